@@ -0,0 +1,75 @@
+"""
+Batch throughput of image groups with synchronous and background encoding.
+
+Several image groups of a large canvas are rendered and saved one after another, first with every image
+encoded before the next group is traced, then with background encoder, which encodes images, while the next group
+is traced. Time of the whole batch is printed for both, and then time of writing one image and size of the file
+for every image format.
+
+Run from the repository root: python benchmarks/background_encoding.py [canvas size] [number of groups]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionCircle
+from plane.plane2d import Point
+from visual.image_output import BackgroundEncoder, ImageFormat
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+NUMBER_OF_BEAMS = 300
+FORMATS = {'png, level 1': ImageFormat(compress_level=1), 'png, level 6': ImageFormat(),
+           'png, level 9': ImageFormat(compress_level=9), 'png, 16 colors': ImageFormat(palette_size=16),
+           'npy': ImageFormat('npy'), 'memmap': ImageFormat('memmap')}
+
+
+def get_image_groups(size: int, number_of_groups: int) -> dict:
+    return {f'group{k}': {'beams': [(LightBeam(Point(10, 10 + i*(size - 20) / NUMBER_OF_BEAMS), 15 + k, max_bounces=30),
+                                     Color.RED, False) for i in range(NUMBER_OF_BEAMS)],
+                          'circles': [(ReflectionCircle(Point(size / 2 + k*20, size / 2), size / 8), Color.GREEN, False)]}
+            for k in range(number_of_groups)}
+
+
+def render_batch(size: int, number_of_groups: int, folder: str, encoder=None) -> float:
+    scene_manager = LightBeamSceneManager(VisualPlane(size, size, path_to_image_folder=folder, encoder=encoder),
+                                          image_groups=get_image_groups(size, number_of_groups))
+    start = time.perf_counter()
+    scene_manager.draw_all_images()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    number_of_groups = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    with tempfile.TemporaryDirectory() as folder:
+        # Progress of every image is printed by scene manager, so it is silenced
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        try:
+            synchronous_time = render_batch(size, number_of_groups, folder)
+            with BackgroundEncoder() as encoder:
+                background_time = render_batch(size, number_of_groups, folder, encoder)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print(f'{number_of_groups} groups of {size}x{size} pixels')
+        print(f'synchronous encoding  {synchronous_time*1000:9.1f} ms')
+        print(f'background encoding   {background_time*1000:9.1f} ms')
+
+        visual_plane = VisualPlane(size, size)
+        LightBeamSceneManager(visual_plane, image_groups=get_image_groups(size, 1)).render_image('group0')
+        pixels = visual_plane.get_pixels()
+        for name, image_format in FORMATS.items():
+            path = os.path.join(folder, 'image' + image_format.get_extension())
+            start = time.perf_counter()
+            image_format.write(pixels, path)
+            print(f'{name:16} {(time.perf_counter() - start)*1000:9.1f} ms {os.path.getsize(path) / 1024:9.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Cold-start import budget.
+
+Every module is imported in a fresh interpreter, which has already imported numpy, several times,
+and the shortest import time is compared with its budget, so timings don't depend on numpy
+and on noise of the machine. Core modules (plane, optical) must also not load the imaging stack.
+Exits with status 1, if any budget is exceeded.
+
+Run from the repository root: python benchmarks/cold_start.py
+"""
+
+import os
+import subprocess
+import sys
+
+# Milliseconds of import time after numpy is imported
+IMPORT_BUDGETS = {
+    'plane.plane2d': 15,
+    'optical.light_beam': 20,
+    'optical.light_sources': 20,
+    'optical.opticalfigures': 15,
+    'visual.visuallight': 45,
+}
+# Modules, which must stay unloaded after importing core modules
+CORE_MODULES = ('plane.plane2d', 'optical.light_beam', 'optical.light_sources', 'optical.opticalfigures')
+RENDERING_MODULES = ('PIL', 'concurrent.futures')
+NUMBER_OF_RUNS = 7
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEASURE_SCRIPT = """
+import sys, time
+import numpy
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, ','.join(name for name in {rendering_modules!r} if name in sys.modules))
+"""
+
+
+def measure_import(module: str) -> tuple[float, list[str]]:
+    """Returns shortest import time of the module in milliseconds and rendering modules, that it loaded"""
+    times = []
+    for _ in range(NUMBER_OF_RUNS):
+        output = subprocess.run([sys.executable, '-c', MEASURE_SCRIPT.format(module=module, rendering_modules=RENDERING_MODULES)],
+                                cwd=REPOSITORY_ROOT, capture_output=True, text=True, check=True).stdout.split(' ')
+        times.append(float(output[0]))
+        loaded_modules = [name for name in output[1].strip().split(',') if name]
+    return (min(times), loaded_modules)
+
+
+def main() -> int:
+    is_within_budget = True
+    for module, budget in IMPORT_BUDGETS.items():
+        import_time, loaded_modules = measure_import(module)
+        status = 'ok' if import_time <= budget else 'OVER BUDGET'
+        if module in CORE_MODULES and loaded_modules:
+            status = f'loads {", ".join(loaded_modules)}'
+        if status != 'ok':
+            is_within_budget = False
+        print(f'{module:<24}{import_time:6.1f} ms of {budget} ms  {status}')
+    return 0 if is_within_budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
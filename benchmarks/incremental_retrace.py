@@ -0,0 +1,72 @@
+"""
+Edit-to-image latency of moving one mirror on a busy optical bench.
+
+Bench of reflecting balls and a column of small mirrors is lit by a fan of beams and rendered once.
+Then one of the mirrors is moved by LightBeamSceneManager.replace_object, which traces again only beams,
+that passed near it, and the same edited scene is rendered from scratch. Times of both are printed,
+and number of pixels, where their images differ (it must be 0).
+
+Run from the repository root: python benchmarks/incremental_retrace.py [number of beams]
+"""
+
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionCircle
+from optical.opticallines import ReflectionSegment
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+PLANE_SIZE = 600
+NUMBER_OF_MIRRORS = 10
+MOVED_MIRROR = 3
+
+
+def get_mirror(i: int, shift: float = 0) -> ReflectionSegment:
+    return ReflectionSegment(Point(550 - shift, 100 + i*40), Point(570, 120 + i*40 + shift), 0.9)
+
+
+def get_scene(number_of_beams: int, moved: bool) -> dict:
+    random.seed(0)
+    circles = [(ReflectionCircle(Point(random.uniform(100, 500), random.uniform(50, 550)), random.uniform(5, 15)),
+                Color.GREEN, False) for _ in range(20)]
+    mirrors = [(get_mirror(i, 10 if moved and i == MOVED_MIRROR else 0), Color.YELLOW) for i in range(NUMBER_OF_MIRRORS)]
+    beams = [(LightBeam(Point(10, 20 + i*(PLANE_SIZE - 40) / number_of_beams), random.uniform(-20, 20), max_bounces=40),
+              Color.RED, False) for i in range(number_of_beams)]
+    return {'circles': circles, 'line_segments': mirrors, 'beams': beams}
+
+
+def render(scene: dict) -> LightBeamSceneManager:
+    scene_manager = LightBeamSceneManager(VisualPlane(PLANE_SIZE, PLANE_SIZE), **scene)
+    scene_manager.render_image()
+    return scene_manager
+
+
+def main() -> None:
+    number_of_beams = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    scene = get_scene(number_of_beams, moved=False)
+    scene_manager = render(scene)
+    start = time.perf_counter()
+    scene_manager.replace_object(scene['line_segments'][MOVED_MIRROR][0], get_mirror(MOVED_MIRROR, 10))
+    incremental_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    full_scene_manager = render(get_scene(number_of_beams, moved=True))
+    full_time = time.perf_counter() - start
+    differences = np.any(scene_manager.visual_plane.framebuffer != full_scene_manager.visual_plane.framebuffer, axis=2)
+    print(f'{number_of_beams} beams, one of {NUMBER_OF_MIRRORS} mirrors moved')
+    print(f'full render         {full_time*1000:9.1f} ms')
+    print(f'incremental update  {incremental_time*1000:9.1f} ms')
+    print(f'{np.count_nonzero(differences)} pixels differ')
+
+
+if __name__ == '__main__':
+    main()
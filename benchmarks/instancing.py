@@ -0,0 +1,82 @@
+"""
+Setup of instanced microstructure array.
+
+Array of identical reflecting triangles is built twice: as scene graph with one prototype
+and as separate ReflectionPolygon objects. Time and peak traced memory of setup are printed for both,
+and then time of tracing the same beams through the scene graph by batch tracer.
+
+Run from the repository root: python benchmarks/instancing.py [number of instances]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionPolygon
+from optical.scene_graph import Prototype, SceneGraph
+from optical.spectral_tracer import BatchTracer
+from plane.plane2d import Plane, Point
+
+TRIANGLE = [Point(0, 0), Point(4, 0), Point(2, 3)]
+PLANE_SIZE = 1000
+NUMBER_OF_BEAMS = 100
+
+
+def measure(build) -> tuple[float, float, object]:
+    """Returns time in seconds and peak traced memory in megabytes of build() and its result"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return (elapsed, peak_memory, result)
+
+
+def get_translations(number_of_instances: int) -> np.ndarray:
+    side = int(np.ceil(np.sqrt(number_of_instances)))
+    spacing = (PLANE_SIZE - 100) / side
+    xs, ys = np.meshgrid(50 + np.arange(side)*spacing, 50 + np.arange(side)*spacing)
+    return np.stack([xs.ravel(), ys.ravel()], axis=1)[:number_of_instances]
+
+
+def build_scene_graph(translations: np.ndarray) -> SceneGraph:
+    transforms = np.zeros((translations.shape[0], 6))
+    transforms[:, 0] = transforms[:, 3] = 1
+    transforms[:, 4:] = translations
+    scene_graph = SceneGraph()
+    scene_graph.add_instances(Prototype(ReflectionPolygon(TRIANGLE, 1)), transforms)
+    scene_graph.build()
+    return scene_graph
+
+
+def build_polygons(translations: np.ndarray) -> list[ReflectionPolygon]:
+    return [ReflectionPolygon([Point(point.x + x, point.y + y) for point in TRIANGLE], 1)
+            for x, y in translations.tolist()]
+
+
+def main() -> None:
+    number_of_instances = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    translations = get_translations(number_of_instances)
+    graph_time, graph_memory, scene_graph = measure(lambda: build_scene_graph(translations))
+    polygons_time, polygons_memory, _ = measure(lambda: build_polygons(translations))
+    print(f'{number_of_instances} instances')
+    print(f'scene graph  {graph_time*1000:9.1f} ms {graph_memory:8.1f} MB')
+    print(f'polygons     {polygons_time*1000:9.1f} ms {polygons_memory:8.1f} MB')
+
+    beams = [LightBeam(Point(0, 10 + i*(PLANE_SIZE - 20) / NUMBER_OF_BEAMS), 1 + i*0.3) for i in range(NUMBER_OF_BEAMS)]
+    start = time.perf_counter()
+    BatchTracer(Plane(PLANE_SIZE).borders_as_list() + [scene_graph]).trace(beams)
+    elapsed = time.perf_counter() - start
+    number_of_bounces = sum(len(beam.coordinates) for beam in beams)
+    print(f'{NUMBER_OF_BEAMS} beams traced in {elapsed*1000:.1f} ms, {number_of_bounces} points')
+
+
+if __name__ == '__main__':
+    main()
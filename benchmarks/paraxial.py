@@ -0,0 +1,63 @@
+"""
+Design iterations of a doublet by paraxial ray transfer matrices.
+
+Two lenses and a flat window are compiled into ParaxialSystem, and bundle of rays is propogated
+to the image plane again and again, while distance between the lenses is changed, as a design loop would do.
+The same number of iterations is done by exact tracing. Iterations per second of both are printed,
+and the largest differences of heights and angles between them at the image plane.
+
+Run from the repository root: python benchmarks/paraxial.py [number of rays]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optical.opticalfigures import RefractionLens
+from optical.opticallines import RefractionSegment
+from optical.paraxial import ParaxialSystem
+from plane.plane2d import Point
+
+AXIS_ORIGIN = Point(10, 300)
+IMAGE_POSITION = 600
+SECONDS_PER_MODE = 1
+
+
+def get_system(spacing: float) -> ParaxialSystem:
+    elements = [RefractionLens(Point(200, 300), 80, 400, -400, 1.5, edge_thickness=4),
+                RefractionLens(Point(200 + spacing, 300), 80, -600, 600, 1.6, edge_thickness=8),
+                RefractionSegment(Point(450, 350), Point(450, 250), 1.5, 1)]
+    return ParaxialSystem(elements, AXIS_ORIGIN)
+
+
+def run(evaluate, heights: np.ndarray, angles: np.ndarray) -> float:
+    """Returns number of design iterations per second, done by evaluate(system, heights, angles)"""
+    iterations = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < SECONDS_PER_MODE:
+        evaluate(get_system(30 + iterations % 20), heights, angles)
+        iterations += 1
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    number_of_rays = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    heights = np.linspace(-20, 20, number_of_rays)
+    angles = np.linspace(-1, 1, number_of_rays)
+    paraxial_rate = run(lambda system, heights, angles: system.propogate(heights, angles, IMAGE_POSITION), heights, angles)
+    exact_rate = run(lambda system, heights, angles: system.trace_exactly(heights, angles, IMAGE_POSITION), heights, angles)
+    height_differences, angle_differences = get_system(30).compare_with_exact(heights, angles, IMAGE_POSITION)
+    print(f'{number_of_rays} rays through 2 lenses and a window')
+    print(f'paraxial  {paraxial_rate:10.1f} iterations/s')
+    print(f'exact     {exact_rate:10.1f} iterations/s')
+    print(f'max height difference {np.nanmax(np.abs(height_differences)):.4f}, '
+          f'max angle difference {np.nanmax(np.abs(angle_differences)):.4f} degrees, '
+          f'{np.count_nonzero(np.isnan(height_differences))} rays lost by exact tracing')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Transport of multi-process tracing: pickling versus shared memory.
+
+Spectral beams are traced through a scene of a prism, a lens, a water drop and mirrors three ways:
+by BatchTracer in this process, by pool of worker processes, which get pickled geometry and beams with every task
+and send pickled paths back, and by ProcessTracer, which publishes packed geometry into shared memory once
+and lets workers write paths into shared arrays.
+Objects of the scene can't be pickled as they are (transparensy of figures is kept in lambdas),
+so pickled tasks carry the same packed tables, as are published into shared memory. Times of every way are printed,
+and number of pixels, where images, rendered with and without process tracer, differ (it must be 0).
+Workers can only be faster than batch tracer, when there are several cores for them: with one core
+both ways of transport are slower, than tracing in this process.
+
+Run from the repository root: python benchmarks/shared_tracing.py [number of spectral beams] [number of workers]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optical.dispersion import BK7_GLASS
+from optical.light_beam import LightBeam
+from optical.opticalfigures import RefractionCircle, RefractionLens, RefractionPolygon
+from optical.opticallines import ReflectionSegment
+from optical.shared_tracer import PackedGeometry, ProcessTracer, unpack_objects
+from optical.spectral_tracer import BatchTracer, SpectralBeam
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+PLANE_SIZE = 600
+NUMBER_OF_WAVELENGTHS = 7
+CHUNKS_PER_WORKER = 4
+
+
+def get_scene(number_of_beams: int) -> dict:
+    prism = RefractionPolygon([Point(250, 200), Point(350, 200), Point(300, 290)], BK7_GLASS)
+    lens = RefractionLens(Point(420, 380), 120, 200, -200, BK7_GLASS, edge_thickness=10)
+    drop = RefractionCircle(Point(180, 420), 70, 1.33)
+    mirrors = [(ReflectionSegment(Point(560, 50 + i*100), Point(580, 120 + i*100), 0.9), Color.YELLOW) for i in range(5)]
+    beams = [(SpectralBeam.construct_visible(Point(20, 20 + i*(PLANE_SIZE - 40) / number_of_beams), 10 - 20*i / number_of_beams,
+                                             NUMBER_OF_WAVELENGTHS, max_bounces=40), Color.WHITE, False)
+             for i in range(number_of_beams)]
+    return {'beams': beams, 'polygons': [(prism, Color.BLUE)], 'lenses': [(lens, Color.GREEN)],
+            'circles': [(drop, Color.BLUE, False)], 'line_segments': mirrors}
+
+
+def _trace_pickled(tables: dict[str, np.ndarray], refraction_coefficients: list[Any], figure_coefficients: np.ndarray,
+                   starts: list[tuple[float, float, float, float, int, list[int]]]) -> list[np.ndarray]:
+    """Rebuilds objects from pickled tables, traces beams from given starts and returns their paths"""
+    objects, figures = unpack_objects(tables, refraction_coefficients, figure_coefficients)
+    beams = []
+    for x, y, angle, wavelength, max_bounces, media in starts:
+        beam = LightBeam(Point(x, y), angle, max_bounces=max_bounces, wavelength=wavelength)
+        beam.media = [figures[index] for index in media]
+        beams.append(beam)
+    BatchTracer(objects).trace(beams)
+    return [np.array([(point.x, point.y) for point in beam.coordinates]) for beam in beams]
+
+
+def trace_pickled(executor: ProcessPoolExecutor, geometry: PackedGeometry, beams: list[LightBeam],
+                  number_of_chunks: int) -> None:
+    """Sends geometry and chunk of beams to workers with every task, and gives beams paths, which workers send back"""
+    figure_indexes = {id(figure): i for i, figure in enumerate(geometry.figures)}
+    starts = [(beam.origin.x, beam.origin.y, beam.initial_angle, beam.wavelength, beam.max_number_of_bounces,
+               [figure_indexes[id(figure)] for figure in beam.media]) for beam in beams]
+    bounds = np.linspace(0, len(beams), number_of_chunks + 1).astype(np.int64).tolist()
+    futures = [executor.submit(_trace_pickled, geometry.tables, geometry.refraction_coefficients, geometry.figure_coefficients,
+                               starts[first_beam:last_beam])
+               for first_beam, last_beam in zip(bounds, bounds[1:])]
+    paths = [path for future in futures for path in future.result()]
+    for beam, path in zip(beams, paths):
+        beam.coordinates = [Point(x, y) for x, y in path.tolist()]
+
+
+def get_beams(scene_manager: LightBeamSceneManager) -> list[LightBeam]:
+    """Returns fresh wavelength beams of the scene with resolved media"""
+    beams = [LightBeam(beam.origin, beam.initial_angle, max_bounces=beam.max_number_of_bounces, wavelength=beam.wavelength)
+             for beam in (visual_beam.beam for visual_beam in scene_manager.spectral_visual_beams)]
+    scene_manager.resolve_refraction_coefficients(beams)
+    return beams
+
+
+def measure(trace, *arguments: Any) -> float:
+    start = time.perf_counter()
+    trace(*arguments)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    number_of_beams = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    number_of_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    scene_manager = LightBeamSceneManager(VisualPlane(PLANE_SIZE, PLANE_SIZE), **get_scene(number_of_beams))
+    plane = scene_manager.visual_plane.plane
+    objects = plane.borders_as_list() + plane.objects_on_plane
+
+    batch_time = measure(lambda beams: BatchTracer(objects).trace(beams), get_beams(scene_manager))
+    with ProcessPoolExecutor(number_of_workers) as executor:
+        # Workers are started before measuring, like warm pool of process tracer
+        trace_pickled(executor, PackedGeometry(objects), get_beams(scene_manager), number_of_workers)
+        pickled_time = measure(lambda beams: trace_pickled(executor, PackedGeometry(objects), beams,
+                                                           number_of_workers*CHUNKS_PER_WORKER), get_beams(scene_manager))
+    with ProcessTracer(number_of_workers, CHUNKS_PER_WORKER) as process_tracer:
+        process_tracer.publish(objects)
+        process_tracer.trace(get_beams(scene_manager))
+        shared_time = measure(process_tracer.trace, get_beams(scene_manager))
+
+        scene_manager.render_image()
+        process_scene_manager = LightBeamSceneManager(VisualPlane(PLANE_SIZE, PLANE_SIZE), **get_scene(number_of_beams),
+                                                      process_tracer=process_tracer)
+        process_scene_manager.render_image()
+    differences = np.any(scene_manager.visual_plane.framebuffer != process_scene_manager.visual_plane.framebuffer, axis=2)
+    print(f'{number_of_beams} spectral beams of {NUMBER_OF_WAVELENGTHS} wavelengths, {number_of_workers} workers')
+    print(f'batch tracer in process     {batch_time*1000:9.1f} ms')
+    print(f'workers, pickled per task   {pickled_time*1000:9.1f} ms')
+    print(f'workers, shared memory      {shared_time*1000:9.1f} ms')
+    print(f'{np.count_nonzero(differences)} pixels differ')
+
+
+if __name__ == '__main__':
+    main()
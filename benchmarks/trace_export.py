@@ -0,0 +1,65 @@
+"""
+Memory of streaming trace export.
+
+Beams of a point light source are traced through a few mirrors and lenses into radiance buffer
+and exported to NPZ with several chunk sizes. Rows of every table, time and peak of memory, allocated by Python
+while tracing (measured by tracemalloc), are printed, so it can be seen, that memory is bounded by chunk size,
+not by number of exported points.
+
+Run from the repository root: python benchmarks/trace_export.py [number of beams]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optical.light_sources import PointLightSource
+from optical.opticalfigures import ReflectionCircle, RefractionCircle
+from optical.trace_export import TraceExporter
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+PLANE_SIZE = 300
+CHUNK_SIZES = (1024, 16384, 262144)
+
+
+def get_scene(number_of_beams: int) -> dict:
+    return {'sources': [(PointLightSource(Point(150, 150), 0, number_of_beams, seed=0), Color.RED)],
+            'circles': [(ReflectionCircle(Point(60, 60), 20, 0.9), Color.GREEN, False),
+                        (RefractionCircle(Point(220, 200), 40, 1.5), Color.BLUE, False)]}
+
+
+def main() -> None:
+    number_of_beams = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    print(f'{number_of_beams} beams of point light source')
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'trace.npz')
+        for chunk_size in CHUNK_SIZES:
+            scene_manager = LightBeamSceneManager(VisualPlane(PLANE_SIZE, PLANE_SIZE), **get_scene(number_of_beams))
+            tracemalloc.start()
+            start = time.perf_counter()
+            with TraceExporter(path, chunk_size=chunk_size) as exporter:
+                scene_manager.trace_exporter = exporter
+                # Progress is printed by scene manager, so it is silenced
+                with contextlib.redirect_stdout(io.StringIO()):
+                    scene_manager.render_image()
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with np.load(path) as trace:
+                sizes = ', '.join(f'{table} {trace[f"{table}_beam"].size}' for table in ('beams', 'points', 'events'))
+            print(f'chunk of {chunk_size:6} rows: {elapsed*1000:8.1f} ms, peak {peak / 2**20:7.1f} MiB, '
+                  f'file {os.path.getsize(path) / 2**20:6.1f} MiB ({sizes})')
+
+
+if __name__ == '__main__':
+    main()
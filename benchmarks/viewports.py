@@ -0,0 +1,77 @@
+"""
+One trace drawn at several resolutions through viewports versus a trace per resolution.
+
+The same scene of mirrors, a prism and a lens is rendered as thumbnail, full-size image and zoomed crop.
+First every image is traced on its own plane (scene is scaled to the size of the image, crop is cut out
+of the scene, traced at crop scale), then the scene is traced once and drawn three times through viewports.
+Times of both ways are printed, and number of pixels, where full-size images of both ways differ (it must be 0).
+
+Run from the repository root: python benchmarks/viewports.py [number of beams]
+"""
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionCircle, RefractionLens, RefractionPolygon
+from optical.opticallines import ReflectionSegment
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+from visual.viewport import Viewport
+
+SCENE_SIZE = 800
+# Thumbnail, full-size image and zoomed crop of the prism
+VIEWPORTS = {'thumbnail': Viewport(0.25), 'full size': Viewport(), 'crop x4': Viewport.crop(300, 300, 500, 500, 4)}
+
+
+def get_scene(number_of_beams: int, scale: float = 1) -> dict:
+    def to_scale(x: float, y: float) -> Point:
+        return Point(x*scale, y*scale)
+
+    beams = [(LightBeam(to_scale(20, 20 + i*(SCENE_SIZE - 40) / number_of_beams), 15 - 30*i / number_of_beams,
+                        max_bounces=30), Color.RED, False) for i in range(number_of_beams)]
+    mirrors = [(ReflectionSegment(to_scale(760, 100 + i*150), to_scale(780, 200 + i*150), 0.9), Color.YELLOW) for i in range(4)]
+    return {'beams': beams, 'line_segments': mirrors,
+            'polygons': [(RefractionPolygon([to_scale(330, 330), to_scale(470, 330), to_scale(400, 450)], 1.5), Color.BLUE)],
+            'lenses': [(RefractionLens(to_scale(600, 250), 200*scale, 300*scale, -300*scale, 1.5, edge_thickness=10*scale), Color.GREEN)],
+            'circles': [(ReflectionCircle(to_scale(200, 600), 80*scale, 0.8), Color.GREEN, False)]}
+
+
+def main() -> None:
+    number_of_beams = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    # Progress is printed by scene manager, so it is silenced
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for name, viewport in VIEWPORTS.items():
+            # Scene, traced at scale of the viewport, is as large, as the whole scene in pixels of the viewport
+            size = round(SCENE_SIZE*viewport.scale)
+            scene_manager = LightBeamSceneManager(VisualPlane(size, size), **get_scene(number_of_beams, viewport.scale))
+            scene_manager.render_image()
+            if name == 'full size':
+                separate_pixels = scene_manager.visual_plane.get_pixels()
+        separate_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scene_manager = LightBeamSceneManager(VisualPlane(SCENE_SIZE, SCENE_SIZE), **get_scene(number_of_beams))
+        scene_manager.render_image()
+        trace_time = time.perf_counter() - start
+        views = {name: scene_manager.render_view(viewport) for name, viewport in VIEWPORTS.items()}
+        view_time = time.perf_counter() - start
+    differences = np.any(views['full size'].get_pixels() != separate_pixels, axis=2)
+    print(f'{number_of_beams} beams, scene of {SCENE_SIZE}x{SCENE_SIZE}, views: '
+          + ', '.join(f'{name} {"x".join(map(str, view.plane.size()))}' for name, view in views.items()))
+    print(f'trace per resolution      {separate_time*1000:9.1f} ms')
+    print(f'one trace, three views    {view_time*1000:9.1f} ms (trace {trace_time*1000:.1f} ms)')
+    print(f'{np.count_nonzero(differences)} pixels differ')
+
+
+if __name__ == '__main__':
+    main()
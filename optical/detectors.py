@@ -0,0 +1,125 @@
+import numpy as np
+
+from plane.plane2d import Line, LineSegment, Point, Polygon
+
+# Incidence angles are measured from the normal of the surface, so they always lie in this range
+INCIDENCE_ANGLES_RANGE = (-90, 90)
+
+
+class Detector:
+    def __init__(self, number_of_position_bins: int = 100, number_of_angle_bins: int = 1, absorbing: bool = True) -> None:
+        """
+        Sensor, that accumulates relative intensity of every beam, that hits it,
+        into histogram of position along its surface (from 0 to 1) and incidence angle in degrees.
+        Absorbing detector stops beams, other detectors let them pass without turning.
+        """
+        if number_of_position_bins < 1 or number_of_angle_bins < 1:
+            raise ValueError(f'Numbers of bins must be positive, but {number_of_position_bins} and {number_of_angle_bins} were given')
+        self.number_of_position_bins = number_of_position_bins
+        self.number_of_angle_bins = number_of_angle_bins
+        self.absorbing = absorbing
+        self.histogram = np.zeros((number_of_position_bins, number_of_angle_bins), np.float64)
+        self.number_of_hits = 0
+
+    def deposit(self, positions: np.ndarray, angles: np.ndarray, intensities: np.ndarray) -> None:
+        """Adds intensities of hits at given positions (from 0 to 1) with given incidence angles (in degrees)"""
+        positions, angles = np.asarray(positions, np.float64), np.asarray(angles, np.float64)
+        intensities = np.broadcast_to(np.asarray(intensities, np.float64), positions.shape)
+        first_angle, last_angle = INCIDENCE_ANGLES_RANGE
+        position_bins = np.clip((positions*self.number_of_position_bins).astype(np.int64), 0, self.number_of_position_bins - 1)
+        angle_bins = np.clip(((angles - first_angle) / (last_angle - first_angle)*self.number_of_angle_bins).astype(np.int64),
+                             0, self.number_of_angle_bins - 1)
+        self.histogram += np.bincount(position_bins*self.number_of_angle_bins + angle_bins, weights=intensities,
+                                      minlength=self.histogram.size).reshape(self.histogram.shape)
+        self.number_of_hits += positions.size
+
+    def reset(self) -> None:
+        self.histogram.fill(0)
+        self.number_of_hits = 0
+
+    def get_total_intensity(self) -> float:
+        return float(self.histogram.sum())
+
+    def get_position_profile(self) -> np.ndarray:
+        """Returns intensity in every position bin, summed over incidence angles"""
+        return self.histogram.sum(axis=1)
+
+    def get_angle_profile(self) -> np.ndarray:
+        """Returns intensity in every incidence angle bin, summed over positions"""
+        return self.histogram.sum(axis=0)
+
+    def get_position_bin_edges(self) -> np.ndarray:
+        return np.linspace(0, 1, self.number_of_position_bins + 1)
+
+    def get_angle_bin_edges(self) -> np.ndarray:
+        return np.linspace(*INCIDENCE_ANGLES_RANGE, self.number_of_angle_bins + 1)
+
+
+class DetectorLine(Line):
+    def __init__(self, first_point: Point, second_point: Point, detector: Detector,
+                 first_position: float = 0, position_size: float = 1) -> None:
+        """
+        Line of detector surface from first to second point, which positions on detector
+        are from first position to first position + position size.
+        Tracers record hits on this line into the detector.
+        """
+        line = Line.construct_by_two_points(first_point, second_point)
+        super().__init__(line.sample_coordinates, angle=line.angle)
+        self.first_point = first_point
+        self.second_point = second_point
+        self.detector = detector
+        self.first_position = first_position
+        self.position_size = position_size
+
+    def record_hits(self, xs: np.ndarray, ys: np.ndarray, dxs: np.ndarray, dys: np.ndarray,
+                    intensities: np.ndarray) -> None:
+        """
+        Records hits of beams at given points with given unit directions and intensities.
+        Incidence angle is positive, if beam moves towards the second point of the line.
+        """
+        vector_x, vector_y = self.second_point.x - self.first_point.x, self.second_point.y - self.first_point.y
+        length = np.hypot(vector_x, vector_y)
+        tangent_x, tangent_y = vector_x / length, vector_y / length
+        xs, ys, dxs, dys = (np.asarray(array, np.float64) for array in (xs, ys, dxs, dys))
+        parameters = np.clip(((xs - self.first_point.x)*tangent_x + (ys - self.first_point.y)*tangent_y) / length, 0, 1)
+        angles = np.degrees(np.arctan2(dxs*tangent_x + dys*tangent_y, np.abs(dxs*tangent_y - dys*tangent_x)))
+        self.detector.deposit(self.first_position + parameters*self.position_size, angles, intensities)
+
+    def record_hit(self, point: Point, direction_x: float, direction_y: float, intensity: float) -> None:
+        self.record_hits(np.array([point.x]), np.array([point.y]), np.array([direction_x]), np.array([direction_y]),
+                         np.array([intensity]))
+
+
+class DetectorSegment(LineSegment):
+    def __init__(self, first_point: Point, second_point: Point, detector: Detector,
+                 first_position: float = 0, position_size: float = 1) -> None:
+        """Part of detector surface, which positions on detector go from first point to second one"""
+        super().__init__(first_point, second_point)
+        self.related_line = DetectorLine(first_point, second_point, detector, first_position, position_size)
+
+
+class SegmentDetector(DetectorSegment, Detector):
+    def __init__(self, first_point: Point, second_point: Point, number_of_position_bins: int = 100,
+                 number_of_angle_bins: int = 1, absorbing: bool = True) -> None:
+        """Detector on line segment, which position goes from 0 at first point to 1 at second one"""
+        Detector.__init__(self, number_of_position_bins, number_of_angle_bins, absorbing)
+        DetectorSegment.__init__(self, first_point, second_point, self)
+
+
+class PolygonDetector(Polygon, Detector):
+    def __init__(self, vertexes: list[Point], number_of_position_bins: int = 100,
+                 number_of_angle_bins: int = 1, absorbing: bool = True) -> None:
+        """
+        Detector on border of polygon. Position goes along the perimeter from the first vertex
+        through vertexes in given order, so it is proportional to the length of passed border.
+        """
+        Polygon.__init__(self, vertexes)
+        Detector.__init__(self, number_of_position_bins, number_of_angle_bins, absorbing)
+        next_vertexes = vertexes[1:] + vertexes[:1]
+        lengths = [vertex.get_distance_to_point(next_vertex) for vertex, next_vertex in zip(vertexes, next_vertexes)]
+        perimeter = sum(lengths)
+        self.edges: list[DetectorSegment] = []
+        first_position = 0
+        for vertex, next_vertex, length in zip(vertexes, next_vertexes, lengths):
+            self.edges.append(DetectorSegment(vertex, next_vertex, self, first_position, length / perimeter))
+            first_position += length / perimeter
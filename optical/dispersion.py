@@ -0,0 +1,71 @@
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+# Wavelength in nanometres (sodium D line), at which dispersive media are resolved for beams without wavelength
+REFERENCE_WAVELENGTH = 589.3
+
+
+class DispersionModel:
+    """Refraction coefficient of a medium as a function of wavelength in nanometres"""
+
+    def get_refraction_coefficients(self, wavelengths: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def get_refraction_coefficient(self, wavelength: float = REFERENCE_WAVELENGTH) -> float:
+        return float(self.get_refraction_coefficients(np.array([wavelength], np.float64))[0])
+
+
+class CauchyDispersion(DispersionModel):
+    def __init__(self, a: float, b: float = 0, c: float = 0) -> None:
+        """
+        Cauchy equation n = a + b / l^2 + c / l^4, where wavelength l is in micrometres.
+        For example, a = 1.5046, b = 0.0042 for BK7 glass.
+        """
+        self.a = a
+        self.b = b
+        self.c = c
+
+    def get_refraction_coefficients(self, wavelengths: np.ndarray) -> np.ndarray:
+        squared_wavelengths = (np.asarray(wavelengths, np.float64) / 1000)**2
+        return self.a + self.b / squared_wavelengths + self.c / (squared_wavelengths*squared_wavelengths)
+
+    def __repr__(self) -> str:
+        return f'CauchyDispersion({self.a}, {self.b}, {self.c})'
+
+
+class SellmeierDispersion(DispersionModel):
+    def __init__(self, b_coefficients: Sequence[float], c_coefficients: Sequence[float]) -> None:
+        """
+        Sellmeier equation n^2 = 1 + sum(b * l^2 / (l^2 - c)), where wavelength l is in micrometres,
+        and c coefficients are in squared micrometres.
+        """
+        if len(b_coefficients) != len(c_coefficients):
+            raise ValueError(f'Sellmeier equation needs the same number of b and c coefficients, \
+                               but {len(b_coefficients)} and {len(c_coefficients)} were given')
+        self.b_coefficients = tuple(float(b) for b in b_coefficients)
+        self.c_coefficients = tuple(float(c) for c in c_coefficients)
+
+    def get_refraction_coefficients(self, wavelengths: np.ndarray) -> np.ndarray:
+        squared_wavelengths = (np.asarray(wavelengths, np.float64) / 1000)**2
+        squared_coefficients = np.ones_like(squared_wavelengths)
+        for b, c in zip(self.b_coefficients, self.c_coefficients):
+            squared_coefficients += b * squared_wavelengths / (squared_wavelengths - c)
+        return np.sqrt(squared_coefficients)
+
+    def __repr__(self) -> str:
+        return f'SellmeierDispersion({self.b_coefficients}, {self.c_coefficients})'
+
+
+BK7_GLASS = SellmeierDispersion((1.03961212, 0.231792344, 1.01046945), (0.00600069867, 0.0200179144, 103.560653))
+FUSED_SILICA = SellmeierDispersion((0.6961663, 0.4079426, 0.8974794), (0.0046791483, 0.0135120631, 97.9340025))
+
+RefractionCoefficientType = Union[float, DispersionModel]
+
+
+def get_refraction_coefficient(refraction_coefficient: RefractionCoefficientType,
+                               wavelength: Optional[float] = None) -> float:
+    """Resolves coefficient, that may depend on wavelength, for given wavelength (or reference one, if None)"""
+    if isinstance(refraction_coefficient, DispersionModel):
+        return refraction_coefficient.get_refraction_coefficient(REFERENCE_WAVELENGTH if wavelength is None else wavelength)
+    return refraction_coefficient
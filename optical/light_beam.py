@@ -1,154 +1,295 @@
-from math import sin, cos, radians, asin, degrees
-from typing import Union
+from math import atan2, degrees, fabs, sqrt
+from typing import TYPE_CHECKING, Optional, Union
 
-from plane.plane2d import Cirlce, Line, LineSegment, Point
+from optical.dispersion import RefractionCoefficientType, get_refraction_coefficient
+from plane.distance_field import DistanceField
+from plane.plane2d import Cirlce, Line, LineSegment, Point, Ray, Vector2d
 from optical.opticallines import ReflectionLine, RefractionLine
 
+if TYPE_CHECKING:
+    from plane.conics2d import Conic
+    from plane.polygons2d import Arc
+
 class LightBeam:
+    # Distance, that sphere tracing keeps from objects, before switching to unit steps
+    SPHERE_TRACING_MARGIN = 1
+
     def __init__(self, start_coordinates: Point, angle: float,
-                 *,initial_refraction_coefficient: float = 1, max_bounces: int = 100) -> None:
-        """Angle in degrees"""
+                 *,initial_refraction_coefficient: RefractionCoefficientType = 1, max_bounces: int = 100,
+                 wavelength: Optional[float] = None) -> None:
+        """
+        Angle in degrees.
+        Wavelength in nanometres is used to resolve refraction coefficients of dispersive media.
+        Beam without wavelength sees them at reference wavelength.
+        Media is stack of closed figures (refraction polygons, circles and lenses), inside which beam is, outermost first.
+        If it is set, beam pushes and pops figures, when it crosses their borders, and takes refraction coefficients
+        on the borders from the stack. Otherwise coefficients are taken from the side of refraction line, beam comes from.
+        """
         self.angle = angle
-        while self.angle <= -180 or self.angle > 180:
-            if self.angle < -180:
-                self.angle += 360
-            else:
-                self.angle -= 360
         self.coordinates = [start_coordinates]
-        self.refracion_coefficient = initial_refraction_coefficient
+        self.wavelength = wavelength
+        self.refracion_coefficient = get_refraction_coefficient(initial_refraction_coefficient, wavelength)
+        self.initial_refraction_coefficient = initial_refraction_coefficient
         self._number_of_bounces = 0
         self.max_number_of_bounces = max_bounces
         self.relative_intensity = 1
         self.origin = start_coordinates
         self.initial_angle = angle
+        self.media: Optional[list] = None
+
+    @property
+    def angle(self) -> float:
+        """Angle between beam and Ox in degrees. Beam itself keeps unit direction vector."""
+        return degrees(atan2(self.direction.y, self.direction.x))
+
+    @angle.setter
+    def angle(self, angle: float) -> None:
+        self.direction = Vector2d.construct_from_length(1, angle)
+
+    def copy(self) -> 'LightBeam':
+        """Returns beam in the same state, that continues from two last points of this beam"""
+        beam = LightBeam(self.coordinates[-1], 0, initial_refraction_coefficient=self.refracion_coefficient,
+                         max_bounces=self.max_number_of_bounces, wavelength=self.wavelength)
+        beam.direction = self.direction
+        beam.coordinates = self.coordinates[-2:]
+        beam._number_of_bounces = self._number_of_bounces
+        beam.relative_intensity = self.relative_intensity
+        beam.origin = self.origin
+        beam.initial_angle = self.initial_angle
+        beam.media = list(self.media) if self.media is not None else None
+        return beam
+
+    def get_state(self) -> tuple:
+        """Returns state, from which beam continues its path. Path itself is kept as number of its points."""
+        return (len(self.coordinates), self.direction, self.refracion_coefficient,
+                self.relative_intensity, self._number_of_bounces, tuple(self.media) if self.media is not None else None)
+
+    def restore_state(self, state: tuple) -> None:
+        """Returns beam into given state, forgetting points of the path, that were passed after it"""
+        number_of_points, self.direction, self.refracion_coefficient, self.relative_intensity, self._number_of_bounces, media = state
+        self.media = list(media) if media is not None else None
+        del self.coordinates[number_of_points:]
+
+    def is_exhausted(self) -> bool:
+        """Exhausted beam has made more than max number of bounces and can't propogate anymore"""
+        return self._number_of_bounces > self.max_number_of_bounces
 
     def propogate(self, distance: float = 1) -> Point:
         if self._number_of_bounces > self.max_number_of_bounces: return
 
-        previous_x, previous_y = self.coordinates[-1].x, self.coordinates[-1].y
-        x = previous_x + (cos(radians(self.angle)) * distance)
-        y = previous_y + (sin(radians(self.angle)) * distance)
-        self.coordinates.append(Point(x, y))
-        return Point(x, y)
+        previous_point = self.coordinates[-1]
+        point = Point(previous_point.x + self.direction.x*distance, previous_point.y + self.direction.y*distance)
+        self.coordinates.append(point)
+        return point
+
+    def propogate_steps(self, number_of_steps: int) -> None:
+        """Makes given number of unit steps, which points are the same, as of the same number of propogate calls"""
+        if self._number_of_bounces > self.max_number_of_bounces: return
+
+        x, y = self.coordinates[-1].x, self.coordinates[-1].y
+        step_x, step_y = self.direction.x*1, self.direction.y*1
+        for _ in range(number_of_steps):
+            x, y = x + step_x, y + step_y
+            self.coordinates.append(Point(x, y))
 
-    def propogate_until(self, objects: list[Union[LineSegment, Line, Cirlce]]) -> Line:
+    def propogate_until(self, objects: list[Union[LineSegment, Line, Cirlce, 'Arc', 'Conic']],
+                        distance_field: Optional[DistanceField] = None) -> Line:
+        """
+        Propogates beam until it hits one of the objects and returns line, that was hit.
+        If distance field of the objects is given, objects are not checked, while beam moves through open space
+        by clearance to the closest object, and are checked only near objects. Beam makes the same unit steps
+        in both cases, so its path is the same, as without distance field.
+        Objects with get_ray_hit (like scene graphs) find their hit once, before the beam starts moving.
+        Arcs and conics are told by get_signed_distances_on_arc and get_signed_distances,
+        so plain beams don't load their modules.
+        """
         if self._number_of_bounces > self.max_number_of_bounces: return None
 
+        starting_point = self.coordinates[-1]
         starting_directions = []
+        ray_hits = {}
         for i, object_ in enumerate(objects):
-            if isinstance(object_, Line) or isinstance(object_, Cirlce):
+            if hasattr(object_, 'get_ray_hit'):
+                starting_directions.append(None)
+                ray_hit = object_.get_ray_hit(Ray(starting_point, self.direction))
+                if ray_hit is not None:
+                    ray_hits[i] = ray_hit
+            elif (isinstance(object_, (Line, Cirlce)) or hasattr(object_, 'get_signed_distances_on_arc')
+                  or hasattr(object_, 'get_signed_distances')):
                 starting_directions.append(object_.get_direction_to_point(self.coordinates[-1]))
             elif isinstance(object_, LineSegment):
                 direction = object_.reconstruct_line().get_direction_to_point(self.coordinates[-1])
-                # Exclude s direction if intersection point doesn't lie on line segment itself
-                if (direction == 's' and object_.check_intersection(Line(self.coordinates[-1], self.angle))) or direction != 's':
+                # Exclude s direction if point doesn't lie on line segment itself
+                if (direction == 's' and 0 <= object_.get_projection_parameter(self.coordinates[-1]) <= 1) or direction != 's':
                     starting_directions.append(direction)
                 else:
                     starting_directions.append('lou')
             if starting_directions[i] == 's':
                 return None
         while True:
-            #TODO: optimize by propogating at steps == distance to nearest object (or similar, like check in 100 radius) 
+            if distance_field is not None:
+                # No object can be crossed by moving less than clearance, so there is nothing to check
+                clearance = distance_field.get_clearance(self.coordinates[-1])
+                if clearance > self.SPHERE_TRACING_MARGIN + 1:
+                    self.propogate_steps(int(clearance - self.SPHERE_TRACING_MARGIN))
+                    continue
             new_point = self.propogate()
             for i, object_ in enumerate(objects):
-                if isinstance(object_, Line):
+                if i in ray_hits:
+                    distance, line = ray_hits[i]
+                    if starting_point.get_distance_to_point(new_point) >= distance:
+                        self.coordinates.pop()
+                        self.coordinates.append(Ray(starting_point, self.direction).get_point(distance))
+                        return line
+                elif isinstance(object_, Line):
                     if object_.get_direction_to_point(new_point) != starting_directions[i]:
                         self.coordinates.pop()
-                        movement_line = Line(self.coordinates[-1], self.angle)
-                        intersection_point = Line.get_intersection_point(object_, movement_line)
-                        if intersection_point is not None:
-                            self.coordinates.append(intersection_point)
+                        movement_ray = Ray(self.coordinates[-1], self.direction)
+                        distance = movement_ray.get_signed_distance_to_line(object_)
+                        if distance is not None:
+                            self.coordinates.append(movement_ray.get_point(distance))
                         return object_
                 elif isinstance(object_, LineSegment):
                     if object_.reconstruct_line().get_direction_to_point(new_point) != starting_directions[i]:
-                        movement_line = Line(self.coordinates[-2], self.angle)
-                        is_intersect, intersection_point, related_line_hit = object_.get_intersection(movement_line)
-                        if is_intersect:
+                        movement_ray = Ray(self.coordinates[-2], self.direction)
+                        distance = movement_ray.get_signed_distance_to_line(object_)
+                        if distance is None:
+                            continue
+                        intersection_point = movement_ray.get_point(distance)
+                        if 0 <= object_.get_projection_parameter(intersection_point) <= 1:
                             self.coordinates.pop()
                             self.coordinates.append(intersection_point)
-                            return related_line_hit
+                            return object_.reconstruct_line()
                 elif isinstance(object_, Cirlce):
                     if object_.get_direction_to_point(new_point) != starting_directions[i]:
-                        movement_line = Line(self.coordinates[-2], self.angle)
-                        is_intersect, first_point, second_point = object_.get_intersection(movement_line)
-                        if is_intersect:
+                        movement_ray = Ray(self.coordinates[-2], self.direction)
+                        distances = movement_ray.get_signed_distances_to_circle(object_)
+                        if distances is not None:
                             self.coordinates.pop()
-                            distance_first = self.coordinates[-1].get_distance_to_point(first_point)
-                            distance_second = self.coordinates[-1].get_distance_to_point(second_point)
-                            if distance_first <= distance_second:
-                                self.coordinates.append(first_point)
-                                return object_.get_tangent_line(first_point)
-                            self.coordinates.append(second_point)
-                            return object_.get_tangent_line(second_point)
-
+                            intersection_point = movement_ray.get_point(min(distances, key=fabs))
+                            self.coordinates.append(intersection_point)
+                            return object_.get_tangent_line(intersection_point)
+                elif hasattr(object_, 'get_signed_distances_on_arc'):
+                    # Circumference of the arc may be crossed outside of the arc itself,
+                    # so crossing is checked for the last step only
+                    if object_.get_direction_to_point(new_point) != object_.get_direction_to_point(self.coordinates[-2]):
+                        movement_ray = Ray(self.coordinates[-2], self.direction)
+                        step = self.coordinates[-2].get_distance_to_point(new_point)
+                        distances = [distance for distance in object_.get_signed_distances_on_arc(movement_ray)
+                                     if 0 < distance <= step]
+                        if distances:
+                            self.coordinates.pop()
+                            intersection_point = movement_ray.get_point(distances[0])
+                            self.coordinates.append(intersection_point)
+                            return object_.get_tangent_line(intersection_point)
+                elif hasattr(object_, 'get_signed_distances'):
+                    # Like for arcs, conic section may be crossed outside of its bounds
+                    if object_.get_direction_to_point(new_point) != object_.get_direction_to_point(self.coordinates[-2]):
+                        movement_ray = Ray(self.coordinates[-2], self.direction)
+                        step = self.coordinates[-2].get_distance_to_point(new_point)
+                        distances = [distance for distance in object_.get_signed_distances(movement_ray)
+                                     if 0 < distance <= step]
+                        if distances:
+                            self.coordinates.pop()
+                            intersection_point = movement_ray.get_point(distances[0])
+                            self.coordinates.append(intersection_point)
+                            return object_.get_tangent_line(intersection_point)
 
     def reflect(self, reflection_line: ReflectionLine) -> None:
         if self._number_of_bounces > self.max_number_of_bounces: return
 
-        normal_line = Line.perpendicular_line(reflection_line, self.coordinates[-1])
-        falling_angle = Line.angle_between(normal_line, Line(self.coordinates[-1], self.angle))
-        reversed_angle = 180 + self.angle
-        while not (-180 < reversed_angle <= 180):
-            if reversed_angle > 180:
-                reversed_angle -= 360
-            else:
-                reversed_angle += 360
-        direction = reflection_line.get_direction_to_point(self.coordinates[-2])
-        if direction == 'lou' or direction == 'rou':
-            if reflection_line.angle < reversed_angle <= reflection_line.angle+90:
-                new_angle = reversed_angle + 2*falling_angle
-            else:
-                new_angle = reversed_angle - 2*falling_angle
-        else:
-            if reflection_line.angle-90 <= reversed_angle < reflection_line.angle:
-                new_angle = reversed_angle - 2*falling_angle
-            else:
-                new_angle = reversed_angle + 2*falling_angle
-        while not (-180 < new_angle <= 180):
-            if new_angle > 180:
-                new_angle -= 360
-            else:
-                new_angle += 360
-        self.angle = new_angle
+        self.direction = Ray(self.coordinates[-1], self.direction).get_reflected_direction(reflection_line)
         self._number_of_bounces += 1
         self.relative_intensity *= reflection_line.reflection_coefficient
         self.propogate(0.01)
 
+    def get_new_refraction_coefficient(self, refraction_line: RefractionLine) -> float:
+        """Returns refraction coefficient, that beam gets after crossing refraction line, it has hit"""
+        figure = refraction_line.bounded_figure
+        if self.media is None or figure is None:
+            direction = refraction_line.get_direction_to_point(self.coordinates[-2])
+            return refraction_line.get_new_refraction_coefficient(direction, self.wavelength)
+        if not any(medium is figure for medium in self.media):
+            return get_refraction_coefficient(figure.inner_refraction_coefficient, self.wavelength)
+        # Beam leaves the figure into the innermost of other media, or into outer medium of the figure
+        enclosing_media = [medium for medium in self.media if medium is not figure]
+        if enclosing_media:
+            return get_refraction_coefficient(enclosing_media[-1].inner_refraction_coefficient, self.wavelength)
+        return get_refraction_coefficient(figure.outer_refraction_coefficient, self.wavelength)
+
+    def cross_border(self, refraction_line: RefractionLine) -> None:
+        """Pushes figure of refraction line into media, when beam enters it, and pops it, when beam leaves it"""
+        figure = refraction_line.bounded_figure
+        if self.media is None or figure is None:
+            return
+        enclosing_media = [medium for medium in self.media if medium is not figure]
+        if len(enclosing_media) == len(self.media):
+            self.media.append(figure)
+        else:
+            self.media = enclosing_media
+
+    def replace_medium(self, old_figure, new_figure) -> None:
+        """Changes figure in media of the beam to the new one, for example to its moved copy"""
+        if self.media is not None:
+            self.media = [new_figure if medium is old_figure else medium for medium in self.media]
+
     def refract(self, refraction_line: RefractionLine) -> None:
         if self._number_of_bounces > self.max_number_of_bounces: return
         
-        direction = refraction_line.get_direction_to_point(self.coordinates[-2])
-        new_refraction_coefficient = refraction_line.get_new_refraction_coefficient(direction)
-        normal_line = Line.perpendicular_line(refraction_line, self.coordinates[-1])
-        falling_angle = Line.angle_between(normal_line, Line(self.coordinates[-1], self.angle))
-        refraction_angle_sine = (sin(radians(falling_angle)) * self.refracion_coefficient) / new_refraction_coefficient
+        new_refraction_coefficient = self.get_new_refraction_coefficient(refraction_line)
+        refracted_direction = Ray(self.coordinates[-1], self.direction).get_refracted_direction(
+            refraction_line, self.refracion_coefficient, new_refraction_coefficient)
 
-        if refraction_angle_sine > 1:
+        if refracted_direction is None:
             self.reflect(refraction_line)
         else:
-            refraction_angle = degrees(asin(refraction_angle_sine))
             self.refracion_coefficient = new_refraction_coefficient
-            reversed_angle = 180 + self.angle
-            while not (-180 < reversed_angle <= 180):
-                if reversed_angle > 180:
-                    reversed_angle -= 360
-                else:
-                    reversed_angle += 360
+            self.cross_border(refraction_line)
+            self.direction = refracted_direction
+            self.propogate(0.01)
 
-            if direction == 'lou' or direction == 'rou':
-                if refraction_line.angle < reversed_angle <= refraction_line.angle+90:
-                    new_angle = self.angle + (falling_angle - refraction_angle)
-                else:
-                    new_angle = self.angle - (falling_angle - refraction_angle)
-            else:
-                if refraction_line.angle-90 < reversed_angle <= refraction_line.angle:
-                    new_angle = self.angle + (falling_angle - refraction_angle)
-                else:
-                    new_angle = self.angle - (falling_angle - refraction_angle)
-            while not (-180 < new_angle <= 180):
-                if new_angle > 180:
-                    new_angle -= 360
-                else:
-                    new_angle += 360
-            self.angle = new_angle
-            self.propogate(0.01)
\ No newline at end of file
+    def pass_through(self) -> None:
+        """Moves beam past the line, it has hit, without turning it, like through transparent detector"""
+        if self._number_of_bounces > self.max_number_of_bounces: return
+
+        self.propogate(0.01)
+
+    def get_fresnel_reflectance(self, refraction_line: RefractionLine) -> float:
+        """
+        Returns part of intensity, that is reflected by refraction line, for unpolarized light.
+        Equals to 1 on total internal reflection.
+        """
+        new_refraction_coefficient = self.get_new_refraction_coefficient(refraction_line)
+        falling_cosine = Ray(self.coordinates[-1], self.direction).get_falling_cosine(refraction_line)
+        ratio = self.refracion_coefficient / new_refraction_coefficient
+        squared_refraction_sine = ratio*ratio*(1 - falling_cosine*falling_cosine)
+        if squared_refraction_sine >= 1:
+            return 1
+        refraction_cosine = sqrt(1 - squared_refraction_sine)
+        first_cosine = falling_cosine * self.refracion_coefficient
+        second_cosine = refraction_cosine * new_refraction_coefficient
+        s_reflectance = ((first_cosine - second_cosine) / (first_cosine + second_cosine))**2
+        first_cosine = falling_cosine * new_refraction_coefficient
+        second_cosine = refraction_cosine * self.refracion_coefficient
+        p_reflectance = ((second_cosine - first_cosine) / (second_cosine + first_cosine))**2
+        return (s_reflectance + p_reflectance) / 2
+
+    def split(self, refraction_line: RefractionLine) -> Optional['LightBeam']:
+        """
+        Splits beam on refraction line by Fresnel equations.
+        This beam is refracted and keeps transmitted part of intensity,
+        reflected part is returned as a new beam.
+        On total internal reflection beam is fully reflected and None is returned.
+        """
+        if self._number_of_bounces > self.max_number_of_bounces: return None
+
+        reflectance = self.get_fresnel_reflectance(refraction_line)
+        if reflectance >= 1:
+            self.reflect(refraction_line)
+            return None
+        reflected_beam = self.copy()
+        reflected_beam.relative_intensity *= reflectance
+        reflected_beam.reflect(refraction_line)
+        self.relative_intensity *= 1 - reflectance
+        self.refract(refraction_line)
+        return reflected_beam
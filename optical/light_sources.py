@@ -0,0 +1,99 @@
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional
+
+import numpy as np
+
+from plane.plane2d import Point
+from optical.light_beam import LightBeam
+
+BeamsChunk = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class LightSource(ABC):
+    """
+    Source, that emits given number of beams lazily, in chunks of at most chunk_size beams.
+    Each chunk is a tuple of numpy arrays (xs, ys, angles), angles are in degrees.
+    Beams directions are spread uniformly in [angle - angular_spread/2; angle + angular_spread/2].
+    Sampling is seeded, so every emission of the same source gives the same beams.
+    """
+
+    def __init__(self, angle: float, number_of_beams: int, *, angular_spread: float = 0,
+                 seed: Optional[int] = None, chunk_size: int = 1024) -> None:
+        if number_of_beams < 0:
+            raise ValueError(f'Number of beams must be non-negative, but {number_of_beams} was given')
+        if chunk_size < 1:
+            raise ValueError(f'Chunk size must be positive, but {chunk_size} was given')
+        if not (0 <= angular_spread <= 360):
+            raise ValueError(f'Angular spread must be in [0; 360], but {angular_spread} was given')
+        self.angle = angle
+        self.number_of_beams = number_of_beams
+        self.angular_spread = angular_spread
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+    @abstractmethod
+    def sample_origins(self, rng: 'np.random.Generator', size: int) -> tuple[np.ndarray, np.ndarray]:
+        pass
+
+    def sample_angles(self, rng: 'np.random.Generator', size: int) -> np.ndarray:
+        if self.angular_spread == 0:
+            return np.full(size, self.angle, np.float64)
+        return self.angle + rng.uniform(-self.angular_spread / 2, self.angular_spread / 2, size)
+
+    def emit(self) -> Iterator[BeamsChunk]:
+        rng = np.random.default_rng(self.seed)
+        for first_beam in range(0, self.number_of_beams, self.chunk_size):
+            size = min(self.chunk_size, self.number_of_beams - first_beam)
+            xs, ys = self.sample_origins(rng, size)
+            yield (xs, ys, self.sample_angles(rng, size))
+
+    def emit_beams(self) -> Iterator[list[LightBeam]]:
+        """Same as emit, but chunks are converted to lists of LightBeam"""
+        for xs, ys, angles in self.emit():
+            yield [LightBeam(Point(x, y), angle) for x, y, angle in zip(xs.tolist(), ys.tolist(), angles.tolist())]
+
+    def __len__(self) -> int:
+        return self.number_of_beams
+
+
+class PointLightSource(LightSource):
+    def __init__(self, origin: Point, angle: float, number_of_beams: int, *, angular_spread: float = 360,
+                 seed: Optional[int] = None, chunk_size: int = 1024) -> None:
+        super().__init__(angle, number_of_beams, angular_spread=angular_spread, seed=seed, chunk_size=chunk_size)
+        self.origin = origin
+
+    def sample_origins(self, rng: 'np.random.Generator', size: int) -> tuple[np.ndarray, np.ndarray]:
+        return (np.full(size, self.origin.x, np.float64), np.full(size, self.origin.y, np.float64))
+
+
+class LineLightSource(LightSource):
+    """Emits beams from points, uniformly distributed on line segment between given points"""
+
+    def __init__(self, first_point: Point, second_point: Point, angle: float, number_of_beams: int, *,
+                 angular_spread: float = 0, seed: Optional[int] = None, chunk_size: int = 1024) -> None:
+        super().__init__(angle, number_of_beams, angular_spread=angular_spread, seed=seed, chunk_size=chunk_size)
+        self.endpoints = [first_point, second_point]
+
+    def sample_origins(self, rng: 'np.random.Generator', size: int) -> tuple[np.ndarray, np.ndarray]:
+        first_point, second_point = self.endpoints
+        t = rng.random(size)
+        return (first_point.x + t*(second_point.x - first_point.x), first_point.y + t*(second_point.y - first_point.y))
+
+
+class AreaLightSource(LightSource):
+    """
+    Emits beams from points, uniformly distributed in rectangle with given width and height,
+    centred at origin, same as in generate_nonpoint_beam.
+    """
+
+    def __init__(self, origin: Point, width: float, height: float, angle: float, number_of_beams: int, *,
+                 angular_spread: float = 0, seed: Optional[int] = None, chunk_size: int = 1024) -> None:
+        super().__init__(angle, number_of_beams, angular_spread=angular_spread, seed=seed, chunk_size=chunk_size)
+        self.origin = origin
+        self.width = width
+        self.height = height
+
+    def sample_origins(self, rng: 'np.random.Generator', size: int) -> tuple[np.ndarray, np.ndarray]:
+        xs = self.origin.x + rng.uniform(-self.width / 2, self.width / 2, size)
+        ys = self.origin.y + rng.uniform(-self.height / 2, self.height / 2, size)
+        return (xs, ys)
@@ -0,0 +1,86 @@
+from typing import Optional, Union
+
+import numpy as np
+
+from optical.dispersion import get_refraction_coefficient
+from optical.opticalfigures import RefractionCircle, RefractionLens, RefractionPolygon
+from plane.plane2d import Point
+
+ClosedMediumType = Union[RefractionPolygon, RefractionCircle, RefractionLens]
+
+
+def get_border_point(figure: ClosedMediumType) -> Point:
+    """Returns some point on border of the figure"""
+    if isinstance(figure, RefractionCircle):
+        return Point(figure.centre.x + figure.radius, figure.centre.y)
+    if isinstance(figure, RefractionLens):
+        return figure.get_point(-figure.edge_thickness / 2, figure.aperture / 2)
+    return figure.vertexes[0]
+
+
+def get_medium_refraction_coefficient(media: list[ClosedMediumType], wavelength: Optional[float] = None) -> Optional[float]:
+    """Returns refraction coefficient inside the innermost of media, or None, if there are no media"""
+    if not media:
+        return None
+    return get_refraction_coefficient(media[-1].inner_refraction_coefficient, wavelength)
+
+
+class MediumTree:
+    def __init__(self, figures: list[ClosedMediumType]) -> None:
+        """
+        Containment tree of closed refraction figures. Figure is a child of the innermost figure, that contains it,
+        and figures, that are not contained by any other figure, are roots.
+        Borders of figures must not cross each other, so every figure either contains another one or lies outside of it.
+        """
+        self.figures = figures
+        border_points = [get_border_point(figure) for figure in figures]
+        xs = np.array([point.x for point in border_points], np.float64)
+        ys = np.array([point.y for point in border_points], np.float64)
+        # Containers of i-th figure are figures, which contain its border
+        is_container = np.zeros((len(figures), len(figures)), bool)
+        for i, figure in enumerate(figures):
+            is_container[i] = figure.are_points_inside(xs, ys)
+        np.fill_diagonal(is_container, False)
+        self.depths: list[int] = is_container.sum(axis=0).tolist()
+
+        self.parents: list[Optional[int]] = []
+        self.children: list[list[int]] = [[] for _ in figures]
+        self.roots: list[int] = []
+        for i in range(len(figures)):
+            containers = np.flatnonzero(is_container[:, i]).tolist()
+            if not containers:
+                self.parents.append(None)
+                self.roots.append(i)
+                continue
+            parent = max(containers, key=lambda container: self.depths[container])
+            self.parents.append(parent)
+            self.children[parent].append(i)
+
+    def get_parent(self, figure: ClosedMediumType) -> Optional[ClosedMediumType]:
+        parent = self.parents[self._get_index(figure)]
+        return self.figures[parent] if parent is not None else None
+
+    def _get_index(self, figure: ClosedMediumType) -> int:
+        for i, tree_figure in enumerate(self.figures):
+            if tree_figure is figure:
+                return i
+        raise ValueError(f'{figure} is not in the medium tree')
+
+    def get_media(self, xs: np.ndarray, ys: np.ndarray) -> list[list[ClosedMediumType]]:
+        """
+        Returns stacks of figures, which contain every given point, outermost first.
+        Points are checked against children of a figure only, if they lie inside of it.
+        """
+        xs, ys = np.asarray(xs, np.float64), np.asarray(ys, np.float64)
+        media: list[list[ClosedMediumType]] = [[] for _ in range(xs.size)]
+        nodes = [(root, np.arange(xs.size)) for root in self.roots]
+        while nodes:
+            node, indexes = nodes.pop()
+            figure = self.figures[node]
+            inside = indexes[figure.are_points_inside(xs[indexes], ys[indexes])]
+            if inside.size == 0:
+                continue
+            for i in inside.tolist():
+                media[i].append(figure)
+            nodes += [(child, inside) for child in self.children[node]]
+        return media
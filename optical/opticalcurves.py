@@ -0,0 +1,139 @@
+from typing import Union
+
+from optical.dispersion import RefractionCoefficientType
+from optical.opticalfigures import get_border_refraction_coefficients
+from optical.opticallines import LightTransparentMixin, ReflectionLine, RefractionLine, RefractionSegment
+from plane.conics2d import Conic, ConicBoundsType, ConicCoefficientsType
+from plane.plane2d import Point, Vector2d
+from plane.polygons2d import Arc, Lens
+
+
+class ReflectionArc(Arc):
+    def __init__(self, centre: Point, radius: float, start_angle: float, end_angle: float,
+                 reflection_coefficient: float = 1) -> None:
+        super().__init__(centre, radius, start_angle, end_angle)
+        self.reflection_coefficient = reflection_coefficient
+
+    def get_tangent_line(self, point_on_arc: Point) -> ReflectionLine:
+        tangent_line = super().get_tangent_line(point_on_arc)
+        return ReflectionLine.construct_from_line(tangent_line, self.reflection_coefficient)
+
+
+class RefractionArc(Arc, LightTransparentMixin):
+    def __init__(self, centre: Point, radius: float, start_angle: float, end_angle: float,
+                 inner_refraction_coefficient: RefractionCoefficientType,
+                 outer_refraction_coefficient: RefractionCoefficientType = 1, *, transparensy: float = 1) -> None:
+        """
+        Inner refraction coefficient is on the side of the centre of the arc.
+        Arc on border of closed figure (like lens) keeps the figure as bounded figure.
+        """
+        super().__init__(centre, radius, start_angle, end_angle)
+        LightTransparentMixin.__init__(self, transparensy)
+        self.inner_refraction_coefficient = inner_refraction_coefficient
+        self.outer_refraction_coefficient = outer_refraction_coefficient
+        self._bounded_figure = None
+
+    @property
+    def bounded_figure(self):
+        return self._bounded_figure
+
+    @bounded_figure.setter
+    def bounded_figure(self, figure) -> None:
+        self._bounded_figure = figure
+
+    def get_tangent_line(self, point_on_arc: Point) -> RefractionLine:
+        tangent_line = super().get_tangent_line(point_on_arc)
+        direction = tangent_line.get_direction_to_point(self.centre)
+        if direction == 'lod' or direction == 'lou':
+            refraction_line = RefractionLine.construct_from_line(tangent_line, self.inner_refraction_coefficient, self.outer_refraction_coefficient)
+        else:
+            refraction_line = RefractionLine.construct_from_line(tangent_line, self.outer_refraction_coefficient, self.inner_refraction_coefficient)
+        refraction_line.bounded_figure = self.bounded_figure
+        return refraction_line
+
+
+class RefractionLens(Lens, LightTransparentMixin):
+    def __init__(self, centre: Point, aperture: float, first_radius: float, second_radius: float,
+                 inner_refraction_coefficient: RefractionCoefficientType,
+                 outer_refraction_coefficient: RefractionCoefficientType = 1, *,
+                 edge_thickness: float = 0, angle_from_ox: float = 0, transparensy: float = 1) -> None:
+        super().__init__(centre, aperture, first_radius, second_radius, edge_thickness, angle_from_ox)
+        LightTransparentMixin.__init__(self, transparensy)
+        surfaces: list[Union[RefractionArc, RefractionSegment]] = []
+        # Surfaces are oriented by checking, on which side of them inside of lens is
+        for surface in self.surfaces:
+            if isinstance(surface, Arc):
+                middle_angle = surface.start_angle + surface.angular_size / 2
+                sample = surface.centre + Vector2d.construct_from_length(surface.radius - .1, middle_angle)
+                coefficients = (inner_refraction_coefficient, outer_refraction_coefficient)
+                if not self.is_point_inside(sample):
+                    coefficients = coefficients[::-1]
+                arc = RefractionArc(surface.centre, surface.radius, surface.start_angle, surface.end_angle,
+                                    *coefficients, transparensy=transparensy)
+                arc.bounded_figure = self
+                surfaces.append(arc)
+            else:
+                first_endpoint, second_endpoint = surface.endpoints
+                middle = Point((first_endpoint.x + second_endpoint.x) / 2, (first_endpoint.y + second_endpoint.y) / 2)
+                sample = middle + surface.reconstruct_line().get_normal() * .1
+                coefficients = get_border_refraction_coefficients(surface.reconstruct_line(), sample, self.is_point_inside(sample),
+                                                                  inner_refraction_coefficient, outer_refraction_coefficient)
+                segment = RefractionSegment(first_endpoint, second_endpoint, *coefficients, transparensy=transparensy)
+                segment.related_line.bounded_figure = self
+                surfaces.append(segment)
+        self.surfaces: list[Union[RefractionArc, RefractionSegment]] = surfaces
+        self.inner_refraction_coefficient = inner_refraction_coefficient
+        self.outer_refraction_coefficient = outer_refraction_coefficient
+
+    @staticmethod
+    def from_lens(lens: Lens, inner_refraction_coefficient: RefractionCoefficientType,
+                  outer_refraction_coefficient: RefractionCoefficientType = 1, *,
+                  transparensy: float = 1) -> 'RefractionLens':
+        return RefractionLens(lens.centre, lens.aperture, lens.first_radius, lens.second_radius,
+                              inner_refraction_coefficient, outer_refraction_coefficient,
+                              edge_thickness=lens.edge_thickness, angle_from_ox=lens.angle_from_ox,
+                              transparensy=transparensy)
+
+
+class ReflectionConic(Conic):
+    def __init__(self, origin: Point, coefficients: ConicCoefficientsType, bounds: ConicBoundsType,
+                 reflection_coefficient: float = 1, *, angle_from_ox: float = 0) -> None:
+        super().__init__(origin, coefficients, bounds, angle_from_ox)
+        self.reflection_coefficient = reflection_coefficient
+
+    def get_tangent_line(self, point_on_conic: Point) -> ReflectionLine:
+        tangent_line = super().get_tangent_line(point_on_conic)
+        return ReflectionLine.construct_from_line(tangent_line, self.reflection_coefficient)
+
+    @staticmethod
+    def from_conic(conic: Conic, reflection_coefficient: float = 1) -> 'ReflectionConic':
+        """Returns reflector of the same shape, as given conic (for example, Parabola or Ellipse)"""
+        return ReflectionConic(conic.origin, conic.coefficients, conic.bounds, reflection_coefficient,
+                               angle_from_ox=conic.angle_from_ox)
+
+
+class RefractionConic(Conic, LightTransparentMixin):
+    def __init__(self, origin: Point, coefficients: ConicCoefficientsType, bounds: ConicBoundsType,
+                 inner_refraction_coefficient: RefractionCoefficientType,
+                 outer_refraction_coefficient: RefractionCoefficientType = 1, *,
+                 angle_from_ox: float = 0, transparensy: float = 1) -> None:
+        """Inner refraction coefficient is inside of conic (for example, on the side of focus of parabola)"""
+        super().__init__(origin, coefficients, bounds, angle_from_ox)
+        LightTransparentMixin.__init__(self, transparensy)
+        self.inner_refraction_coefficient = inner_refraction_coefficient
+        self.outer_refraction_coefficient = outer_refraction_coefficient
+
+    def get_tangent_line(self, point_on_conic: Point) -> RefractionLine:
+        tangent_line = super().get_tangent_line(point_on_conic)
+        direction = tangent_line.get_direction_to_point(point_on_conic - self.get_normal(point_on_conic))
+        if direction == 'lod' or direction == 'lou':
+            return RefractionLine.construct_from_line(tangent_line, self.inner_refraction_coefficient, self.outer_refraction_coefficient)
+        return RefractionLine.construct_from_line(tangent_line, self.outer_refraction_coefficient, self.inner_refraction_coefficient)
+
+    @staticmethod
+    def from_conic(conic: Conic, inner_refraction_coefficient: RefractionCoefficientType,
+                   outer_refraction_coefficient: RefractionCoefficientType = 1, *,
+                   transparensy: float = 1) -> 'RefractionConic':
+        """Returns refracting surface of the same shape, as given conic (for example, Parabola or Hyperbola)"""
+        return RefractionConic(conic.origin, conic.coefficients, conic.bounds, inner_refraction_coefficient,
+                               outer_refraction_coefficient, angle_from_ox=conic.angle_from_ox, transparensy=transparensy)
@@ -1,7 +1,23 @@
+from typing import Any
+
+import numpy as np
+
+from optical.dispersion import RefractionCoefficientType
 from plane.plane2d import Cirlce, Polygon, Point
 from optical.opticallines import LightTransparentMixin, ReflectionLine, ReflectionSegment, RefractionLine, RefractionSegment
 
 
+def get_border_refraction_coefficients(line: RefractionLine, sample: Point, is_sample_inside: bool,
+                                       inner_refraction_coefficient: RefractionCoefficientType,
+                                       outer_refraction_coefficient: RefractionCoefficientType
+                                       ) -> tuple[RefractionCoefficientType, RefractionCoefficientType]:
+    """Returns left and right refraction coefficients of line on border of a figure by sample point near the line"""
+    is_sample_on_left = line.get_direction_to_point(sample) in ('lou', 'lod')
+    if is_sample_on_left == is_sample_inside:
+        return (inner_refraction_coefficient, outer_refraction_coefficient)
+    return (outer_refraction_coefficient, inner_refraction_coefficient)
+
+
 class ReflectionPolygon(Polygon):
     def __init__(self, vertexes: list[Point], reflection_coefficient: float) -> None:
         super().__init__(vertexes)
@@ -18,31 +34,29 @@ class ReflectionPolygon(Polygon):
 
 
 class RefractionPolygon(Polygon, LightTransparentMixin):
-    def __init__(self, vertexes: list[Point], inner_refraction_coefficient: float,
-                outer_refraction_coefficient: float = 1, *, transparensy: float = 1) -> None:
+    def __init__(self, vertexes: list[Point], inner_refraction_coefficient: RefractionCoefficientType,
+                outer_refraction_coefficient: RefractionCoefficientType = 1, *, transparensy: float = 1) -> None:
         super().__init__(vertexes)
         LightTransparentMixin.__init__(self, transparensy)
+        # Edges are oriented by checking, on which side of them inside of polygon is
+        samples = [Point((edge.endpoints[0].x + edge.endpoints[1].x) / 2, (edge.endpoints[0].y + edge.endpoints[1].y) / 2)
+                   + edge.reconstruct_line().get_normal() * .1 for edge in self.edges]
+        samples_inside = self.are_points_inside(np.array([sample.x for sample in samples]),
+                                                np.array([sample.y for sample in samples]))
         edges: list[RefractionSegment] = []
-        previous_angle = self.edges[-1].reconstruct_line().angle
-        for non_optical_edge in self.edges:
-            current_angle = non_optical_edge.reconstruct_line().angle
-            if current_angle != 0 and previous_angle != 0:
-                sample_point = Point(non_optical_edge.endpoints[0].x + .1, non_optical_edge.endpoints[0].y)
-            else:
-                sample_point = Point(non_optical_edge.endpoints[0].x, non_optical_edge.endpoints[0].y - .1)
-            if self.is_point_inside(sample_point):
-                edges.append(RefractionSegment(non_optical_edge.endpoints[0], non_optical_edge.endpoints[1],
-                                               inner_refraction_coefficient, outer_refraction_coefficient))
-            else:
-                edges.append(RefractionSegment(non_optical_edge.endpoints[0], non_optical_edge.endpoints[1],
-                                               outer_refraction_coefficient, inner_refraction_coefficient))
+        for non_optical_edge, sample, is_sample_inside in zip(self.edges, samples, samples_inside):
+            coefficients = get_border_refraction_coefficients(non_optical_edge.reconstruct_line(), sample, is_sample_inside,
+                                                              inner_refraction_coefficient, outer_refraction_coefficient)
+            edge = RefractionSegment(non_optical_edge.endpoints[0], non_optical_edge.endpoints[1], *coefficients)
+            edge.related_line.bounded_figure = self
+            edges.append(edge)
         self.edges: list[RefractionSegment] = edges
         self.inner_refraction_coefficient = inner_refraction_coefficient
         self.outer_refraction_coefficient = outer_refraction_coefficient
 
     @staticmethod
-    def from_polygon(polygon: Polygon, inner_refraction_coefficient: float,
-                     outer_refraction_coefficient: float = 1) -> 'RefractionPolygon':
+    def from_polygon(polygon: Polygon, inner_refraction_coefficient: RefractionCoefficientType,
+                     outer_refraction_coefficient: RefractionCoefficientType = 1) -> 'RefractionPolygon':
         return RefractionPolygon(polygon.vertexes, inner_refraction_coefficient, outer_refraction_coefficient)
 
 
@@ -58,7 +72,8 @@ class ReflectionCircle(Cirlce):
 
 class RefractionCircle(Cirlce):
     def __init__(self, centre: Point, radius: float,
-                 inner_refraction_coefficient: float, outer_refraction_coefficient: float = 1) -> None:
+                 inner_refraction_coefficient: RefractionCoefficientType,
+                 outer_refraction_coefficient: RefractionCoefficientType = 1) -> None:
         super().__init__(centre, radius)
         self.inner_refraction_coefficient = inner_refraction_coefficient
         self.outer_refraction_coefficient = outer_refraction_coefficient
@@ -68,5 +83,20 @@ class RefractionCircle(Cirlce):
         tangent_line = super().get_tangent_line(point_on_circumference)
         direction = tangent_line.get_direction_to_point(self.centre)
         if direction == 'lod' or direction == 'lou':
-            return RefractionLine.construct_from_line(tangent_line, self.inner_refraction_coefficient, self.outer_refraction_coefficient)
-        return RefractionLine.construct_from_line(tangent_line, self.outer_refraction_coefficient, self.inner_refraction_coefficient)
\ No newline at end of file
+            refraction_line = RefractionLine.construct_from_line(tangent_line, self.inner_refraction_coefficient, self.outer_refraction_coefficient)
+        else:
+            refraction_line = RefractionLine.construct_from_line(tangent_line, self.outer_refraction_coefficient, self.inner_refraction_coefficient)
+        refraction_line.bounded_figure = self
+        return refraction_line
+
+
+# Figures, bounded by arcs and conics, are defined in opticalcurves, which is loaded on their first use,
+# so beams and figures, that are bounded by lines and circles, don't pay for import of their geometry
+_CURVED_FIGURES = ('ReflectionArc', 'RefractionArc', 'RefractionLens', 'ReflectionConic', 'RefractionConic')
+
+
+def __getattr__(name: str) -> Any:
+    if name in _CURVED_FIGURES:
+        from optical import opticalcurves
+        return getattr(opticalcurves, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
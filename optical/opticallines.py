@@ -1,3 +1,6 @@
+from typing import Optional
+
+from optical.dispersion import RefractionCoefficientType, get_refraction_coefficient
 from plane.plane2d import Line, Point, LineSegment
 
 
@@ -24,33 +27,49 @@ class ReflectionLine(Line):
 
 
 class RefractionLine(ReflectionLine, LightTransparentMixin):
-    def __init__(self, sample_coordinates: Point, left_refraction_coefficient: float, 
-                right_refraction_coefficient: float, angle: float = None, angle_coefficient: float = None,
+    def __init__(self, sample_coordinates: Point, left_refraction_coefficient: RefractionCoefficientType,
+                right_refraction_coefficient: RefractionCoefficientType, angle: float = None, angle_coefficient: float = None,
                 *, transparensy: float = 1) -> None:
+        """
+        Refraction coefficients are either numbers or dispersion models, which depend on wavelength.
+        Line on border of closed figure (refraction polygon, circle or lens) keeps the figure as bounded figure,
+        so beams, that track media, take coefficients from the figure instead of sides of the line.
+        """
         super().__init__(sample_coordinates, reflection_coefficient=1, angle=angle, angle_coefficient=angle_coefficient)
         LightTransparentMixin.__init__(self, transparensy)
-        if left_refraction_coefficient < 1 or right_refraction_coefficient < 1:
+        if get_refraction_coefficient(left_refraction_coefficient) < 1 or get_refraction_coefficient(right_refraction_coefficient) < 1:
             raise ValueError(f'Refraction coefficients must be greater or equal to 1, \
                                 but {left_refraction_coefficient} and {right_refraction_coefficient} was given')
         self.left_refraction_coefficient = left_refraction_coefficient #top coefficient for horizontal line
         self.right_refraction_coefficient = right_refraction_coefficient #bottom coefficient for horizontal line
+        # Kept private, because figure itself refers to its borders
+        self._bounded_figure = None
+
+    @property
+    def bounded_figure(self):
+        return self._bounded_figure
+
+    @bounded_figure.setter
+    def bounded_figure(self, figure) -> None:
+        self._bounded_figure = figure
 
-    def get_new_refraction_coefficient(self, direction: str) -> float:
+    def get_new_refraction_coefficient(self, direction: str, wavelength: Optional[float] = None) -> float:
         if direction == 'lou' or direction == 'lod':
-            return self.right_refraction_coefficient
+            return get_refraction_coefficient(self.right_refraction_coefficient, wavelength)
         elif direction == 'rou' or direction == 'rod':
-            return self.left_refraction_coefficient
+            return get_refraction_coefficient(self.left_refraction_coefficient, wavelength)
         raise ValueError(f'Unsopported direction: {direction}')
 
-    def get_current_refraction_coefficient(self, direction: str) -> float:
+    def get_current_refraction_coefficient(self, direction: str, wavelength: Optional[float] = None) -> float:
         if direction == 'lou' or direction == 'lod':
-            return self.left_refraction_coefficient
+            return get_refraction_coefficient(self.left_refraction_coefficient, wavelength)
         elif direction == 'rou' or direction == 'rod':
-            return self.right_refraction_coefficient
+            return get_refraction_coefficient(self.right_refraction_coefficient, wavelength)
         raise ValueError(f'Unsopported direction: {direction}')
 
     @staticmethod
-    def construct_from_line(line: Line, left_refraction_coefficient: float, right_refraction_coefficient: float) -> 'RefractionLine':
+    def construct_from_line(line: Line, left_refraction_coefficient: RefractionCoefficientType,
+                            right_refraction_coefficient: RefractionCoefficientType) -> 'RefractionLine':
         return RefractionLine(line.sample_coordinates, left_refraction_coefficient, right_refraction_coefficient, line.angle)
 
 
@@ -61,8 +80,8 @@ class ReflectionSegment(LineSegment):
 
 
 class RefractionSegment(LineSegment, LightTransparentMixin):
-    def __init__(self, first_point: Point, second_point: Point, left_refraction_coefficient: float,
-                right_refraction_coefficient: float, *, transparensy: float = 1) -> None:
+    def __init__(self, first_point: Point, second_point: Point, left_refraction_coefficient: RefractionCoefficientType,
+                right_refraction_coefficient: RefractionCoefficientType, *, transparensy: float = 1) -> None:
         super().__init__(first_point, second_point)
         LightTransparentMixin.__init__(self, transparensy)
         self.related_line = RefractionLine.construct_from_line(self.reconstruct_line(), left_refraction_coefficient, right_refraction_coefficient)
\ No newline at end of file
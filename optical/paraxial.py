@@ -0,0 +1,242 @@
+from math import cos, fabs, inf, isinf, radians, sin
+from typing import Optional, Union
+
+import numpy as np
+
+from optical.dispersion import RefractionCoefficientType, get_refraction_coefficient
+from optical.light_beam import LightBeam
+from optical.opticalfigures import RefractionCircle, RefractionLens
+from optical.opticallines import ReflectionLine, RefractionLine
+from optical.spectral_tracer import BatchTracer
+from plane.plane2d import Line, LineSegment, Point, Ray, Vector2d
+
+ParaxialElementType = Union[Line, LineSegment, RefractionLens, RefractionCircle]
+
+# Flat elements must be perpendicular to optical axis with this precision of cosine between them
+_PERPENDICULARITY_PRESICION = 1e-9
+# Lenses and balls must be centred on optical axis with this precision
+_CENTERING_PRESICION = 1e-6
+
+
+def get_free_space_matrix(distance: float) -> np.ndarray:
+    """Ray transfer matrix of moving by given signed distance along optical axis"""
+    return np.array([[1, distance], [0, 1]], np.float64)
+
+
+def get_refraction_matrix(radius: float, first_refraction_coefficient: float, second_refraction_coefficient: float) -> np.ndarray:
+    """
+    Ray transfer matrix of refracting surface with given radius (infinite for flat one).
+    Radius is positive, if centre of the surface lies further along optical axis.
+    """
+    power = 0 if isinf(radius) else (second_refraction_coefficient - first_refraction_coefficient) / radius
+    return np.array([[1, 0], [-power / second_refraction_coefficient,
+                               first_refraction_coefficient / second_refraction_coefficient]], np.float64)
+
+
+def get_flat_mirror_matrix() -> np.ndarray:
+    """Ray transfer matrix of flat mirror, after which ray goes against optical axis"""
+    return np.array([[1, 0], [0, -1]], np.float64)
+
+
+class ParaxialSystem:
+    def __init__(self, elements: list[ParaxialElementType], axis_origin: Point, axis_angle: float = 0, *,
+                 initial_refraction_coefficient: RefractionCoefficientType = 1, wavelength: Optional[float] = None) -> None:
+        """
+        Sequential optical system along optical axis, that goes from axis origin at given angle (in degrees).
+        Elements are given in order, in which rays pass them: refraction lines and segments, lenses, balls
+        and flat mirrors, all perpendicular to the axis or centred on it. Rays start at axis origin.
+        Every surface is compiled into 2x2 ray transfer matrix, which acts on height of ray (to the left of the axis)
+        and its slope to the axis, so whole bundles of rays are propogated by one matrix product per matrix.
+        Mirrors turn rays back, so positions of next elements must decrease along the axis, and so on.
+        """
+        self.elements = elements
+        self.axis_origin = axis_origin
+        self.axis_angle = axis_angle
+        self.initial_refraction_coefficient = initial_refraction_coefficient
+        self.wavelength = wavelength
+        self._axis = (cos(radians(axis_angle)), sin(radians(axis_angle)))
+
+        # Surfaces are kept as their positions along the axis and matrices, in order of passage
+        self.surfaces: list[tuple[float, np.ndarray]] = []
+        self.final_direction = 1
+        self.final_refraction_coefficient = get_refraction_coefficient(initial_refraction_coefficient, wavelength)
+        for element in elements:
+            self._compile_element(element)
+
+    def get_axis_coordinates(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns positions of points along optical axis and their heights to the left of it"""
+        dxs, dys = np.asarray(xs) - self.axis_origin.x, np.asarray(ys) - self.axis_origin.y
+        return (dxs*self._axis[0] + dys*self._axis[1], dys*self._axis[0] - dxs*self._axis[1])
+
+    def get_point(self, position: float, height: float = 0) -> Point:
+        """Returns point at given position along optical axis and height to the left of it"""
+        return Point(self.axis_origin.x + position*self._axis[0] - height*self._axis[1],
+                     self.axis_origin.y + position*self._axis[1] + height*self._axis[0])
+
+    def _get_last_position(self) -> float:
+        return self.surfaces[-1][0] if self.surfaces else 0
+
+    def _add_surface(self, position: float, matrix: np.ndarray, element: ParaxialElementType) -> None:
+        if (position - self._get_last_position())*self.final_direction < 0:
+            raise ValueError(f'Elements must be given in order of passage, but {element} lies behind previous element')
+        self.surfaces.append((position, matrix))
+
+    def _add_refraction_surface(self, position: float, radius: float,
+                                new_refraction_coefficient: float, element: ParaxialElementType) -> None:
+        self._add_surface(position, get_refraction_matrix(radius, self.final_refraction_coefficient,
+                                                          new_refraction_coefficient), element)
+        self.final_refraction_coefficient = new_refraction_coefficient
+
+    def _get_centre_position(self, centre: Point, element: ParaxialElementType) -> float:
+        position, height = self.get_axis_coordinates(centre.x, centre.y)
+        if fabs(height) > _CENTERING_PRESICION:
+            raise ValueError(f'{element} must be centred on optical axis, but its centre is {float(height)} away from it')
+        return float(position)
+
+    def _compile_element(self, element: ParaxialElementType) -> None:
+        if isinstance(element, RefractionLens):
+            self._compile_lens(element)
+        elif isinstance(element, RefractionCircle):
+            position = self._get_centre_position(element.centre, element)
+            radius = element.radius
+            inner = get_refraction_coefficient(element.inner_refraction_coefficient, self.wavelength)
+            outer = get_refraction_coefficient(element.outer_refraction_coefficient, self.wavelength)
+            self._add_refraction_surface(position - self.final_direction*radius, self.final_direction*radius, inner, element)
+            self._add_refraction_surface(position + self.final_direction*radius, -self.final_direction*radius, outer, element)
+        elif isinstance(element, (Line, LineSegment)):
+            self._compile_flat_element(element)
+        else:
+            raise ValueError(f'Unsupported paraxial element: {element}')
+
+    def _compile_flat_element(self, element: Union[Line, LineSegment]) -> None:
+        line = element.reconstruct_line() if isinstance(element, LineSegment) else element
+        if fabs(cos(radians(line.angle - self.axis_angle))) > _PERPENDICULARITY_PRESICION:
+            raise ValueError(f'{element} must be perpendicular to optical axis')
+        position = Ray(self.axis_origin, Vector2d(*self._axis)).get_signed_distance_to_line(line)
+        if isinstance(element, LineSegment) and not (0 <= element.get_projection_parameter(self.get_point(position)) <= 1):
+            raise ValueError(f'Optical axis does not cross {element}')
+        if isinstance(line, RefractionLine):
+            point_before = self.get_point(position - self.final_direction)
+            direction = line.get_direction_to_point(point_before)
+            self._add_refraction_surface(position, inf, line.get_new_refraction_coefficient(direction, self.wavelength), element)
+        elif isinstance(line, ReflectionLine):
+            self._add_surface(position, get_flat_mirror_matrix(), element)
+            self.final_direction = -self.final_direction
+        else:
+            raise ValueError(f'{element} neither reflects, nor refracts light')
+
+    def _compile_lens(self, lens: RefractionLens) -> None:
+        if fabs(sin(radians(lens.angle_from_ox - self.axis_angle))) > _PERPENDICULARITY_PRESICION:
+            raise ValueError(f'Optical axis of {lens} must coincide with optical axis of the system')
+        centre_position = self._get_centre_position(lens.centre, lens)
+        # Radiuses of the lens are signed along its own axis, that may go against axis of the system
+        sign = 1 if cos(radians(lens.angle_from_ox - self.axis_angle)) > 0 else -1
+        surfaces = [(centre_position + sign*(edge_x - lens._get_sagitta(radius)), sign*radius)
+                    for edge_x, radius in zip(lens._surfaces_x, (lens.first_radius, lens.second_radius))]
+        if sign != self.final_direction:
+            surfaces.reverse()
+        inner = get_refraction_coefficient(lens.inner_refraction_coefficient, self.wavelength)
+        outer = get_refraction_coefficient(lens.outer_refraction_coefficient, self.wavelength)
+        for (position, radius), refraction_coefficient in zip(surfaces, (inner, outer)):
+            self._add_refraction_surface(position, radius, refraction_coefficient, lens)
+
+    def get_matrices(self, output_position: Optional[float] = None) -> list[np.ndarray]:
+        """
+        Returns ray transfer matrices of the system in order of passage, from axis origin
+        to the plane at given position along the axis (to the last surface by default).
+        """
+        if output_position is None:
+            output_position = self._get_last_position()
+        if (output_position - self._get_last_position())*self.final_direction < 0:
+            raise ValueError(f'Output plane must lie after the last surface, but {output_position} was given')
+        matrices = []
+        position = 0
+        for surface_position, matrix in self.surfaces:
+            if surface_position != position:
+                matrices.append(get_free_space_matrix(surface_position - position))
+            matrices.append(matrix)
+            position = surface_position
+        if output_position != position:
+            matrices.append(get_free_space_matrix(output_position - position))
+        return matrices
+
+    def get_system_matrix(self, output_position: Optional[float] = None) -> np.ndarray:
+        system_matrix = np.identity(2)
+        for matrix in self.get_matrices(output_position):
+            system_matrix = matrix @ system_matrix
+        return system_matrix
+
+    def get_focal_length(self) -> float:
+        """Returns focal length of the system in image space, it is infinite for afocal system"""
+        power = self.get_system_matrix()[1, 0]
+        if power == 0:
+            return inf
+        return -self.final_direction / power
+
+    def propogate(self, heights: np.ndarray, angles: np.ndarray,
+                  output_position: Optional[float] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Propogates rays, that start at axis origin with given heights and angles to the axis (in degrees),
+        to the output plane and returns their heights and angles there.
+        Arrays of any shape are propogated at once.
+        """
+        heights, angles = np.broadcast_arrays(np.asarray(heights, np.float64), np.asarray(angles, np.float64))
+        rays = np.stack([heights.ravel(), np.tan(np.radians(angles.ravel()))])
+        for matrix in self.get_matrices(output_position):
+            rays = matrix @ rays
+        return (rays[0].reshape(heights.shape), np.degrees(np.arctan(rays[1])).reshape(heights.shape))
+
+    def get_plane_objects(self) -> list:
+        """Returns objects, that exact tracer intersects"""
+        objects = []
+        for element in self.elements:
+            objects += element.surfaces if isinstance(element, RefractionLens) else [element]
+        return objects
+
+    def trace_exactly(self, heights: np.ndarray, angles: np.ndarray,
+                      output_position: Optional[float] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Traces the same rays, as propogate, by batch tracer through surfaces of the elements
+        and returns their heights and angles at the output plane.
+        Rays, that don't pass all surfaces in order (miss them or turn back by total internal reflection), get nan.
+        """
+        if output_position is None:
+            output_position = self._get_last_position()
+        self.get_matrices(output_position)
+        heights, angles = np.broadcast_arrays(np.asarray(heights, np.float64), np.asarray(angles, np.float64))
+        beams = [LightBeam(self.get_point(0, height), self.axis_angle + angle,
+                           initial_refraction_coefficient=self.initial_refraction_coefficient, wavelength=self.wavelength)
+                 for height, angle in zip(heights.ravel().tolist(), angles.ravel().tolist())]
+        numbers_of_hits = [0]*len(beams)
+
+        def on_hit(i: int) -> None:
+            numbers_of_hits[i] += 1
+
+        def should_continue(i: int) -> bool:
+            return numbers_of_hits[i] < len(self.surfaces)
+
+        BatchTracer(self.get_plane_objects()).trace(beams, on_hit=on_hit, should_continue=should_continue)
+
+        positions, exact_heights = self.get_axis_coordinates(np.array([beam.coordinates[-1].x for beam in beams]),
+                                                             np.array([beam.coordinates[-1].y for beam in beams]))
+        position_steps, height_steps = self.get_axis_coordinates(
+            self.axis_origin.x + np.array([beam.direction.x for beam in beams]),
+            self.axis_origin.y + np.array([beam.direction.y for beam in beams]))
+        is_passed = (np.array(numbers_of_hits) == len(self.surfaces)) & (position_steps*self.final_direction > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slopes = np.where(is_passed, height_steps / position_steps, np.nan)
+            exact_heights = np.where(is_passed, exact_heights + slopes*(output_position - positions), np.nan)
+        return (exact_heights.reshape(heights.shape), np.degrees(np.arctan(slopes)).reshape(heights.shape))
+
+    def compare_with_exact(self, heights: np.ndarray, angles: np.ndarray,
+                           output_position: Optional[float] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns differences of heights and angles (in degrees) at the output plane between exact tracing
+        and paraxial propogation of the same rays. Rays, which exact tracing loses, get nan.
+        """
+        paraxial_heights, paraxial_angles = self.propogate(heights, angles, output_position)
+        exact_heights, exact_angles = self.trace_exactly(heights, angles, output_position)
+        return (exact_heights - paraxial_heights, exact_angles - paraxial_angles)
+
+    def __str__(self) -> str:
+        return f'ParaxialSystem({len(self.elements)} elements, {self.axis_origin}, {self.axis_angle})'
@@ -0,0 +1,51 @@
+import heapq
+from itertools import count
+from typing import Any
+
+
+class RayTreeScheduler:
+    """
+    Priority work queue for beams of a ray tree, brightest beam is always popped first.
+    Beams, spawned by splitting (both reflected and transmitted ones), are pruned if their intensity
+    is below intensity treshold or if ray budget (maximum number of spawned beams) is exhausted.
+    """
+
+    # Same as default diffusion treshold of VisualLightBeam (5 of 255 per color channel)
+    DEFAULT_INTENSITY_TRESHOLD = 5 / 255
+
+    def __init__(self, intensity_treshold: float = DEFAULT_INTENSITY_TRESHOLD, ray_budget: int = 10000) -> None:
+        if not (0 <= intensity_treshold <= 1):
+            raise ValueError(f'Intensity treshold must be in [0; 1], but {intensity_treshold} was given')
+        if ray_budget < 0:
+            raise ValueError(f'Ray budget must be non-negative, but {ray_budget} was given')
+        self.intensity_treshold = intensity_treshold
+        self.ray_budget = ray_budget
+        self.reset()
+
+    def reset(self) -> None:
+        self._queue: list[tuple[float, int, Any]] = []
+        self._counter = count()
+        self.number_of_spawned = 0
+        self.number_of_pruned = 0
+
+    def push(self, item: Any, intensity: float) -> None:
+        """Schedules primary beam, which is never pruned"""
+        heapq.heappush(self._queue, (-intensity, next(self._counter), item))
+
+    def spawn(self, item: Any, intensity: float) -> bool:
+        """Schedules beam, spawned by splitting. Returns False, if beam was pruned."""
+        if intensity < self.intensity_treshold or self.number_of_spawned >= self.ray_budget:
+            self.number_of_pruned += 1
+            return False
+        self.number_of_spawned += 1
+        self.push(item, intensity)
+        return True
+
+    def pop(self) -> Any:
+        return heapq.heappop(self._queue)[2]
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __bool__(self) -> bool:
+        return bool(self._queue)
@@ -0,0 +1,373 @@
+from math import ceil, hypot, inf
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+from optical.opticallines import ReflectionLine, RefractionLine
+from optical.spectral_tracer import BatchTracer
+from plane.conics2d import Conic
+from plane.plane2d import Cirlce, Line, LineSegment, Point, Polygon, Ray
+from plane.polygons2d import Arc, Lens
+from plane.transforms2d import AffineTransform, compose_transforms, get_transform_scales, invert_transforms
+
+PrototypeShapeType = Union[Polygon, Lens, Cirlce, Arc, Conic, LineSegment]
+TransformsType = Union[Sequence[AffineTransform], np.ndarray]
+
+# Rays are tested against bounding boxes of instances by chunks of about this many pairs
+_MAX_CHUNK_SIZE = 2**20
+# Bounding boxes are widened by this, so rays, that touch surfaces on the box, are not culled
+_BOUNDING_BOX_MARGIN = 1e-6
+
+
+class Prototype:
+    def __init__(self, shape: PrototypeShapeType) -> None:
+        """
+        Shape, that is shared by instances of scene graph. Shape is given in its own (local) coordinates
+        and is never copied, so instances keep only their transforms.
+        Surfaces of the shape are traced by one batch tracer for all instances.
+        """
+        if isinstance(shape, Polygon):
+            surfaces = shape.edges
+        elif isinstance(shape, Lens):
+            surfaces = shape.surfaces
+        elif isinstance(shape, (Cirlce, Arc, Conic, LineSegment)):
+            surfaces = [shape]
+        else:
+            raise ValueError(f'Shape of prototype must be polygon, lens, circle, arc, conic or line segment, but {shape} was given')
+        self.shape = shape
+        self.tracer = BatchTracer(surfaces)
+        # Surfaces in the order of indexes of the tracer
+        self.surfaces = self.tracer.lines + self.tracer.segments + self.tracer.circles + self.tracer.arcs + self.tracer.conics
+        if isinstance(shape, Cirlce):
+            self.min_x, self.max_x = shape.centre.x - shape.radius, shape.centre.x + shape.radius
+            self.min_y, self.max_y = shape.centre.y - shape.radius, shape.centre.y + shape.radius
+        else:
+            self.min_x, self.max_x, self.min_y, self.max_y = shape.min_x, shape.max_x, shape.min_y, shape.max_y
+        self.bounding_centre = Point((self.min_x + self.max_x) / 2, (self.min_y + self.max_y) / 2)
+        self.bounding_radius = hypot(self.max_x - self.min_x, self.max_y - self.min_y) / 2
+
+    def is_closed(self) -> bool:
+        """Closed shapes are drawn filled, and others by their outline"""
+        return hasattr(self.shape, 'are_points_inside')
+
+    def get_outline_samples(self, step: float) -> tuple[np.ndarray, np.ndarray]:
+        """Returns points on surfaces of the shape, which are at most step apart"""
+        xs, ys = [], []
+        for surface in self.surfaces:
+            if isinstance(surface, LineSegment):
+                first_endpoint, second_endpoint = surface.endpoints
+                parameters = np.linspace(0, 1, ceil(surface.length() / step) + 1)
+                xs.append(first_endpoint.x + (second_endpoint.x - first_endpoint.x)*parameters)
+                ys.append(first_endpoint.y + (second_endpoint.y - first_endpoint.y)*parameters)
+            elif isinstance(surface, (Cirlce, Arc)):
+                angular_size = surface.angular_size if isinstance(surface, Arc) else 360
+                start_angle = surface.start_angle if isinstance(surface, Arc) else 0
+                angles = np.radians(start_angle + np.linspace(0, angular_size,
+                                                              ceil(np.radians(angular_size)*surface.radius / step) + 1))
+                xs.append(surface.centre.x + surface.radius*np.cos(angles))
+                ys.append(surface.centre.y + surface.radius*np.sin(angles))
+            else:
+                surface_xs, surface_ys = surface.get_samples(step)
+                xs.append(surface_xs)
+                ys.append(surface_ys)
+        return (np.concatenate(xs), np.concatenate(ys))
+
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        return self.shape.get_distances_to_points(xs, ys)
+
+    def __repr__(self) -> str:
+        return f'Prototype({self.shape})'
+
+
+def transform_line(line: Line, transform: AffineTransform) -> Line:
+    """Returns image of the line under transform, which reflects and refracts the same way, as the line"""
+    point = line.sample_coordinates
+    transformed_point = transform.apply_to_point(point)
+    transformed_line = Line.construct_by_two_points(
+        transformed_point, transformed_point + transform.apply_to_vector(line.get_direction_vector()))
+    if isinstance(line, RefractionLine):
+        # Left coefficient belongs to lou or lod side of the line, which may become the right side after transform
+        side_point = point + line.get_normal()
+        is_left_side = line.get_direction_to_point(side_point) in ('lou', 'lod')
+        is_transformed_left_side = transformed_line.get_direction_to_point(transform.apply_to_point(side_point)) in ('lou', 'lod')
+        coefficients = (line.left_refraction_coefficient, line.right_refraction_coefficient)
+        if is_left_side != is_transformed_left_side:
+            coefficients = coefficients[::-1]
+        return RefractionLine.construct_from_line(transformed_line, *coefficients)
+    if isinstance(line, ReflectionLine):
+        return ReflectionLine.construct_from_line(transformed_line, line.reflection_coefficient)
+    return transformed_line
+
+
+def _as_transforms_array(transforms: TransformsType) -> np.ndarray:
+    if isinstance(transforms, np.ndarray):
+        transforms = np.asarray(transforms, np.float64)
+    else:
+        transforms = np.array([transform.as_array() for transform in transforms], np.float64).reshape(-1, 6)
+    if transforms.ndim != 2 or transforms.shape[1] != 6:
+        raise ValueError(f'Transforms must be (n, 6) array of (a, b, c, d, dx, dy), but array of shape {transforms.shape} was given')
+    a, b, c, d = transforms.T[:4]
+    if np.any(a*d - b*c == 0):
+        raise ValueError('Transforms of instances must be invertible')
+    return transforms
+
+
+class SceneNode:
+    def __init__(self, transform: Optional[AffineTransform] = None) -> None:
+        """Group of instances and other nodes, that are all moved by transform of the node"""
+        self.transform = transform if transform is not None else AffineTransform.identity()
+        self.nodes: list[SceneNode] = []
+        # Transforms of instances of every prototype are kept as (n, 6) arrays of (a, b, c, d, dx, dy)
+        self.instances: list[tuple[Prototype, np.ndarray]] = []
+
+    def add_node(self, transform: Optional[AffineTransform] = None) -> 'SceneNode':
+        """Adds and returns child node, which instances are moved by its transform and then by transform of this node"""
+        node = SceneNode(transform)
+        self.nodes.append(node)
+        return node
+
+    def add_instance(self, prototype: Prototype, transform: Optional[AffineTransform] = None) -> None:
+        self.add_instances(prototype, [transform if transform is not None else AffineTransform.identity()])
+
+    def add_instances(self, prototype: Prototype, transforms: TransformsType) -> None:
+        """Adds instances of the prototype with given transforms (list of AffineTransform or (n, 6) array)"""
+        self.instances.append((prototype, _as_transforms_array(transforms)))
+
+    def get_instance_transforms(self, parent_transform: Optional[np.ndarray] = None) -> dict[Prototype, list[np.ndarray]]:
+        """Returns transforms of all instances of this node and its children to the coordinates of the parent"""
+        transform = self.transform.as_array()
+        if parent_transform is not None:
+            transform = compose_transforms(parent_transform, transform[np.newaxis])[0]
+        instance_transforms: dict[Prototype, list[np.ndarray]] = {}
+        for prototype, transforms in self.instances:
+            instance_transforms.setdefault(prototype, []).append(compose_transforms(transform, transforms))
+        for node in self.nodes:
+            for prototype, transforms in node.get_instance_transforms(transform).items():
+                instance_transforms.setdefault(prototype, []).extend(transforms)
+        return instance_transforms
+
+
+class _InstanceBatch:
+    """Instances of one prototype with precomputed arrays for ray and distance queries"""
+
+    def __init__(self, prototype: Prototype, transforms: np.ndarray) -> None:
+        self.prototype = prototype
+        self.transforms = transforms
+        self.inverse_transforms = invert_transforms(transforms)
+        self.min_scales, self.max_scales = get_transform_scales(transforms)
+        a, b, c, d, dx, dy = transforms.T
+        # Bounding box of every instance is bounding box of transformed corners of prototype's bounding box
+        corner_xs, corner_ys = [], []
+        for x in (prototype.min_x, prototype.max_x):
+            for y in (prototype.min_y, prototype.max_y):
+                corner_xs.append(a*x + b*y + dx)
+                corner_ys.append(c*x + d*y + dy)
+        self.min_xs = np.min(corner_xs, axis=0) - _BOUNDING_BOX_MARGIN
+        self.max_xs = np.max(corner_xs, axis=0) + _BOUNDING_BOX_MARGIN
+        self.min_ys = np.min(corner_ys, axis=0) - _BOUNDING_BOX_MARGIN
+        self.max_ys = np.max(corner_ys, axis=0) + _BOUNDING_BOX_MARGIN
+        centre = prototype.bounding_centre
+        self.centre_xs, self.centre_ys = a*centre.x + b*centre.y + dx, c*centre.x + d*centre.y + dy
+        self.bounding_radiuses = self.max_scales * prototype.bounding_radius
+
+    def get_local_rays(self, instances: np.ndarray, xs: np.ndarray, ys: np.ndarray,
+                       dxs: np.ndarray, dys: np.ndarray) -> tuple[np.ndarray, ...]:
+        """Returns starts and unit directions of rays in coordinates of instances, and lengths of transformed directions"""
+        a, b, c, d, dx, dy = self.inverse_transforms[instances].T
+        local_dxs, local_dys = a*dxs + b*dys, c*dxs + d*dys
+        lengths = np.hypot(local_dxs, local_dys)
+        return (a*xs + b*ys + dx, c*xs + d*ys + dy, local_dxs / lengths, local_dys / lengths, lengths)
+
+
+class SceneGraph(SceneNode):
+    """
+    Root of instanced geometry. Every prototype is stored once, and instances are only transforms of it,
+    so memory and setup scale with the number of unique shapes, not with the number of instances.
+    Rays are culled by bounding boxes of instances, moved into local coordinates of the rest
+    and traced there by batch tracer of the prototype.
+    Graph is flattened by build, which must be called again after graph is changed.
+    """
+
+    def __init__(self, transform: Optional[AffineTransform] = None) -> None:
+        super().__init__(transform)
+        self._batches: Optional[list[_InstanceBatch]] = None
+
+    def build(self) -> None:
+        self._batches = [_InstanceBatch(prototype, np.concatenate(transforms))
+                         for prototype, transforms in self.get_instance_transforms().items()]
+
+    def _get_batches(self) -> list[_InstanceBatch]:
+        if self._batches is None:
+            self.build()
+        return self._batches
+
+    @property
+    def prototypes(self) -> list[Prototype]:
+        return [batch.prototype for batch in self._get_batches()]
+
+    @property
+    def number_of_instances(self) -> int:
+        return sum(batch.transforms.shape[0] for batch in self._get_batches())
+
+    def get_bounds(self) -> tuple[float, float, float, float]:
+        """Returns (min x, max x, min y, max y) of bounding box of all instances"""
+        batches = [batch for batch in self._get_batches() if batch.transforms.shape[0]]
+        if not batches:
+            return (inf, -inf, inf, -inf)
+        return (min(float(batch.min_xs.min()) for batch in batches), max(float(batch.max_xs.max()) for batch in batches),
+                min(float(batch.min_ys.min()) for batch in batches), max(float(batch.max_ys.max()) for batch in batches))
+
+    def get_prototype_transforms(self, prototype: Prototype) -> np.ndarray:
+        """Returns (n, 6) array of transforms of all instances of the prototype to the coordinates of the graph"""
+        for batch in self._get_batches():
+            if batch.prototype is prototype:
+                return batch.transforms
+        return np.empty((0, 6), np.float64)
+
+    def get_hits(self, xs: np.ndarray, ys: np.ndarray,
+                 dxs: np.ndarray, dys: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns distances along rays with given starts and unit directions to the closest instances,
+        indexes of prototypes and instances, that are hit, and indexes of hit surfaces in prototypes
+        (inf and -1, if ray hits nothing).
+        """
+        xs, ys, dxs, dys = (np.asarray(array, np.float64) for array in (xs, ys, dxs, dys))
+        distances = np.full(xs.shape, np.inf)
+        batch_indexes, instance_indexes, surface_indexes = (np.full(xs.shape, -1) for _ in range(3))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse_dxs, inverse_dys = 1 / dxs, 1 / dys
+        for batch_index, batch in enumerate(self._get_batches()):
+            chunk_size = max(_MAX_CHUNK_SIZE // max(xs.size, 1), 1)
+            for first_instance in range(0, batch.transforms.shape[0], chunk_size):
+                instances = slice(first_instance, first_instance + chunk_size)
+                entries, exits = self._get_slab_distances(xs, ys, inverse_dxs, inverse_dys, batch, instances)
+                rays, candidates = np.nonzero((entries <= exits) & (exits > 0) & (entries < distances[:, np.newaxis]))
+                if rays.size == 0:
+                    continue
+                candidates += first_instance
+                local_xs, local_ys, local_dxs, local_dys, lengths = batch.get_local_rays(
+                    candidates, xs[rays], ys[rays], dxs[rays], dys[rays])
+                surfaces, local_distances = batch.prototype.tracer.get_hits(local_xs, local_ys, local_dxs, local_dys)
+                hit_distances = local_distances / lengths
+                # The closest hit of every ray is the first one after sorting by ray and distance
+                order = np.lexsort((hit_distances, rays))
+                is_first = np.ones(order.size, bool)
+                is_first[1:] = rays[order][1:] != rays[order][:-1]
+                closest = order[is_first]
+                closest = closest[hit_distances[closest] < distances[rays[closest]]]
+                hit_rays = rays[closest]
+                distances[hit_rays] = hit_distances[closest]
+                batch_indexes[hit_rays] = batch_index
+                instance_indexes[hit_rays] = candidates[closest]
+                surface_indexes[hit_rays] = surfaces[closest]
+        return (distances, batch_indexes, instance_indexes, surface_indexes)
+
+    @staticmethod
+    def _get_slab_distances(xs: np.ndarray, ys: np.ndarray, inverse_dxs: np.ndarray, inverse_dys: np.ndarray,
+                            batch: _InstanceBatch, instances: slice) -> tuple[np.ndarray, np.ndarray]:
+        """Returns distances, at which rays enter and exit bounding boxes of instances"""
+        entries, exits = [], []
+        for starts, inverse_directions, mins, maxs in ((xs, inverse_dxs, batch.min_xs, batch.max_xs),
+                                                       (ys, inverse_dys, batch.min_ys, batch.max_ys)):
+            starts, inverse_directions = starts[:, np.newaxis], inverse_directions[:, np.newaxis]
+            with np.errstate(invalid='ignore'):
+                first_distances = (mins[instances] - starts) * inverse_directions
+                second_distances = (maxs[instances] - starts) * inverse_directions
+            # Ray, parallel to the slab, is either always inside of it or never
+            is_parallel = np.isinf(inverse_directions)
+            is_inside = (mins[instances] <= starts) & (starts <= maxs[instances])
+            entries.append(np.where(is_parallel, np.where(is_inside, -np.inf, np.inf),
+                                    np.minimum(first_distances, second_distances)))
+            exits.append(np.where(is_parallel, np.where(is_inside, np.inf, -np.inf),
+                                  np.maximum(first_distances, second_distances)))
+        return (np.maximum(*entries), np.minimum(*exits))
+
+    def get_ray_hit(self, ray: Ray) -> Optional[tuple[float, Line]]:
+        """Returns distance along the ray to the closest instance and line, that is hit there, or None"""
+        distances, batch_indexes, instance_indexes, surface_indexes = self.get_hits(
+            np.array([ray.origin.x]), np.array([ray.origin.y]), np.array([ray.direction.x]), np.array([ray.direction.y]))
+        if batch_indexes[0] < 0:
+            return None
+        distance = float(distances[0])
+        batch = self._get_batches()[batch_indexes[0]]
+        transform = AffineTransform(*batch.transforms[instance_indexes[0]])
+        local_point = transform.inverse().apply_to_point(ray.get_point(distance))
+        return (distance, transform_line(batch.prototype.tracer.get_hit_line(int(surface_indexes[0]), local_point), transform))
+
+    def get_intersection_distance(self, ray: Ray) -> Optional[float]:
+        hit = self.get_ray_hit(ray)
+        return hit[0] if hit is not None else None
+
+    def get_tangent_line(self, point: Point) -> Line:
+        """Returns line, that is hit at the point on the closest surface of instances"""
+        closest_distance, closest_hit = np.inf, None
+        for batch in self._get_batches():
+            is_near = ((batch.min_xs <= point.x) & (point.x <= batch.max_xs)
+                       & (batch.min_ys <= point.y) & (point.y <= batch.max_ys))
+            for instance in np.flatnonzero(is_near).tolist():
+                transform = AffineTransform(*batch.transforms[instance])
+                local_point = transform.inverse().apply_to_point(point)
+                for i, surface in enumerate(batch.prototype.surfaces):
+                    distance = surface.get_distance_to_point(local_point) * batch.min_scales[instance]
+                    if distance < closest_distance:
+                        closest_distance, closest_hit = distance, (batch, transform, i, local_point)
+        if closest_hit is None:
+            raise ValueError(f'Point {point} is not on any instance of scene graph')
+        batch, transform, surface_index, local_point = closest_hit
+        return transform_line(batch.prototype.tracer.get_hit_line(surface_index, local_point), transform)
+
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """
+        Returns lower bounds of distances from given points to the closest instances.
+        Centres of instances are hashed into cells twice as large as the largest instance,
+        and only instances in cells around a point are measured exactly: all other ones are at least
+        half of cell away, so distances never exceed actual ones and are exact near instances.
+        """
+        xs, ys = np.asarray(xs, np.float64), np.asarray(ys, np.float64)
+        shape = np.broadcast(xs, ys).shape
+        xs, ys = np.broadcast_to(xs, shape).ravel(), np.broadcast_to(ys, shape).ravel()
+        batches = self._get_batches()
+        distances = np.full(xs.shape, np.inf)
+        if not batches or all(batch.transforms.shape[0] == 0 for batch in batches):
+            return distances.reshape(shape)
+        cell_size = max(2*max(float(batch.bounding_radiuses.max(initial=0)) for batch in batches), 1)
+        batch_indexes = np.concatenate([np.full(batch.transforms.shape[0], i) for i, batch in enumerate(batches)])
+        instance_indexes = np.concatenate([np.arange(batch.transforms.shape[0]) for batch in batches])
+        keys = self._get_cell_keys(np.concatenate([batch.centre_xs for batch in batches]) // cell_size,
+                                   np.concatenate([batch.centre_ys for batch in batches]) // cell_size)
+        order = np.argsort(keys, kind='stable')
+        keys, batch_indexes, instance_indexes = keys[order], batch_indexes[order], instance_indexes[order]
+
+        columns, rows = xs // cell_size, ys // cell_size
+        chunk_size = 4096
+        for first_point in range(0, xs.size, chunk_size):
+            points = np.arange(first_point, min(first_point + chunk_size, xs.size))
+            pair_points, pair_instances = [], []
+            for column_offset in (-1, 0, 1):
+                for row_offset in (-1, 0, 1):
+                    cell_keys = self._get_cell_keys(columns[points] + column_offset, rows[points] + row_offset)
+                    starts = np.searchsorted(keys, cell_keys, 'left')
+                    counts = np.searchsorted(keys, cell_keys, 'right') - starts
+                    pair_points.append(np.repeat(points, counts))
+                    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                    pair_instances.append(np.repeat(starts, counts) + offsets)
+            pair_points, pair_instances = np.concatenate(pair_points), np.concatenate(pair_instances)
+            for batch_index, batch in enumerate(batches):
+                is_in_batch = batch_indexes[pair_instances] == batch_index
+                if not np.any(is_in_batch):
+                    continue
+                points_of_batch = pair_points[is_in_batch]
+                instances = instance_indexes[pair_instances[is_in_batch]]
+                a, b, c, d, dx, dy = batch.inverse_transforms[instances].T
+                point_xs, point_ys = xs[points_of_batch], ys[points_of_batch]
+                local_distances = batch.prototype.get_distances_to_points(a*point_xs + b*point_ys + dx,
+                                                                          c*point_xs + d*point_ys + dy)
+                np.minimum.at(distances, points_of_batch, local_distances * batch.min_scales[instances])
+        return np.minimum(distances, cell_size / 2).reshape(shape)
+
+    @staticmethod
+    def _get_cell_keys(columns: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        return columns.astype(np.int64) * 2**32 + rows.astype(np.int64)
+
+    def get_distance_to_point(self, point: Point) -> float:
+        return float(self.get_distances_to_points(np.array([point.x]), np.array([point.y]))[0])
@@ -0,0 +1,482 @@
+"""
+Multi-process tracing, that passes geometry and paths through shared memory instead of pickling them.
+
+Geometry of the scene is packed into flat numpy tables and published once into shared memory.
+Worker processes rebuild tracer from the tables once per published geometry, read starts of beams
+from shared array and write vertices of paths and states of beams between propogations into shared arrays,
+so only names of the arrays and ranges of beams are sent to them.
+
+Only propogation runs in workers: callbacks (drawing, radiance deposits, export) are replayed in this process afterwards.
+LightBeamSceneManager uses it for spectral beams only, regular beams and chunks of light sources are traced in this process.
+Workers pay off only on several cores with enough beams to outweigh tasks and replay, on one core they are slower
+than batch tracer in this process.
+"""
+
+import math
+import os
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+import numpy as np
+
+from optical.detectors import DetectorLine
+from optical.dispersion import RefractionCoefficientType
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionArc, ReflectionCircle, RefractionArc, RefractionCircle
+from optical.opticallines import ReflectionLine, ReflectionSegment, RefractionLine, RefractionSegment
+from optical.spectral_tracer import BatchTracer
+from plane.plane2d import Cirlce, Line, LineSegment, Point, Vector2d
+from plane.polygons2d import Arc
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Name, shape and dtype of shared array
+SharedArrayDescriptor = tuple[str, tuple[int, ...], str]
+
+# Optical kinds of packed objects
+PLAIN, REFLECTION, REFRACTION = 0, 1, 2
+
+# Columns of packed tables: geometry, then optical kind, reflection coefficient,
+# indexes of refraction coefficients (left and right, or inner and outer) and index of bounded figure
+_LINE_COLUMNS = 8
+_SEGMENT_COLUMNS = 9
+_CIRCLE_COLUMNS = 8
+_ARC_COLUMNS = 10
+
+# Columns of beam starts: x, y, direction x, direction y, refraction coefficient, intensity, wavelength (nan if None),
+# max bounces, bounces
+_START_COLUMNS = 9
+# Columns of beam states: number of points, direction x, direction y, refraction coefficient, intensity, bounces,
+# and for states before propogations, if beam hit something after it, or for final states, number of states before.
+# Final states have one more column, which tells, that beam was stopped, because there was no place for more states
+_STATE_COLUMNS = 7
+
+
+class SharedArray:
+    def __init__(self, shape: tuple[int, ...], dtype: Any = np.float64, name: Optional[str] = None) -> None:
+        """
+        Numpy array in shared memory block. Without name new block is created, which must be unlinked by its owner,
+        otherwise existing block with given name is attached.
+        """
+        dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape, dtype=np.int64)) * dtype.itemsize, 1)
+        self._memory = shared_memory.SharedMemory(name=name, create=name is None, size=size if name is None else 0)
+        self.array = np.ndarray(shape, dtype, buffer=self._memory.buf)
+        self.descriptor: SharedArrayDescriptor = (self._memory.name, tuple(shape), dtype.str)
+
+    @staticmethod
+    def from_array(array: np.ndarray) -> 'SharedArray':
+        shared_array = SharedArray(array.shape, array.dtype)
+        shared_array.array[...] = array
+        return shared_array
+
+    @staticmethod
+    def attach(descriptor: SharedArrayDescriptor) -> 'SharedArray':
+        name, shape, dtype = descriptor
+        return SharedArray(shape, dtype, name)
+
+    def close(self) -> None:
+        """Detaches array from the block, array must not be used after it"""
+        self.array = None
+        self._memory.close()
+
+    def unlink(self) -> None:
+        """Closes array and frees the block, it is done once by the owner of the block"""
+        self.close()
+        self._memory.unlink()
+
+
+def can_pack(objects: list[Any]) -> bool:
+    """Checks, if objects are lines, line segments, circles and arcs, which packed tables describe completely"""
+    for object_ in objects:
+        line = object_.reconstruct_line() if isinstance(object_, LineSegment) else object_
+        if isinstance(line, DetectorLine) or not isinstance(line, (Line, Cirlce, Arc)) or hasattr(object_, 'get_ray_hit'):
+            return False
+    return True
+
+
+class PackedGeometry:
+    def __init__(self, objects: list[Any]) -> None:
+        """
+        Lines, line segments, circles and arcs, packed into tables by kind.
+        Refraction coefficients are kept in separate list (they may be dispersion models) and referred by index,
+        like closed figures, which borders refraction lines are: figures are kept as indexes of their inner and outer coefficients.
+        """
+        if not can_pack(objects):
+            raise ValueError('Only lines, line segments, circles and arcs without detectors can be packed')
+        self.refraction_coefficients: list[RefractionCoefficientType] = []
+        self.figures: list[Any] = []
+        self._figure_indexes: dict[int, int] = {}
+        lines, segments, circles, arcs = [], [], [], []
+        for object_ in objects:
+            if isinstance(object_, Line):
+                lines.append([object_.sample_coordinates.x, object_.sample_coordinates.y, object_.angle_coefficient,
+                              *self._pack_optics(object_)])
+            elif isinstance(object_, LineSegment):
+                first_point, second_point = object_.endpoints
+                segments.append([first_point.x, first_point.y, second_point.x, second_point.y,
+                                 *self._pack_optics(object_.reconstruct_line())])
+            elif isinstance(object_, Cirlce):
+                circles.append([object_.centre.x, object_.centre.y, object_.radius, *self._pack_optics(object_)])
+            else:
+                arcs.append([object_.centre.x, object_.centre.y, object_.radius, object_.start_angle, object_.angular_size,
+                             *self._pack_optics(object_)])
+        self.figure_coefficients = np.array([[self._get_coefficient_index(figure.inner_refraction_coefficient),
+                                              self._get_coefficient_index(figure.outer_refraction_coefficient)]
+                                             for figure in self.figures], np.int64).reshape(-1, 2)
+        self.tables = {'lines': np.array(lines, np.float64).reshape(-1, _LINE_COLUMNS),
+                       'segments': np.array(segments, np.float64).reshape(-1, _SEGMENT_COLUMNS),
+                       'circles': np.array(circles, np.float64).reshape(-1, _CIRCLE_COLUMNS),
+                       'arcs': np.array(arcs, np.float64).reshape(-1, _ARC_COLUMNS)}
+
+    def _get_coefficient_index(self, refraction_coefficient: RefractionCoefficientType) -> int:
+        for i, known_coefficient in enumerate(self.refraction_coefficients):
+            if known_coefficient is refraction_coefficient or known_coefficient == refraction_coefficient:
+                return i
+        self.refraction_coefficients.append(refraction_coefficient)
+        return len(self.refraction_coefficients) - 1
+
+    def _get_figure_index(self, figure: Any) -> int:
+        if id(figure) not in self._figure_indexes:
+            self._figure_indexes[id(figure)] = len(self.figures)
+            self.figures.append(figure)
+        return self._figure_indexes[id(figure)]
+
+    def _pack_optics(self, object_: Any) -> list[float]:
+        """Returns optical kind, reflection coefficient, indexes of refraction coefficients and index of bounded figure"""
+        if isinstance(object_, (RefractionLine, RefractionCircle, RefractionArc)):
+            if isinstance(object_, RefractionLine):
+                coefficients = (object_.left_refraction_coefficient, object_.right_refraction_coefficient)
+            else:
+                coefficients = (object_.inner_refraction_coefficient, object_.outer_refraction_coefficient)
+            figure = object_ if isinstance(object_, RefractionCircle) else object_.bounded_figure
+            return [REFRACTION, 1, *(self._get_coefficient_index(coefficient) for coefficient in coefficients),
+                    self._get_figure_index(figure) if figure is not None else -1]
+        if isinstance(object_, (ReflectionLine, ReflectionCircle, ReflectionArc)):
+            return [REFLECTION, object_.reflection_coefficient, -1, -1, -1]
+        return [PLAIN, 0, -1, -1, -1]
+
+
+class _PackedFigure:
+    def __init__(self, inner_refraction_coefficient: RefractionCoefficientType,
+                 outer_refraction_coefficient: RefractionCoefficientType) -> None:
+        """Stand-in for closed figure in worker, which beams only need coefficients of"""
+        self.inner_refraction_coefficient = inner_refraction_coefficient
+        self.outer_refraction_coefficient = outer_refraction_coefficient
+
+
+def unpack_objects(tables: dict[str, np.ndarray], refraction_coefficients: list[RefractionCoefficientType],
+                   figure_coefficients: np.ndarray) -> tuple[list[Any], list[Any]]:
+    """
+    Returns objects, built from packed tables the same way, as original ones, so their tracing gives the same floats,
+    and closed figures, which borders they are (refraction circles or stand-ins with coefficients).
+    """
+    figures: list[Any] = [_PackedFigure(refraction_coefficients[inner], refraction_coefficients[outer])
+                          for inner, outer in figure_coefficients.tolist()]
+    objects = []
+    for x, y, angle_coefficient, kind, reflection_coefficient, left, right, figure in tables['lines'].tolist():
+        sample = Point(x, y)
+        if kind == REFRACTION:
+            line = RefractionLine(sample, refraction_coefficients[int(left)], refraction_coefficients[int(right)],
+                                  angle_coefficient=angle_coefficient)
+            line.bounded_figure = figures[int(figure)] if figure >= 0 else None
+        elif kind == REFLECTION:
+            line = ReflectionLine(sample, reflection_coefficient, angle_coefficient=angle_coefficient)
+        else:
+            line = Line(sample, angle_coefficient=angle_coefficient)
+        objects.append(line)
+    for x0, y0, x1, y1, kind, reflection_coefficient, left, right, figure in tables['segments'].tolist():
+        if kind == REFRACTION:
+            segment = RefractionSegment(Point(x0, y0), Point(x1, y1), refraction_coefficients[int(left)],
+                                        refraction_coefficients[int(right)])
+            segment.related_line.bounded_figure = figures[int(figure)] if figure >= 0 else None
+        elif kind == REFLECTION:
+            segment = ReflectionSegment(Point(x0, y0), Point(x1, y1), reflection_coefficient)
+        else:
+            segment = LineSegment(Point(x0, y0), Point(x1, y1))
+        objects.append(segment)
+    for x, y, radius, kind, reflection_coefficient, inner, outer, figure in tables['circles'].tolist():
+        if kind == REFRACTION:
+            circle = RefractionCircle(Point(x, y), radius, refraction_coefficients[int(inner)], refraction_coefficients[int(outer)])
+            # Refraction circle is bounded figure of its own tangent lines
+            figures[int(figure)] = circle
+        elif kind == REFLECTION:
+            circle = ReflectionCircle(Point(x, y), radius, reflection_coefficient)
+        else:
+            circle = Cirlce(Point(x, y), radius)
+        objects.append(circle)
+    for x, y, radius, start_angle, angular_size, kind, reflection_coefficient, inner, outer, figure in tables['arcs'].tolist():
+        end_angle = start_angle + angular_size
+        if kind == REFRACTION:
+            arc = RefractionArc(Point(x, y), radius, start_angle, end_angle,
+                                refraction_coefficients[int(inner)], refraction_coefficients[int(outer)])
+            arc.bounded_figure = figures[int(figure)] if figure >= 0 else None
+        elif kind == REFLECTION:
+            arc = ReflectionArc(Point(x, y), radius, start_angle, end_angle, reflection_coefficient)
+        else:
+            arc = Arc(Point(x, y), radius, start_angle, end_angle)
+        # Angles are kept as they were, not computed again from the ends
+        arc.start_angle, arc.angular_size, arc.end_angle = start_angle, angular_size, end_angle
+        objects.append(arc)
+    return (objects, figures)
+
+
+# Tracer of every published geometry, that worker process has seen, by name of its first table
+_worker_tracers: dict[str, tuple[BatchTracer, list[Any]]] = {}
+
+
+def _get_worker_tracer(geometry: dict[str, SharedArrayDescriptor],
+                       refraction_coefficients: list[RefractionCoefficientType]) -> tuple[BatchTracer, list[Any]]:
+    key = geometry['lines'][0]
+    if key not in _worker_tracers:
+        shared_tables = {kind: SharedArray.attach(descriptor) for kind, descriptor in geometry.items()}
+        tables = {kind: shared_table.array.copy() for kind, shared_table in shared_tables.items()}
+        for shared_table in shared_tables.values():
+            shared_table.close()
+        objects, figures = unpack_objects({kind: tables[kind] for kind in ('lines', 'segments', 'circles', 'arcs')},
+                                          refraction_coefficients, tables['figures'].astype(np.int64))
+        # Geometry is published for one scene at a time, so tracers of previous scenes are dropped
+        _worker_tracers.clear()
+        _worker_tracers[key] = (BatchTracer(objects), figures)
+    return _worker_tracers[key]
+
+
+def _trace_chunk(geometry: dict[str, SharedArrayDescriptor], refraction_coefficients: list[RefractionCoefficientType],
+                 buffers: dict[str, SharedArrayDescriptor], first_beam: int, last_beam: int, record_states: bool) -> None:
+    """
+    Traces beams [first_beam; last_beam) in worker process and writes their paths and final states into shared buffers,
+    and also states before every propogation, if record_states is True
+    """
+    tracer, figures = _get_worker_tracer(geometry, refraction_coefficients)
+    shared_buffers = {kind: SharedArray.attach(descriptor) for kind, descriptor in buffers.items()}
+    try:
+        arrays = {kind: shared_buffer.array for kind, shared_buffer in shared_buffers.items()}
+        figure_indexes = {id(figure): i for i, figure in enumerate(figures)}
+        beams = []
+        for row, media in zip(arrays['starts'][first_beam:last_beam].tolist(),
+                              arrays['start_media'][first_beam:last_beam].tolist()):
+            x, y, direction_x, direction_y, refraction_coefficient, intensity, wavelength, max_bounces, bounces = row
+            beam = LightBeam(Point(x, y), 0, max_bounces=int(max_bounces),
+                             wavelength=None if math.isnan(wavelength) else wavelength)
+            beam.direction = Vector2d(direction_x, direction_y)
+            beam.refracion_coefficient = refraction_coefficient
+            beam.relative_intensity = intensity
+            beam._number_of_bounces = int(bounces)
+            if media[0] != -2:
+                beam.media = [figures[index] for index in media if index >= 0]
+            beams.append(beam)
+
+        media_size = arrays['final_media'].shape[1]
+        # Every propogation adds at most two points
+        capacity = (arrays['points'].shape[1] - 1) // 2
+        # States are collected in lists and written into shared arrays at once after tracing
+        states: list[list[list[float]]] = [[] for _ in beams]
+        state_media: list[list[list[int]]] = [[] for _ in beams]
+        numbers_of_states = [0]*len(beams)
+        is_stopped = [False]*len(beams)
+
+        def get_state(beam: LightBeam) -> list[float]:
+            return [len(beam.coordinates), beam.direction.x, beam.direction.y,
+                    beam.refracion_coefficient, beam.relative_intensity, beam._number_of_bounces, 0]
+
+        def get_media(beam: LightBeam) -> list[int]:
+            if beam.media is None:
+                return [-2]*media_size
+            if len(beam.media) > media_size:
+                raise ValueError(f'Beam is inside of {len(beam.media)} figures at once, but only {media_size} are kept')
+            return [figure_indexes[id(figure)] for figure in beam.media] + [-1]*(media_size - len(beam.media))
+
+        def on_hit(i: int) -> None:
+            states[i][-1][6] = 1
+
+        def should_continue(i: int) -> bool:
+            # Beam, that has no place for more states, is stopped and continued by the next trace
+            if numbers_of_states[i] == capacity:
+                is_stopped[i] = True
+                return False
+            numbers_of_states[i] += 1
+            if record_states:
+                states[i].append(get_state(beams[i]))
+                state_media[i].append(get_media(beams[i]))
+            return True
+
+        tracer.trace(beams, on_hit=on_hit if record_states else None, should_continue=should_continue)
+
+        for i, beam in enumerate(beams):
+            j = first_beam + i
+            arrays['points'][j, :len(beam.coordinates)] = [(point.x, point.y) for point in beam.coordinates]
+            if record_states and states[i]:
+                arrays['states'][j, :len(states[i])] = states[i]
+                arrays['state_media'][j, :len(states[i])] = state_media[i]
+            arrays['final_states'][j] = get_state(beam)[:6] + [len(states[i]), is_stopped[i]]
+            arrays['final_media'][j] = get_media(beam)
+    finally:
+        for shared_buffer in shared_buffers.values():
+            shared_buffer.close()
+
+
+class ProcessTracer:
+    """
+    Traces beams by batch tracers in pool of worker processes, with the same results and callbacks, as BatchTracer.trace.
+    Geometry is published into shared memory once by publish, workers write paths into shared arrays,
+    and callbacks are called afterwards in this process by replaying states of beams before every propogation.
+    """
+
+    def __init__(self, number_of_workers: Optional[int] = None, chunks_per_worker: int = 4) -> None:
+        if number_of_workers is None:
+            number_of_workers = os.cpu_count() or 1
+        if number_of_workers < 1:
+            raise ValueError(f'Number of workers must be positive, but {number_of_workers} was given')
+        if chunks_per_worker < 1:
+            raise ValueError(f'Chunks per worker must be positive, but {chunks_per_worker} was given')
+        self.number_of_workers = number_of_workers
+        self.chunks_per_worker = chunks_per_worker
+        self.geometry: Optional[PackedGeometry] = None
+        self._published_objects: list[Any] = []
+        self._shared_tables: dict[str, SharedArray] = {}
+        self._executor: Optional['ProcessPoolExecutor'] = None
+
+    def __enter__(self) -> 'ProcessTracer':
+        return self
+
+    def __exit__(self, *exception_info: Any) -> None:
+        self.close()
+
+    def publish(self, objects: list[Any]) -> None:
+        """Packs objects into shared memory for workers, if they are not the same objects, as were published last time"""
+        if (len(objects) == len(self._published_objects)
+                and all(object_ is published for object_, published in zip(objects, self._published_objects))):
+            return
+        geometry = PackedGeometry(objects)
+        self._unlink_tables()
+        self._shared_tables = {kind: SharedArray.from_array(table) for kind, table in geometry.tables.items()}
+        self._shared_tables['figures'] = SharedArray.from_array(geometry.figure_coefficients.astype(np.float64))
+        self.geometry = geometry
+        self._published_objects = list(objects)
+
+    def _get_executor(self) -> 'ProcessPoolExecutor':
+        if self._executor is None:
+            # Imported on first use, like thread pool of band rasterizer
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(self.number_of_workers)
+        return self._executor
+
+    def trace(self, beams: list[LightBeam], *, on_hit: Optional[Callable[[int], None]] = None,
+              should_continue: Optional[Callable[[int], bool]] = None) -> None:
+        """
+        Fully propogates given beams through published objects, like BatchTracer.trace.
+        Beams continue from their last points, and media of beams must consist of published figures.
+        """
+        if self.geometry is None:
+            raise ValueError('Objects must be published before tracing')
+        if not beams:
+            return
+        number_of_beams = len(beams)
+        # Refractions don't count as bounces, so beams, that have more propogations, are traced again from where they stopped
+        number_of_states = max(beam.max_number_of_bounces - beam._number_of_bounces for beam in beams) + 2
+        # Every propogation adds the hit and the point after reflection or refraction
+        number_of_points = 2*number_of_states + 1
+        media_size = max([len(self.geometry.figures)] + [len(beam.media) for beam in beams if beam.media is not None] + [1])
+        # States before propogations are needed only to call callbacks with them
+        record_states = on_hit is not None or should_continue is not None
+        buffers = {'starts': SharedArray((number_of_beams, _START_COLUMNS)),
+                   'start_media': SharedArray((number_of_beams, media_size), np.int64),
+                   'points': SharedArray((number_of_beams, number_of_points, 2)),
+                   'states': SharedArray((number_of_beams, number_of_states if record_states else 0, _STATE_COLUMNS)),
+                   'state_media': SharedArray((number_of_beams, number_of_states if record_states else 0, media_size), np.int64),
+                   'final_states': SharedArray((number_of_beams, _STATE_COLUMNS + 1)),
+                   'final_media': SharedArray((number_of_beams, media_size), np.int64)}
+        try:
+            buffers['starts'].array[:] = [(beam.coordinates[-1].x, beam.coordinates[-1].y, beam.direction.x, beam.direction.y,
+                                           beam.refracion_coefficient, beam.relative_intensity,
+                                           np.nan if beam.wavelength is None else beam.wavelength,
+                                           beam.max_number_of_bounces, beam._number_of_bounces) for beam in beams]
+            figure_indexes = {id(figure): i for i, figure in enumerate(self.geometry.figures)}
+            start_media = buffers['start_media'].array
+            start_media[:] = -1
+            for i, beam in enumerate(beams):
+                if beam.media is None:
+                    start_media[i] = -2
+                    continue
+                if any(id(figure) not in figure_indexes for figure in beam.media):
+                    raise ValueError('Media of beams must consist of figures, which borders are published')
+                start_media[i, :len(beam.media)] = [figure_indexes[id(figure)] for figure in beam.media]
+
+            geometry = {kind: shared_table.descriptor for kind, shared_table in self._shared_tables.items()}
+            descriptors = {kind: buffer.descriptor for kind, buffer in buffers.items()}
+            number_of_chunks = min(number_of_beams, self.number_of_workers*self.chunks_per_worker)
+            bounds = np.linspace(0, number_of_beams, number_of_chunks + 1).astype(np.int64).tolist()
+            executor = self._get_executor()
+            futures = [executor.submit(_trace_chunk, geometry, self.geometry.refraction_coefficients, descriptors,
+                                       first_beam, last_beam, record_states) for first_beam, last_beam in zip(bounds, bounds[1:])]
+            for future in futures:
+                future.result()
+            stopped = self._replay(beams, {kind: buffer.array for kind, buffer in buffers.items()}, on_hit, should_continue)
+        finally:
+            for buffer in buffers.values():
+                buffer.unlink()
+        if stopped:
+            self.trace([beams[i] for i in stopped],
+                       on_hit=(lambda j: on_hit(stopped[j])) if on_hit is not None else None,
+                       should_continue=(lambda j: should_continue(stopped[j])) if should_continue is not None else None)
+
+    def _set_state(self, beam: LightBeam, state: list[float], media: list[int], first_point: int) -> None:
+        number_of_points, direction_x, direction_y, refraction_coefficient, intensity, bounces = state[:6]
+        del beam.coordinates[first_point + int(number_of_points):]
+        beam.direction = Vector2d(direction_x, direction_y)
+        beam.refracion_coefficient = refraction_coefficient
+        beam.relative_intensity = intensity
+        beam._number_of_bounces = int(bounces)
+        beam.media = None if media[0] == -2 else [self.geometry.figures[index] for index in media if index >= 0]
+
+    def _replay(self, beams: list[LightBeam], arrays: dict[str, np.ndarray],
+                on_hit: Optional[Callable[[int], None]], should_continue: Optional[Callable[[int], bool]]) -> list[int]:
+        """
+        Gives beams their paths and calls callbacks with beams in the same states, as in BatchTracer.trace.
+        Returns indexes of beams, which workers stopped for lack of place, and should_continue did not stop.
+        """
+        stopped = []
+        for i, beam in enumerate(beams):
+            # Worker path starts from the last point of the beam, which beam already has
+            first_point = len(beam.coordinates) - 1
+            final_state = arrays['final_states'][i].tolist()
+            path = [Point(x, y) for x, y in arrays['points'][i, 1:int(final_state[0])].tolist()]
+            beam.coordinates += path
+            if on_hit is None and should_continue is None:
+                self._set_state(beam, final_state, arrays['final_media'][i].tolist(), first_point)
+                if final_state[_STATE_COLUMNS]:
+                    stopped.append(i)
+                continue
+            # Path is given back point by point, so callbacks see it growing, like in batch tracer
+            coordinates = beam.coordinates
+            beam.coordinates = coordinates[:first_point + 1]
+            for state, media in zip(arrays['states'][i, :int(final_state[6])].tolist(),
+                                    arrays['state_media'][i, :int(final_state[6])].tolist()):
+                beam.coordinates += coordinates[len(beam.coordinates):first_point + int(state[0])]
+                self._set_state(beam, state, media, first_point)
+                if should_continue is not None and not should_continue(i):
+                    break
+                if state[6]:
+                    beam.coordinates.append(coordinates[first_point + int(state[0])])
+                    if on_hit is not None:
+                        on_hit(i)
+            else:
+                beam.coordinates += coordinates[len(beam.coordinates):]
+                self._set_state(beam, final_state, arrays['final_media'][i].tolist(), first_point)
+                if final_state[_STATE_COLUMNS]:
+                    stopped.append(i)
+        return stopped
+
+    def _unlink_tables(self) -> None:
+        for shared_table in self._shared_tables.values():
+            shared_table.unlink()
+        self._shared_tables = {}
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._unlink_tables()
+        self.geometry = None
+        self._published_objects = []
@@ -0,0 +1,214 @@
+from typing import Any, Callable, Optional, Sequence
+
+import numpy as np
+
+from optical.detectors import DetectorLine
+from optical.dispersion import RefractionCoefficientType
+from optical.light_beam import LightBeam
+from optical.opticallines import ReflectionLine, RefractionLine
+from plane.conics2d import Conic
+from plane.plane2d import Cirlce, Line, LineSegment, Point
+from plane.polygons2d import Arc
+
+# Intersections closer than this to the start of a ray are ignored, so ray doesn't hit the line it has just left
+_MIN_HIT_DISTANCE = 1e-6
+
+VISIBLE_WAVELENGTHS = (380, 780)
+
+
+class SpectralBeam:
+    def __init__(self, start_coordinates: Point, angle: float, wavelengths: Sequence[float],
+                 *, initial_refraction_coefficient: RefractionCoefficientType = 1, max_bounces: int = 100) -> None:
+        """
+        Beam of several wavelengths (in nanometres), that starts from one point in one direction.
+        Every wavelength is kept as separate LightBeam, and all of them are traced together by BatchTracer.
+        """
+        if len(wavelengths) == 0:
+            raise ValueError('Spectral beam needs at least one wavelength')
+        self.origin = start_coordinates
+        self.initial_angle = angle
+        self.wavelengths = tuple(float(wavelength) for wavelength in wavelengths)
+        self.beams = [LightBeam(start_coordinates, angle, initial_refraction_coefficient=initial_refraction_coefficient,
+                                max_bounces=max_bounces, wavelength=wavelength) for wavelength in self.wavelengths]
+
+    @staticmethod
+    def construct_visible(start_coordinates: Point, angle: float, number_of_wavelengths: int,
+                          *, initial_refraction_coefficient: RefractionCoefficientType = 1,
+                          max_bounces: int = 100) -> 'SpectralBeam':
+        """Returns beam of white light, sampled by evenly spaced visible wavelengths"""
+        wavelengths = np.linspace(*VISIBLE_WAVELENGTHS, number_of_wavelengths).tolist()
+        return SpectralBeam(start_coordinates, angle, wavelengths,
+                            initial_refraction_coefficient=initial_refraction_coefficient, max_bounces=max_bounces)
+
+
+class BatchTracer:
+    """
+    Traces many beams at once through the same objects.
+    Instead of stepping every beam separately, intersections of all beams with all objects
+    are found in closed form by one vectorized computation per bounce, and geometry of the objects
+    is prepared once for all beams. Beams of one SpectralBeam share everything except refraction coefficients.
+    Reflections and refractions themselves are done by LightBeam, so paths end the same way,
+    as in LightBeam.propogate_until, but keep only points of bounces.
+    """
+
+    def __init__(self, objects: list[Any]) -> None:
+        lines = [object_ for object_ in objects if isinstance(object_, Line)]
+        self.lines = lines
+        self._line_coefficients = np.array([line.coefficients for line in lines], np.float64).reshape(-1, 3)
+
+        self.segments = [object_ for object_ in objects if isinstance(object_, LineSegment)]
+        endpoints = np.array([[segment.endpoints[0].x, segment.endpoints[0].y,
+                               segment.endpoints[1].x, segment.endpoints[1].y] for segment in self.segments],
+                             np.float64).reshape(-1, 4)
+        self._segment_starts = endpoints[:, :2]
+        self._segment_vectors = endpoints[:, 2:] - endpoints[:, :2]
+
+        self.circles = [object_ for object_ in objects if isinstance(object_, Cirlce)]
+        self._circles = np.array([[circle.centre.x, circle.centre.y, circle.radius] for circle in self.circles],
+                                 np.float64).reshape(-1, 3)
+
+        self.arcs = [object_ for object_ in objects if isinstance(object_, Arc)]
+        self._arcs = np.array([[arc.centre.x, arc.centre.y, arc.radius, arc.start_angle, arc.angular_size]
+                               for arc in self.arcs], np.float64).reshape(-1, 5)
+
+        self.conics = [object_ for object_ in objects if isinstance(object_, Conic)]
+
+        # Objects, that find hits themselves, like scene graphs
+        self.ray_queried_objects = [object_ for object_ in objects if hasattr(object_, 'get_ray_hit')]
+
+        # Indexes of lines and segments of detectors, hits on which are recorded for all beams at once
+        detector_lines = [(i, line) for i, line in enumerate(self.lines + [segment.reconstruct_line() for segment in self.segments])
+                          if isinstance(line, DetectorLine)]
+        self._detector_indexes = np.array([i for i, _ in detector_lines], np.int64)
+        self._detector_lines = dict(detector_lines)
+
+    def get_hits(self, xs: np.ndarray, ys: np.ndarray,
+                 dxs: np.ndarray, dys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns distances along rays with given starts and unit directions to the closest objects
+        and indexes of these objects in lines + segments + circles + arcs + conics + ray queried objects order (-1 and inf, if ray hits nothing).
+        """
+        xs, ys, dxs, dys = (array[:, np.newaxis] for array in (xs, ys, dxs, dys))
+        distances = []
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a, b, c = self._line_coefficients.T
+            distances.append(-(a*xs + b*ys + c) / (a*dxs + b*dys))
+
+            # Ray p + t*d crosses segment s + u*v, where t and u are found by cross products
+            start_xs, start_ys = self._segment_starts.T
+            vector_xs, vector_ys = self._segment_vectors.T
+            denominators = dxs*vector_ys - dys*vector_xs
+            offset_xs, offset_ys = start_xs - xs, start_ys - ys
+            segment_distances = (offset_xs*vector_ys - offset_ys*vector_xs) / denominators
+            parameters = (offset_xs*dys - offset_ys*dxs) / denominators
+            distances.append(np.where((parameters >= 0) & (parameters <= 1), segment_distances, np.nan))
+
+            # Ray crosses circle at t = -k +- sqrt(k^2 - q), the closest root in front of the ray is taken
+            near_roots, far_roots = self._get_circle_roots(xs, ys, dxs, dys, self._circles)
+            distances.append(np.where(near_roots > _MIN_HIT_DISTANCE, near_roots, far_roots))
+
+            # Roots for arcs are taken only, if they lie on the arc
+            arc_roots = []
+            centre_xs, centre_ys, _, start_angles, angular_sizes = self._arcs.T
+            for roots in self._get_circle_roots(xs, ys, dxs, dys, self._arcs):
+                angles = np.degrees(np.arctan2(ys + dys*roots - centre_ys, xs + dxs*roots - centre_xs))
+                arc_roots.append(np.where((angles - start_angles) % 360 <= angular_sizes, roots, np.nan))
+            near_roots, far_roots = arc_roots
+            distances.append(np.where(near_roots > _MIN_HIT_DISTANCE, near_roots, far_roots))
+
+            # Every conic solves its quadratic equation for all rays at once in its own coordinate system
+            for conic in self.conics:
+                near_roots, far_roots = conic.get_ray_roots(xs[:, 0], ys[:, 0], dxs[:, 0], dys[:, 0])
+                distances.append(np.where(near_roots > _MIN_HIT_DISTANCE, near_roots, far_roots)[:, np.newaxis])
+
+            for object_ in self.ray_queried_objects:
+                distances.append(object_.get_hits(xs[:, 0], ys[:, 0], dxs[:, 0], dys[:, 0])[0][:, np.newaxis])
+
+        distances = np.concatenate(distances, axis=1)
+        distances = np.where(distances > _MIN_HIT_DISTANCE, distances, np.inf)
+        if distances.shape[1] == 0:
+            return (np.full(xs.shape[0], -1), np.full(xs.shape[0], np.inf))
+        indexes = np.argmin(distances, axis=1)
+        closest_distances = distances[np.arange(distances.shape[0]), indexes]
+        return (np.where(np.isfinite(closest_distances), indexes, -1), closest_distances)
+
+    @staticmethod
+    def _get_circle_roots(xs: np.ndarray, ys: np.ndarray, dxs: np.ndarray, dys: np.ndarray,
+                          circles: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        centre_xs, centre_ys, radiuses = circles.T[:3]
+        offset_xs, offset_ys = xs - centre_xs, ys - centre_ys
+        k = offset_xs*dxs + offset_ys*dys
+        roots = np.sqrt(k*k - (offset_xs*offset_xs + offset_ys*offset_ys - radiuses*radiuses))
+        return (-k - roots, -k + roots)
+
+    def get_hit_line(self, index: int, point: Point) -> Line:
+        """Returns line, that beam hits at the point on the object with given index"""
+        if index < len(self.lines):
+            return self.lines[index]
+        index -= len(self.lines)
+        if index < len(self.segments):
+            return self.segments[index].reconstruct_line()
+        index -= len(self.segments)
+        if index < len(self.circles):
+            return self.circles[index].get_tangent_line(point)
+        index -= len(self.circles)
+        if index < len(self.arcs):
+            return self.arcs[index].get_tangent_line(point)
+        index -= len(self.arcs)
+        if index < len(self.conics):
+            return self.conics[index].get_tangent_line(point)
+        return self.ray_queried_objects[index - len(self.conics)].get_tangent_line(point)
+
+    def trace(self, beams: list[LightBeam], *, on_hit: Optional[Callable[[int], None]] = None,
+              should_continue: Optional[Callable[[int], bool]] = None) -> None:
+        """
+        Fully propogates given beams.
+        After i-th beam reaches an object, on_hit(i) is called before beam is reflected or refracted.
+        Before every propogation of i-th beam should_continue(i) is called, and beam is stopped, if it returns False.
+        """
+        is_active = np.ones(len(beams), bool)
+        while True:
+            for i in np.flatnonzero(is_active).tolist():
+                beam = beams[i]
+                if beam.is_exhausted() or (should_continue is not None and not should_continue(i)):
+                    is_active[i] = False
+            active = np.flatnonzero(is_active).tolist()
+            if not active:
+                return
+            xs = np.array([beams[i].coordinates[-1].x for i in active], np.float64)
+            ys = np.array([beams[i].coordinates[-1].y for i in active], np.float64)
+            dxs = np.array([beams[i].direction.x for i in active], np.float64)
+            dys = np.array([beams[i].direction.y for i in active], np.float64)
+            indexes, distances = self.get_hits(xs, ys, dxs, dys)
+            if self._detector_indexes.size:
+                self.record_detector_hits([beams[i] for i in active], xs, ys, dxs, dys, indexes, distances)
+
+            for j, i in enumerate(active):
+                beam = beams[i]
+                if indexes[j] < 0:
+                    is_active[i] = False
+                    continue
+                hit_point = beam.propogate(float(distances[j]))
+                if on_hit is not None:
+                    on_hit(i)
+                line = self.get_hit_line(int(indexes[j]), hit_point)
+                if isinstance(line, RefractionLine):
+                    beam.refract(line)
+                elif isinstance(line, ReflectionLine):
+                    beam.reflect(line)
+                elif isinstance(line, DetectorLine) and not line.detector.absorbing:
+                    beam.pass_through()
+                else:
+                    is_active[i] = False
+
+    def record_detector_hits(self, beams: list[LightBeam], xs: np.ndarray, ys: np.ndarray, dxs: np.ndarray, dys: np.ndarray,
+                             indexes: np.ndarray, distances: np.ndarray) -> None:
+        """Records hits of rays with given starts and directions, that reach lines of detectors, with intensities of beams"""
+        is_detected = np.isin(indexes, self._detector_indexes)
+        if not is_detected.any():
+            return
+        intensities = np.array([beam.relative_intensity for beam in beams], np.float64)
+        for index in np.unique(indexes[is_detected]).tolist():
+            rays = np.flatnonzero(indexes == index)
+            self._detector_lines[index].record_hits(xs[rays] + dxs[rays]*distances[rays], ys[rays] + dys[rays]*distances[rays],
+                                                    dxs[rays], dys[rays], intensities[rays])
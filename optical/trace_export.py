@@ -0,0 +1,251 @@
+"""
+Streaming export of traced beams.
+
+Beams, their path points and interactions with objects are buffered in chunks of rows,
+and every full chunk is written to disk, so memory doesn't grow with number of beams or length of paths.
+Tables are written as NPZ (one array per column), CSV (one file per table) or Parquet (one file per table, needs pyarrow).
+"""
+
+import csv
+import importlib.util
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import Any, Optional
+
+import numpy as np
+
+from optical.light_beam import LightBeam
+
+# Kinds of interactions, which are told by the state of beam before and after the hit:
+# refraction changes refraction coefficient, reflection changes only direction,
+# transmission changes nothing and beam goes on, absorption changes nothing and path ends
+REFLECTION, REFRACTION, TRANSMISSION, ABSORPTION = 0, 1, 2, 3
+
+# Tables of exported traces with their columns and dtypes.
+# Beams are numbered in order, in which they start. Points are numbered along the path of every beam from 0,
+# which is the point, where beam started to be traced. Events refer to the point of the hit by its number,
+# intensities and refraction coefficients of events are taken before and after the interaction.
+# Wavelength of beam without one is nan. Number of bounces is counted only by reflections, like in LightBeam.
+TRACE_SCHEMA: dict[str, tuple[tuple[str, str], ...]] = {
+    'beams': (('beam', 'int64'), ('wavelength', 'float64'), ('origin_x', 'float64'), ('origin_y', 'float64'),
+              ('direction_x', 'float64'), ('direction_y', 'float64'), ('initial_intensity', 'float64'),
+              ('final_intensity', 'float64'), ('number_of_points', 'int64'), ('number_of_bounces', 'int64')),
+    'points': (('beam', 'int64'), ('point', 'int64'), ('x', 'float64'), ('y', 'float64')),
+    'events': (('beam', 'int64'), ('point', 'int64'), ('x', 'float64'), ('y', 'float64'), ('kind', 'int8'),
+               ('intensity', 'float64'), ('refraction_coefficient', 'float64'),
+               ('outgoing_intensity', 'float64'), ('outgoing_refraction_coefficient', 'float64')),
+}
+
+
+def get_trace_formats() -> list[str]:
+    """Returns formats, that traces can be exported to in this environment"""
+    formats = ['npz', 'csv']
+    if importlib.util.find_spec('pyarrow') is not None:
+        formats.append('parquet')
+    return formats
+
+
+class _NpzWriter:
+    def __init__(self, path: str, compress: bool) -> None:
+        """Appends columns to raw files, which are put into NPZ archive as arrays on close"""
+        self.path = path
+        self.compress = compress
+        self._folder = tempfile.mkdtemp(prefix='trace_export_', dir=os.path.dirname(os.path.abspath(path)))
+        self._sizes = {table: 0 for table in TRACE_SCHEMA}
+
+    def _get_column_path(self, table: str, column: str) -> str:
+        return os.path.join(self._folder, f'{table}_{column}.bin')
+
+    def write(self, table: str, columns: dict[str, np.ndarray]) -> None:
+        for column, array in columns.items():
+            with open(self._get_column_path(table, column), 'ab') as column_file:
+                column_file.write(array.tobytes())
+        self._sizes[table] += len(next(iter(columns.values())))
+
+    def close(self) -> None:
+        compression = zipfile.ZIP_DEFLATED if self.compress else zipfile.ZIP_STORED
+        try:
+            with zipfile.ZipFile(self.path, 'w', compression, allowZip64=True) as archive:
+                for table, columns in TRACE_SCHEMA.items():
+                    for column, dtype in columns:
+                        with archive.open(f'{table}_{column}.npy', 'w', force_zip64=True) as array_file:
+                            np.lib.format.write_array_header_1_0(
+                                array_file, {'descr': np.dtype(dtype).str, 'fortran_order': False,
+                                             'shape': (self._sizes[table],)})
+                            if os.path.exists(self._get_column_path(table, column)):
+                                with open(self._get_column_path(table, column), 'rb') as column_file:
+                                    shutil.copyfileobj(column_file, array_file)
+        finally:
+            shutil.rmtree(self._folder)
+
+
+class _CsvWriter:
+    def __init__(self, path: str) -> None:
+        self._files = {table: open(f'{path}.{table}.csv', 'w', newline='') for table in TRACE_SCHEMA}
+        self._writers = {table: csv.writer(table_file) for table, table_file in self._files.items()}
+        for table, columns in TRACE_SCHEMA.items():
+            self._writers[table].writerow([column for column, _ in columns])
+
+    def write(self, table: str, columns: dict[str, np.ndarray]) -> None:
+        self._writers[table].writerows(zip(*(array.tolist() for array in columns.values())))
+
+    def close(self) -> None:
+        for table_file in self._files.values():
+            table_file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path: str) -> None:
+        """Writes every chunk as row group of Parquet file of its table"""
+        # pyarrow is optional, so it is imported only for Parquet export
+        import pyarrow
+        import pyarrow.parquet
+        self._pyarrow = pyarrow
+        self._schemas = {table: pyarrow.schema([(column, pyarrow.from_numpy_dtype(np.dtype(dtype))) for column, dtype in columns])
+                         for table, columns in TRACE_SCHEMA.items()}
+        self._writers = {table: pyarrow.parquet.ParquetWriter(f'{path}.{table}.parquet', schema)
+                         for table, schema in self._schemas.items()}
+
+    def write(self, table: str, columns: dict[str, np.ndarray]) -> None:
+        self._writers[table].write_table(self._pyarrow.table(columns, schema=self._schemas[table]))
+
+    def close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+
+
+class _BeamTrack:
+    def __init__(self, beam_id: int, beam: LightBeam) -> None:
+        """State of export of beam, that is being traced"""
+        self.beam_id = beam_id
+        self.last_point = beam.coordinates[-1]
+        self.origin = (self.last_point.x, self.last_point.y)
+        self.number_of_points = 1
+        self.initial_intensity = beam.relative_intensity
+        self.direction = (beam.direction.x, beam.direction.y)
+        # Hit, which outcome is known only after the interaction: row of event and direction before it
+        self.pending_event: Optional[list[Any]] = None
+        self.pending_direction: tuple[float, float] = self.direction
+
+
+class TraceExporter:
+    """
+    Writes beams, their paths and interactions (see TRACE_SCHEMA) into files in chunks of rows while beams are traced.
+    Tracer calls start_beam before the beam is propogated, record_propogation after every propogation,
+    before the beam is reflected or refracted, and finish_beam once beam is traced.
+    Points are taken from coordinates of beams, so beams, that forget their path (like beams of radiance buffer),
+    are exported fully, as long as they keep the last hit point until the next propogation.
+    """
+
+    def __init__(self, path: str, format: str = 'npz', *, chunk_size: int = 65536, compress: bool = False) -> None:
+        """
+        NPZ is written to given path, CSV and Parquet tables to files path.beams.csv, path.points.csv and so on.
+        Chunk size is number of rows of every table, which are kept in memory before they are written.
+        If compress is True, NPZ arrays are compressed by zlib.
+        """
+        if format not in ('npz', 'csv', 'parquet'):
+            raise ValueError(f'Format must be "npz", "csv" or "parquet", but {format!r} was given')
+        if format not in get_trace_formats():
+            raise ValueError(f'Export to {format} needs pyarrow, which is not installed')
+        if chunk_size < 1:
+            raise ValueError(f'Chunk size must be positive, but {chunk_size} was given')
+        self.path = path
+        self.format = format
+        self.chunk_size = chunk_size
+        if format == 'npz':
+            self._writer = _NpzWriter(path, compress)
+        elif format == 'csv':
+            self._writer = _CsvWriter(path)
+        else:
+            self._writer = _ParquetWriter(path)
+        self._rows: dict[str, list[tuple]] = {table: [] for table in TRACE_SCHEMA}
+        self._tracks: dict[int, _BeamTrack] = {}
+        self.number_of_beams = 0
+        self.is_closed = False
+
+    def __enter__(self) -> 'TraceExporter':
+        return self
+
+    def __exit__(self, *exception_info: Any) -> None:
+        self.close()
+
+    def start_beam(self, beam: LightBeam) -> int:
+        """Starts export of beam from its last point and returns its number"""
+        if self.is_closed:
+            raise ValueError('Beams can not be exported after exporter is closed')
+        beam_id = self.number_of_beams
+        self.number_of_beams += 1
+        self._tracks[beam_id] = _BeamTrack(beam_id, beam)
+        start = beam.coordinates[-1]
+        self._add_row('points', (beam_id, 0, start.x, start.y))
+        return beam_id
+
+    def record_propogation(self, beam_id: int, beam: LightBeam, is_hit: bool) -> None:
+        """Records points, that beam passed since the last call, and the hit at its last point, if beam hit an object"""
+        track = self._tracks[beam_id]
+        self._resolve_pending_event(track, beam, is_continued=True)
+        coordinates = beam.coordinates
+        # New points follow the last recorded one, which beam keeps, even if it forgets the points before it
+        first_point = len(coordinates) - 1
+        while first_point >= 0 and coordinates[first_point] is not track.last_point:
+            first_point -= 1
+        for point in coordinates[first_point + 1:]:
+            self._add_row('points', (beam_id, track.number_of_points, point.x, point.y))
+            track.number_of_points += 1
+        track.last_point = coordinates[-1]
+        if is_hit:
+            track.pending_event = [beam_id, track.number_of_points - 1, track.last_point.x, track.last_point.y,
+                                   beam.relative_intensity, beam.refracion_coefficient]
+            track.pending_direction = (beam.direction.x, beam.direction.y)
+
+    def finish_beam(self, beam_id: int, beam: LightBeam) -> None:
+        """Records the last interaction and the beam itself"""
+        track = self._tracks.pop(beam_id)
+        self._resolve_pending_event(track, beam, is_continued=False)
+        self._add_row('beams', (beam_id, np.nan if beam.wavelength is None else beam.wavelength, *track.origin,
+                                *track.direction, track.initial_intensity, beam.relative_intensity,
+                                track.number_of_points, beam._number_of_bounces))
+
+    def _resolve_pending_event(self, track: _BeamTrack, beam: LightBeam, is_continued: bool) -> None:
+        """Finds kind of the last hit by state of the beam after it"""
+        if track.pending_event is None:
+            return
+        _, _, _, _, intensity, refraction_coefficient = track.pending_event
+        if beam.refracion_coefficient != refraction_coefficient:
+            kind = REFRACTION
+        elif (beam.direction.x, beam.direction.y) != track.pending_direction:
+            kind = REFLECTION
+        elif is_continued:
+            kind = TRANSMISSION
+        else:
+            kind = ABSORPTION
+        beam_id, point, x, y = track.pending_event[:4]
+        self._add_row('events', (beam_id, point, x, y, kind, intensity, refraction_coefficient,
+                                 beam.relative_intensity, beam.refracion_coefficient))
+        track.pending_event = None
+
+    def _add_row(self, table: str, row: tuple) -> None:
+        rows = self._rows[table]
+        rows.append(row)
+        if len(rows) >= self.chunk_size:
+            self._write_rows(table)
+
+    def _write_rows(self, table: str) -> None:
+        rows = self._rows[table]
+        if not rows:
+            return
+        columns = {column: np.array([row[i] for row in rows], dtype)
+                   for i, (column, dtype) in enumerate(TRACE_SCHEMA[table])}
+        self._writer.write(table, columns)
+        self._rows[table] = []
+
+    def close(self) -> None:
+        """Writes the remaining rows and closes files. Beams, that are not finished, are not exported"""
+        if self.is_closed:
+            return
+        for table in TRACE_SCHEMA:
+            self._write_rows(table)
+        self._writer.close()
+        self.is_closed = True
@@ -0,0 +1,265 @@
+from math import atan2, cos, degrees, inf, isinf, radians, sin, sqrt
+from typing import Optional
+
+import numpy as np
+
+from plane.plane2d import DirectionType, Line, Point, Ray, Vector2d
+
+ConicCoefficientsType = tuple[float, float, float, float, float, float]
+# (min x, max x, min y, max y) in conic coordinate system
+ConicBoundsType = tuple[float, float, float, float]
+
+# Roots of ray equations with smaller leading coefficient are found as roots of linear equation
+_LINEAR_EQUATION_TRESHOLD = 1e-12
+
+
+class Conic:
+    def __init__(self, origin: Point, coefficients: ConicCoefficientsType, bounds: ConicBoundsType,
+                 angle_from_ox: float = 0) -> None:
+        """
+        Part of conic section a*x^2 + b*x*y + c*y^2 + d*x + e*y + f = 0, which lies inside of bounds.
+        Coordinates x and y are taken in conic coordinate system: with given origin and Ox turned by angle_from_ox.
+        Bounds are (min x, max x, min y, max y) and must be finite, so that curve can be sampled.
+        Points, where left side of the equation is negative, are inside of conic.
+        """
+        if any(isinf(bound) for bound in bounds):
+            raise ValueError(f'Bounds of conic must be finite, but {bounds} were given')
+        if bounds[0] > bounds[1] or bounds[2] > bounds[3]:
+            raise ValueError(f'Bounds of conic must be (min x, max x, min y, max y), but {bounds} were given')
+        if all(coefficient == 0 for coefficient in coefficients[:3]):
+            raise ValueError(f'Conic must have at least one quadratic coefficient, but {coefficients} were given')
+        self.origin = origin
+        self.coefficients = tuple(float(coefficient) for coefficient in coefficients)
+        self.bounds = tuple(float(bound) for bound in bounds)
+        self.angle_from_ox = angle_from_ox
+        self._axis = Vector2d(cos(radians(angle_from_ox)), sin(radians(angle_from_ox)))
+        xs, ys = self.get_samples(1)
+        if xs.size == 0:
+            raise ValueError(f'Conic {self.coefficients} has no points inside of bounds {self.bounds}')
+        # Samples are at most one unit apart, so curve doesn't go further than one unit from their bounding box
+        self.min_x, self.max_x = float(xs.min()) - 1, float(xs.max()) + 1
+        self.min_y, self.max_y = float(ys.min()) - 1, float(ys.max()) + 1
+
+    def get_local_coordinates(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns coordinates of the points in conic coordinate system"""
+        dxs, dys = np.asarray(xs) - self.origin.x, np.asarray(ys) - self.origin.y
+        return (dxs*self._axis.x + dys*self._axis.y, dys*self._axis.x - dxs*self._axis.y)
+
+    def get_global_coordinates(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns coordinates of the points, given in conic coordinate system"""
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        return (self.origin.x + xs*self._axis.x - ys*self._axis.y, self.origin.y + xs*self._axis.y + ys*self._axis.x)
+
+    def get_values(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Returns values of left side of conic equation for points in global coordinates"""
+        a, b, c, d, e, f = self.coefficients
+        xs, ys = self.get_local_coordinates(xs, ys)
+        return a*xs*xs + b*xs*ys + c*ys*ys + d*xs + e*ys + f
+
+    def are_local_points_in_bounds(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        min_x, max_x, min_y, max_y = self.bounds
+        return (xs >= min_x) & (xs <= max_x) & (ys >= min_y) & (ys <= max_y)
+
+    def get_direction_to_point(self, point: Point) -> DirectionType:
+        """Direction relative to the whole conic section, not only to its part in bounds"""
+        value = float(self.get_values(np.array([point.x]), np.array([point.y]))[0])
+        if value == 0:
+            return 's'
+        return 'in' if value < 0 else 'out'
+
+    def get_ray_roots(self, xs: np.ndarray, ys: np.ndarray,
+                      dxs: np.ndarray, dys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns both signed distances along rays with given starts and unit directions to the conic,
+        lesser first, or nan, if there is no intersection inside of bounds.
+        Points of the ray are substituted into conic equation, so distances are roots of quadratic equation.
+        """
+        a, b, c, d, e, f = self.coefficients
+        xs, ys = self.get_local_coordinates(xs, ys)
+        dxs, dys = dxs*self._axis.x + dys*self._axis.y, dys*self._axis.x - dxs*self._axis.y
+        quadratic = a*dxs*dxs + b*dxs*dys + c*dys*dys
+        linear = 2*a*xs*dxs + b*(xs*dys + ys*dxs) + 2*c*ys*dys + d*dxs + e*dys
+        constant = a*xs*xs + b*xs*ys + c*ys*ys + d*xs + e*ys + f
+        with np.errstate(divide='ignore', invalid='ignore'):
+            is_linear = np.abs(quadratic) < _LINEAR_EQUATION_TRESHOLD
+            root = np.sqrt(linear*linear - 4*quadratic*constant)
+            # Numerically stable form of roots of quadratic equation
+            q = -(linear + np.where(linear >= 0, root, -root)) / 2
+            first_roots = np.where(is_linear, -constant / linear, q / quadratic)
+            second_roots = np.where(is_linear, np.nan, constant / q)
+        roots = []
+        for distances in (np.where(is_linear, first_roots, np.minimum(first_roots, second_roots)),
+                          np.where(is_linear, np.nan, np.maximum(first_roots, second_roots))):
+            in_bounds = self.are_local_points_in_bounds(xs + dxs*distances, ys + dys*distances)
+            roots.append(np.where(in_bounds, distances, np.nan))
+        return tuple(roots)
+
+    def get_signed_distances(self, ray: Ray) -> list[float]:
+        """Returns signed distances along the ray from its origin to intersections with the conic, lesser first"""
+        roots = self.get_ray_roots(np.array([ray.origin.x]), np.array([ray.origin.y]),
+                                   np.array([ray.direction.x]), np.array([ray.direction.y]))
+        return [float(root[0]) for root in roots if not np.isnan(root[0])]
+
+    def get_intersection_distance(self, ray: Ray) -> Optional[float]:
+        """Returns distance to the closest intersection ahead of the ray's origin or None"""
+        for distance in self.get_signed_distances(ray):
+            if distance > 0:
+                return distance
+        return None
+
+    def get_normal(self, point: Point) -> Vector2d:
+        """Returns unit normal to the conic at the point, that looks outside of conic"""
+        a, b, c, d, e, _ = self.coefficients
+        x, y = (float(coordinate[0]) for coordinate in self.get_local_coordinates(np.array([point.x]), np.array([point.y])))
+        # Gradient of left side of the equation
+        local_x, local_y = 2*a*x + b*y + d, b*x + 2*c*y + e
+        length = sqrt(local_x*local_x + local_y*local_y)
+        if length == 0:
+            raise ValueError(f'Conic {self} has no normal at singular point {point}')
+        local_x, local_y = local_x / length, local_y / length
+        return Vector2d(local_x*self._axis.x - local_y*self._axis.y, local_x*self._axis.y + local_y*self._axis.x)
+
+    def get_tangent_line(self, point_on_conic: Point) -> Line:
+        distance = self.get_distance_to_point(point_on_conic)
+        if distance > 0.05:
+            raise ValueError(f'''Point must be on conic, but {point_on_conic}
+                              was given with distance {distance} to conic {self}''')
+        normal = self.get_normal(point_on_conic)
+        return Line(point_on_conic, degrees(atan2(normal.x, -normal.y)))
+
+    def get_local_samples(self, step: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns points of the conic inside of bounds in conic coordinate system, found on vertical and horizontal
+        lines with given step between them. Every point of the curve is at most step*sqrt(2) away from a sample.
+        """
+        a, b, c, d, e, f = self.coefficients
+        min_x, max_x, min_y, max_y = self.bounds
+        sample_xs, sample_ys = [], []
+        # On horizontal lines conic equation is quadratic equation of x, on vertical ones - of y
+        ys = np.append(np.arange(min_y, max_y, step), max_y)
+        for roots in self._solve(a, b*ys + d, c*ys*ys + e*ys + f):
+            sample_xs.append(roots)
+            sample_ys.append(ys)
+        xs = np.append(np.arange(min_x, max_x, step), max_x)
+        for roots in self._solve(c, b*xs + e, a*xs*xs + d*xs + f):
+            sample_xs.append(xs)
+            sample_ys.append(roots)
+        xs, ys = np.concatenate(sample_xs), np.concatenate(sample_ys)
+        is_sample = ~np.isnan(xs) & ~np.isnan(ys)
+        xs, ys = xs[is_sample], ys[is_sample]
+        in_bounds = self.are_local_points_in_bounds(xs, ys)
+        return (xs[in_bounds], ys[in_bounds])
+
+    @staticmethod
+    def _solve(quadratic: float, linear: np.ndarray, constant: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns both roots of quadratic equations (nan, if there is no root)"""
+        linear, constant = np.broadcast_arrays(np.asarray(linear, np.float64), np.asarray(constant, np.float64))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if quadratic == 0:
+                return (-constant / linear, np.full(linear.shape, np.nan))
+            root = np.sqrt(linear*linear - 4*quadratic*constant)
+            return ((-linear - root) / (2*quadratic), (-linear + root) / (2*quadratic))
+
+    def get_samples(self, step: float) -> tuple[np.ndarray, np.ndarray]:
+        """Returns samples of get_local_samples in global coordinates"""
+        return self.get_global_coordinates(*self.get_local_samples(step))
+
+    def get_distance_to_point(self, point: Point) -> float:
+        return float(self.get_distances_to_points(np.array([point.x]), np.array([point.y]))[0])
+
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray, step: float = 0.05) -> np.ndarray:
+        """
+        Returns distances from given points to the conic, approximated by distances to samples of the curve
+        with given step. Distances are lowered by the largest error of sampling, so they never exceed actual ones.
+        """
+        xs, ys = np.asarray(xs, np.float64), np.asarray(ys, np.float64)
+        sample_xs, sample_ys = self.get_samples(step)
+        distances = np.full(xs.shape, inf)
+        # Samples are processed in chunks, so memory doesn't grow with product of numbers of points and samples
+        for first_sample in range(0, sample_xs.size, 256):
+            chunk_xs = sample_xs[first_sample:first_sample + 256]
+            chunk_ys = sample_ys[first_sample:first_sample + 256]
+            chunk_distances = np.hypot(xs[..., np.newaxis] - chunk_xs, ys[..., np.newaxis] - chunk_ys).min(axis=-1)
+            np.minimum(distances, chunk_distances, out=distances)
+        return np.maximum(distances - step*sqrt(2), 0)
+
+    def __str__(self) -> str:
+        return f'Conic({self.origin}, {self.coefficients}, {self.bounds}, {self.angle_from_ox})'
+
+
+class Parabola(Conic):
+    def __init__(self, vertex: Point, focal_length: float, aperture: float, angle_from_ox: float = 0) -> None:
+        """
+        Parabola y^2 = 4*focal_length*x, which opens along axis at angle_from_ox,
+        cut by aperture (full width across the axis). Focus lies inside of parabola.
+        """
+        if focal_length <= 0 or aperture <= 0:
+            raise ValueError(f'Focal length and aperture of parabola must be positive, but {focal_length} and {aperture} were given')
+        half_aperture = aperture / 2
+        depth = half_aperture*half_aperture / (4*focal_length)
+        super().__init__(vertex, (0, 0, 1, -4*focal_length, 0, 0), (0, depth, -half_aperture, half_aperture), angle_from_ox)
+        self.focal_length = focal_length
+        self.aperture = aperture
+
+    def get_focus(self) -> Point:
+        return self.origin + self._axis*self.focal_length
+
+
+class Ellipse(Conic):
+    def __init__(self, centre: Point, semi_major_axis: float, semi_minor_axis: float, angle_from_ox: float = 0,
+                 x_range: Optional[tuple[float, float]] = None) -> None:
+        """
+        Ellipse x^2 / semi_major_axis^2 + y^2 / semi_minor_axis^2 = 1, which major axis is turned by angle_from_ox.
+        If x range is given, only part of ellipse with x along major axis in this range is kept
+        (for example, (-semi_major_axis, 0) for a half of ellipse).
+        """
+        if semi_minor_axis <= 0 or semi_major_axis < semi_minor_axis:
+            raise ValueError(f'Ellipse needs semi major axis not less than positive semi minor axis, \
+                               but {semi_major_axis} and {semi_minor_axis} were given')
+        if x_range is None:
+            x_range = (-semi_major_axis, semi_major_axis)
+        super().__init__(centre, (1 / semi_major_axis**2, 0, 1 / semi_minor_axis**2, 0, 0, -1),
+                         (x_range[0], x_range[1], -semi_minor_axis, semi_minor_axis), angle_from_ox)
+        self.semi_major_axis = semi_major_axis
+        self.semi_minor_axis = semi_minor_axis
+
+    def get_foci(self) -> tuple[Point, Point]:
+        focal_distance = sqrt(self.semi_major_axis**2 - self.semi_minor_axis**2)
+        return (self.origin - self._axis*focal_distance, self.origin + self._axis*focal_distance)
+
+    @staticmethod
+    def construct_by_foci(first_focus: Point, second_focus: Point, semi_major_axis: float,
+                          x_range: Optional[tuple[float, float]] = None) -> 'Ellipse':
+        """Returns ellipse with given foci, which major axis goes from the first focus to the second one"""
+        axis = Vector2d.construct_from_two_points(first_focus, second_focus)
+        focal_distance = axis.length() / 2
+        if semi_major_axis <= focal_distance:
+            raise ValueError(f'Semi major axis must be greater than {focal_distance}, but {semi_major_axis} was given')
+        centre = Point((first_focus.x + second_focus.x) / 2, (first_focus.y + second_focus.y) / 2)
+        semi_minor_axis = sqrt(semi_major_axis**2 - focal_distance**2)
+        return Ellipse(centre, semi_major_axis, semi_minor_axis, degrees(atan2(axis.y, axis.x)), x_range)
+
+
+class Hyperbola(Conic):
+    def __init__(self, centre: Point, semi_major_axis: float, semi_minor_axis: float, aperture: float,
+                 angle_from_ox: float = 0) -> None:
+        """
+        Branch of hyperbola x^2 / semi_major_axis^2 - y^2 / semi_minor_axis^2 = 1 with positive x,
+        which transverse axis is turned by angle_from_ox, cut by aperture (full width across the axis).
+        Points between branches are outside of hyperbola, and its inner focus is inside.
+        """
+        if semi_major_axis <= 0 or semi_minor_axis <= 0 or aperture <= 0:
+            raise ValueError(f'Axes and aperture of hyperbola must be positive, \
+                               but {semi_major_axis}, {semi_minor_axis} and {aperture} were given')
+        half_aperture = aperture / 2
+        max_x = semi_major_axis * sqrt(1 + half_aperture*half_aperture / semi_minor_axis**2)
+        super().__init__(centre, (-1 / semi_major_axis**2, 0, 1 / semi_minor_axis**2, 0, 0, 1),
+                         (semi_major_axis, max_x, -half_aperture, half_aperture), angle_from_ox)
+        self.semi_major_axis = semi_major_axis
+        self.semi_minor_axis = semi_minor_axis
+        self.aperture = aperture
+
+    def get_foci(self) -> tuple[Point, Point]:
+        """Returns focus inside of the branch and the other focus"""
+        focal_distance = sqrt(self.semi_major_axis**2 + self.semi_minor_axis**2)
+        return (self.origin + self._axis*focal_distance, self.origin - self._axis*focal_distance)
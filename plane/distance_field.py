@@ -0,0 +1,39 @@
+from math import ceil, hypot
+from typing import Any
+
+import numpy as np
+
+from plane.plane2d import Point
+
+
+class DistanceField:
+    """
+    Distance to the closest of given objects, sampled on a regular grid with given cell size.
+    Objects without vectorized get_distances_to_points are sampled by get_distance_to_point.
+    """
+
+    def __init__(self, objects: list[Any], width: float, height: float, cell_size: float = 4) -> None:
+        if cell_size <= 0:
+            raise ValueError(f'Cell size must be positive, but {cell_size} was given')
+        self.cell_size = cell_size
+        self.number_of_columns = ceil(width / cell_size) + 1
+        self.number_of_rows = ceil(height / cell_size) + 1
+        xs, ys = np.meshgrid(np.arange(self.number_of_columns) * cell_size, np.arange(self.number_of_rows) * cell_size)
+        self.distances = np.full(xs.shape, np.inf)
+        for object_ in objects:
+            if hasattr(object_, 'get_distances_to_points'):
+                distances = object_.get_distances_to_points(xs, ys)
+            else:
+                distances = np.array([object_.get_distance_to_point(Point(x, y))
+                                      for x, y in zip(xs.ravel().tolist(), ys.ravel().tolist())]).reshape(xs.shape)
+            np.minimum(self.distances, distances, out=self.distances)
+
+    def get_clearance(self, point: Point) -> float:
+        """
+        Returns lower bound of distance from the point to the closest object.
+        Distance changes not faster than the point moves, so value in the nearest grid node
+        minus distance to that node is never greater than the actual distance.
+        """
+        column = min(max(round(point.x / self.cell_size), 0), self.number_of_columns - 1)
+        row = min(max(round(point.y / self.cell_size), 0), self.number_of_rows - 1)
+        return float(self.distances[row, column]) - hypot(point.x - column*self.cell_size, point.y - row*self.cell_size)
@@ -1,5 +1,5 @@
-from typing import Any, Literal, Union
-from math import radians, degrees, sqrt, tan, atan, fabs, cos, sin, inf
+from typing import Any, Literal, Optional, Union
+from math import radians, degrees, sqrt, tan, atan, atan2, fabs, cos, sin, inf
 
 import numpy as np
 
@@ -68,12 +68,12 @@ class Vector2d:
         return hash(self.__str__())
 
     def __add__(self, other: Union['Vector2d', Point]) -> 'Vector2d':
-        if not isinstance(other, Point) or not isinstance(other, Vector2d):
+        if not isinstance(other, Point) and not isinstance(other, Vector2d):
             return NotImplemented
         return Vector2d(self.x + other.x, self.y + other.y)
 
     def __sub__(self, other: Union['Vector2d', Point]) -> 'Vector2d':
-        if not isinstance(other, Point) or not isinstance(other, Vector2d):
+        if not isinstance(other, Point) and not isinstance(other, Vector2d):
             return NotImplemented
         return Vector2d(self.x - other.x, self.y - other.y)
 
@@ -127,13 +127,7 @@ class Line:
         if angle is None and angle_coefficient is None:
             raise ValueError('Neither angle or coefficient was not given')
         if angle_coefficient is None:
-            self.angle = angle
-            while self.angle < -180 or self.angle > 180:
-                if self.angle < -180:
-                    self.angle += 360
-                else:
-                    self.angle -= 360
-            if self.angle != 90 and self.angle != -90:
+            if angle % 180 != 90:
                 self.angle_coefficient = tan(radians(angle))
                 self.angle = degrees(atan(self.angle_coefficient))
             else:
@@ -151,8 +145,13 @@ class Line:
             self.sample_coordinates = self.as_point()
         if self.angle_coefficient != inf:
             self.oy_segment = sample_coordinates.y - self.angle_coefficient*sample_coordinates.x
+            normal_length = sqrt(self.angle_coefficient*self.angle_coefficient + 1)
+            a, b = -self.angle_coefficient / normal_length, 1 / normal_length
         else:
             self.oy_segment = None
+            a, b = -1, 0
+        # Normalized coefficients of a*x + b*y + c = 0 equation. Normal (a, b) looks to the left-or-up side
+        self.coefficients = (a, b, -(a*sample_coordinates.x + b*sample_coordinates.y))
 
     def get_y_coordinate(self, x: float) -> Union[float, None]:
         """
@@ -165,28 +164,34 @@ class Line:
         else:
             return x if x == self.sample_coordinates.x else None
 
+    def get_normal(self) -> Vector2d:
+        """Returns unit normal, that looks to the left-or-up side of the line"""
+        return Vector2d(self.coefficients[0], self.coefficients[1])
+
+    def get_direction_vector(self) -> Vector2d:
+        """Returns unit vector along the line, that looks to the right (or up for vertical line)"""
+        return Vector2d(self.coefficients[1], -self.coefficients[0])
+
+    def get_signed_distance_to_point(self, point: Union[Point, Vector2d]) -> float:
+        """Distance is positive for points on the left-or-up side of the line"""
+        a, b, c = self.coefficients
+        return a*point.x + b*point.y + c
+
     def get_direction_to_point(self, point: Union[Point, Vector2d]) -> DirectionType:
-        if self.angle == 90:
-            if point.x == self.sample_coordinates.x:
-                return 's'
-            if point.x < self.sample_coordinates.x:
-                return 'lou'
-            return 'rod'
-        line_y = self.get_y_coordinate(point.x)
-        if line_y == point.y:
+        signed_distance = self.get_signed_distance_to_point(point)
+        if signed_distance == 0:
             return 's'
-        if line_y < point.y and self.angle >= 0:
-            return 'lou' #left-or-up
-        elif line_y > point.y and self.angle >= 0:
-            return 'rod' #right-or-down
-        elif line_y < point.y:
-            return 'rou' #right-or-up
-        return 'lod' #left-or-down
+        if self.angle >= 0:
+            return 'lou' if signed_distance > 0 else 'rod' #left-or-up; right-or-down
+        return 'rou' if signed_distance > 0 else 'lod' #right-or-up; left-or-down
 
     def get_distance_to_point(self, point: Point) -> float:
-        if self.angle_coefficient != inf:
-            return fabs(self.angle_coefficient*point.x - point.y + self.oy_segment) / sqrt(self.angle_coefficient**2 + 1)
-        return fabs(point.x - self.sample_coordinates.x)
+        return fabs(self.get_signed_distance_to_point(point))
+
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized version of get_distance_to_point for arrays of coordinates"""
+        a, b, c = self.coefficients
+        return np.abs(a*np.asarray(xs) + b*np.asarray(ys) + c)
 
     def get_intersection_point(self, line: Union['Line', 'LineSegment']) -> Union[Point, None]:
         return Line.get_intersection_point(line, self)
@@ -196,24 +201,15 @@ class Line:
 
     @staticmethod
     def angle_between(first_line: Union['Line', 'LineSegment'], second_line: Union['Line', 'LineSegment']) -> float:
-        if isinstance(first_line, Line):
-            a1 = first_line.angle
-        elif isinstance(first_line, LineSegment):
-            a1 = first_line.reconstruct_line().angle
-
-        if isinstance(second_line, Line):
-            a2 = second_line.angle
-        elif isinstance(second_line, LineSegment):
-            a2 = second_line.reconstruct_line().angle
-
-        if a1 == a2:
-            return 0
-        if (a1 > 0 and a2 > 0) or (a1 < 0 and a2 < 0):
-            angle = fabs(a1 - a2)
-        else:    
-            angle = fabs(a1) + fabs(a2)
-        return angle if angle <= 90 else 180 - angle
-        
+        """Returns acute angle between lines in degrees"""
+        if isinstance(first_line, LineSegment):
+            first_line = first_line.reconstruct_line()
+        if isinstance(second_line, LineSegment):
+            second_line = second_line.reconstruct_line()
+        first_normal = first_line.get_normal()
+        second_normal = second_line.get_normal()
+        return degrees(atan2(fabs(first_normal @ second_normal), fabs(first_normal * second_normal)))
+
     @staticmethod
     def perpendicular_line(line: Union['Line', 'LineSegment'], point_from: Point = None) -> 'Line':
         if point_from is None:
@@ -323,18 +319,126 @@ class LineSegment:
         return min(point.get_distance_to_point(self.endpoints[0]), 
                     point.get_distance_to_point(self.endpoints[1]))
 
-#TODO:
-"""class Ray:
-    def __init__(self, origin: Point, angle: float):
-        self.related_line = Line(origin, angle)
-        self.angle = angle
-        while not (-180 < self.angle <= 180):
-            if self.angle > 180:
-                self.angle -= 360
-            else:
-                self.angle += 360
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized version of get_distance_to_point for arrays of coordinates"""
+        first_endpoint, second_endpoint = self.endpoints
+        dx, dy = second_endpoint.x - first_endpoint.x, second_endpoint.y - first_endpoint.y
+        relative_xs, relative_ys = np.asarray(xs) - first_endpoint.x, np.asarray(ys) - first_endpoint.y
+        projections = np.clip((relative_xs*dx + relative_ys*dy) / (dx*dx + dy*dy), 0, 1)
+        return np.hypot(relative_xs - projections*dx, relative_ys - projections*dy)
 
-    def get_intersection_point(self, )"""
+    def get_projection_parameter(self, point: Point) -> float:
+        """
+        Returns parameter of projection of the point onto the line segment:
+        0 for first endpoint, 1 for second one.
+        """
+        first_endpoint, second_endpoint = self.endpoints
+        dx, dy = second_endpoint.x - first_endpoint.x, second_endpoint.y - first_endpoint.y
+        return ((point.x - first_endpoint.x)*dx + (point.y - first_endpoint.y)*dy) / (dx*dx + dy*dy)
+
+
+class Ray:
+    def __init__(self, origin: Point, direction: Vector2d) -> None:
+        """Constructs a ray from origin along direction, which is normalized to unit vector"""
+        length = direction.length()
+        if length == 0:
+            raise ValueError('Direction of a ray must be non-zero vector')
+        self.origin = origin
+        self.direction = Vector2d(direction.x / length, direction.y / length)
+
+    def __repr__(self) -> str:
+        return f'Ray({self.origin}, {self.direction})'
+
+    @staticmethod
+    def construct_from_angle(origin: Point, angle: float) -> 'Ray':
+        """Angle must be in degrees"""
+        return Ray(origin, Vector2d.construct_from_length(1, angle))
+
+    @property
+    def angle(self) -> float:
+        """Angle between ray and Ox in degrees, in [-180; 180]"""
+        return degrees(atan2(self.direction.y, self.direction.x))
+
+    def get_point(self, distance: float) -> Point:
+        return Point(self.origin.x + self.direction.x*distance, self.origin.y + self.direction.y*distance)
+
+    def get_signed_distance_to_line(self, line: Union[Line, LineSegment]) -> Optional[float]:
+        """
+        Returns signed distance along the ray from origin to intersection with the line
+        (or with related line of line segment). If ray is parallel to the line, None will be returned.
+        """
+        if isinstance(line, LineSegment):
+            line = line.reconstruct_line()
+        a, b, c = line.coefficients
+        projection = a*self.direction.x + b*self.direction.y
+        if projection == 0:
+            return None
+        return -(a*self.origin.x + b*self.origin.y + c) / projection
+
+    def get_signed_distances_to_circle(self, circle: 'Cirlce') -> Optional[tuple[float, float]]:
+        """
+        Returns both signed distances along the ray from origin to circumference, lesser first.
+        If ray's line doesn't intersect circle, None will be returned.
+        """
+        dx, dy = self.origin.x - circle.centre.x, self.origin.y - circle.centre.y
+        half_b = dx*self.direction.x + dy*self.direction.y
+        discriminant = half_b*half_b - (dx*dx + dy*dy - circle.radius*circle.radius)
+        if discriminant < 0:
+            return None
+        root = sqrt(discriminant)
+        return (-half_b - root, -half_b + root)
+
+    def get_intersection_distance(self, obj: Union[Line, LineSegment, 'Cirlce', Any]) -> Optional[float]:
+        """
+        Returns distance from origin to the closest intersection with line, line segment or circle,
+        that lies ahead of origin. If there is no such intersection, None will be returned.
+        Other objects (like arcs) must find intersection themselves by get_intersection_distance(ray).
+        """
+        if not isinstance(obj, (Line, LineSegment, Cirlce)):
+            return obj.get_intersection_distance(self)
+        if isinstance(obj, Cirlce):
+            distances = self.get_signed_distances_to_circle(obj)
+            if distances is None:
+                return None
+            for distance in distances:
+                if distance > 0:
+                    return distance
+            return None
+        distance = self.get_signed_distance_to_line(obj)
+        if distance is None or distance <= 0:
+            return None
+        if isinstance(obj, LineSegment) and not (0 <= obj.get_projection_parameter(self.get_point(distance)) <= 1):
+            return None
+        return distance
+
+    def get_intersection_point(self, obj: Union[Line, LineSegment, 'Cirlce', Any]) -> Optional[Point]:
+        distance = self.get_intersection_distance(obj)
+        return self.get_point(distance) if distance is not None else None
+
+    def get_falling_cosine(self, line: Line) -> float:
+        """Returns cosine of angle between the ray and normal to the line"""
+        a, b, _ = line.coefficients
+        return fabs(a*self.direction.x + b*self.direction.y)
+
+    def get_reflected_direction(self, line: Line) -> Vector2d:
+        a, b, _ = line.coefficients
+        projection = 2*(a*self.direction.x + b*self.direction.y)
+        return Vector2d(self.direction.x - projection*a, self.direction.y - projection*b)
+
+    def get_refracted_direction(self, line: Line, current_refraction_coefficient: float,
+                                new_refraction_coefficient: float) -> Optional[Vector2d]:
+        """Returns direction after refraction by Snell's law or None on total internal reflection"""
+        a, b, _ = line.coefficients
+        cosine = -(a*self.direction.x + b*self.direction.y)
+        if cosine < 0:
+            # Normal must look against the ray
+            a, b, cosine = -a, -b, -cosine
+        ratio = current_refraction_coefficient / new_refraction_coefficient
+        squared_refracted_cosine = 1 - ratio*ratio*(1 - cosine*cosine)
+        if squared_refracted_cosine < 0:
+            return None
+        factor = ratio*cosine - sqrt(squared_refracted_cosine)
+        return Vector2d(ratio*self.direction.x + factor*a, ratio*self.direction.y + factor*b)
 
 
 class Polygon:
@@ -358,6 +462,16 @@ class Polygon:
         self.min_x = min([point.x for point in vertexes])
         self.number_of_edges = len(self.edges)
         self.number_of_vertexes = len(vertexes)
+        # Edges arrays for are_points_inside. Edges, parallel to Ox, never cross a horizontal ray, so they are skipped
+        vertexes_x = np.array([point.x for point in vertexes], np.float64)
+        vertexes_y = np.array([point.y for point in vertexes], np.float64)
+        previous_x, previous_y = np.roll(vertexes_x, 1), np.roll(vertexes_y, 1)
+        is_crossable = vertexes_y != previous_y
+        self._edges_x = vertexes_x[is_crossable]
+        self._edges_y = vertexes_y[is_crossable]
+        self._edges_previous_y = previous_y[is_crossable]
+        self._edges_dx = (previous_x - vertexes_x)[is_crossable]
+        self._edges_dy = (previous_y - vertexes_y)[is_crossable]
 
     def is_point_inside(self, point: Point) -> bool:
         if not (self.min_y <= point.y <= self.max_y) or not (self.min_x <= point.x <= self.max_x):
@@ -373,6 +487,23 @@ class Polygon:
             j = i
         return is_inside
 
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Returns distances from given points to the closest edge"""
+        return np.minimum.reduce([edge.get_distances_to_points(xs, ys) for edge in self.edges])
+
+    def are_points_inside(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized version of is_point_inside: returns boolean array for arrays of coordinates"""
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        is_inside = np.zeros(np.broadcast(xs, ys).shape, bool)
+        in_bounds = (self.min_y <= ys) & (ys <= self.max_y) & (self.min_x <= xs) & (xs <= self.max_x)
+        xs, ys = np.broadcast_to(xs, is_inside.shape)[in_bounds], np.broadcast_to(ys, is_inside.shape)[in_bounds]
+        crossings = np.zeros(xs.shape, bool)
+        for x, y, previous_y, dx, dy in zip(self._edges_x, self._edges_y, self._edges_previous_y,
+                                            self._edges_dx, self._edges_dy):
+            crossings ^= ((y > ys) != (previous_y > ys)) & (xs < dx * (ys - y) / dy + x)
+        is_inside[in_bounds] = crossings
+        return is_inside
+
 
 class Cirlce:
     def __init__(self, centre: Point, radius: float) -> None:
@@ -382,6 +513,14 @@ class Cirlce:
     def signed_distance_to_circle_from_point(self, point: Point) -> float:
         return sqrt((self.centre.x - point.x)**2 + (self.centre.y - point.y)**2) - self.radius
 
+    def get_distance_to_point(self, point: Point) -> float:
+        """Returns distance from the point to circumference"""
+        return fabs(self.signed_distance_to_circle_from_point(point))
+
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized version of get_distance_to_point for arrays of coordinates"""
+        return np.abs(np.hypot(np.asarray(xs) - self.centre.x, np.asarray(ys) - self.centre.y) - self.radius)
+
     def check_intersection(self, line: Union[Line, LineSegment]) -> bool:
         distance = line.get_distance_to_point(self.centre)
         if distance > self.radius:
@@ -431,6 +570,10 @@ class Cirlce:
             return True
         return False
 
+    def are_points_inside(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized version of is_point_inside: returns boolean array for arrays of coordinates"""
+        return np.sqrt((self.centre.x - np.asarray(xs))**2 + (self.centre.y - np.asarray(ys))**2) <= self.radius
+
     def get_direction_to_point(self, point: Point) -> DirectionType:
         distance = self.centre.get_distance_to_point(point)
         if distance > self.radius:
@@ -447,20 +590,17 @@ class Plane:
     ORIGIN = Point(0, 0)
 
     def __init__(self, width: int, height: int = None) -> None:
-        """Pass only width to get a square plane"""
-        self._plane = []
-        if height is not None:
-            for _ in range(height):
-                self._plane.append([0]*width)
-        else:
-            for _ in range(width):
-                self._plane.append([0]*width)
-        self._plane = np.array(self._plane, int)
+        """
+        Pass only width to get a square plane.
+        Values are kept in the smallest unsigned integer type, that fits them,
+        and the buffer is widened, when greater value is set.
+        """
         self.width = width
         if height is not None:
             self.height = height
         else:
             self.height = width
+        self._plane = np.zeros((self.height, self.width), np.uint8)
         self.borders = {
             'left': Line(self.ORIGIN, 90),
             'bottom': Line(self.ORIGIN, 0),
@@ -468,6 +608,7 @@ class Plane:
             'right': Line(Point(self.width, self.height), 90),
         }
         self.objects_on_plane: list[Line, LineSegment] = []
+        self._spatial_index = None
 
     def size(self) -> tuple[int, int]:
         """Returns size of the plane"""
@@ -476,12 +617,37 @@ class Plane:
     def get_point(self, coordinates: Point) -> int:
         if coordinates.x >= self.width or coordinates.y >= self.height or coordinates.x < 0 or coordinates.y < 0:
             return None
-        return self._plane[coordinates.y][coordinates.x]
+        return int(self._plane[coordinates.y][coordinates.x])
 
     def set_point(self, coordinates: Point, value: int) -> None:
         if coordinates.x >= self.width or coordinates.y >= self.height or coordinates.x < 0 or coordinates.y < 0:
             return None
-        self._plane[coordinates.y][coordinates.x] = value
+        self.set_points(np.array([coordinates.x]), np.array([coordinates.y]), value)
+
+    def set_points(self, xs: np.ndarray, ys: np.ndarray, value: int) -> None:
+        """Vectorized version of set_point for arrays of coordinates inside the plane"""
+        self.reserve_value(value)
+        self._plane[ys, xs] = value
+
+    def reserve_value(self, value: int) -> None:
+        """Widens the buffer, if value doesn't fit into it"""
+        if value < 0:
+            raise ValueError(f'Values on plane must be non-negative, but {value} was given')
+        if value > np.iinfo(self._plane.dtype).max:
+            self._plane = self._plane.astype(np.min_scalar_type(value))
+
+    def get_id_buffer(self) -> np.ndarray:
+        """Returns underlying buffer of values, indexed by [y][x]"""
+        return self._plane
+
+    def reset(self) -> None:
+        """Clears values and objects on plane, keeping the buffer, unless it was widened"""
+        if self._plane.dtype == np.uint8:
+            self._plane.fill(0)
+        else:
+            self._plane = np.zeros((self.height, self.width), np.uint8)
+        self.objects_on_plane = []
+        self._spatial_index = None
 
     def borders_as_list(self) -> list[Line]:
         return [self.borders[key] for key in self.borders]
@@ -489,11 +655,13 @@ class Plane:
     def append_object(self, object_to_append: Any):
         self.objects_on_plane.append(object_to_append)
 
+    def get_spatial_index(self) -> Any:
+        """Returns spatial index of objects on plane, which is rebuilt once objects change"""
+        # plane.spatial_index depends on this module, so it is imported only when needed
+        from plane.spatial_index import SpatialIndex
+        if self._spatial_index is None or self._spatial_index.objects != self.objects_on_plane:
+            self._spatial_index = SpatialIndex(self.objects_on_plane)
+        return self._spatial_index
+
     def get_closest_object(self, point: Point) -> Any:
-        closest = None
-        min_distance = inf
-        for obj in self.objects_on_plane:
-            distance = obj.get_distance_to_point(point)
-            if distance < min_distance:
-                closest = obj
-        return closest
\ No newline at end of file
+        return self.get_spatial_index().get_closest_object(point)
\ No newline at end of file
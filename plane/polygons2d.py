@@ -1,8 +1,238 @@
-from math import acos, degrees, radians, cos, sin, tan
+from math import acos, asin, degrees, fabs, inf, isinf, radians, cos, sin, sqrt, tan
+from typing import Optional, Union
 
-from plane.plane2d import Polygon, Point, Vector2d
+import numpy as np
 
-# TODO: implement arcs
+from plane.plane2d import DirectionType, Line, LineSegment, Polygon, Point, Ray, Vector2d
+
+
+class Arc:
+    def __init__(self, centre: Point, radius: float, start_angle: float, end_angle: float) -> None:
+        """
+        Arc of circumference with given centre and radius, that goes counter-clockwise
+        from start angle to end angle. Angles are in degrees from Ox.
+        """
+        if radius <= 0:
+            raise ValueError(f'Radius of an arc must be positive, but {radius} was given')
+        angular_size = (end_angle - start_angle) % 360
+        if angular_size == 0:
+            raise ValueError(f'Arc from {start_angle} to {end_angle} degrees has zero angular size, use Cirlce for full circumference')
+        self.centre = centre
+        self.radius = radius
+        self.start_angle = start_angle % 360
+        self.angular_size = angular_size
+        self.end_angle = self.start_angle + angular_size
+        self.endpoints = [centre + Vector2d.construct_from_length(radius, self.start_angle),
+                          centre + Vector2d.construct_from_length(radius, self.end_angle)]
+        # Bounding box includes endpoints and extreme points of circumference, that lie on the arc
+        extreme_points = [centre + Vector2d.construct_from_length(radius, angle)
+                          for angle in (0, 90, 180, 270) if self.is_angle_on_arc(angle)]
+        xs = [point.x for point in self.endpoints + extreme_points]
+        ys = [point.y for point in self.endpoints + extreme_points]
+        self.min_x, self.max_x = min(xs), max(xs)
+        self.min_y, self.max_y = min(ys), max(ys)
+
+    def is_angle_on_arc(self, angle: float) -> bool:
+        return (angle - self.start_angle) % 360 <= self.angular_size
+
+    def are_angles_on_arc(self, angles: np.ndarray) -> np.ndarray:
+        """Vectorized version of is_angle_on_arc for array of angles in degrees"""
+        return (np.asarray(angles) - self.start_angle) % 360 <= self.angular_size
+
+    def is_point_in_sector(self, point: Point) -> bool:
+        """Checks if the point lies in the angle of the arc (at any distance from centre)"""
+        return self.is_angle_on_arc(degrees(np.arctan2(point.y - self.centre.y, point.x - self.centre.x)))
+
+    def are_points_in_sector(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized version of is_point_in_sector"""
+        return self.are_angles_on_arc(np.degrees(np.arctan2(np.asarray(ys) - self.centre.y, np.asarray(xs) - self.centre.x)))
+
+    def get_distance_to_point(self, point: Point) -> float:
+        if self.is_point_in_sector(point):
+            return fabs(self.centre.get_distance_to_point(point) - self.radius)
+        return min(endpoint.get_distance_to_point(point) for endpoint in self.endpoints)
+
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Vectorized version of get_distance_to_point for arrays of coordinates"""
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        distances_to_circumference = np.abs(np.hypot(xs - self.centre.x, ys - self.centre.y) - self.radius)
+        distances_to_endpoints = np.minimum(*[np.hypot(xs - endpoint.x, ys - endpoint.y) for endpoint in self.endpoints])
+        return np.where(self.are_points_in_sector(xs, ys), distances_to_circumference, distances_to_endpoints)
+
+    def get_direction_to_point(self, point: Point) -> DirectionType:
+        """Direction relative to the whole circumference of the arc"""
+        distance = self.centre.get_distance_to_point(point)
+        if distance > self.radius:
+            return 'out'
+        if distance == self.radius:
+            return 's'
+        return 'in'
+
+    def get_tangent_line(self, point_on_arc: Point) -> Line:
+        distance = self.centre.get_distance_to_point(point_on_arc)
+        if fabs(distance - self.radius) > 0.05:
+            raise ValueError(f'''Point must be on arc, but {point_on_arc} 
+                              was given with distance {distance} to a centre of arc {self}''')
+        return Line.perpendicular_line(Line.construct_by_two_points(self.centre, point_on_arc), point_on_arc)
+
+    def get_signed_distances_on_arc(self, ray: Ray) -> list[float]:
+        """
+        Returns signed distances along the ray from its origin to intersections with the arc, lesser first.
+        Intersections are found in closed form with the circumference, and those outside the arc are dropped.
+        """
+        distances = ray.get_signed_distances_to_circle(self)
+        if distances is None:
+            return []
+        return [distance for distance in distances if self.is_point_in_sector(ray.get_point(distance))]
+
+    def get_intersection_distance(self, ray: Ray) -> Optional[float]:
+        """Returns distance to the closest intersection ahead of the ray's origin or None"""
+        for distance in self.get_signed_distances_on_arc(ray):
+            if distance > 0:
+                return distance
+        return None
+
+    def __str__(self) -> str:
+        return f'Arc({self.centre}, {self.radius}, {self.start_angle}, {self.end_angle})'
+
+
+LensSurfaceType = Union[Arc, LineSegment]
+
+
+class Lens:
+    def __init__(self, centre: Point, aperture: float, first_radius: float, second_radius: float,
+                 edge_thickness: float = 0, angle_from_ox: float = 0) -> None:
+        """
+        Lens with two spherical (or flat) surfaces, which optical axis goes through centre at given angle.
+        Aperture is full height of the lens, edge thickness is distance between edges of the surfaces.
+        Radiuses are signed by lensmaker's convention: radius is positive, if centre of the surface
+        lies further along optical axis, so biconvex lens has positive first and negative second radius.
+        Flat surface has infinite radius.
+        """
+        if aperture <= 0:
+            raise ValueError(f'Aperture of a lens must be positive, but {aperture} was given')
+        if edge_thickness < 0:
+            raise ValueError(f'Edge thickness of a lens must be non-negative, but {edge_thickness} was given')
+        half_aperture = aperture / 2
+        for radius in (first_radius, second_radius):
+            if fabs(radius) < half_aperture:
+                raise ValueError(f'Radius of lens surface must be at least half of aperture {half_aperture}, but {radius} was given')
+        self.centre = centre
+        self.aperture = aperture
+        self.first_radius = first_radius
+        self.second_radius = second_radius
+        self.edge_thickness = edge_thickness
+        self.angle_from_ox = angle_from_ox
+        self.thickness = edge_thickness + self._get_sagitta(first_radius) - self._get_sagitta(second_radius)
+        if self.thickness <= 0:
+            raise ValueError(f'Surfaces of lens with radiuses {first_radius} and {second_radius} cross each other, \
+                               edge thickness must be increased')
+
+        self._axis = Vector2d.construct_from_length(1, angle_from_ox)
+        self._surfaces_x = (-edge_thickness / 2, edge_thickness / 2)
+        self.surfaces: list[LensSurfaceType] = [self._construct_surface(self._surfaces_x[0], first_radius),
+                                                self._construct_surface(self._surfaces_x[1], second_radius)]
+        if edge_thickness > 0:
+            for y in (-half_aperture, half_aperture):
+                self.surfaces.append(LineSegment(self.get_point(self._surfaces_x[0], y), self.get_point(self._surfaces_x[1], y)))
+        self.min_x = min(self._get_bounds(surface)[0] for surface in self.surfaces)
+        self.max_x = max(self._get_bounds(surface)[1] for surface in self.surfaces)
+        self.min_y = min(self._get_bounds(surface)[2] for surface in self.surfaces)
+        self.max_y = max(self._get_bounds(surface)[3] for surface in self.surfaces)
+
+    def _get_sagitta(self, radius: float) -> float:
+        """Returns distance along optical axis from vertex of the surface to its edge (positive, if vertex goes first)"""
+        if isinf(radius):
+            return 0
+        half_aperture = self.aperture / 2
+        return radius - (1 if radius > 0 else -1) * sqrt(radius*radius - half_aperture*half_aperture)
+
+    def get_point(self, x: float, y: float) -> Point:
+        """Returns point with given coordinates in lens coordinate system: along optical axis and to the left of it"""
+        return Point(self.centre.x + x*self._axis.x - y*self._axis.y, self.centre.y + x*self._axis.y + y*self._axis.x)
+
+    def get_local_coordinates(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Returns coordinates of the points in lens coordinate system"""
+        dxs, dys = np.asarray(xs) - self.centre.x, np.asarray(ys) - self.centre.y
+        return (dxs*self._axis.x + dys*self._axis.y, dys*self._axis.x - dxs*self._axis.y)
+
+    def _construct_surface(self, edge_x: float, radius: float) -> LensSurfaceType:
+        half_aperture = self.aperture / 2
+        if isinf(radius):
+            return LineSegment(self.get_point(edge_x, -half_aperture), self.get_point(edge_x, half_aperture))
+        centre_x = edge_x - self._get_sagitta(radius) + radius
+        half_angle = degrees(asin(half_aperture / fabs(radius)))
+        # Vertex of the surface lies before its centre for positive radius
+        facing_angle = (180 if radius > 0 else 0) + self.angle_from_ox
+        return Arc(self.get_point(centre_x, 0), fabs(radius), facing_angle - half_angle, facing_angle + half_angle)
+
+    @staticmethod
+    def _get_bounds(surface: LensSurfaceType) -> tuple[float, float, float, float]:
+        return (surface.min_x, surface.max_x, surface.min_y, surface.max_y)
+
+    def _are_points_behind_surface(self, xs: np.ndarray, ys: np.ndarray, edge_x: float, radius: float,
+                                   direction: int) -> np.ndarray:
+        """
+        Checks in lens coordinates, if points lie on the same side of the surface, as the lens.
+        Direction is 1 for the first surface, where lens lies further along axis, and -1 for the second.
+        """
+        is_behind_edge = direction*(xs - edge_x) >= 0
+        if isinf(radius):
+            return is_behind_edge
+        centre_x = edge_x - self._get_sagitta(radius) + radius
+        is_in_circle = np.hypot(xs - centre_x, ys) <= fabs(radius)
+        # Convex surface adds circular segment to the lens, concave one cuts it off
+        if direction*radius > 0:
+            return is_behind_edge | is_in_circle
+        return is_behind_edge & ~is_in_circle
+
+    def are_points_inside(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        local_xs, local_ys = self.get_local_coordinates(xs, ys)
+        return ((np.abs(local_ys) <= self.aperture / 2)
+                & self._are_points_behind_surface(local_xs, local_ys, self._surfaces_x[0], self.first_radius, 1)
+                & self._are_points_behind_surface(local_xs, local_ys, self._surfaces_x[1], self.second_radius, -1))
+
+    def is_point_inside(self, point: Point) -> bool:
+        return bool(self.are_points_inside(np.array([point.x]), np.array([point.y]))[0])
+
+    def get_distances_to_points(self, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """Returns distances from given points to the closest surface"""
+        return np.minimum.reduce([surface.get_distances_to_points(xs, ys) for surface in self.surfaces])
+
+    def __str__(self) -> str:
+        return f'Lens({self.centre}, {self.aperture}, {self.first_radius}, {self.second_radius}, {self.edge_thickness})'
+
+
+class BiconvexLens(Lens):
+    def __init__(self, centre: Point, aperture: float, first_radius: float, second_radius: Optional[float] = None,
+                 edge_thickness: float = 0, angle_from_ox: float = 0) -> None:
+        """Radiuses are positive, second radius equals to the first one by default"""
+        if second_radius is None:
+            second_radius = first_radius
+        if first_radius <= 0 or second_radius <= 0:
+            raise ValueError(f'Radiuses of biconvex lens must be positive, but {first_radius} and {second_radius} were given')
+        super().__init__(centre, aperture, first_radius, -second_radius, edge_thickness, angle_from_ox)
+
+
+class PlanoConvexLens(Lens):
+    def __init__(self, centre: Point, aperture: float, radius: float,
+                 edge_thickness: float = 0, angle_from_ox: float = 0) -> None:
+        """Flat surface goes first along optical axis, radius of convex surface is positive"""
+        if radius <= 0:
+            raise ValueError(f'Radius of plano-convex lens must be positive, but {radius} was given')
+        super().__init__(centre, aperture, inf, -radius, edge_thickness, angle_from_ox)
+
+
+class MeniscusLens(Lens):
+    def __init__(self, centre: Point, aperture: float, convex_radius: float, concave_radius: float,
+                 edge_thickness: float = 0, angle_from_ox: float = 0) -> None:
+        """
+        Convex surface goes first along optical axis, and both surfaces bulge against it.
+        Lens is converging, if convex radius is less than concave one.
+        """
+        if convex_radius <= 0 or concave_radius <= 0:
+            raise ValueError(f'Radiuses of meniscus lens must be positive, but {convex_radius} and {concave_radius} were given')
+        super().__init__(centre, aperture, convex_radius, concave_radius, edge_thickness, angle_from_ox)
 
 
 class Triangle(Polygon):
@@ -0,0 +1,171 @@
+from math import ceil, sqrt
+from typing import Any, Optional
+
+import numpy as np
+
+from plane.plane2d import Line, LineSegment, Point
+
+
+class SpatialIndex:
+    """
+    Index for nearest object queries.
+    Line segments are put into cells of a uniform grid, and only cells around the query point are searched.
+    Infinite lines and other objects (like circles) can't be localized, so they are checked for every query,
+    but in a vectorized way.
+    """
+
+    def __init__(self, objects: list[Any], cell_size: Optional[float] = None) -> None:
+        """If cell size is not given, it is chosen so that grid has about as many cells as there are segments"""
+        if cell_size is not None and cell_size <= 0:
+            raise ValueError(f'Cell size must be positive, but {cell_size} was given')
+        self.objects = list(objects)
+        self._segment_indexes = [i for i, obj in enumerate(self.objects) if isinstance(obj, LineSegment)]
+        self._line_indexes = [i for i, obj in enumerate(self.objects) if isinstance(obj, Line)]
+        self._other_indexes = [i for i, obj in enumerate(self.objects) if not isinstance(obj, (LineSegment, Line))]
+
+        segments = [self.objects[i] for i in self._segment_indexes]
+        self._segments_x = np.array([segment.endpoints[0].x for segment in segments], np.float64)
+        self._segments_y = np.array([segment.endpoints[0].y for segment in segments], np.float64)
+        self._segments_dx = np.array([segment.endpoints[1].x for segment in segments], np.float64) - self._segments_x
+        self._segments_dy = np.array([segment.endpoints[1].y for segment in segments], np.float64) - self._segments_y
+        self._lines_coefficients = np.array([self.objects[i].coefficients for i in self._line_indexes],
+                                            np.float64).reshape(-1, 3)
+        self._build_grid(cell_size)
+
+    def _build_grid(self, cell_size: Optional[float]) -> None:
+        self._cells: dict[tuple[int, int], np.ndarray] = {}
+        if not self._segment_indexes:
+            self.cell_size = cell_size if cell_size is not None else 1
+            self.origin = Point(0, 0)
+            self.number_of_columns = self.number_of_rows = 0
+            return
+        min_xs = np.minimum(self._segments_x, self._segments_x + self._segments_dx)
+        max_xs = np.maximum(self._segments_x, self._segments_x + self._segments_dx)
+        min_ys = np.minimum(self._segments_y, self._segments_y + self._segments_dy)
+        max_ys = np.maximum(self._segments_y, self._segments_y + self._segments_dy)
+        self.origin = Point(float(min_xs.min()), float(min_ys.min()))
+        width, height = float(max_xs.max()) - self.origin.x, float(max_ys.max()) - self.origin.y
+        if cell_size is None:
+            cell_size = max(width, height, 1) / ceil(sqrt(len(self._segment_indexes)))
+        self.cell_size = cell_size
+        self.number_of_columns = int(width // cell_size) + 1
+        self.number_of_rows = int(height // cell_size) + 1
+
+        # Segment is put into every cell of its bounding box, which is conservative for diagonal segments
+        first_columns, last_columns = self._get_columns(min_xs), self._get_columns(max_xs)
+        first_rows, last_rows = self._get_rows(min_ys), self._get_rows(max_ys)
+        cells: dict[tuple[int, int], list[int]] = {}
+        for segment, bounds in enumerate(zip(first_columns.tolist(), last_columns.tolist(),
+                                             first_rows.tolist(), last_rows.tolist())):
+            first_column, last_column, first_row, last_row = bounds
+            for column in range(first_column, last_column + 1):
+                for row in range(first_row, last_row + 1):
+                    cells.setdefault((column, row), []).append(segment)
+        self._cells = {cell: np.array(segments, np.int64) for cell, segments in cells.items()}
+
+    def _get_columns(self, xs: np.ndarray) -> np.ndarray:
+        return np.clip(((xs - self.origin.x) // self.cell_size).astype(np.int64), 0, self.number_of_columns - 1)
+
+    def _get_rows(self, ys: np.ndarray) -> np.ndarray:
+        return np.clip(((ys - self.origin.y) // self.cell_size).astype(np.int64), 0, self.number_of_rows - 1)
+
+    def _get_segments_distances(self, xs: np.ndarray, ys: np.ndarray, segments: np.ndarray) -> np.ndarray:
+        """Returns matrix of distances from every point (rows) to every given segment (columns)"""
+        x0, y0 = self._segments_x[segments], self._segments_y[segments]
+        dx, dy = self._segments_dx[segments], self._segments_dy[segments]
+        relative_xs, relative_ys = xs[:, np.newaxis] - x0, ys[:, np.newaxis] - y0
+        projections = np.clip((relative_xs*dx + relative_ys*dy) / (dx*dx + dy*dy), 0, 1)
+        return np.hypot(relative_xs - projections*dx, relative_ys - projections*dy)
+
+    def get_closest_indexes(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns indexes (in the list of objects) of the closest objects to every point and distances to them.
+        Index is -1 and distance is inf, if there are no objects.
+        """
+        xs, ys = np.atleast_1d(np.asarray(xs, np.float64)), np.atleast_1d(np.asarray(ys, np.float64))
+        closest = np.full(xs.size, -1, np.int64)
+        min_distances = np.full(xs.size, np.inf)
+
+        def update(distances: np.ndarray, indexes: np.ndarray, points: Optional[np.ndarray] = None) -> None:
+            if distances.shape[1] == 0:
+                return
+            best = np.argmin(distances, axis=1)
+            best_distances = distances[np.arange(best.size), best]
+            if points is None:
+                points = np.arange(xs.size)
+            is_closer = best_distances < min_distances[points]
+            min_distances[points[is_closer]] = best_distances[is_closer]
+            closest[points[is_closer]] = indexes[best[is_closer]]
+
+        if self._line_indexes:
+            a, b, c = self._lines_coefficients.T
+            update(np.abs(xs[:, np.newaxis]*a + ys[:, np.newaxis]*b + c), np.array(self._line_indexes, np.int64))
+        for i in self._other_indexes:
+            obj = self.objects[i]
+            if hasattr(obj, 'get_distances_to_points'):
+                distances = obj.get_distances_to_points(xs, ys)
+            else:
+                distances = np.array([obj.get_distance_to_point(Point(x, y)) for x, y in zip(xs.tolist(), ys.tolist())])
+            update(np.asarray(distances, np.float64)[:, np.newaxis], np.array([i], np.int64))
+
+        if self._segment_indexes:
+            segment_indexes = np.array(self._segment_indexes, np.int64)
+            columns, rows = self._get_columns(xs), self._get_rows(ys)
+            # Points in the same cell share search rings
+            cells, inverse = np.unique(np.stack([columns, rows], axis=1), axis=0, return_inverse=True)
+            for cell_number, (column, row) in enumerate(cells.tolist()):
+                points = np.flatnonzero(inverse.ravel() == cell_number)
+                self._search_rings(xs[points], ys[points], column, row, points, segment_indexes, min_distances, update)
+
+        return (closest, min_distances)
+
+    def _search_rings(self, xs: np.ndarray, ys: np.ndarray, column: int, row: int, points: np.ndarray,
+                      segment_indexes: np.ndarray, min_distances: np.ndarray, update) -> None:
+        """
+        Checks segments in rings of cells around given cell, until the closest found object
+        of every point is closer than any cell outside the rings.
+        """
+        is_checked = np.zeros(segment_indexes.size, bool)
+        max_ring = max(column, row, self.number_of_columns - 1 - column, self.number_of_rows - 1 - row)
+        for ring in range(max_ring + 1):
+            ring_segments = []
+            for cell in self._get_ring(column, row, ring):
+                segments = self._cells.get(cell)
+                if segments is not None:
+                    ring_segments.append(segments[~is_checked[segments]])
+                    is_checked[segments] = True
+            if ring_segments:
+                segments = np.unique(np.concatenate(ring_segments))
+                update(self._get_segments_distances(xs, ys, segments), segment_indexes[segments], points)
+
+            # Cells outside the rings lie beyond one of the sides of the block of searched cells
+            bounds = []
+            if column - ring > 0:
+                bounds.append(xs - (self.origin.x + (column - ring)*self.cell_size))
+            if column + ring < self.number_of_columns - 1:
+                bounds.append(self.origin.x + (column + ring + 1)*self.cell_size - xs)
+            if row - ring > 0:
+                bounds.append(ys - (self.origin.y + (row - ring)*self.cell_size))
+            if row + ring < self.number_of_rows - 1:
+                bounds.append(self.origin.y + (row + ring + 1)*self.cell_size - ys)
+            if not bounds:
+                return
+            lower_bounds = np.maximum(np.min(bounds, axis=0), 0)
+            if np.all(min_distances[points] <= lower_bounds):
+                return
+
+    @staticmethod
+    def _get_ring(column: int, row: int, ring: int) -> list[tuple[int, int]]:
+        if ring == 0:
+            return [(column, row)]
+        cells = [(column + offset, row + side) for side in (-ring, ring) for offset in range(-ring, ring + 1)]
+        cells += [(column + side, row + offset) for side in (-ring, ring) for offset in range(-ring + 1, ring)]
+        return cells
+
+    def get_closest_object(self, point: Point) -> Any:
+        index = int(self.get_closest_indexes(np.array([point.x]), np.array([point.y]))[0][0])
+        return self.objects[index] if index >= 0 else None
+
+    def get_closest_objects(self, xs: np.ndarray, ys: np.ndarray) -> list[Any]:
+        """Vectorized version of get_closest_object for arrays of coordinates"""
+        return [self.objects[index] if index >= 0 else None for index in self.get_closest_indexes(xs, ys)[0].tolist()]
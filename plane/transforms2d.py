@@ -0,0 +1,108 @@
+from math import cos, radians, sin
+
+import numpy as np
+
+from plane.plane2d import Point, Vector2d
+
+
+class AffineTransform:
+    def __init__(self, a: float = 1, b: float = 0, c: float = 0, d: float = 1, dx: float = 0, dy: float = 0) -> None:
+        """Transform of the plane, that moves point (x, y) to (a*x + b*y + dx, c*x + d*y + dy)"""
+        if a*d - b*c == 0:
+            raise ValueError(f'Affine transform must be invertible, but ({a}, {b}, {c}, {d}) matrix was given')
+        self.a, self.b, self.c, self.d = float(a), float(b), float(c), float(d)
+        self.dx, self.dy = float(dx), float(dy)
+
+    @staticmethod
+    def identity() -> 'AffineTransform':
+        return AffineTransform()
+
+    @staticmethod
+    def translation(dx: float, dy: float) -> 'AffineTransform':
+        return AffineTransform(dx=dx, dy=dy)
+
+    @staticmethod
+    def rotation(angle: float, centre: Point = Point(0, 0)) -> 'AffineTransform':
+        """Counter-clockwise rotation by angle in degrees around centre"""
+        cosine, sine = cos(radians(angle)), sin(radians(angle))
+        return AffineTransform(cosine, -sine, sine, cosine,
+                               centre.x - cosine*centre.x + sine*centre.y, centre.y - sine*centre.x - cosine*centre.y)
+
+    @staticmethod
+    def scaling(x_scale: float, y_scale: float = None, centre: Point = Point(0, 0)) -> 'AffineTransform':
+        """Scaling along axes, uniform if only x scale is given"""
+        if y_scale is None:
+            y_scale = x_scale
+        return AffineTransform(x_scale, 0, 0, y_scale, centre.x - x_scale*centre.x, centre.y - y_scale*centre.y)
+
+    def __matmul__(self, other: 'AffineTransform') -> 'AffineTransform':
+        """Composition, that applies other transform first and this one after it"""
+        return AffineTransform(*compose_transforms(self.as_array(), other.as_array()[np.newaxis])[0])
+
+    def inverse(self) -> 'AffineTransform':
+        return AffineTransform(*invert_transforms(self.as_array()[np.newaxis])[0])
+
+    def get_determinant(self) -> float:
+        return self.a*self.d - self.b*self.c
+
+    def get_scales(self) -> tuple[float, float]:
+        """
+        Returns the least and the greatest stretching of lengths by transform (singular values of its matrix).
+        For rotations and translations both are 1.
+        """
+        return tuple(float(scale) for scale in get_transform_scales(self.as_array()[np.newaxis])[:, 0])
+
+    def as_array(self) -> np.ndarray:
+        """Returns (a, b, c, d, dx, dy) array"""
+        return np.array([self.a, self.b, self.c, self.d, self.dx, self.dy], np.float64)
+
+    def apply_to_point(self, point: Point) -> Point:
+        return Point(self.a*point.x + self.b*point.y + self.dx, self.c*point.x + self.d*point.y + self.dy)
+
+    def apply_to_vector(self, vector: Vector2d) -> Vector2d:
+        """Vectors are only turned and stretched, but not moved"""
+        return Vector2d(self.a*vector.x + self.b*vector.y, self.c*vector.x + self.d*vector.y)
+
+    def apply_to_points(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        xs, ys = np.asarray(xs), np.asarray(ys)
+        return (self.a*xs + self.b*ys + self.dx, self.c*xs + self.d*ys + self.dy)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, AffineTransform):
+            return NotImplemented
+        return bool(np.all(self.as_array() == other.as_array()))
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.as_array().tolist()))
+
+    def __repr__(self) -> str:
+        return f'AffineTransform({self.a}, {self.b}, {self.c}, {self.d}, {self.dx}, {self.dy})'
+
+
+def compose_transforms(transform: np.ndarray, transforms: np.ndarray) -> np.ndarray:
+    """Returns (n, 6) array of compositions of transform with every one of (n, 6) transforms, that are applied first"""
+    a, b, c, d, dx, dy = transform
+    other_a, other_b, other_c, other_d, other_dx, other_dy = np.asarray(transforms, np.float64).T
+    return np.stack([a*other_a + b*other_c, a*other_b + b*other_d,
+                     c*other_a + d*other_c, c*other_b + d*other_d,
+                     a*other_dx + b*other_dy + dx, c*other_dx + d*other_dy + dy], axis=1)
+
+
+def invert_transforms(transforms: np.ndarray) -> np.ndarray:
+    """Returns (n, 6) array of inverses of (n, 6) transforms"""
+    a, b, c, d, dx, dy = np.asarray(transforms, np.float64).T
+    determinants = a*d - b*c
+    inverse_a, inverse_b, inverse_c, inverse_d = d / determinants, -b / determinants, -c / determinants, a / determinants
+    return np.stack([inverse_a, inverse_b, inverse_c, inverse_d,
+                     -(inverse_a*dx + inverse_b*dy), -(inverse_c*dx + inverse_d*dy)], axis=1)
+
+
+def get_transform_scales(transforms: np.ndarray) -> np.ndarray:
+    """Returns (2, n) array of the least and the greatest singular values of (n, 6) transforms"""
+    a, b, c, d = np.asarray(transforms, np.float64).T[:4]
+    # Sum and difference of singular values of 2x2 matrix M are sqrt(|M|^2 + 2|det M|) and sqrt(|M|^2 - 2|det M|)
+    squared_norms = a*a + b*b + c*c + d*d
+    determinants = np.abs(a*d - b*c)
+    sums = np.sqrt(squared_norms + 2*determinants)
+    differences = np.sqrt(np.maximum(squared_norms - 2*determinants, 0))
+    return np.stack([(sums - differences) / 2, (sums + differences) / 2])
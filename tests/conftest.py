@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Packages of the engine are imported from the repository root, like in benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,67 @@
+import numpy as np
+
+from optical.detectors import PolygonDetector, SegmentDetector
+from optical.light_beam import LightBeam
+from plane.plane2d import Point
+from visual.render_cache import RenderCache, get_fingerprint
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+NUMBER_OF_BEAMS = 5
+
+
+def get_scene_manager(detector, **settings) -> LightBeamSceneManager:
+    beams = [(LightBeam(Point(10, 30 + 20*i), 0), Color.RED, False) for i in range(NUMBER_OF_BEAMS)]
+    return LightBeamSceneManager(VisualPlane(300, 300, **settings.pop('plane_settings', {})), beams=beams,
+                                 line_segments=[(detector, Color.GREEN)], **settings)
+
+
+def test_segment_detector_counts_every_beam():
+    detector = SegmentDetector(Point(250, 20), Point(250, 280), 10)
+    detectors = get_scene_manager(detector).trace_only()
+    assert detectors == [detector]
+    assert detector.number_of_hits == NUMBER_OF_BEAMS
+    assert detector.get_total_intensity() == NUMBER_OF_BEAMS
+    # Beams hit the detector at heights from 30 to 110, which are in the first four of ten bins
+    assert np.count_nonzero(detector.get_position_profile()) == 4
+
+
+def test_polygon_detector_counts_hits_on_its_border():
+    detector = PolygonDetector([Point(200, 10), Point(280, 10), Point(280, 290), Point(200, 290)], 20)
+    scene_manager = LightBeamSceneManager(VisualPlane(300, 300), beams=[(LightBeam(Point(10, 150), 0), Color.RED, False)],
+                                          polygons=[(detector, Color.GREEN)])
+    scene_manager.trace_only()
+    assert detector.number_of_hits == 1
+    assert detector.get_total_intensity() == 1
+
+
+def test_trace_only_matches_render_image():
+    traced_detector = SegmentDetector(Point(250, 20), Point(250, 280), 10)
+    traced_scene_manager = get_scene_manager(traced_detector)
+    traced_scene_manager.trace_only()
+    assert traced_scene_manager.visual_plane.framebuffer is None
+    rendered_detector = SegmentDetector(Point(250, 20), Point(250, 280), 10)
+    get_scene_manager(rendered_detector).render_image()
+    assert np.array_equal(traced_detector.histogram, rendered_detector.histogram)
+
+
+def test_detector_fingerprint_ignores_histogram():
+    detector = SegmentDetector(Point(250, 20), Point(250, 280), 10)
+    fingerprint = get_fingerprint(detector)
+    get_scene_manager(detector).trace_only()
+    assert detector.number_of_hits == NUMBER_OF_BEAMS
+    assert get_fingerprint(detector) == fingerprint
+    assert get_fingerprint(SegmentDetector(Point(250, 20), Point(250, 280), 20)) != fingerprint
+
+
+def test_detector_scene_is_rendered_with_cache(tmp_path):
+    render_cache = RenderCache(str(tmp_path / 'cache'))
+    for _ in range(2):
+        detector = SegmentDetector(Point(250, 20), Point(250, 280), 10)
+        scene_manager = get_scene_manager(detector, render_cache=render_cache,
+                                          plane_settings={'path_to_image_folder': str(tmp_path)})
+        scene_manager.draw_image()
+        # Scene is traced every time, so histogram is filled even when the same image was rendered before
+        assert detector.number_of_hits == NUMBER_OF_BEAMS
+    assert (tmp_path / 'image0.png').exists()
+    assert render_cache.get_size() == 0
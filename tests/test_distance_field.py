@@ -0,0 +1,35 @@
+import numpy as np
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionCircle, RefractionPolygon
+from optical.opticallines import ReflectionSegment
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+
+def render(use_distance_field: bool) -> LightBeamSceneManager:
+    beams = [(LightBeam(Point(20, 20 + i*19), 15 - 0.75*i, max_bounces=20), Color.RED, False) for i in range(40)]
+    mirrors = [(ReflectionSegment(Point(760, 100 + i*150), Point(780, 200 + i*150), 0.9), Color.YELLOW) for i in range(4)]
+    scene_manager = LightBeamSceneManager(VisualPlane(800, 800), beams=beams, line_segments=mirrors,
+                                          polygons=[(RefractionPolygon([Point(330, 330), Point(470, 330), Point(400, 450)], 1.5), Color.BLUE)],
+                                          circles=[(ReflectionCircle(Point(200, 600), 80, 0.8), Color.GREEN, False)],
+                                          use_distance_field=use_distance_field)
+    scene_manager.render_image()
+    return scene_manager
+
+
+def test_propogate_steps_matches_unit_steps():
+    stepped_beam, jumped_beam = LightBeam(Point(10.3, 20.7), 37.5), LightBeam(Point(10.3, 20.7), 37.5)
+    for _ in range(50):
+        stepped_beam.propogate()
+    jumped_beam.propogate_steps(50)
+    assert [(point.x, point.y) for point in stepped_beam.coordinates] == [(point.x, point.y) for point in jumped_beam.coordinates]
+
+
+def test_distance_field_draws_the_same_image_as_step_tracing():
+    step_scene_manager, field_scene_manager = render(False), render(True)
+    for step_beam, field_beam in zip(step_scene_manager.visual_beams, field_scene_manager.visual_beams):
+        assert ([(point.x, point.y) for point in step_beam.beam.coordinates]
+                == [(point.x, point.y) for point in field_beam.beam.coordinates])
+    assert np.array_equal(step_scene_manager.visual_plane.get_pixels(), field_scene_manager.visual_plane.get_pixels())
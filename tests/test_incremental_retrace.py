@@ -0,0 +1,29 @@
+import numpy as np
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionCircle
+from optical.opticallines import ReflectionSegment
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+
+def get_mirror(shift: float = 0) -> ReflectionSegment:
+    return ReflectionSegment(Point(350 - shift, 150), Point(370, 170 + shift), 0.9)
+
+
+def render(shift: float) -> LightBeamSceneManager:
+    beams = [(LightBeam(Point(10, 20 + i*12), 10 - i, max_bounces=20), Color.RED, False) for i in range(30)]
+    scene_manager = LightBeamSceneManager(VisualPlane(400, 400), beams=beams,
+                                          line_segments=[(get_mirror(shift), Color.YELLOW),
+                                                         (ReflectionSegment(Point(380, 250), Point(390, 380), 0.9), Color.YELLOW)],
+                                          circles=[(ReflectionCircle(Point(200, 300), 40, 0.8), Color.GREEN, False)])
+    scene_manager.render_image()
+    return scene_manager
+
+
+def test_replace_object_draws_the_same_image_as_full_render():
+    scene_manager = render(0)
+    scene_manager.replace_object(scene_manager.line_segments[0], get_mirror(15))
+    full_scene_manager = render(15)
+    assert np.array_equal(scene_manager.visual_plane.get_pixels(), full_scene_manager.visual_plane.get_pixels())
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from optical.opticalfigures import RefractionLens
+from optical.opticallines import RefractionSegment
+from optical.paraxial import ParaxialSystem
+from plane.plane2d import Point
+
+IMAGE_POSITION = 600
+
+
+def get_system() -> ParaxialSystem:
+    elements = [RefractionLens(Point(200, 300), 80, 400, -400, 1.5, edge_thickness=4),
+                RefractionSegment(Point(450, 350), Point(450, 250), 1.5, 1)]
+    return ParaxialSystem(elements, Point(10, 300))
+
+
+def test_paraxial_rays_match_exact_tracing():
+    heights, angles = np.linspace(-2, 2, 11), np.linspace(-0.2, 0.2, 11)
+    height_differences, angle_differences = get_system().compare_with_exact(heights, angles, IMAGE_POSITION)
+    assert not np.isnan(height_differences).any()
+    assert np.abs(height_differences).max() < 1e-3
+    assert np.abs(angle_differences).max() < 1e-4
+
+
+def test_differences_grow_away_from_axis():
+    system = get_system()
+    near_differences, _ = system.compare_with_exact(np.array([1.0]), np.array([0.0]), IMAGE_POSITION)
+    far_differences, _ = system.compare_with_exact(np.array([10.0]), np.array([0.0]), IMAGE_POSITION)
+    assert abs(far_differences[0]) > abs(near_differences[0])
+
+
+def test_focal_length_of_thick_lens():
+    # Equiconvex lens with radius 400 and coefficient 1.5 has focal length close to 400 by lensmaker's equation
+    assert get_system().get_focal_length() == pytest.approx(400, rel=0.01)
+
+
+def test_output_plane_before_last_surface_is_rejected():
+    with pytest.raises(ValueError):
+        get_system().propogate(np.array([1.0]), np.array([0.0]), 300)
@@ -0,0 +1,61 @@
+import numpy as np
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import RefractionPolygon
+from optical.ray_scheduler import RayTreeScheduler
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+PRISM = [Point(100, 50), Point(200, 50), Point(150, 250)]
+
+
+def render(ray_scheduler: RayTreeScheduler) -> LightBeamSceneManager:
+    beams = [(LightBeam(Point(10, 100 + 10*i), 5), Color.RED, False) for i in range(3)]
+    scene_manager = LightBeamSceneManager(VisualPlane(300, 300), beams=beams, polygons=[(RefractionPolygon(PRISM, 1.5), Color.BLUE)],
+                                          ray_scheduler=ray_scheduler)
+    scene_manager.render_image()
+    return scene_manager
+
+
+def test_scheduler_pops_brightest_first():
+    scheduler = RayTreeScheduler()
+    for intensity in (0.2, 0.9, 0.5):
+        scheduler.push(intensity, intensity)
+    assert [scheduler.pop() for _ in range(3)] == [0.9, 0.5, 0.2]
+
+
+def test_scheduler_prunes_dim_beams_and_beams_over_budget():
+    scheduler = RayTreeScheduler(intensity_treshold=0.1, ray_budget=1)
+    assert not scheduler.spawn('dim', 0.05)
+    assert scheduler.spawn('bright', 0.5)
+    assert not scheduler.spawn('over budget', 0.5)
+    assert (scheduler.number_of_spawned, scheduler.number_of_pruned) == (1, 2)
+
+
+def test_transmitted_beams_are_traced_brightest_first():
+    scheduler = RayTreeScheduler()
+    intensities = []
+    pop = scheduler.pop
+
+    def record_pop():
+        visual_beam = pop()
+        intensities.append(visual_beam.beam.relative_intensity)
+        return visual_beam
+
+    scheduler.pop = record_pop
+    scene_manager = render(scheduler)
+    # Every split spawns both reflected and transmitted beam, and transmitted ones are continued after they are popped
+    assert scheduler.number_of_spawned > len(scene_manager.visual_beams) - 3
+    assert len(intensities) == 3 + scheduler.number_of_spawned
+    assert all(intensity >= next_intensity for intensity, next_intensity in zip(intensities, intensities[1:]))
+    assert len(set(scene_manager.visual_beams)) == len(scene_manager.visual_beams)
+
+
+def test_transmitted_beams_count_against_ray_budget():
+    scene_manager = render(RayTreeScheduler(ray_budget=0))
+    assert len(scene_manager.visual_beams) == 3
+    # Without budget beams stop on the first surface of the prism, where they are split
+    for visual_beam in scene_manager.visual_beams:
+        assert visual_beam.beam.coordinates[-1].x < 150
+    assert np.any(scene_manager.visual_plane.framebuffer)
@@ -0,0 +1,66 @@
+import os
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import RefractionPolygon
+from plane.plane2d import Point
+from visual.render_cache import RenderCache, get_fingerprint
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+
+def get_scene_manager(path: str, render_cache: RenderCache, angle: float = 10) -> LightBeamSceneManager:
+    prism = RefractionPolygon([Point(60, 40), Point(140, 40), Point(100, 120)], 1.5)
+    return LightBeamSceneManager(VisualPlane(200, 200, path_to_image_folder=path), beams=[(LightBeam(Point(10, 70), angle), Color.RED, False)],
+                                 polygons=[(prism, Color.BLUE)], render_cache=render_cache)
+
+
+def test_fingerprint_is_the_same_for_equal_scenes():
+    first_beam, second_beam = LightBeam(Point(10, 70), 10), LightBeam(Point(10, 70), 10)
+    assert get_fingerprint(first_beam) == get_fingerprint(second_beam)
+    # Traced beam is fingerprinted by its initial state
+    first_beam.propogate(5)
+    assert get_fingerprint(first_beam) == get_fingerprint(second_beam)
+    assert get_fingerprint(first_beam) != get_fingerprint(LightBeam(Point(10, 70), 11))
+
+
+def test_unchanged_scene_is_restored_from_cache(tmp_path, capsys):
+    render_cache = RenderCache(str(tmp_path / 'cache'))
+    first_scene_manager = get_scene_manager(str(tmp_path / 'first'), render_cache)
+    os.makedirs(tmp_path / 'first')
+    first_scene_manager.draw_image('prism')
+    assert 'restored from cache' not in capsys.readouterr().out
+
+    os.makedirs(tmp_path / 'second')
+    second_scene_manager = get_scene_manager(str(tmp_path / 'second'), render_cache)
+    assert second_scene_manager.get_cache_key('prism') == first_scene_manager.get_cache_key('prism')
+    second_scene_manager.draw_image('prism')
+    assert 'restored from cache' in capsys.readouterr().out
+    assert (tmp_path / 'second' / 'prism.png').read_bytes() == (tmp_path / 'first' / 'prism.png').read_bytes()
+
+
+def test_changed_scene_misses_cache(tmp_path, capsys):
+    render_cache = RenderCache(str(tmp_path / 'cache'))
+    get_scene_manager(str(tmp_path), render_cache).draw_image('prism')
+    changed_scene_manager = get_scene_manager(str(tmp_path), render_cache, angle=20)
+    assert changed_scene_manager.get_cache_key('prism') != get_scene_manager(str(tmp_path), render_cache).get_cache_key('prism')
+    capsys.readouterr()
+    changed_scene_manager.draw_image('prism')
+    assert 'restored from cache' not in capsys.readouterr().out
+
+
+def test_store_restore_invalidate_and_evict(tmp_path):
+    render_cache = RenderCache(str(tmp_path / 'cache'), max_size=10)
+    source = tmp_path / 'source.png'
+    source.write_bytes(b'123456')
+    render_cache.store('first', str(source))
+    assert render_cache.restore('first', str(tmp_path / 'restored.png'))
+    assert (tmp_path / 'restored.png').read_bytes() == b'123456'
+    assert not render_cache.restore('missing', str(tmp_path / 'missing.png'))
+    # Time of last access is kept as modification time, which is set to the past, so the order doesn't depend on clock
+    os.utime(tmp_path / 'cache' / 'first.png', (0, 0))
+    # Second entry doesn't fit together with the first one, so the least recently used one is evicted
+    render_cache.store('second', str(source))
+    assert render_cache.get_size() == 6
+    assert not render_cache.restore('first', str(tmp_path / 'restored.png'))
+    assert render_cache.invalidate('second')
+    assert render_cache.get_size() == 0
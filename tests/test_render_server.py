@@ -0,0 +1,65 @@
+import asyncio
+import json
+from io import BytesIO
+
+from PIL import Image
+
+from visual.render_server import RenderServer, render_scene
+
+SCENE = {'width': 50, 'beams': [{'origin': [4, 4], 'angle': 30}]}
+
+
+async def send(socket_path: str, request: bytes) -> tuple[bytes, bytes]:
+    """Returns status line and body of the response"""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(request)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return (head.split(b'\r\n')[0], body)
+
+
+def get_render_request(description: dict) -> bytes:
+    body = json.dumps(description).encode()
+    return b'POST /render HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body
+
+
+async def run_requests(socket_path: str) -> dict[str, tuple[bytes, bytes]]:
+    server = RenderServer(unix_socket_path=socket_path, number_of_workers=1)
+    await server.start()
+    try:
+        return {'png': await send(socket_path, get_render_request(SCENE)),
+                'trace': await send(socket_path, get_render_request({**SCENE, 'output': 'trace'})),
+                'bad timeout': await send(socket_path, get_render_request({**SCENE, 'timeout': -1})),
+                'health': await send(socket_path, b'GET /health HTTP/1.1\r\n\r\n'),
+                'unknown path': await send(socket_path, b'GET /unknown HTTP/1.1\r\n\r\n')}
+    finally:
+        await server.close()
+
+
+def are_images_equal(first_png: bytes, second_png: bytes) -> bool:
+    first_image, second_image = Image.open(BytesIO(first_png)), Image.open(BytesIO(second_png))
+    return first_image.size == second_image.size and first_image.tobytes() == second_image.tobytes()
+
+
+def test_render_server_round_trip(tmp_path):
+    responses = asyncio.run(run_requests(str(tmp_path / 'render.sock')))
+
+    status, body = responses['png']
+    assert status == b'HTTP/1.1 200 OK'
+    _, _, expected_body = render_scene(SCENE)
+    assert are_images_equal(body, expected_body)
+
+    status, body = responses['trace']
+    assert status == b'HTTP/1.1 200 OK'
+    trace = json.loads(body)
+    assert (trace['width'], trace['height']) == (50, 50)
+    assert len(trace['beams']) == 1 and trace['beams'][0]['points'][0] == [4, 4]
+
+    assert responses['bad timeout'][0] == b'HTTP/1.1 400 Bad Request'
+    assert responses['unknown path'][0] == b'HTTP/1.1 404 Not Found'
+    status, body = responses['health']
+    assert status == b'HTTP/1.1 200 OK'
+    assert json.loads(body)['completed'] == 2
+
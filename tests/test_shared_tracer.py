@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from optical.detectors import SegmentDetector
+from optical.light_beam import LightBeam
+from optical.opticalfigures import RefractionCircle, RefractionPolygon
+from optical.opticallines import ReflectionSegment, RefractionSegment
+from optical.shared_tracer import PackedGeometry, ProcessTracer, can_pack
+from optical.spectral_tracer import BatchTracer, SpectralBeam
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+
+
+def get_scene() -> dict:
+    beams = [(SpectralBeam.construct_visible(Point(20, 40 + i*50), 5 - 2*i, 3, max_bounces=20), Color.WHITE, False) for i in range(5)]
+    return {'beams': beams, 'polygons': [(RefractionPolygon([Point(100, 80), Point(180, 80), Point(140, 160)], 1.5), Color.BLUE)],
+            'circles': [(RefractionCircle(Point(120, 230), 30, 1.33), Color.BLUE, False)],
+            'line_segments': [(ReflectionSegment(Point(280, 20), Point(290, 280), 0.9), Color.YELLOW)]}
+
+
+def test_process_tracer_renders_the_same_image_as_batch_tracer():
+    batch_scene_manager = LightBeamSceneManager(VisualPlane(300, 300), **get_scene())
+    batch_scene_manager.render_image()
+    with ProcessTracer(number_of_workers=1, chunks_per_worker=2) as process_tracer:
+        process_scene_manager = LightBeamSceneManager(VisualPlane(300, 300), **get_scene(), process_tracer=process_tracer)
+        process_scene_manager.render_image()
+    for batch_beam, process_beam in zip(batch_scene_manager.spectral_visual_beams, process_scene_manager.spectral_visual_beams):
+        assert ([(point.x, point.y) for point in batch_beam.beam.coordinates]
+                == [(point.x, point.y) for point in process_beam.beam.coordinates])
+    assert np.array_equal(batch_scene_manager.visual_plane.get_pixels(), process_scene_manager.visual_plane.get_pixels())
+
+
+def test_process_tracer_continues_beams_with_long_paths():
+    # Refractions don't count as bounces, so beam, that crosses many slabs, outgrows buffers of workers
+    slabs = [RefractionSegment(Point(20 + i*10, 10), Point(20 + i*10, 290), 1.5 if i % 2 else 1, 1 if i % 2 else 1.5) for i in range(25)]
+    batch_beam, process_beam = LightBeam(Point(10, 150), 10, max_bounces=2), LightBeam(Point(10, 150), 10, max_bounces=2)
+    BatchTracer(slabs).trace([batch_beam])
+    with ProcessTracer(number_of_workers=1) as process_tracer:
+        process_tracer.publish(slabs)
+        process_tracer.trace([process_beam])
+    # Workers keep place for 2*(max bounces + 2) + 1 points
+    assert len(process_beam.coordinates) > 2*(2 + 2) + 1
+    assert [(point.x, point.y) for point in batch_beam.coordinates] == [(point.x, point.y) for point in process_beam.coordinates]
+
+
+def test_only_plain_geometry_can_be_packed():
+    assert can_pack([ReflectionSegment(Point(0, 0), Point(1, 1), 1)])
+    assert not can_pack([SegmentDetector(Point(0, 0), Point(1, 1))])
+    with pytest.raises(ValueError):
+        PackedGeometry([SegmentDetector(Point(0, 0), Point(1, 1))])
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from optical.light_beam import LightBeam
+from optical.opticalfigures import ReflectionCircle, RefractionPolygon
+from plane.plane2d import Point
+from visual.visual2d import Color, VisualPlane
+from visual.visuallight import LightBeamSceneManager
+from visual.viewport import Viewport
+
+
+def render() -> LightBeamSceneManager:
+    beams = [(LightBeam(Point(20, 30 + i*40), 5 + i*3, max_bounces=20), Color.RED, i % 2 == 0) for i in range(8)]
+    scene_manager = LightBeamSceneManager(VisualPlane(400, 400), beams=beams,
+                                          polygons=[(RefractionPolygon([Point(150, 100), Point(220, 100), Point(185, 170)], 1.5), Color.BLUE)],
+                                          circles=[(ReflectionCircle(Point(100, 300), 30, 0.8), Color.GREEN, False)])
+    scene_manager.render_image()
+    return scene_manager
+
+
+def test_identity_viewport_draws_native_image():
+    scene_manager = render()
+    view_plane = scene_manager.render_view(Viewport())
+    assert np.array_equal(view_plane.framebuffer, scene_manager.visual_plane.framebuffer)
+
+
+def test_viewport_sizes():
+    scene_manager = render()
+    assert scene_manager.render_view(Viewport(0.25)).framebuffer.shape[:2] == (100, 100)
+    assert scene_manager.render_view(Viewport.crop(100, 200, 200, 300, 4)).framebuffer.shape[:2] == (400, 400)
+
+
+def test_viewport_rejects_non_positive_scale():
+    with pytest.raises(ValueError):
+        Viewport(0)
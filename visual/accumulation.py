@@ -0,0 +1,82 @@
+from math import log
+from typing import Optional
+
+import numpy as np
+
+ColorType = tuple[int, int, int]
+
+
+def densify_path(xs: np.ndarray, ys: np.ndarray, step: float = 1) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns points of polyline with given vertexes, sampled so that
+    distance between neighbouring points is not greater than step.
+    Vertexes themselves are always included.
+    """
+    xs, ys = np.asarray(xs, np.float64), np.asarray(ys, np.float64)
+    if xs.size < 2:
+        return (xs.copy(), ys.copy())
+    dx, dy = np.diff(xs), np.diff(ys)
+    # Tolerance keeps segments, which length is step up to rounding error, from being split
+    counts = np.maximum(np.ceil(np.hypot(dx, dy) / step - 1e-9).astype(np.int64), 1)
+    segments = np.repeat(np.arange(dx.size), counts)
+    offsets = np.arange(segments.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    t = offsets / counts[segments]
+    return (np.append(xs[segments] + t*dx[segments], xs[-1]),
+            np.append(ys[segments] + t*dy[segments], ys[-1]))
+
+
+class RadianceBuffer:
+    """
+    Float render target, into which beams deposit their intensity along the path.
+    Deposits of overlapping beams add up, and memory doesn't depend on number of beams.
+    Buffer is converted to colors only once, by tone_map.
+    """
+
+    # Fraction of maximum brightness, to which the 99th percentile of radiance is mapped with automatic exposure
+    AUTO_EXPOSURE_LEVEL = 0.95
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.radiance = np.zeros((height, width, 3), np.float32)
+
+    def reset(self) -> None:
+        self.radiance.fill(0)
+
+    def deposit(self, xs: np.ndarray, ys: np.ndarray, intensity: float, color: ColorType) -> None:
+        """
+        Adds intensity, tinted with color, to every given pixel.
+        Points outside the buffer and repeats of the same pixel in a row are skipped.
+        """
+        xs, ys = np.rint(xs).astype(np.int64), np.rint(ys).astype(np.int64)
+        in_buffer = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs, ys = xs[in_buffer], ys[in_buffer]
+        if xs.size == 0:
+            return
+        is_new_pixel = np.ones(xs.size, bool)
+        is_new_pixel[1:] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+        xs, ys = xs[is_new_pixel], ys[is_new_pixel]
+        weight = np.asarray(color, np.float32) * np.float32(intensity / 255)
+        np.add.at(self.radiance, (ys, xs), weight)
+
+    def deposit_path(self, xs: np.ndarray, ys: np.ndarray, intensity: float, color: ColorType) -> None:
+        """Deposits intensity along polyline with given vertexes"""
+        self.deposit(*densify_path(xs, ys), intensity, color)
+
+    def get_auto_exposure(self) -> float:
+        lit = self.radiance[self.radiance > 0]
+        if lit.size == 0:
+            return 1
+        return -log(1 - self.AUTO_EXPOSURE_LEVEL) / float(np.percentile(lit, 99))
+
+    def tone_map(self, background: np.ndarray, exposure: Optional[float] = None) -> np.ndarray:
+        """
+        Returns background (array of colors with shape (height, width, 3)) lit by accumulated radiance.
+        Every channel approaches 255 as 1 - exp(-exposure * radiance),
+        exposure is chosen automatically if it is not given.
+        """
+        if exposure is None:
+            exposure = self.get_auto_exposure()
+        light = 1 - np.exp(-exposure * self.radiance)
+        background = background.astype(np.float32)
+        return np.rint(background + (255 - background)*light).astype(np.uint8)
@@ -0,0 +1,168 @@
+from typing import Any, Iterator, Optional, Union
+
+import numpy as np
+
+from plane.plane2d import Point
+
+ColorType = tuple[int, int, int]
+
+# Shift of x in keys of points, so that keys of points in one row are ordered by x
+_X_OFFSET = 2**31
+
+
+class DrawCoordinates:
+    """
+    Compact mapping of pixels to colors, replacing dict[Point, ColorType] of drawables.
+    Pixels are kept as int32 coordinate arrays (COO format), and colors as one color for all pixels,
+    or as uint8 array of colors, if pixels have different colors.
+    Supports dict interface (in, [], get, iteration, items, assignment) with points rounded to pixels,
+    and vectorized addition of pixels by add.
+    Added pixels are merged lazily, on the first read after them.
+    """
+
+    def __init__(self) -> None:
+        self._xs = np.empty(0, np.int32)
+        self._ys = np.empty(0, np.int32)
+        self._keys = np.empty(0, np.int64)
+        # Either single color for all pixels, or (n, 3) array
+        self._colors: Union[ColorType, np.ndarray, None] = None
+        # Chunks of (xs, ys, colors, overwrite), added since the last merge
+        self._pending: list[tuple[np.ndarray, np.ndarray, Any, bool]] = []
+        # Single points, assigned since the last merge
+        self._assigned: tuple[list[int], list[int], list[ColorType]] = ([], [], [])
+
+    def add(self, xs: np.ndarray, ys: np.ndarray, color: Union[ColorType, np.ndarray], overwrite: bool = False) -> None:
+        """
+        Adds pixels with given color (one color or (n, 3) array of colors).
+        Pixels, that are already present, keep their color, unless overwrite is True.
+        """
+        xs, ys = np.rint(xs).astype(np.int32), np.rint(ys).astype(np.int32)
+        if xs.size == 0:
+            return
+        if np.ndim(color) == 2:
+            color = np.asarray(color, np.uint8)
+        else:
+            color = tuple(int(channel) for channel in color)
+        self._flush_assigned()
+        self._pending.append((xs, ys, color, overwrite))
+
+    def __setitem__(self, point: Point, color: ColorType) -> None:
+        xs, ys, colors = self._assigned
+        xs.append(round(point.x))
+        ys.append(round(point.y))
+        colors.append(color)
+
+    def _flush_assigned(self) -> None:
+        xs, ys, colors = self._assigned
+        if xs:
+            self._pending.append((np.array(xs, np.int32), np.array(ys, np.int32), np.array(colors, np.uint8), True))
+            self._assigned = ([], [], [])
+
+    def _merge(self) -> None:
+        """
+        Merges pending pixels, so that every pixel is present once, and pixels are sorted by (y, x).
+        Pixel gets color of its last overwriting addition, or of the first addition, if there were none.
+        """
+        self._flush_assigned()
+        if not self._pending:
+            return
+        chunks = []
+        if self._keys.size:
+            chunks.append((self._xs, self._ys, self._colors, False))
+        chunks += self._pending
+        self._pending = []
+
+        xs = np.concatenate([chunk[0] for chunk in chunks])
+        ys = np.concatenate([chunk[1] for chunk in chunks])
+        keys = self._get_keys(xs, ys)
+        order = np.arange(keys.size)
+        overwrites = np.concatenate([np.full(chunk[0].size, chunk[3]) for chunk in chunks])
+        # Overwriting additions win by order, other ones only if there were no overwriting ones, the first one wins
+        priorities = np.where(overwrites, order + keys.size, keys.size - order)
+        sorted_indexes = np.lexsort((priorities, keys))
+        sorted_keys = keys[sorted_indexes]
+        is_last = np.ones(sorted_keys.size, bool)
+        is_last[:-1] = sorted_keys[1:] != sorted_keys[:-1]
+        winners = sorted_indexes[is_last]
+
+        self._xs, self._ys, self._keys = xs[winners], ys[winners], keys[winners]
+        single_colors = {chunk[2] for chunk in chunks if isinstance(chunk[2], tuple)}
+        if len(single_colors) == 1 and all(isinstance(chunk[2], tuple) for chunk in chunks):
+            self._colors = single_colors.pop()
+        else:
+            colors = np.concatenate([np.broadcast_to(np.asarray(chunk[2], np.uint8), (chunk[0].size, 3))
+                                     for chunk in chunks])
+            self._colors = colors[winners]
+
+    @staticmethod
+    def _get_keys(xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        return ys.astype(np.int64) * 2**32 + (xs.astype(np.int64) + _X_OFFSET)
+
+    @property
+    def xs(self) -> np.ndarray:
+        self._merge()
+        return self._xs
+
+    @property
+    def ys(self) -> np.ndarray:
+        self._merge()
+        return self._ys
+
+    def get_colors(self) -> Union[ColorType, np.ndarray]:
+        """Returns one color of all pixels or (n, 3) array of colors of every pixel"""
+        self._merge()
+        if self._colors is None:
+            return np.empty((0, 3), np.uint8)
+        return self._colors
+
+    def _find(self, point: Point) -> Optional[int]:
+        self._merge()
+        key = self._get_keys(np.array([round(point.x)]), np.array([round(point.y)]))[0]
+        index = int(np.searchsorted(self._keys, key))
+        if index < self._keys.size and self._keys[index] == key:
+            return index
+        return None
+
+    def _get_color(self, index: int) -> ColorType:
+        if isinstance(self._colors, tuple):
+            return self._colors
+        return tuple(self._colors[index].tolist())
+
+    def __contains__(self, point: Point) -> bool:
+        return self._find(point) is not None
+
+    def __getitem__(self, point: Point) -> ColorType:
+        index = self._find(point)
+        if index is None:
+            raise KeyError(point)
+        return self._get_color(index)
+
+    def get(self, point: Point, default: Any = None) -> Any:
+        index = self._find(point)
+        return self._get_color(index) if index is not None else default
+
+    def __len__(self) -> int:
+        self._merge()
+        return self._keys.size
+
+    def __iter__(self) -> Iterator[Point]:
+        self._merge()
+        return (Point(x, y) for x, y in zip(self._xs.tolist(), self._ys.tolist()))
+
+    def keys(self) -> Iterator[Point]:
+        return iter(self)
+
+    def values(self) -> Iterator[ColorType]:
+        self._merge()
+        colors = self._colors
+        if colors is None:
+            return iter([])
+        if isinstance(colors, tuple):
+            return (colors for _ in range(self._keys.size))
+        return (tuple(color) for color in colors.tolist())
+
+    def items(self) -> Iterator[tuple[Point, ColorType]]:
+        return zip(iter(self), self.values())
+
+    def clear(self) -> None:
+        self.__init__()
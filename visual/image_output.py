@@ -0,0 +1,136 @@
+import atexit
+import queue
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Kinds of output files: PNG image, numpy array, or numpy array, written through memory map
+IMAGE_KINDS = ('png', 'npy', 'memmap')
+
+
+class ImageFormat:
+    def __init__(self, kind: str = 'png', *, compress_level: int = 6, palette_size: Optional[int] = None) -> None:
+        """
+        Format of saved images. PNG is compressed by zlib with given level (0 is no compression, 9 is the best one),
+        and, if palette size is given, is saved with indexed palette of at most this number of colors
+        (exact, if image has no more colors, otherwise adaptive one).
+        Npy and memmap kinds save raw (height, width, 3) uint8 array in .npy file, rows from the top of the image,
+        memmap writes it through memory map, so it can be read back by np.load with mmap_mode without copying.
+        """
+        if kind not in IMAGE_KINDS:
+            raise ValueError(f'Kind of image must be one of {IMAGE_KINDS}, but {kind!r} was given')
+        if not (0 <= compress_level <= 9):
+            raise ValueError(f'Compress level must be in [0; 9], but {compress_level} was given')
+        if palette_size is not None:
+            if kind != 'png':
+                raise ValueError('Only PNG images can have palette')
+            if not (2 <= palette_size <= 256):
+                raise ValueError(f'Palette size must be in [2; 256], but {palette_size} was given')
+        self.kind = kind
+        self.compress_level = compress_level
+        self.palette_size = palette_size
+
+    def get_extension(self) -> str:
+        return '.png' if self.kind == 'png' else '.npy'
+
+    def write(self, pixels: np.ndarray, path: str) -> None:
+        """Writes (height, width, 3) uint8 pixels, rows from the top of the image, into file of this format"""
+        if self.kind == 'npy':
+            np.save(path, pixels)
+        elif self.kind == 'memmap':
+            array = np.lib.format.open_memmap(path, 'w+', np.uint8, pixels.shape)
+            array[...] = pixels
+            array.flush()
+            del array
+        else:
+            self.get_image(pixels).save(path, 'PNG', compress_level=self.compress_level)
+
+    def get_image(self, pixels: np.ndarray) -> 'Image.Image':
+        """Returns PIL image of pixels, with palette, if this format has it"""
+        # PIL is imported on the first image, like in VisualPlane.get_image
+        from PIL import Image
+        image = Image.fromarray(pixels, 'RGB')
+        if self.palette_size is None:
+            return image
+        colors = image.getcolors(self.palette_size)
+        if colors is None:
+            # Image has more colors, than palette can keep
+            return image.quantize(self.palette_size)
+        palette_image = Image.new('P', (1, 1))
+        palette_image.putpalette([channel for _, color in colors for channel in color])
+        return image.quantize(palette=palette_image, dither=Image.Dither.NONE)
+
+
+class BackgroundEncoder:
+    """
+    Encodes and writes images in background thread, so the next image can be traced, while the previous one is encoded.
+    Queue of images is bounded, so images are submitted no faster, than they are written, if encoding is slower.
+    Errors of writing are raised by the next submit or flush.
+    """
+
+    def __init__(self, max_queued_images: int = 2) -> None:
+        if max_queued_images < 1:
+            raise ValueError(f'Max number of queued images must be positive, but {max_queued_images} was given')
+        self.max_queued_images = max_queued_images
+        self._queue: queue.Queue = queue.Queue(max_queued_images)
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def __enter__(self) -> 'BackgroundEncoder':
+        return self
+
+    def __exit__(self, *exception_info) -> None:
+        self.close()
+
+    def submit(self, pixels: np.ndarray, path: str, image_format: ImageFormat,
+               on_written: Optional[Callable[[], None]] = None) -> None:
+        """
+        Queues pixels to be written into file of given format, waiting, while queue is full.
+        Pixels must not be changed afterwards. On_written is called from encoder thread, once file is written.
+        """
+        self._raise_error()
+        if self._thread is None:
+            # Thread is started on the first image, and images, left in queue, are written before exit
+            self._thread = threading.Thread(target=self._run, name='BackgroundEncoder', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        self._queue.put((pixels, path, image_format, on_written))
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    return
+                pixels, path, image_format, on_written = task
+                if self._error is None:
+                    image_format.write(pixels, path)
+                    if on_written is not None:
+                        on_written()
+            except BaseException as error:
+                self._error = error
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def flush(self) -> None:
+        """Waits, until all queued images are written"""
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Writes queued images and stops the thread. Encoder can be used again afterwards"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            atexit.unregister(self.close)
+        self._raise_error()
@@ -0,0 +1,155 @@
+import os
+from math import ceil, floor
+from typing import TYPE_CHECKING, Any, Optional
+
+import numpy as np
+
+from plane.plane2d import Line, Plane
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+BandCoordinates = tuple[np.ndarray, np.ndarray, Any]
+
+
+def empty_band_coordinates(color: Any) -> BandCoordinates:
+    return (np.empty(0, np.int64), np.empty(0, np.int64), color)
+
+
+def blend_color_arrays(first_colors: np.ndarray, second_colors: np.ndarray,
+                       blending_coefficients: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of Color.blend_colors.
+    Colors are passed as (n, 3) arrays, blending coefficients as (n,) array.
+    """
+    blending_coefficients = blending_coefficients[:, np.newaxis]
+    blended = np.sqrt((1 - blending_coefficients)*(first_colors**2) + blending_coefficients*(second_colors**2))
+    return np.rint(blended)
+
+
+def line_samples_in_band(line: Line, first_sample: int, last_sample: int, samples_per_unit: int,
+                         first_row: int, last_row: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns rounded points of non vertical line, sampled at x = i / samples_per_unit
+    for i in [first_sample; last_sample), which lie in rows [first_row; last_row).
+    """
+    k, b = line.angle_coefficient, line.oy_segment
+    if k == 0:
+        if not (first_row <= round(b) < last_row):
+            return (np.empty(0, np.int64), np.empty(0, np.int64))
+    else:
+        # Only samples, which y may round into the band, are computed
+        x_bounds = ((first_row - 0.5 - b) / k, (last_row - 0.5 - b) / k)
+        first_sample = max(first_sample, floor(min(x_bounds)*samples_per_unit) - 1)
+        last_sample = min(last_sample, ceil(max(x_bounds)*samples_per_unit) + 2)
+    if first_sample >= last_sample:
+        return (np.empty(0, np.int64), np.empty(0, np.int64))
+    samples = np.arange(first_sample, last_sample) / samples_per_unit
+    xs = np.rint(samples).astype(np.int64)
+    ys = np.rint(k*samples + b).astype(np.int64)
+    in_band = (ys >= first_row) & (ys < last_row)
+    return (xs[in_band], ys[in_band])
+
+
+class BandRasterizer:
+    """
+    Rasterizes drawables into the plane ID buffer and RGB framebuffer, shared by all workers.
+    Canvas is split into horizontal bands, and every band is drawn in a thread pool.
+    Drawables kernels are numpy-based, so threads don't wait for each other on GIL.
+    """
+
+    def __init__(self, number_of_workers: Optional[int] = None, rows_per_band: Optional[int] = None) -> None:
+        if number_of_workers is None:
+            number_of_workers = os.cpu_count() or 1
+        if number_of_workers < 1:
+            raise ValueError(f'Number of workers must be positive, but {number_of_workers} was given')
+        if rows_per_band is not None and rows_per_band < 1:
+            raise ValueError(f'Rows per band must be positive, but {rows_per_band} was given')
+        self.number_of_workers = number_of_workers
+        self.rows_per_band = rows_per_band
+        self._executor: Optional['ThreadPoolExecutor'] = None
+
+    def get_bands(self, height: int) -> list[tuple[int, int]]:
+        """Returns list of [first_row; last_row) bands, covering plane of given height"""
+        if self.rows_per_band is None:
+            # Few bands per worker to even out bands with different amount of objects
+            rows_per_band = max(1, ceil(height / (self.number_of_workers*4)))
+        else:
+            rows_per_band = self.rows_per_band
+        return [(first_row, min(first_row + rows_per_band, height)) for first_row in range(0, height, rows_per_band)]
+
+    def get_bands_of_rows(self, rows: np.ndarray, height: int) -> list[tuple[int, int]]:
+        """Returns bands of the plane of given height, that cover all given rows and only them"""
+        rows = np.unique(np.clip(np.asarray(rows, np.int64), 0, height - 1)) if height else np.empty(0, np.int64)
+        if rows.size == 0:
+            return []
+        # Every run of consecutive rows is split like the whole plane, so all workers get some of them
+        run_starts = np.flatnonzero(np.diff(rows, prepend=rows[0] - 2) > 1)
+        run_ends = np.append(run_starts[1:], rows.size) - 1
+        rows_per_band = self.get_bands(height)[0][1]
+        bands = []
+        for first_row, last_row in zip(rows[run_starts].tolist(), (rows[run_ends] + 1).tolist()):
+            bands += [(row, min(row + rows_per_band, last_row)) for row in range(first_row, last_row, rows_per_band)]
+        return bands
+
+    def rasterize(self, plane: Plane, framebuffer: np.ndarray, drawables: list,
+                  bands: Optional[list[tuple[int, int]]] = None) -> None:
+        """
+        Draws drawables in given order, so latter ones overlap former.
+        Drawables, that blend with passed objects, are blended with colors already in framebuffer.
+        """
+        for drawable in drawables:
+            drawable.prepare_rasterization()
+        # Buffer is widened before workers start, so all of them write into the same one
+        plane.reserve_value(max([0] + [drawable.draw_id for drawable in drawables]))
+        ids = plane.get_id_buffer()
+        max_id = max([int(ids.max())] + [drawable.draw_id for drawable in drawables])
+        transparensies = np.zeros(max_id + 1)
+        for drawable in drawables:
+            transparensy = drawable.get_transparensy()
+            transparensies[drawable.draw_id] = transparensy if transparensy is not None else 0
+
+        if bands is None:
+            bands = self.get_bands(plane.height)
+        if self.number_of_workers == 1 or len(bands) == 1:
+            for band in bands:
+                self.rasterize_band(plane, framebuffer, drawables, transparensies, band)
+            return
+        if self._executor is None:
+            # Imported on first use, so trace-only and single-threaded runs don't load concurrent.futures
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(self.number_of_workers, thread_name_prefix='band-rasterizer')
+        futures = [self._executor.submit(self.rasterize_band, plane, framebuffer, drawables, transparensies, band)
+                   for band in bands]
+        for future in futures:
+            future.result()
+
+    @staticmethod
+    def rasterize_band(plane: Plane, framebuffer: np.ndarray, drawables: list,
+                       transparensies: np.ndarray, band: tuple[int, int]) -> None:
+        first_row, last_row = band
+        ids = plane.get_id_buffer()
+        width = ids.shape[1]
+        for drawable in drawables:
+            xs, ys, colors = drawable.get_band_coordinates(first_row, last_row)
+            in_plane = (xs >= 0) & (xs < width)
+            if not in_plane.all():
+                xs, ys = xs[in_plane], ys[in_plane]
+                if np.ndim(colors) == 2:
+                    colors = colors[in_plane]
+            if xs.size == 0:
+                continue
+            if drawable.blends_with_passed_objects:
+                colors = np.array(np.broadcast_to(colors, (xs.size, 3)), np.float64)
+                passed_ids = ids[ys, xs]
+                passed = passed_ids != 0
+                if passed.any():
+                    passed_colors = framebuffer[ys[passed], xs[passed]].astype(np.float64)
+                    colors[passed] = blend_color_arrays(colors[passed], passed_colors, 1 - transparensies[passed_ids[passed]])
+            ids[ys, xs] = drawable.draw_id
+            framebuffer[ys, xs] = colors
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
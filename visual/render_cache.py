@@ -0,0 +1,151 @@
+import hashlib
+import os
+import shutil
+from typing import Any, Callable
+
+import numpy as np
+
+from optical.detectors import Detector, PolygonDetector, SegmentDetector
+from optical.light_beam import LightBeam
+from optical.ray_scheduler import RayTreeScheduler
+
+# Must be changed with every change of tracing or rendering, that changes resulting images
+ENGINE_VERSION = '5'
+
+# State of objects, which attributes change while they are traced, or which are defined by fewer attributes
+FINGERPRINT_STATES: dict[type, Callable[[Any], dict[str, Any]]] = {
+    LightBeam: lambda beam: {'origin': beam.origin, 'angle': beam.initial_angle,
+                             'refraction_coefficient': beam.initial_refraction_coefficient,
+                             'max_bounces': beam.max_number_of_bounces, 'wavelength': beam.wavelength},
+    RayTreeScheduler: lambda scheduler: {'intensity_treshold': scheduler.intensity_treshold,
+                                         'ray_budget': scheduler.ray_budget},
+    # Detector lines refer back to their detector, and histograms are filled by tracing, so only geometry is taken
+    Detector: lambda detector: {'geometry': detector.endpoints if isinstance(detector, SegmentDetector)
+                                            else detector.vertexes if isinstance(detector, PolygonDetector) else None,
+                                'number_of_position_bins': detector.number_of_position_bins,
+                                'number_of_angle_bins': detector.number_of_angle_bins, 'absorbing': detector.absorbing},
+}
+
+
+def get_fingerprint(value: Any) -> str:
+    """
+    Returns sha256 of canonical representation of the value, which is the same between runs.
+    Objects are represented by their class and public attributes, except callables.
+    Transparensy is taken from get_transparensy, because it is stored only in it.
+    """
+    digest = hashlib.sha256()
+    _update_fingerprint(digest, value, set())
+    return digest.hexdigest()
+
+
+def _update_fingerprint(digest: 'hashlib._Hash', value: Any, path: set[int]) -> None:
+    if value is None or isinstance(value, (bool, int, str)):
+        digest.update(f'{type(value).__name__}:{value!r};'.encode())
+    elif isinstance(value, float):
+        digest.update(f'float:{value!r};'.encode())
+    elif isinstance(value, np.generic):
+        _update_fingerprint(digest, value.item(), path)
+    elif isinstance(value, np.ndarray):
+        digest.update(f'ndarray:{value.dtype.str}:{value.shape};'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    else:
+        if id(value) in path:
+            raise ValueError(f'Can\'t fingerprint value with reference cycle: {value!r}')
+        path.add(id(value))
+        if isinstance(value, (list, tuple)):
+            digest.update(f'{type(value).__name__}:{len(value)}['.encode())
+            for item in value:
+                _update_fingerprint(digest, item, path)
+            digest.update(b']')
+        elif isinstance(value, dict):
+            digest.update(f'dict:{len(value)}{{'.encode())
+            for key in sorted(value, key=repr):
+                _update_fingerprint(digest, key, path)
+                _update_fingerprint(digest, value[key], path)
+            digest.update(b'}')
+        else:
+            cls = type(value)
+            digest.update(f'{cls.__module__}.{cls.__qualname__}'.encode())
+            _update_fingerprint(digest, _get_fingerprint_state(value), path)
+        path.remove(id(value))
+
+
+def _get_fingerprint_state(value: Any) -> dict[str, Any]:
+    for cls, get_state in FINGERPRINT_STATES.items():
+        if isinstance(value, cls):
+            return get_state(value)
+    state = {key: attribute for key, attribute in vars(value).items()
+             if not key.startswith('_') and not callable(attribute)}
+    if hasattr(value, 'get_transparensy'):
+        state['transparensy'] = value.get_transparensy()
+    return state
+
+
+class RenderCache:
+    """
+    On-disk cache of rendered files, addressed by fingerprint of everything, that the result depends on.
+    When total size of files exceeds max size, least recently used files are evicted.
+    """
+
+    def __init__(self, path: str, max_size: int = 512 * 1024 * 1024) -> None:
+        if max_size < 0:
+            raise ValueError(f'Max size must be non-negative, but {max_size} was given')
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    def get_key(self, *values: Any) -> str:
+        """Returns key for result, that depends on given values and engine version"""
+        return get_fingerprint((ENGINE_VERSION, values))
+
+    def _get_entry_path(self, key: str, file_path: str) -> str:
+        return os.path.join(self.path, key + os.path.splitext(file_path)[1])
+
+    def restore(self, key: str, destination: str) -> bool:
+        """Copies cached file with given key to destination. Returns False, if there is no such file."""
+        entry_path = self._get_entry_path(key, destination)
+        try:
+            shutil.copyfile(entry_path, destination)
+        except FileNotFoundError:
+            return False
+        # Modification time is used as time of last access for eviction
+        os.utime(entry_path)
+        return True
+
+    def store(self, key: str, source: str) -> None:
+        """Puts copy of the file into cache under given key"""
+        entry_path = self._get_entry_path(key, source)
+        # File is replaced atomically, so concurrent readers never see partially written entry
+        temporary_path = f'{entry_path}.{os.getpid()}.tmp'
+        shutil.copyfile(source, temporary_path)
+        os.replace(temporary_path, entry_path)
+        self.evict()
+
+    def invalidate(self, key: str) -> bool:
+        """Removes cached files with given key. Returns False, if there were no such files."""
+        removed = False
+        for entry in self._get_entries():
+            if os.path.basename(entry.path).split('.')[0] == key:
+                os.remove(entry.path)
+                removed = True
+        return removed
+
+    def clear(self) -> None:
+        for entry in self._get_entries():
+            os.remove(entry.path)
+
+    def get_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._get_entries())
+
+    def evict(self) -> None:
+        """Removes least recently used files, until total size doesn't exceed max size"""
+        entries = sorted(self._get_entries(), key=lambda entry: entry.stat().st_mtime)
+        total_size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if total_size <= self.max_size:
+                break
+            total_size -= entry.stat().st_size
+            os.remove(entry.path)
+
+    def _get_entries(self) -> list[os.DirEntry]:
+        return [entry for entry in os.scandir(self.path) if entry.is_file() and not entry.name.endswith('.tmp')]
@@ -0,0 +1,327 @@
+"""
+Long-running local render server.
+
+Scenes are posted as JSON (see visual.scene_description) to POST /render over HTTP on TCP or Unix socket,
+and PNG image or JSON trace data is returned. Requests are queued and rendered by a pool of warm worker processes,
+requests, that wait in the queue together, are sent to a worker in one batch.
+When the queue is full, server answers 503 right away instead of accepting more work.
+Requests, which client disconnected or which exceeded timeout, are cancelled, if they haven't been started yet.
+
+Run with: python -m visual.render_server --port 8765 (or --unix-socket /path/to/socket)
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from io import BytesIO
+from typing import Any, Optional
+
+from visual.scene_description import build_scene
+
+RenderResult = tuple[int, str, bytes]
+
+# Scene, rendered by every worker on start, so imports and numpy code paths are warm for the first request
+WARM_UP_SCENE = {'width': 8, 'beams': [{'origin': [4, 4], 'angle': 30}]}
+
+
+def render_scene(description: dict) -> RenderResult:
+    """
+    Renders scene of given description and returns HTTP status, content type and body.
+    Description may contain "output" ("png" by default, or "trace") and, if scene has groups,
+    name of the "group" to render.
+    """
+    output = description.get('output', 'png')
+    if output not in ('png', 'trace'):
+        raise ValueError(f'Output must be "png" or "trace", but {output!r} was given')
+    scene = build_scene(description, number_of_raster_workers=1)
+    if scene.using_groups:
+        image_name = description.get('group')
+        if image_name not in scene.image_groups:
+            raise ValueError(f'Group must be one of {list(scene.image_groups)}, but {image_name!r} was given')
+        scene.render_image(str(image_name))
+    else:
+        scene.render_image()
+
+    if output == 'png':
+        image_file = BytesIO()
+        scene.visual_plane.get_image().save(image_file, 'PNG')
+        return (HTTPStatus.OK, 'image/png', image_file.getvalue())
+    # Accumulated beams keep only the last points of their paths, so only bound beams have full traces
+    trace = {
+        'width': scene.visual_plane.plane.width,
+        'height': scene.visual_plane.plane.height,
+        'beams': [{'color': list(visual_beam.color), 'intensity': visual_beam.beam.relative_intensity,
+                   'wavelength': visual_beam.beam.wavelength,
+                   'points': [[point.x, point.y] for point in visual_beam.beam.coordinates]}
+                  for visual_beam in [*scene.visual_beams, *scene.spectral_visual_beams]
+                  if visual_beam.radiance_buffer is None],
+    }
+    return (HTTPStatus.OK, 'application/json', json.dumps(trace).encode())
+
+
+def render_batch(descriptions: list[dict]) -> list[RenderResult]:
+    """Renders every scene in worker process, errors of one scene don't affect the others"""
+    results = []
+    for description in descriptions:
+        try:
+            results.append(render_scene(description))
+        except (ValueError, TypeError, KeyError) as error:
+            results.append(_get_error_result(HTTPStatus.BAD_REQUEST, str(error)))
+        except Exception as error:
+            results.append(_get_error_result(HTTPStatus.INTERNAL_SERVER_ERROR, f'{type(error).__name__}: {error}'))
+    return results
+
+
+def _warm_up_worker() -> None:
+    render_scene(WARM_UP_SCENE)
+
+
+def _get_error_result(status: int, message: str) -> RenderResult:
+    return (status, 'application/json', json.dumps({'error': message}).encode())
+
+
+class _RenderRequest:
+    def __init__(self, description: dict, result: asyncio.Future) -> None:
+        self.description = description
+        self.result = result
+
+
+class RenderServer:
+    """
+    Asyncio HTTP front end for pool of render worker processes.
+    Every worker has a dispatcher, that takes up to max_batch_size queued requests
+    (waiting batch_window seconds for more of them) and sends them to the pool at once.
+    """
+
+    # Requests with greater body are rejected
+    MAX_BODY_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, *, host: str = '127.0.0.1', port: int = 8765, unix_socket_path: Optional[str] = None,
+                 number_of_workers: Optional[int] = None, max_batch_size: int = 8, batch_window: float = 0.005,
+                 max_queue_size: int = 64, request_timeout: float = 60) -> None:
+        if number_of_workers is None:
+            number_of_workers = os.cpu_count() or 1
+        if number_of_workers < 1:
+            raise ValueError(f'Number of workers must be positive, but {number_of_workers} was given')
+        if max_batch_size < 1:
+            raise ValueError(f'Max batch size must be positive, but {max_batch_size} was given')
+        if max_queue_size < 1:
+            raise ValueError(f'Max queue size must be positive, but {max_queue_size} was given')
+        self.host = host
+        self.port = port
+        self.unix_socket_path = unix_socket_path
+        self.number_of_workers = number_of_workers
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_queue_size = max_queue_size
+        self.request_timeout = request_timeout
+        self.statistics = {'accepted': 0, 'rejected': 0, 'cancelled': 0, 'completed': 0, 'batches': 0}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatchers: list[asyncio.Task] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._executor = ProcessPoolExecutor(self.number_of_workers, initializer=_warm_up_worker)
+        # Workers are started now, not on the first request
+        await asyncio.gather(*[loop.run_in_executor(self._executor, render_batch, [])
+                               for _ in range(self.number_of_workers)])
+        self._queue = asyncio.Queue(self.max_queue_size)
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.number_of_workers)]
+        if self.unix_socket_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, self.unix_socket_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for dispatcher in self._dispatchers:
+            dispatcher.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        self._dispatchers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, description: dict, timeout: Optional[float] = None) -> RenderResult:
+        """
+        Queues scene and waits for its result. Raises asyncio.QueueFull, if the queue is full,
+        and asyncio.TimeoutError, if the scene wasn't rendered in time.
+        If the waiting is cancelled, the scene is dropped, unless its rendering has started.
+        """
+        request = _RenderRequest(description, asyncio.get_running_loop().create_future())
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            self.statistics['rejected'] += 1
+            raise
+        self.statistics['accepted'] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(request.result),
+                                          timeout if timeout is not None else self.request_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            if request.result.cancel():
+                self.statistics['cancelled'] += 1
+            raise
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch_size:
+                if self._queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(self._queue.get_nowait())
+            batch = [request for request in batch if not request.result.done()]
+            if not batch:
+                continue
+            self.statistics['batches'] += 1
+            try:
+                results = await loop.run_in_executor(self._executor, render_batch,
+                                                     [request.description for request in batch])
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                results = [_get_error_result(HTTPStatus.INTERNAL_SERVER_ERROR, f'{type(error).__name__}: {error}')]*len(batch)
+            for request, result in zip(batch, results):
+                if not request.result.done():
+                    request.result.set_result(result)
+                    self.statistics['completed'] += 1
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            result = await self._handle_request(reader)
+            if result is not None:
+                writer.write(self._format_response(*result))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader: asyncio.StreamReader) -> Optional[RenderResult]:
+        """Returns response for the request, or None, if client has disconnected before it was ready"""
+        try:
+            method, path, body = await self._read_request(reader)
+        except ValueError as error:
+            return _get_error_result(HTTPStatus.BAD_REQUEST, str(error))
+        if path == '/health':
+            if method != 'GET':
+                return _get_error_result(HTTPStatus.METHOD_NOT_ALLOWED, 'Use GET for /health')
+            health = {**self.statistics, 'queued': self._queue.qsize(), 'workers': self.number_of_workers}
+            return (HTTPStatus.OK, 'application/json', json.dumps(health).encode())
+        if path != '/render':
+            return _get_error_result(HTTPStatus.NOT_FOUND, f'Unknown path: {path}')
+        if method != 'POST':
+            return _get_error_result(HTTPStatus.METHOD_NOT_ALLOWED, 'Use POST for /render')
+        try:
+            description = json.loads(body)
+        except ValueError as error:
+            return _get_error_result(HTTPStatus.BAD_REQUEST, f'Invalid JSON: {error}')
+        if not isinstance(description, dict):
+            return _get_error_result(HTTPStatus.BAD_REQUEST, 'Scene description must be a JSON object')
+        timeout = description.get('timeout')
+        if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+                                    or not (0 < timeout < math.inf)):
+            return _get_error_result(HTTPStatus.BAD_REQUEST, f'Timeout must be a positive number of seconds, but {timeout!r} was given')
+
+        render = asyncio.ensure_future(self.render(description, timeout))
+        # Client, that closes connection, doesn't wait for the result anymore
+        disconnect = asyncio.ensure_future(self._wait_for_disconnect(reader))
+        try:
+            await asyncio.wait({render, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            disconnect.cancel()
+        if not render.done():
+            render.cancel()
+            await asyncio.gather(render, return_exceptions=True)
+            return None
+        try:
+            return render.result()
+        except asyncio.QueueFull:
+            return _get_error_result(HTTPStatus.SERVICE_UNAVAILABLE, 'Render queue is full, try again later')
+        except asyncio.TimeoutError:
+            return _get_error_result(HTTPStatus.GATEWAY_TIMEOUT, 'Scene was not rendered in time')
+
+    @staticmethod
+    async def _wait_for_disconnect(reader: asyncio.StreamReader) -> None:
+        """
+        Returns, once client closes connection. Bytes after the request (like trailing CRLF or pipelined request)
+        are skipped, because connection is closed after the response anyway.
+        """
+        while await reader.read(4096):
+            pass
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise ValueError('Malformed request line')
+        method, path, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        content_length = int(headers.get('content-length', 0))
+        if not (0 <= content_length <= self.MAX_BODY_SIZE):
+            raise ValueError(f'Content length must be in [0; {self.MAX_BODY_SIZE}], but {content_length} was given')
+        body = await reader.readexactly(content_length) if content_length else b''
+        return (method.upper(), path.split('?')[0], body)
+
+    @staticmethod
+    def _format_response(status: int, content_type: str, body: bytes) -> bytes:
+        status = HTTPStatus(status)
+        headers = [f'HTTP/1.1 {status.value} {status.phrase}', f'Content-Type: {content_type}',
+                   f'Content-Length: {len(body)}', 'Connection: close']
+        if status == HTTPStatus.SERVICE_UNAVAILABLE:
+            headers.append('Retry-After: 1')
+        return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body
+
+
+def main(arguments: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Local render server for LightBeamSceneManager scenes')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix-socket', default=None, help='serve on Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-queue-size', type=int, default=64)
+    parser.add_argument('--timeout', type=float, default=60, help='default request timeout in seconds')
+    parsed: Any = parser.parse_args(arguments)
+    server = RenderServer(host=parsed.host, port=parsed.port, unix_socket_path=parsed.unix_socket,
+                          number_of_workers=parsed.workers, max_batch_size=parsed.max_batch_size,
+                          max_queue_size=parsed.max_queue_size, request_timeout=parsed.timeout)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
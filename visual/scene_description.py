@@ -0,0 +1,423 @@
+"""
+Scenes for LightBeamSceneManager, described by JSON-compatible dictionaries:
+
+{
+    "width": 1000, "height": 1000, "background_color": "BLACK",
+    "options": {"accumulate_beams": false, "exposure": null, "refraction_coefficients_management": true,
+                "use_distance_field": false, "distance_field_cell_size": 4,
+                "ray_scheduler": {"intensity_treshold": 0.02, "ray_budget": 10000}},
+    "beams": [{"origin": [300, 300], "angle": 85, "color": "BLUE", "draw_source": true, "max_bounces": 100},
+              {"origin": [100, 500], "angle": 0, "wavelengths": [450, 550, 650]}],
+    "points": [{"point": [10, 10], "color": [255, 0, 0]}],
+    "lines": [{"type": "refraction", "point": [500, 500], "angle": -50,
+               "left_refraction_coefficient": 1, "right_refraction_coefficient": 1.6, "color": "GREEN"}],
+    "line_segments": [{"type": "reflection", "first_point": [410, 290], "second_point": [520, 120],
+                       "reflection_coefficient": 0.3, "color": "MAGENTA"}],
+    "polygons": [{"type": "refraction", "vertexes": [[410, 290], [520, 120], [390, 120]],
+                  "inner_refraction_coefficient": {"cauchy": [1.5046, 0.0042]}, "transparensy": 0.8, "color": "GREEN"}],
+    "circles": [{"type": "refraction", "centre": [500, 500], "radius": 100,
+                 "inner_refraction_coefficient": 1.5, "draw_only_circumference": false, "color": "AQUA"}],
+    "sources": [{"type": "point", "origin": [100, 100], "angle": 0, "number_of_beams": 1000, "seed": 1,
+                 "color": "YELLOW"}],
+    "arcs": [{"type": "reflection", "centre": [800, 200], "radius": 150, "start_angle": 120, "end_angle": 240,
+              "color": "WHITE"}],
+    "lenses": [{"type": "refraction", "shape": "biconvex", "centre": [500, 800], "aperture": 120,
+                "first_radius": 150, "second_radius": 150, "edge_thickness": 0, "angle_from_ox": 0,
+                "inner_refraction_coefficient": "BK7_GLASS", "color": "AQUA"}],
+    "conics": [{"type": "reflection", "shape": "parabola", "vertex": [950, 500], "focal_length": 100,
+                "aperture": 300, "angle_from_ox": 180, "color": "WHITE"}],
+    "scene_graphs": [{"prototypes": {"prism": {"kind": "polygons", "type": "refraction",
+                                               "vertexes": [[0, 0], [20, 0], [10, 17]], "inner_refraction_coefficient": 1.5}},
+                      "instances": [{"prototype": "prism", "transforms": [{"translation": [100, 900]},
+                                                                          {"translation": [140, 900], "rotation": 180}]}],
+                      "nodes": [{"transform": {"translation": [0, -100]}, "instances": [...], "nodes": [...]}],
+                      "color": "GREEN"}]
+}
+
+Every object kind is optional. Instead of objects on the top level, scene may have "groups":
+dictionary of image names to objects of every image, same as image groups of LightBeamSceneManager.
+Types of lines, segments, polygons, circles and arcs are "plain" (default), "reflection" and "refraction",
+line segments and polygons may also be "detector" (with "position_bins", "angle_bins" and "absorbing"),
+lenses are "plain" or "refraction". Shapes of lenses are "biconvex", "plano_convex" (with "radius"),
+"meniscus" (with "convex_radius" and "concave_radius") and "general" (with signed radiuses of Lens).
+Types of conics are the same, as of arcs. Shapes of conics are "parabola", "ellipse" (with "centre"
+or "foci", and optional "x_range"), "hyperbola" and "general" (with "origin", "coefficients" and "bounds" of Conic).
+Prototypes of scene graphs are described as objects of given "kind" (without color), and every instance and node
+may have transform: "scale" (number or [x, y]), "rotation" in degrees and "translation", applied in this order.
+Colors are either [red, green, blue] lists or names of Color constants, null means Color.NONE.
+Beams with "wavelengths" (list of nanometres, or number of evenly spaced visible wavelengths)
+are spectral beams, colored by wavelengths. Refraction coefficients are either numbers,
+names of dispersion constants ("BK7_GLASS", "FUSED_SILICA"), {"cauchy": [a, b, c]}
+or {"sellmeier": {"b": [...], "c": [...]}}.
+"""
+
+from typing import Any, Callable, Optional, Union
+
+from optical import dispersion
+from optical.detectors import PolygonDetector, SegmentDetector
+from optical.dispersion import CauchyDispersion, DispersionModel, RefractionCoefficientType, SellmeierDispersion
+from optical.light_beam import LightBeam
+from optical.light_sources import AreaLightSource, LightSource, LineLightSource, PointLightSource
+from optical.opticalfigures import (ReflectionArc, ReflectionCircle, ReflectionConic, ReflectionPolygon, RefractionArc,
+                                   RefractionCircle, RefractionConic, RefractionLens, RefractionPolygon)
+from optical.opticallines import ReflectionLine, ReflectionSegment, RefractionLine, RefractionSegment
+from optical.ray_scheduler import RayTreeScheduler
+from optical.scene_graph import Prototype, SceneGraph, SceneNode
+from optical.spectral_tracer import SpectralBeam
+from plane.conics2d import Conic, Ellipse, Hyperbola, Parabola
+from plane.plane2d import Cirlce, Line, LineSegment, Point, Polygon
+from plane.polygons2d import Arc, BiconvexLens, Lens, MeniscusLens, PlanoConvexLens
+from plane.transforms2d import AffineTransform
+from visual.visual2d import Color, ColorType, VisualPlane
+from visual.visuallight import LightBeamSceneManager, SceneGroup
+
+SCENE_OBJECT_KINDS = ('beams', 'points', 'lines', 'line_segments', 'polygons', 'circles', 'sources', 'arcs', 'lenses',
+                      'conics', 'scene_graphs')
+
+
+def parse_point(value: Any) -> Point:
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError(f'Point must be a list of two coordinates, but {value!r} was given')
+    return Point(float(value[0]), float(value[1]))
+
+
+def parse_color(value: Any) -> ColorType:
+    if value is None:
+        return Color.NONE
+    if isinstance(value, str):
+        color = getattr(Color, value.upper(), None)
+        if not isinstance(color, tuple):
+            raise ValueError(f'Unknown color: {value!r}')
+        return color
+    if not isinstance(value, (list, tuple)) or len(value) != 3 or not all(0 <= channel <= 255 for channel in value):
+        raise ValueError(f'Color must be a name or a list of three channels in [0; 255], but {value!r} was given')
+    return (int(value[0]), int(value[1]), int(value[2]))
+
+
+def _get_type(description: dict) -> str:
+    return description.get('type', 'plain')
+
+
+def _get_required(description: dict, key: str) -> Any:
+    if key not in description:
+        raise ValueError(f'Missing "{key}" in {description!r}')
+    return description[key]
+
+
+def parse_refraction_coefficient(value: Any) -> RefractionCoefficientType:
+    if isinstance(value, str):
+        model = getattr(dispersion, value.upper(), None)
+        if not isinstance(model, DispersionModel):
+            raise ValueError(f'Unknown dispersion model: {value!r}')
+        return model
+    if isinstance(value, dict) and set(value) == {'cauchy'}:
+        return CauchyDispersion(*(float(coefficient) for coefficient in value['cauchy']))
+    if isinstance(value, dict) and set(value) == {'sellmeier'}:
+        return SellmeierDispersion([float(b) for b in _get_required(value['sellmeier'], 'b')],
+                                   [float(c) for c in _get_required(value['sellmeier'], 'c')])
+    if isinstance(value, dict):
+        raise ValueError(f'Dispersion must be given as {{"cauchy": ...}} or {{"sellmeier": ...}}, but {value!r} was given')
+    return float(value)
+
+
+def _get_refraction_coefficient(description: dict, key: str, default: Any = None) -> RefractionCoefficientType:
+    value = description.get(key, default) if default is not None else _get_required(description, key)
+    return parse_refraction_coefficient(value)
+
+
+def parse_beam(description: dict) -> tuple[Union[LightBeam, SpectralBeam], ColorType, bool]:
+    origin = parse_point(_get_required(description, 'origin'))
+    angle = float(_get_required(description, 'angle'))
+    max_bounces = int(description.get('max_bounces', 100))
+    wavelengths = description.get('wavelengths')
+    if wavelengths is None:
+        beam = LightBeam(origin, angle, max_bounces=max_bounces)
+    elif isinstance(wavelengths, int):
+        beam = SpectralBeam.construct_visible(origin, angle, wavelengths, max_bounces=max_bounces)
+    else:
+        beam = SpectralBeam(origin, angle, [float(wavelength) for wavelength in wavelengths], max_bounces=max_bounces)
+    return (beam, parse_color(description.get('color', 'WHITE')), bool(description.get('draw_source', False)))
+
+
+def parse_scene_point(description: dict) -> tuple[Point, ColorType]:
+    return (parse_point(_get_required(description, 'point')), parse_color(description.get('color', 'WHITE')))
+
+
+def parse_line(description: dict) -> tuple[Line, ColorType]:
+    point = parse_point(_get_required(description, 'point'))
+    angle = float(_get_required(description, 'angle'))
+    line_type = _get_type(description)
+    if line_type == 'plain':
+        line = Line(point, angle=angle)
+    elif line_type == 'reflection':
+        line = ReflectionLine(point, float(description.get('reflection_coefficient', 1)), angle)
+    elif line_type == 'refraction':
+        line = RefractionLine(point, _get_refraction_coefficient(description, 'left_refraction_coefficient'),
+                              _get_refraction_coefficient(description, 'right_refraction_coefficient'), angle,
+                              transparensy=float(description.get('transparensy', 1)))
+    else:
+        raise ValueError(f'Unknown line type: {line_type!r}')
+    return (line, parse_color(description.get('color', 'WHITE')))
+
+
+def _get_detector_options(description: dict) -> tuple[int, int, bool]:
+    return (int(description.get('position_bins', 100)), int(description.get('angle_bins', 1)),
+            bool(description.get('absorbing', True)))
+
+
+def parse_line_segment(description: dict) -> tuple[LineSegment, ColorType]:
+    first_point = parse_point(_get_required(description, 'first_point'))
+    second_point = parse_point(_get_required(description, 'second_point'))
+    segment_type = _get_type(description)
+    if segment_type == 'plain':
+        segment = LineSegment(first_point, second_point)
+    elif segment_type == 'reflection':
+        segment = ReflectionSegment(first_point, second_point, float(description.get('reflection_coefficient', 1)))
+    elif segment_type == 'refraction':
+        segment = RefractionSegment(first_point, second_point,
+                                    _get_refraction_coefficient(description, 'left_refraction_coefficient'),
+                                    _get_refraction_coefficient(description, 'right_refraction_coefficient'),
+                                    transparensy=float(description.get('transparensy', 1)))
+    elif segment_type == 'detector':
+        segment = SegmentDetector(first_point, second_point, *_get_detector_options(description))
+    else:
+        raise ValueError(f'Unknown line segment type: {segment_type!r}')
+    return (segment, parse_color(description.get('color', 'WHITE')))
+
+
+def parse_polygon(description: dict) -> tuple[Polygon, ColorType]:
+    vertexes = [parse_point(vertex) for vertex in _get_required(description, 'vertexes')]
+    polygon_type = _get_type(description)
+    if polygon_type == 'plain':
+        polygon = Polygon(vertexes)
+    elif polygon_type == 'reflection':
+        polygon = ReflectionPolygon(vertexes, float(description.get('reflection_coefficient', 1)))
+    elif polygon_type == 'refraction':
+        polygon = RefractionPolygon(vertexes, _get_refraction_coefficient(description, 'inner_refraction_coefficient'),
+                                    _get_refraction_coefficient(description, 'outer_refraction_coefficient', 1),
+                                    transparensy=float(description.get('transparensy', 1)))
+    elif polygon_type == 'detector':
+        polygon = PolygonDetector(vertexes, *_get_detector_options(description))
+    else:
+        raise ValueError(f'Unknown polygon type: {polygon_type!r}')
+    return (polygon, parse_color(description.get('color', 'WHITE')))
+
+
+def parse_circle(description: dict) -> tuple[Cirlce, ColorType, bool]:
+    centre = parse_point(_get_required(description, 'centre'))
+    radius = float(_get_required(description, 'radius'))
+    circle_type = _get_type(description)
+    if circle_type == 'plain':
+        circle = Cirlce(centre, radius)
+    elif circle_type == 'reflection':
+        circle = ReflectionCircle(centre, radius, float(description.get('reflection_coefficient', 1)))
+    elif circle_type == 'refraction':
+        circle = RefractionCircle(centre, radius, _get_refraction_coefficient(description, 'inner_refraction_coefficient'),
+                                  _get_refraction_coefficient(description, 'outer_refraction_coefficient', 1))
+    else:
+        raise ValueError(f'Unknown circle type: {circle_type!r}')
+    return (circle, parse_color(description.get('color', 'WHITE')), bool(description.get('draw_only_circumference', False)))
+
+
+def parse_arc(description: dict) -> tuple[Arc, ColorType]:
+    centre = parse_point(_get_required(description, 'centre'))
+    radius = float(_get_required(description, 'radius'))
+    start_angle = float(_get_required(description, 'start_angle'))
+    end_angle = float(_get_required(description, 'end_angle'))
+    arc_type = _get_type(description)
+    if arc_type == 'plain':
+        arc = Arc(centre, radius, start_angle, end_angle)
+    elif arc_type == 'reflection':
+        arc = ReflectionArc(centre, radius, start_angle, end_angle, float(description.get('reflection_coefficient', 1)))
+    elif arc_type == 'refraction':
+        arc = RefractionArc(centre, radius, start_angle, end_angle,
+                            _get_refraction_coefficient(description, 'inner_refraction_coefficient'),
+                            _get_refraction_coefficient(description, 'outer_refraction_coefficient', 1),
+                            transparensy=float(description.get('transparensy', 1)))
+    else:
+        raise ValueError(f'Unknown arc type: {arc_type!r}')
+    return (arc, parse_color(description.get('color', 'WHITE')))
+
+
+def parse_lens(description: dict) -> tuple[Lens, ColorType]:
+    centre = parse_point(_get_required(description, 'centre'))
+    aperture = float(_get_required(description, 'aperture'))
+    keywords = {'edge_thickness': float(description.get('edge_thickness', 0)),
+                'angle_from_ox': float(description.get('angle_from_ox', 0))}
+    shape = description.get('shape', 'general')
+    if shape == 'biconvex':
+        second_radius = description.get('second_radius')
+        lens = BiconvexLens(centre, aperture, float(_get_required(description, 'first_radius')),
+                            float(second_radius) if second_radius is not None else None, **keywords)
+    elif shape == 'plano_convex':
+        lens = PlanoConvexLens(centre, aperture, float(_get_required(description, 'radius')), **keywords)
+    elif shape == 'meniscus':
+        lens = MeniscusLens(centre, aperture, float(_get_required(description, 'convex_radius')),
+                            float(_get_required(description, 'concave_radius')), **keywords)
+    elif shape == 'general':
+        lens = Lens(centre, aperture, float(_get_required(description, 'first_radius')),
+                    float(_get_required(description, 'second_radius')), **keywords)
+    else:
+        raise ValueError(f'Unknown lens shape: {shape!r}')
+    lens_type = _get_type(description)
+    if lens_type == 'refraction':
+        lens = RefractionLens.from_lens(lens, _get_refraction_coefficient(description, 'inner_refraction_coefficient'),
+                                        _get_refraction_coefficient(description, 'outer_refraction_coefficient', 1),
+                                        transparensy=float(description.get('transparensy', 1)))
+    elif lens_type != 'plain':
+        raise ValueError(f'Unknown lens type: {lens_type!r}')
+    return (lens, parse_color(description.get('color', 'WHITE')))
+
+
+def parse_conic(description: dict) -> tuple[Conic, ColorType]:
+    angle_from_ox = float(description.get('angle_from_ox', 0))
+    shape = description.get('shape', 'general')
+    if shape == 'parabola':
+        conic = Parabola(parse_point(_get_required(description, 'vertex')), float(_get_required(description, 'focal_length')),
+                         float(_get_required(description, 'aperture')), angle_from_ox)
+    elif shape == 'ellipse':
+        x_range = description.get('x_range')
+        if x_range is not None:
+            x_range = (float(x_range[0]), float(x_range[1]))
+        semi_major_axis = float(_get_required(description, 'semi_major_axis'))
+        if 'foci' in description:
+            first_focus, second_focus = (parse_point(focus) for focus in description['foci'])
+            conic = Ellipse.construct_by_foci(first_focus, second_focus, semi_major_axis, x_range)
+        else:
+            conic = Ellipse(parse_point(_get_required(description, 'centre')), semi_major_axis,
+                            float(_get_required(description, 'semi_minor_axis')), angle_from_ox, x_range)
+    elif shape == 'hyperbola':
+        conic = Hyperbola(parse_point(_get_required(description, 'centre')),
+                          float(_get_required(description, 'semi_major_axis')),
+                          float(_get_required(description, 'semi_minor_axis')),
+                          float(_get_required(description, 'aperture')), angle_from_ox)
+    elif shape == 'general':
+        conic = Conic(parse_point(_get_required(description, 'origin')),
+                      tuple(float(coefficient) for coefficient in _get_required(description, 'coefficients')),
+                      tuple(float(bound) for bound in _get_required(description, 'bounds')), angle_from_ox)
+    else:
+        raise ValueError(f'Unknown conic shape: {shape!r}')
+    conic_type = _get_type(description)
+    if conic_type == 'reflection':
+        conic = ReflectionConic.from_conic(conic, float(description.get('reflection_coefficient', 1)))
+    elif conic_type == 'refraction':
+        conic = RefractionConic.from_conic(conic, _get_refraction_coefficient(description, 'inner_refraction_coefficient'),
+                                           _get_refraction_coefficient(description, 'outer_refraction_coefficient', 1),
+                                           transparensy=float(description.get('transparensy', 1)))
+    elif conic_type != 'plain':
+        raise ValueError(f'Unknown conic type: {conic_type!r}')
+    return (conic, parse_color(description.get('color', 'WHITE')))
+
+
+def parse_source(description: dict) -> tuple[LightSource, ColorType]:
+    angle = float(_get_required(description, 'angle'))
+    number_of_beams = int(_get_required(description, 'number_of_beams'))
+    keywords = {'seed': description.get('seed', None), 'chunk_size': int(description.get('chunk_size', 1024))}
+    if 'angular_spread' in description:
+        keywords['angular_spread'] = float(description['angular_spread'])
+    source_type = _get_type(description)
+    if source_type == 'point':
+        source = PointLightSource(parse_point(_get_required(description, 'origin')), angle, number_of_beams, **keywords)
+    elif source_type == 'line':
+        source = LineLightSource(parse_point(_get_required(description, 'first_point')),
+                                 parse_point(_get_required(description, 'second_point')),
+                                 angle, number_of_beams, **keywords)
+    elif source_type == 'area':
+        source = AreaLightSource(parse_point(_get_required(description, 'origin')),
+                                 float(_get_required(description, 'width')), float(_get_required(description, 'height')),
+                                 angle, number_of_beams, **keywords)
+    else:
+        raise ValueError(f'Unknown light source type: {source_type!r}')
+    return (source, parse_color(description.get('color', 'WHITE')))
+
+
+def parse_transform(description: dict) -> AffineTransform:
+    scale = description.get('scale', 1)
+    x_scale, y_scale = (float(scale), float(scale)) if isinstance(scale, (int, float)) else (float(scale[0]), float(scale[1]))
+    translation = parse_point(description.get('translation', [0, 0]))
+    return (AffineTransform.translation(translation.x, translation.y)
+            @ AffineTransform.rotation(float(description.get('rotation', 0)))
+            @ AffineTransform.scaling(x_scale, y_scale))
+
+
+def _parse_scene_node(description: dict, node: SceneNode, prototypes: dict[str, Prototype]) -> None:
+    for instances_description in description.get('instances', []):
+        name = _get_required(instances_description, 'prototype')
+        if name not in prototypes:
+            raise ValueError(f'Unknown prototype: {name!r}')
+        node.add_instances(prototypes[name], [parse_transform(transform_description)
+                                              for transform_description in _get_required(instances_description, 'transforms')])
+    for node_description in description.get('nodes', []):
+        _parse_scene_node(node_description, node.add_node(parse_transform(node_description.get('transform', {}))), prototypes)
+
+
+def parse_scene_graph(description: dict) -> tuple[SceneGraph, ColorType]:
+    prototypes = {}
+    for name, prototype_description in _get_required(description, 'prototypes').items():
+        kind = _get_required(prototype_description, 'kind')
+        if kind not in PROTOTYPE_KINDS:
+            raise ValueError(f'Prototype kind must be one of {PROTOTYPE_KINDS}, but {kind!r} was given')
+        prototypes[name] = Prototype(OBJECT_PARSERS[kind](prototype_description)[0])
+    scene_graph = SceneGraph(parse_transform(description.get('transform', {})))
+    _parse_scene_node(description, scene_graph, prototypes)
+    return (scene_graph, parse_color(description.get('color', 'WHITE')))
+
+
+PROTOTYPE_KINDS = ('line_segments', 'polygons', 'circles', 'arcs', 'lenses', 'conics')
+
+OBJECT_PARSERS: dict[str, Callable[[dict], tuple]] = {
+    'beams': parse_beam,
+    'points': parse_scene_point,
+    'lines': parse_line,
+    'line_segments': parse_line_segment,
+    'polygons': parse_polygon,
+    'circles': parse_circle,
+    'sources': parse_source,
+    'arcs': parse_arc,
+    'lenses': parse_lens,
+    'conics': parse_conic,
+    'scene_graphs': parse_scene_graph,
+}
+
+
+def parse_scene_group(description: dict) -> SceneGroup:
+    """Returns scene group for LightBeamSceneManager with objects of given description"""
+    scene_group = {}
+    for kind in SCENE_OBJECT_KINDS:
+        if description.get(kind) is None:
+            continue
+        if not isinstance(description[kind], list):
+            raise ValueError(f'"{kind}" must be a list, but {description[kind]!r} was given')
+        scene_group[kind] = [OBJECT_PARSERS[kind](object_description) for object_description in description[kind]]
+    return scene_group
+
+
+def parse_manager_options(description: dict) -> dict[str, Any]:
+    """Returns keyword arguments for LightBeamSceneManager from "options" of the description"""
+    options = dict(description.get('options', {}))
+    unknown_options = set(options) - {'accumulate_beams', 'exposure', 'refraction_coefficients_management',
+                                      'use_distance_field', 'distance_field_cell_size', 'ray_scheduler'}
+    if unknown_options:
+        raise ValueError(f'Unknown scene options: {sorted(unknown_options)}')
+    if options.get('ray_scheduler') is not None:
+        options['ray_scheduler'] = RayTreeScheduler(**options['ray_scheduler'])
+    return options
+
+
+def build_scene(description: dict, path_to_image_folder: str = '',
+                number_of_raster_workers: Optional[int] = None) -> LightBeamSceneManager:
+    """Returns scene manager with plane and objects of given description"""
+    width = int(_get_required(description, 'width'))
+    height = int(description.get('height', width))
+    visual_plane = VisualPlane(width, height, path_to_image_folder=path_to_image_folder,
+                               background_color=parse_color(description.get('background_color', 'BLACK')),
+                               number_of_raster_workers=number_of_raster_workers)
+    options = parse_manager_options(description)
+    if description.get('groups') is not None:
+        image_groups = {str(name): parse_scene_group(group) for name, group in description['groups'].items()}
+        return LightBeamSceneManager(visual_plane, image_groups=image_groups, **options)
+    scene_group = parse_scene_group(description)
+    if not scene_group.get('beams') and not scene_group.get('sources'):
+        # Manager expects beams or sources, scene without them is drawn with no beams
+        scene_group['beams'] = []
+    return LightBeamSceneManager(visual_plane, **scene_group, **options)
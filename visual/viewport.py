@@ -0,0 +1,186 @@
+"""
+World-to-screen viewport.
+
+Scene is traced in its own units (size of the plane), and viewport maps traced paths and objects
+to pixels of an image of any size, so one trace can be drawn as thumbnail, full-size image and zoomed crop.
+Paths of beams are taken from their points, not from pixels, that were drawn on the plane,
+so they stay continuous at every scale.
+"""
+
+from math import ceil
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from plane.conics2d import Conic
+from plane.plane2d import Cirlce, Line, LineSegment, Point, Polygon
+from plane.polygons2d import Arc, Lens
+from plane.transforms2d import AffineTransform, compose_transforms
+from visual.accumulation import densify_path
+from visual.visual2d import (Color, ColorType, Drawable, VisaulCircle, VisualArc, VisualConic, VisualInstances, VisualLens,
+                             VisualLine, VisualLineSegment, VisualPlane, VisualPoint, VisualPolygon)
+from visual.visuallight import VisualLightBeam
+
+if TYPE_CHECKING:
+    from optical.scene_graph import Prototype, SceneGraph
+
+
+class Viewport:
+    def __init__(self, scale: float = 1, offset: Point = Point(0, 0), size: Optional[tuple[int, int]] = None) -> None:
+        """
+        Point of the scene is drawn at pixel (point - offset)*scale, so offset is the point of the scene,
+        that is drawn in the bottom left corner of the image.
+        Size is (width, height) of the image in pixels, by default the rest of the scene after offset is drawn.
+        """
+        if scale <= 0:
+            raise ValueError(f'Scale of viewport must be positive, but {scale} was given')
+        if size is not None and (size[0] < 1 or size[1] < 1):
+            raise ValueError(f'Size of viewport must be positive, but {size} was given')
+        self.scale = scale
+        self.offset = offset
+        self.size = size
+
+    @staticmethod
+    def crop(min_x: float, min_y: float, max_x: float, max_y: float, scale: float = 1) -> 'Viewport':
+        """Returns viewport, that draws given rectangle of the scene with given scale"""
+        if min_x >= max_x or min_y >= max_y:
+            raise ValueError(f'Crop must be (min x, min y, max x, max y), but {(min_x, min_y, max_x, max_y)} was given')
+        return Viewport(scale, Point(min_x, min_y), (max(ceil((max_x - min_x)*scale), 1), max(ceil((max_y - min_y)*scale), 1)))
+
+    @staticmethod
+    def fit(scene_size: tuple[int, int], width: int, height: Optional[int] = None) -> 'Viewport':
+        """Returns viewport, that draws the whole scene of given size into image of at most given width and height"""
+        scene_width, scene_height = scene_size
+        scale = width / scene_width if height is None else min(width / scene_width, height / scene_height)
+        return Viewport(scale)
+
+    def get_transform(self) -> AffineTransform:
+        return AffineTransform.scaling(self.scale) @ AffineTransform.translation(-self.offset.x, -self.offset.y)
+
+    def get_size(self, scene_size: tuple[int, int]) -> tuple[int, int]:
+        """Returns (width, height) of the image for the scene of given size"""
+        if self.size is not None:
+            return self.size
+        scene_width, scene_height = scene_size
+        return (max(round((scene_width - self.offset.x)*self.scale), 1), max(round((scene_height - self.offset.y)*self.scale), 1))
+
+    def apply_to_point(self, point: Point) -> Point:
+        return Point((point.x - self.offset.x)*self.scale, (point.y - self.offset.y)*self.scale)
+
+    def __repr__(self) -> str:
+        return f'Viewport({self.scale}, {self.offset}, {self.size})'
+
+
+class VisualPath(Drawable):
+    blends_with_passed_objects = True
+
+    def __init__(self, paths: list[tuple[np.ndarray, np.ndarray, ColorType]], visual_plane: VisualPlane,
+                 transparensy: float = 0.5, source: Optional[tuple[Point, ColorType]] = None) -> None:
+        """
+        Path of beam in pixels of the image: parts of polyline with colors, they are drawn with,
+        and, optionally, point of source, which is marked by star, like in VisualLightBeam.
+        Parts are drawn in given order, and pixels, that were already drawn, keep their color.
+        """
+        super().__init__()
+        self.paths = paths
+        self.source = source
+        self.visual_plane = visual_plane
+        self.visual_plane.bind_object(self)
+        self.transparensy = transparensy
+
+    def get_transparensy(self) -> float:
+        return self.transparensy
+
+    def compute_draw_coordinates(self) -> None:
+        width, height = self.visual_plane.plane.size()
+        if self.source is not None:
+            point, color = self.source
+            x, y = round(point.x), round(point.y)
+            offsets = np.arange(-3, 4)
+            zeros = np.zeros_like(offsets)
+            xs = x + np.concatenate([offsets, zeros, -offsets, offsets])
+            ys = y + np.concatenate([zeros, offsets, offsets, offsets])
+            in_plane = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            self.draw_coordinates.add(xs[in_plane], ys[in_plane], color)
+        for xs, ys, color in self.paths:
+            xs, ys = densify_path(xs, ys)
+            xs, ys = np.rint(xs), np.rint(ys)
+            # Zoomed crop shows only part of the path
+            in_plane = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+            self.draw_coordinates.add(xs[in_plane], ys[in_plane], color)
+
+    def get_color_on_point(self, point: Point, precision: Optional[float] = None) -> ColorType:
+        if not self.draw_coordinates:
+            self.compute_draw_coordinates()
+        if point in self.draw_coordinates:
+            return self.draw_coordinates[point]
+        else:
+            return Color.NONE
+
+
+class _ViewSceneGraph:
+    def __init__(self, scene_graph: 'SceneGraph', transform: AffineTransform) -> None:
+        """Scene graph, which instances are moved by transform of viewport, for VisualInstances"""
+        self.scene_graph = scene_graph
+        self.transform = transform
+
+    def get_prototype_transforms(self, prototype: 'Prototype') -> np.ndarray:
+        return compose_transforms(self.transform.as_array(), self.scene_graph.get_prototype_transforms(prototype))
+
+
+def get_view_drawable(drawable: Drawable, viewport: Viewport, view_plane: VisualPlane) -> Drawable:
+    """
+    Returns drawable, bound to plane of the view, that draws the same object in pixels of the viewport.
+    Only geometry is transformed: colors and transparensy are taken from the given drawable.
+    """
+    scale = viewport.scale
+    to_view = viewport.apply_to_point
+    if isinstance(drawable, VisualLightBeam):
+        paths = []
+        for coordinates, color in drawable.get_drawn_paths():
+            points = [to_view(point) for point in coordinates]
+            paths.append((np.array([point.x for point in points]), np.array([point.y for point in points]), color))
+        source = (to_view(drawable.beam.coordinates[0]), drawable.original_color) if drawable.is_source_drawn else None
+        return VisualPath(paths, view_plane, drawable.get_transparensy(), source)
+    if isinstance(drawable, VisualLine):
+        line = drawable.line
+        view_drawable = VisualLine(Line(to_view(line.sample_coordinates), angle_coefficient=line.angle_coefficient),
+                                   view_plane, drawable.color)
+    elif isinstance(drawable, VisualPoint):
+        view_drawable = VisualPoint(to_view(drawable.point), view_plane, drawable.color)
+    elif isinstance(drawable, VisualLineSegment):
+        first_endpoint, second_endpoint = drawable.line_segment.endpoints
+        line_segment = LineSegment(to_view(first_endpoint), to_view(second_endpoint))
+        # Slope of the segment is kept, because optical segments round it, when they construct their lines
+        line = drawable.line_segment.reconstruct_line()
+        line_segment.related_line = Line(to_view(line.sample_coordinates), angle_coefficient=line.angle_coefficient)
+        view_drawable = VisualLineSegment(line_segment, view_plane, drawable.color)
+    elif isinstance(drawable, VisualPolygon):
+        view_drawable = VisualPolygon(Polygon([to_view(vertex) for vertex in drawable.polygon.vertexes]), view_plane, drawable.color)
+    elif isinstance(drawable, VisaulCircle):
+        circle = drawable.circle
+        view_drawable = VisaulCircle(Cirlce(to_view(circle.centre), circle.radius*scale), view_plane, drawable.color,
+                                     drawable.is_circumference)
+    elif isinstance(drawable, VisualArc):
+        arc = drawable.arc
+        view_drawable = VisualArc(Arc(to_view(arc.centre), arc.radius*scale, arc.start_angle, arc.end_angle),
+                                  view_plane, drawable.color)
+    elif isinstance(drawable, VisualLens):
+        lens = drawable.lens
+        view_drawable = VisualLens(Lens(to_view(lens.centre), lens.aperture*scale, lens.first_radius*scale,
+                                        lens.second_radius*scale, lens.edge_thickness*scale, lens.angle_from_ox),
+                                   view_plane, drawable.color)
+    elif isinstance(drawable, VisualConic):
+        conic = drawable.conic
+        # Equation in coordinates, stretched by scale, is multiplied by scale squared
+        a, b, c, d, e, f = conic.coefficients
+        view_drawable = VisualConic(Conic(to_view(conic.origin), (a, b, c, d*scale, e*scale, f*scale*scale),
+                                          tuple(bound*scale for bound in conic.bounds), conic.angle_from_ox),
+                                    view_plane, drawable.color)
+    elif isinstance(drawable, VisualInstances):
+        view_drawable = VisualInstances(_ViewSceneGraph(drawable.scene_graph, viewport.get_transform()), drawable.prototype,
+                                        view_plane, drawable.color)
+    else:
+        raise ValueError(f'{type(drawable).__name__} can not be drawn through viewport')
+    view_drawable.get_transparensy = drawable.get_transparensy
+    return view_drawable
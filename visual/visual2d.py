@@ -1,10 +1,22 @@
 from math import fabs
-from typing import Any, Iterable, Optional
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
 from abc import ABC, abstractmethod
 
-from PIL import Image, ImageDraw
+import numpy as np
 
-from plane.plane2d import Cirlce, Line, LineSegment, Plane, Point, Polygon, Vector2d
+from plane.conics2d import Conic
+from plane.plane2d import Cirlce, Line, LineSegment, Plane, Point, Polygon
+from plane.polygons2d import Arc, Lens
+from plane.transforms2d import AffineTransform
+from visual.accumulation import RadianceBuffer
+from visual.draw_coordinates import DrawCoordinates
+from visual.image_output import BackgroundEncoder, ImageFormat
+from visual.raster import BandCoordinates, BandRasterizer, empty_band_coordinates, line_samples_in_band
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+    from optical.scene_graph import Prototype, SceneGraph
 
 ColorType = tuple[int, int, int]
 
@@ -40,20 +52,69 @@ class Color:
         new_blue = pow((1 - blending_coefficient)*(first_color[2]**2) + blending_coefficient*(second_color[2]**2), 1/2)
         return (round(new_red), round(new_green), round(new_blue))
 
+    @staticmethod
+    def from_wavelength(wavelength: float) -> ColorType:
+        """
+        Returns approximate color of light with given wavelength in nanometres (piecewise linear
+        approximation of visible spectrum, dimmed near its ends). Wavelengths outside [380; 780] are black.
+        """
+        if 380 <= wavelength < 440:
+            red, green, blue = (440 - wavelength) / 60, 0, 1
+        elif 440 <= wavelength < 490:
+            red, green, blue = 0, (wavelength - 440) / 50, 1
+        elif 490 <= wavelength < 510:
+            red, green, blue = 0, 1, (510 - wavelength) / 20
+        elif 510 <= wavelength < 580:
+            red, green, blue = (wavelength - 510) / 70, 1, 0
+        elif 580 <= wavelength < 645:
+            red, green, blue = 1, (645 - wavelength) / 65, 0
+        elif 645 <= wavelength <= 780:
+            red, green, blue = 1, 0, 0
+        else:
+            return Color.BLACK
+        # Eye sensitivity falls near the ends of visible spectrum
+        if wavelength < 420:
+            intensity = 0.3 + 0.7*(wavelength - 380) / 40
+        elif wavelength > 700:
+            intensity = 0.3 + 0.7*(780 - wavelength) / 80
+        else:
+            intensity = 1
+        return tuple(round(255 * (channel*intensity)**0.8) for channel in (red, green, blue))
+
 
 class Drawable(ABC):
-    _draw_id = 0
+    # If True, rasterizer blends colors of drawable with objects, that were drawn under it
+    blends_with_passed_objects = False
 
     def __init__(self):
-        self.draw_coordinates: dict[Point, ColorType] = {}
-        Drawable._draw_id += 1
-        self.draw_id = Drawable._draw_id
+        self.draw_coordinates = DrawCoordinates()
+        # Draw id is given by the plane, drawable is bound to, 0 is id of the plane itself
+        self.draw_id = 0
 
-    def get_draw_coordinates(self) -> dict[Point, ColorType]:
+    def get_draw_coordinates(self) -> DrawCoordinates:
         if not self.draw_coordinates:
             self.compute_draw_coordinates()
         return self.draw_coordinates
 
+    def prepare_rasterization(self) -> None:
+        """
+        Called by rasterizer before bands are drawn.
+        By default takes arrays of draw coordinates, that are shared by all bands.
+        """
+        draw_coordinates = self.get_draw_coordinates()
+        self._raster_xs = draw_coordinates.xs
+        self._raster_ys = draw_coordinates.ys
+        self._raster_colors = draw_coordinates.get_colors()
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        """
+        Returns (xs, ys, colors) of points in rows [first_row; last_row), that must be drawn.
+        Colors are either one color for all points or array of colors for each point.
+        """
+        in_band = (self._raster_ys >= first_row) & (self._raster_ys < last_row)
+        colors = self._raster_colors if np.ndim(self._raster_colors) == 1 else self._raster_colors[in_band]
+        return (self._raster_xs[in_band], self._raster_ys[in_band], colors)
+
     @abstractmethod
     def get_color_on_point(self, point: Point, precision: Optional[float]) -> ColorType:
         pass
@@ -100,7 +161,15 @@ class DrawableSet:
 
 class VisualPlane(Drawable):
     def __init__(self, width: int = None, height: int = None, *, plane: Plane = None,
-                 path_to_image_folder: str = '', background_color: ColorType = Color.BLACK) -> None:
+                 path_to_image_folder: str = '', background_color: ColorType = Color.BLACK,
+                 number_of_raster_workers: Optional[int] = None,
+                 image_format: Optional[ImageFormat] = None, encoder: Optional[BackgroundEncoder] = None) -> None:
+        """
+        Number of raster workers sets size of thread pool, used by rasterize.
+        If it is not given, number of CPUs will be used.
+        Images are saved in given format (PNG by default). If encoder is given, create_image only queues
+        images to it, and they are encoded and written in background, while the next image is traced.
+        """
         if plane is None:
             self.plane = Plane(width, height)
         else:
@@ -113,7 +182,15 @@ class VisualPlane(Drawable):
         self.background_color = background_color
         self.objects_on_plane = DrawableSet(self)
         self.draw_id = 0
-        self.draw_coordinates = {}
+        # Ids are counted by every plane from 1 and start again on reset_plane,
+        # so ID buffer stays uint8, while less than 256 objects are bound to the plane
+        self.number_of_bound_objects = 0
+        self.draw_coordinates = DrawCoordinates()
+        self.rasterizer = BandRasterizer(number_of_raster_workers)
+        self.framebuffer: Optional[np.ndarray] = None
+        self.radiance_buffer: Optional[RadianceBuffer] = None
+        self.image_format = image_format if image_format is not None else ImageFormat()
+        self.encoder = encoder
 
     def compute_draw_coordinates(self) -> None:
         width, height = self.plane.size()
@@ -139,20 +216,58 @@ class VisualPlane(Drawable):
         x, y = point.as_tuple()
         return Point(x, height - y - 1)
 
-    def create_image(self, image_name: str = '') -> None:
+    def create_image(self, image_name: str = '', on_written: Optional[Callable[[], None]] = None) -> None:
+        """
+        Saves image in format of the plane. If plane has encoder, image is saved in background,
+        and on_written is called from the encoder thread, once file is written, otherwise it is called right away.
+        """
+        path = self.get_image_path(image_name)
+        self.image_counter += 1
+        if self.encoder is not None:
+            self.encoder.submit(self.get_pixels(), path, self.image_format, on_written)
+            return
+        self.image_format.write(self.get_pixels(), path)
+        if on_written is not None:
+            on_written()
+
+    def flush_images(self) -> None:
+        """Waits, until all images, queued to encoder, are written"""
+        if self.encoder is not None:
+            self.encoder.flush()
+
+    def get_pixels(self) -> np.ndarray:
+        """Returns new (height, width, 3) uint8 array of the image, rows from the top"""
+        if self.framebuffer is not None:
+            return np.ascontiguousarray(self.framebuffer[::-1])
+        return np.asarray(self.get_image())
+
+    def get_image(self) -> 'Image.Image':
+        # PIL is imported on the first image, so tracing without images doesn't pay for its import
+        from PIL import Image, ImageDraw
+        if self.framebuffer is not None:
+            return Image.fromarray(np.ascontiguousarray(self.framebuffer[::-1]), 'RGB')
         image = Image.new('RGB', self.plane.size())
         image_draw = ImageDraw.ImageDraw(image)
-        
-        draw_coordinates = self.get_draw_coordinates()
-        for point in draw_coordinates:
-            image_draw.point(self.flip_point_horizontally(point).as_tuple(), draw_coordinates[point])
+
+        for point, color in self.get_draw_coordinates().items():
+            image_draw.point(self.flip_point_horizontally(point).as_tuple(), color)
+        return image
+
+    def get_image_path(self, image_name: str = '') -> str:
+        """Returns path, where the next image with given name will be saved"""
+        extension = self.image_format.get_extension()
         if image_name == '':
-            image.save(f'{self.path_to_image_folder}/image{self.image_counter}.png')
-        else:
-            image.save(f'{self.path_to_image_folder}/{image_name}.png')
+            return f'{self.path_to_image_folder}/image{self.image_counter}{extension}'
+        return f'{self.path_to_image_folder}/{image_name}{extension}'
+
+    def save_image(self, image: 'Image.Image', image_name: str = '') -> None:
+        image.save(self.get_image_path(image_name))
         self.image_counter += 1
 
     def bind_object(self, obj: Drawable) -> None:
+        """Adds object to the plane and gives it the next draw id of the plane"""
+        self.number_of_bound_objects += 1
+        obj.draw_id = self.number_of_bound_objects
         self.objects_on_plane.add(obj)
 
     def draw_object_by_point(self, obj: Drawable) -> None:
@@ -163,11 +278,49 @@ class VisualPlane(Drawable):
         for coordinates in coordinates_iter:
             self.plane.set_point(coordinates, draw_id)
 
-    def reset_plane(self) -> None:
+    def rasterize(self, drawables: Iterable[Drawable], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Draws given objects into plane and framebuffer in parallel bands.
+        Works like draw_object_by_point called for each object in given order,
+        but also computes final colors, so create_image doesn't need to resolve them per point.
+        If rows are given, only they are cleared and drawn again, and the rest of the framebuffer is kept.
+        """
         width, height = self.plane.size()
-        self.plane = Plane(width, height)
+        if self.framebuffer is None:
+            self.framebuffer = np.empty((height, width, 3), np.uint8)
+            self.framebuffer[:] = self.background_color
+        elif rows is not None:
+            bands = self.rasterizer.get_bands_of_rows(rows, height)
+            ids = self.plane.get_id_buffer()
+            for first_row, last_row in bands:
+                ids[first_row:last_row] = 0
+                self.framebuffer[first_row:last_row] = self.background_color
+            self.rasterizer.rasterize(self.plane, self.framebuffer, list(drawables), bands)
+            return self.framebuffer
+        self.rasterizer.rasterize(self.plane, self.framebuffer, list(drawables))
+        return self.framebuffer
+
+    def get_radiance_buffer(self) -> RadianceBuffer:
+        if self.radiance_buffer is None:
+            self.radiance_buffer = RadianceBuffer(*self.plane.size())
+        return self.radiance_buffer
+
+    def compose_radiance(self, exposure: Optional[float] = None) -> np.ndarray:
+        """Tone maps accumulated radiance over already rasterized framebuffer"""
+        if self.framebuffer is None:
+            self.rasterize([])
+        if self.radiance_buffer is not None:
+            self.framebuffer = self.radiance_buffer.tone_map(self.framebuffer, exposure)
+        return self.framebuffer
+
+    def reset_plane(self) -> None:
+        self.plane.reset()
         self.objects_on_plane = DrawableSet(self)
-        self.draw_coordinates = {}
+        self.number_of_bound_objects = 0
+        self.draw_coordinates = DrawCoordinates()
+        self.framebuffer = None
+        if self.radiance_buffer is not None:
+            self.radiance_buffer.reset()
 
     def get_value_on_point(self, point: Point) -> int:
         return self.plane.get_point(point)
@@ -183,7 +336,6 @@ class VisualLine(Drawable):
         self.visual_plane = visual_plane
         self.get_transparensy = getattr(self.line, 'get_transparensy', lambda: 0)
         self.visual_plane.bind_object(self)
-        self.compute_draw_coordinates()
 
     def get_transparensy(self) -> float:
         pass
@@ -191,7 +343,7 @@ class VisualLine(Drawable):
     def get_color_on_point(self, point: Point, precision: float = 0.1) -> ColorType:
         if not self.draw_coordinates:
             self.compute_draw_coordinates()
-        if point in self.draw_coordinates.keys():
+        if point in self.draw_coordinates:
             return self.draw_coordinates[point]
         elif fabs(self.line.get_y_coordinate(point.x) - point.y) < precision:
             return self.color
@@ -199,20 +351,24 @@ class VisualLine(Drawable):
             return Color.NONE
 
     def compute_draw_coordinates(self) -> None:
+        _, height = self.visual_plane.plane.size()
+        xs, ys, _ = self.get_band_coordinates(0, height)
+        self.draw_coordinates.add(xs, ys, self.color)
+
+    def prepare_rasterization(self) -> None:
+        pass
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
         width, height = self.visual_plane.plane.size()
-        if self.line.angle != 90:
-            number_of_trials = round(fabs(self.line.angle_coefficient))+1 if fabs(self.line.angle_coefficient) >= 1 else 1
-            for x in range(width*number_of_trials):
-                round_x = round(x/number_of_trials)
-                round_y = round(self.line.get_y_coordinate(x/number_of_trials))
-                if 0 <= round_y < height:
-                    if self.draw_coordinates.get(Point(round_x, round_y), None) is None:
-                        self.draw_coordinates[Point(round_x, round_y)] = self.color
-        else:
-            round_x = round(self.line.sample_coordinates.x)
-            for y in range(height):
-                if self.draw_coordinates.get(Point(round_x, y), None) is None:
-                    self.draw_coordinates[Point(round_x, y)] = self.color
+        first_row, last_row = max(first_row, 0), min(last_row, height)
+        if first_row >= last_row:
+            return empty_band_coordinates(self.color)
+        if self.line.angle == 90:
+            ys = np.arange(first_row, last_row)
+            return (np.full_like(ys, round(self.line.sample_coordinates.x)), ys, self.color)
+        number_of_trials = round(fabs(self.line.angle_coefficient))+1 if fabs(self.line.angle_coefficient) >= 1 else 1
+        xs, ys = line_samples_in_band(self.line, 0, width*number_of_trials, number_of_trials, first_row, last_row)
+        return (xs, ys, self.color)
 
 
 class VisualPoint(Drawable):
@@ -226,12 +382,21 @@ class VisualPoint(Drawable):
         self.compute_draw_coordinates()
 
     def compute_draw_coordinates(self) -> None:
-        self.draw_coordinates[Point(round(self.point.x), round(self.point.y))] = self.color
+        self.draw_coordinates.add(np.array([self.point.x]), np.array([self.point.y]), self.color)
+
+    def prepare_rasterization(self) -> None:
+        pass
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        x, y = round(self.point.x), round(self.point.y)
+        if not (first_row <= y < last_row):
+            return empty_band_coordinates(self.color)
+        return (np.array([x]), np.array([y]), self.color)
 
     def get_color_on_point(self, point: Point, precision: float = 0.5) -> ColorType:
         if not self.draw_coordinates:
             self.compute_draw_coordinates()
-        if point in self.draw_coordinates.keys():
+        if point in self.draw_coordinates:
             return self.draw_coordinates[point]
         elif (fabs(point.x - self.point.x) < precision) and (fabs(point.y - self.point.y) < precision):
             return self.color
@@ -250,30 +415,35 @@ class VisualLineSegment(Drawable):
         self.visual_plane = visual_plane
         self.visual_plane.bind_object(self)
         self.get_transparensy = getattr(self.line_segment, 'get_transparensy', lambda: 0)
-        self.compute_draw_coordinates()
 
     def compute_draw_coordinates(self) -> None:
         width, height = self.visual_plane.plane.size()
-        if self.line_segment.endpoints[0].x != self.line_segment.endpoints[1].x:
-            for x in range(round(self.line_segment.endpoints[0].x)*100, round(self.line_segment.endpoints[1].x)*100):
-                round_x = round(x/100)
-                round_y = round(self.line_segment.reconstruct_line().get_y_coordinate(x/100))
-                if 0 <= round_y < height and 0 <= round_x < width:
-                        if self.draw_coordinates.get(Point(round_x, round_y), None) is None:
-                            self.draw_coordinates[Point(round_x, round_y)] = self.color
-        else:
-            round_x = round(self.line_segment.endpoints[0].x)
-            min_y = round(self.line_segment.min_y)
-            max_y = round(self.line_segment.max_y)
-            for y in range(min_y, max_y+1):
-                if 0 <= y < height and 0 <= round_x < width:
-                        if self.draw_coordinates.get(Point(round_x, y), None) is None:
-                            self.draw_coordinates[Point(round_x, y)] = self.color
+        xs, ys, _ = self.get_band_coordinates(0, height)
+        in_plane = (xs >= 0) & (xs < width)
+        self.draw_coordinates.add(xs[in_plane], ys[in_plane], self.color)
+
+    def prepare_rasterization(self) -> None:
+        pass
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        _, height = self.visual_plane.plane.size()
+        first_row, last_row = max(first_row, 0), min(last_row, height)
+        first_endpoint, second_endpoint = self.line_segment.endpoints
+        if first_endpoint.x != second_endpoint.x:
+            xs, ys = line_samples_in_band(self.line_segment.reconstruct_line(), round(first_endpoint.x)*100,
+                                          round(second_endpoint.x)*100, 100, first_row, last_row)
+            return (xs, ys, self.color)
+        first_row = max(first_row, round(self.line_segment.min_y))
+        last_row = min(last_row, round(self.line_segment.max_y)+1)
+        if first_row >= last_row:
+            return empty_band_coordinates(self.color)
+        ys = np.arange(first_row, last_row)
+        return (np.full_like(ys, round(first_endpoint.x)), ys, self.color)
 
     def get_color_on_point(self, point: Point, precision: float = 0.2) -> ColorType:
         if not self.draw_coordinates:
             self.compute_draw_coordinates()
-        if point in self.draw_coordinates.keys():
+        if point in self.draw_coordinates:
             return self.draw_coordinates[point]
         elif (fabs(self.line_segment.reconstruct_line().get_y_coordinate(point.x) - point.y) < precision
                 and self.line_segment.min_y <= point.y <= self.line_segment.max_y
@@ -294,19 +464,29 @@ class VisualPolygon(Drawable):
         self.visual_plane = visual_plane
         self.visual_plane.bind_object(self)
         self.get_transparensy = getattr(self.polygon, 'get_transparensy', lambda: 0)
-        self.compute_draw_coordinates()
 
     def compute_draw_coordinates(self) -> None:
-        for x in range(round(self.polygon.min_x), round(self.polygon.max_x)+1):
-            for y in range(round(self.polygon.min_y), round(self.polygon.max_y)+1):
-                point = Point(x, y)
-                if self.polygon.is_point_inside(point) and self.draw_coordinates.get(point, None) is None:
-                    self.draw_coordinates[point] = self.color
+        xs, ys, _ = self.get_band_coordinates(round(self.polygon.min_y), round(self.polygon.max_y)+1)
+        self.draw_coordinates.add(xs, ys, self.color)
+
+    def prepare_rasterization(self) -> None:
+        pass
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        first_row = max(first_row, round(self.polygon.min_y))
+        last_row = min(last_row, round(self.polygon.max_y)+1)
+        if first_row >= last_row:
+            return empty_band_coordinates(self.color)
+        xs, ys = np.meshgrid(np.arange(round(self.polygon.min_x), round(self.polygon.max_x)+1),
+                             np.arange(first_row, last_row))
+        xs, ys = xs.ravel(), ys.ravel()
+        inside = self.polygon.are_points_inside(xs, ys)
+        return (xs[inside], ys[inside], self.color)
 
     def get_color_on_point(self, point: Point, precision: Optional[float] = None) -> ColorType:
         if not self.draw_coordinates:
             self.compute_draw_coordinates()
-        if point in self.draw_coordinates.keys():
+        if point in self.draw_coordinates:
             return self.draw_coordinates[point]
         elif self.polygon.is_point_inside(point):
             return self.color
@@ -326,27 +506,45 @@ class VisaulCircle(Drawable):
         self.visual_plane.bind_object(self)
         self.is_circumference = draw_only_circumference
         self.get_transparensy = getattr(self.circle, 'get_transparensy', lambda: 0)
-        self.compute_draw_coordinates()
 
     def compute_draw_coordinates(self) -> None:
         if self.is_circumference:
-            turn_amount = 90 / (self.circle.radius * self.circle.radius)
-            angle = 0
-            while angle < 360:
-                vector_to_point = Vector2d.construct_from_length(self.circle.radius, angle)
-                point_to_draw = self.circle.centre + vector_to_point
-                self.draw_coordinates[point_to_draw] = self.color
-                angle += turn_amount
+            self.prepare_rasterization()
+            self.draw_coordinates.add(self._circumference_xs, self._circumference_ys, self.color)
         else:
-            for x in range(round(self.circle.centre.x - self.circle.radius), round(self.circle.centre.x + self.circle.radius)+1):
-                for y in range(round(self.circle.centre.y - self.circle.radius), round(self.circle.centre.y + self.circle.radius)+1):
-                    if self.circle.centre.get_distance_to_point(Point(x, y)) <= self.circle.radius:
-                        self.draw_coordinates[Point(x, y)] = self.color
+            xs, ys, _ = self.get_band_coordinates(round(self.circle.centre.y - self.circle.radius),
+                                                  round(self.circle.centre.y + self.circle.radius)+1)
+            self.draw_coordinates.add(xs, ys, self.color)
+
+    def prepare_rasterization(self) -> None:
+        if self.is_circumference:
+            turn_amount = 90 / (self.circle.radius * self.circle.radius)
+            angles = np.radians(np.arange(0, 360, turn_amount))
+            points = np.unique(np.stack([
+                np.rint(self.circle.centre.x + self.circle.radius*np.cos(angles)),
+                np.rint(self.circle.centre.y + self.circle.radius*np.sin(angles)),
+            ], axis=1).astype(np.int64), axis=0)
+            self._circumference_xs, self._circumference_ys = points[:, 0], points[:, 1]
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        centre, radius = self.circle.centre, self.circle.radius
+        if self.is_circumference:
+            in_band = (self._circumference_ys >= first_row) & (self._circumference_ys < last_row)
+            return (self._circumference_xs[in_band], self._circumference_ys[in_band], self.color)
+        first_row = max(first_row, round(centre.y - radius))
+        last_row = min(last_row, round(centre.y + radius)+1)
+        if first_row >= last_row:
+            return empty_band_coordinates(self.color)
+        xs, ys = np.meshgrid(np.arange(round(centre.x - radius), round(centre.x + radius)+1),
+                             np.arange(first_row, last_row))
+        xs, ys = xs.ravel(), ys.ravel()
+        inside = self.circle.are_points_inside(xs, ys)
+        return (xs[inside], ys[inside], self.color)
 
     def get_color_on_point(self, point: Point, precision: Optional[float] = 0.2) -> ColorType:
         if not self.draw_coordinates:
             self.compute_draw_coordinates()
-        if point in self.draw_coordinates.keys():
+        if point in self.draw_coordinates:
             return self.draw_coordinates[point]
         elif self.is_circumference and fabs(point.get_distance_to_point(self.circle.centre) - self.circle.radius) < precision:
             return self.color
@@ -356,4 +554,190 @@ class VisaulCircle(Drawable):
             return Color.NONE
 
     def get_transparensy(self) -> float:
-        pass
\ No newline at end of file
+        pass
+
+class VisualArc(Drawable):
+    def __init__(self, arc: Arc, visual_plane: VisualPlane, color: ColorType) -> None:
+        super().__init__()
+        self.arc = arc
+        self.color = color
+        self.visual_plane = visual_plane
+        self.visual_plane.bind_object(self)
+        self.get_transparensy = getattr(self.arc, 'get_transparensy', lambda: 0)
+
+    def compute_draw_coordinates(self) -> None:
+        self.prepare_rasterization()
+        self.draw_coordinates.add(self._arc_xs, self._arc_ys, self.color)
+
+    def prepare_rasterization(self) -> None:
+        # Same density of samples, as for circumference of VisaulCircle
+        turn_amount = 90 / (self.arc.radius * self.arc.radius)
+        angles = np.radians(self.arc.start_angle + np.append(np.arange(0, self.arc.angular_size, turn_amount),
+                                                             self.arc.angular_size))
+        points = np.unique(np.stack([
+            np.rint(self.arc.centre.x + self.arc.radius*np.cos(angles)),
+            np.rint(self.arc.centre.y + self.arc.radius*np.sin(angles)),
+        ], axis=1).astype(np.int64), axis=0)
+        self._arc_xs, self._arc_ys = points[:, 0], points[:, 1]
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        in_band = (self._arc_ys >= first_row) & (self._arc_ys < last_row)
+        return (self._arc_xs[in_band], self._arc_ys[in_band], self.color)
+
+    def get_color_on_point(self, point: Point, precision: Optional[float] = 0.2) -> ColorType:
+        if not self.draw_coordinates:
+            self.compute_draw_coordinates()
+        if point in self.draw_coordinates:
+            return self.draw_coordinates[point]
+        elif self.arc.get_distance_to_point(point) < precision:
+            return self.color
+        else:
+            return Color.NONE
+
+    def get_transparensy(self) -> float:
+        pass
+
+
+class VisualConic(Drawable):
+    def __init__(self, conic: Conic, visual_plane: VisualPlane, color: ColorType) -> None:
+        super().__init__()
+        self.conic = conic
+        self.color = color
+        self.visual_plane = visual_plane
+        self.visual_plane.bind_object(self)
+        self.get_transparensy = getattr(self.conic, 'get_transparensy', lambda: 0)
+
+    def compute_draw_coordinates(self) -> None:
+        self.prepare_rasterization()
+        self.draw_coordinates.add(self._conic_xs, self._conic_ys, self.color)
+
+    def prepare_rasterization(self) -> None:
+        # Samples on both vertical and horizontal lines, so steep parts of the curve have no gaps
+        xs, ys = self.conic.get_samples(0.25)
+        points = np.unique(np.stack([np.rint(xs), np.rint(ys)], axis=1).astype(np.int64), axis=0)
+        self._conic_xs, self._conic_ys = points[:, 0], points[:, 1]
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        in_band = (self._conic_ys >= first_row) & (self._conic_ys < last_row)
+        return (self._conic_xs[in_band], self._conic_ys[in_band], self.color)
+
+    def get_color_on_point(self, point: Point, precision: Optional[float] = 0.2) -> ColorType:
+        if not self.draw_coordinates:
+            self.compute_draw_coordinates()
+        if point in self.draw_coordinates:
+            return self.draw_coordinates[point]
+        elif self.conic.get_distance_to_point(point) < precision:
+            return self.color
+        else:
+            return Color.NONE
+
+    def get_transparensy(self) -> float:
+        pass
+
+class VisualLens(Drawable):
+    def __init__(self, lens: Lens, visual_plane: VisualPlane, color: ColorType) -> None:
+        super().__init__()
+        self.lens = lens
+        self.color = color
+        self.visual_plane = visual_plane
+        self.visual_plane.bind_object(self)
+        self.get_transparensy = getattr(self.lens, 'get_transparensy', lambda: 0)
+
+    def compute_draw_coordinates(self) -> None:
+        xs, ys, _ = self.get_band_coordinates(round(self.lens.min_y), round(self.lens.max_y)+1)
+        self.draw_coordinates.add(xs, ys, self.color)
+
+    def prepare_rasterization(self) -> None:
+        pass
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        first_row = max(first_row, round(self.lens.min_y))
+        last_row = min(last_row, round(self.lens.max_y)+1)
+        if first_row >= last_row:
+            return empty_band_coordinates(self.color)
+        xs, ys = np.meshgrid(np.arange(round(self.lens.min_x), round(self.lens.max_x)+1),
+                             np.arange(first_row, last_row))
+        xs, ys = xs.ravel(), ys.ravel()
+        inside = self.lens.are_points_inside(xs, ys)
+        return (xs[inside], ys[inside], self.color)
+
+    def get_color_on_point(self, point: Point, precision: Optional[float] = None) -> ColorType:
+        if not self.draw_coordinates:
+            self.compute_draw_coordinates()
+        if point in self.draw_coordinates:
+            return self.draw_coordinates[point]
+        elif self.lens.is_point_inside(point):
+            return self.color
+        else:
+            return Color.NONE
+
+    def get_transparensy(self) -> float:
+        pass
+
+
+class VisualInstances(Drawable):
+    def __init__(self, scene_graph: 'SceneGraph', prototype: 'Prototype', visual_plane: VisualPlane, color: ColorType) -> None:
+        """
+        Draws all instances of one prototype of scene graph.
+        Pixels of the prototype are computed once for every distinct turn and stretch of instances,
+        and are moved to every instance by its translation (rounded to whole pixels).
+        """
+        super().__init__()
+        self.scene_graph = scene_graph
+        self.prototype = prototype
+        self.color = color
+        self.visual_plane = visual_plane
+        self.visual_plane.bind_object(self)
+        self.get_transparensy = getattr(self.prototype.shape, 'get_transparensy', lambda: 0)
+
+    def compute_draw_coordinates(self) -> None:
+        self.prepare_rasterization()
+        self.draw_coordinates.add(self._instances_xs, self._instances_ys, self.color)
+
+    def prepare_rasterization(self) -> None:
+        transforms = self.scene_graph.get_prototype_transforms(self.prototype)
+        linear_parts, linear_part_indexes = np.unique(transforms[:, :4], axis=0, return_inverse=True)
+        xs, ys = [], []
+        for i, linear_part in enumerate(linear_parts):
+            offset_xs, offset_ys = self._get_prototype_pixels(AffineTransform(*linear_part))
+            translations = np.rint(transforms[linear_part_indexes.ravel() == i, 4:]).astype(np.int64)
+            xs.append((translations[:, :1] + offset_xs).ravel())
+            ys.append((translations[:, 1:] + offset_ys).ravel())
+        xs = np.concatenate(xs) if xs else np.empty(0, np.int64)
+        ys = np.concatenate(ys) if ys else np.empty(0, np.int64)
+        width, height = self.visual_plane.plane.size()
+        in_plane = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        # Pixels are sorted by rows, so pixels of every band are one slice
+        order = np.argsort(ys[in_plane], kind='stable')
+        self._instances_xs, self._instances_ys = xs[in_plane][order], ys[in_plane][order]
+
+    def _get_prototype_pixels(self, linear_transform: AffineTransform) -> tuple[np.ndarray, np.ndarray]:
+        """Returns pixels of the prototype, turned and stretched by transform, which has no translation"""
+        if self.prototype.is_closed():
+            corner_xs, corner_ys = linear_transform.apply_to_points(
+                [self.prototype.min_x, self.prototype.min_x, self.prototype.max_x, self.prototype.max_x],
+                [self.prototype.min_y, self.prototype.max_y, self.prototype.min_y, self.prototype.max_y])
+            xs, ys = np.meshgrid(np.arange(np.floor(corner_xs.min()), np.ceil(corner_xs.max()) + 1),
+                                 np.arange(np.floor(corner_ys.min()), np.ceil(corner_ys.max()) + 1))
+            xs, ys = xs.ravel(), ys.ravel()
+            inside = self.prototype.shape.are_points_inside(*linear_transform.inverse().apply_to_points(xs, ys))
+            return (xs[inside].astype(np.int64), ys[inside].astype(np.int64))
+        # Same density of samples, as for outlines of other drawables
+        xs, ys = linear_transform.apply_to_points(*self.prototype.get_outline_samples(0.25 / linear_transform.get_scales()[1]))
+        points = np.unique(np.stack([np.rint(xs), np.rint(ys)], axis=1).astype(np.int64), axis=0)
+        return (points[:, 0], points[:, 1])
+
+    def get_band_coordinates(self, first_row: int, last_row: int) -> BandCoordinates:
+        first_pixel, last_pixel = np.searchsorted(self._instances_ys, [first_row, last_row])
+        return (self._instances_xs[first_pixel:last_pixel], self._instances_ys[first_pixel:last_pixel], self.color)
+
+    def get_color_on_point(self, point: Point, precision: Optional[float] = None) -> ColorType:
+        if not self.draw_coordinates:
+            self.compute_draw_coordinates()
+        if point in self.draw_coordinates:
+            return self.draw_coordinates[point]
+        else:
+            return Color.NONE
+
+    def get_transparensy(self) -> float:
+        pass
@@ -1,26 +1,122 @@
 import math
-from typing import Optional, Union, overload
+from typing import TYPE_CHECKING, Any, Optional, Union, overload
 
-from optical.opticalfigures import RefractionCircle, RefractionPolygon
-from visual.visual2d import Color, Drawable, VisaulCircle, VisualLineSegment, VisualPlane, VisualLine, VisualPoint, VisualPolygon, ColorType
+import numpy as np
+
+from optical.opticalfigures import RefractionCircle, RefractionLens, RefractionPolygon
+from visual.accumulation import RadianceBuffer, densify_path
+from visual.visual2d import (Color, Drawable, VisaulCircle, VisualArc, VisualConic, VisualInstances, VisualLens, VisualLineSegment, VisualPlane, VisualLine,
+                             VisualPoint, VisualPolygon, ColorType)
 from optical.light_beam import LightBeam
+from optical.light_sources import LightSource
+from optical.media import MediumTree, get_medium_refraction_coefficient
+from optical.ray_scheduler import RayTreeScheduler
+from plane.conics2d import Conic
+from plane.distance_field import DistanceField
+from plane.spatial_index import SpatialIndex
 from plane.plane2d import Cirlce, LineSegment, Point, Line, Polygon, Vector2d
+from plane.polygons2d import Arc, Lens
 from optical.opticallines import ReflectionLine, RefractionLine
 
+# Detectors, spectral tracer and scene graph are imported by functions, that use them,
+# so importing visuallight doesn't load them for scenes without such objects
+if TYPE_CHECKING:
+    from optical.detectors import Detector
+    from optical.scene_graph import SceneGraph
+    from optical.shared_tracer import ProcessTracer
+    from optical.spectral_tracer import SpectralBeam
+    from optical.trace_export import TraceExporter
+    from visual.render_cache import RenderCache
+    from visual.viewport import Viewport
+
 
-BeamsTemplateList = list[tuple[LightBeam, ColorType, bool]]
+BeamsTemplateList = list[tuple[Union[LightBeam, 'SpectralBeam'], ColorType, bool]]
 PointTemplateList = list[tuple[Point, ColorType]]
 LinesTemplateList = list[tuple[Line, ColorType]]
 LinesSegmentsTemplateList = list[tuple[LineSegment, ColorType]]
 PolygonsTemplateList = list[tuple[Polygon, ColorType]]
 CirclesTemplateList = list[tuple[Cirlce, ColorType, bool]]
+ArcsTemplateList = list[tuple[Arc, ColorType]]
+LensesTemplateList = list[tuple[Lens, ColorType]]
+ConicsTemplateList = list[tuple[Conic, ColorType]]
+SceneGraphsTemplateList = list[tuple['SceneGraph', ColorType]]
+SourcesTemplateList = list[tuple[LightSource, ColorType]]
 
 SceneGroup = dict[str, Union[BeamsTemplateList, PointTemplateList,
     LinesTemplateList, LinesSegmentsTemplateList,
-    PolygonsTemplateList, CirclesTemplateList
+    PolygonsTemplateList, CirclesTemplateList, SourcesTemplateList, ArcsTemplateList, LensesTemplateList,
+    ConicsTemplateList, SceneGraphsTemplateList
 ]]
 
 
+# Kinds of scene objects, that can be replaced, with lists of their visual objects and attributes of objects there
+_REPLACEABLE_KINDS = {
+    'lines': ('visual_lines', 'line'),
+    'line_segments': ('visual_line_segments', 'line_segment'),
+    'polygons': ('visual_polygons', 'polygon'),
+    'circles': ('visual_circles', 'circle'),
+    'arcs': ('visual_arcs', 'arc'),
+    'lenses': ('visual_lenses', 'lens'),
+    'conics': ('visual_conics', 'conic'),
+    'scene_graphs': ('visual_instances', 'scene_graph'),
+}
+# Beams find hits by unit steps, so paths, that passed this close to a changed object, are traced again
+_CHANGED_REGION_MARGIN = 2
+
+
+def _get_plane_objects(object_: Any) -> list[Any]:
+    """Returns objects, that are put on plane for object of the scene"""
+    if isinstance(object_, Polygon):
+        return list(object_.edges)
+    if isinstance(object_, Lens):
+        return list(object_.surfaces)
+    return [object_]
+
+
+def _get_bounds(object_: Any, width: int, height: int) -> tuple[float, float, float, float]:
+    """Returns (min x, max x, min y, max y) of the part of object on plane of given size"""
+    from optical.scene_graph import SceneGraph
+    if isinstance(object_, Line):
+        if object_.angle_coefficient == math.inf:
+            return (object_.sample_coordinates.x, object_.sample_coordinates.x, 0, height)
+        ys = (object_.oy_segment, object_.angle_coefficient*width + object_.oy_segment)
+        return (0, width, max(min(ys), 0), min(max(ys), height))
+    if isinstance(object_, Cirlce):
+        centre, radius = object_.centre, object_.radius
+        return (centre.x - radius, centre.x + radius, centre.y - radius, centre.y + radius)
+    if isinstance(object_, SceneGraph):
+        return object_.get_bounds()
+    return (object_.min_x, object_.max_x, object_.min_y, object_.max_y)
+
+
+def _are_runs_near_object(x0s: np.ndarray, y0s: np.ndarray, x1s: np.ndarray, y1s: np.ndarray,
+                          object_: Any, bounds: tuple[float, float, float, float]) -> np.ndarray:
+    """
+    Returns, which segments from (x0, y0) to (x1, y1) pass closer than changed region margin to the line,
+    or to the bounding box with given bounds for other objects.
+    """
+    margin = _CHANGED_REGION_MARGIN
+    if isinstance(object_, Line):
+        a, b, c = object_.coefficients
+        first_distances, second_distances = a*x0s + b*y0s + c, a*x1s + b*y1s + c
+        return (first_distances*second_distances <= 0) | (np.minimum(np.abs(first_distances), np.abs(second_distances)) <= margin)
+    min_x, max_x, min_y, max_y = bounds
+    # Parts of segments inside slabs of the box are clipped one after another
+    entries, exits = np.zeros(x0s.shape), np.ones(x0s.shape)
+    for starts, ends, low, high in ((x0s, x1s, min_x - margin, max_x + margin), (y0s, y1s, min_y - margin, max_y + margin)):
+        deltas = ends - starts
+        is_parallel = deltas == 0
+        is_inside = (low <= starts) & (starts <= high)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            first, second = (low - starts) / deltas, (high - starts) / deltas
+        # Segments, parallel to the slab, are either inside it or never enter it
+        first = np.where(is_parallel, np.where(is_inside, -np.inf, np.inf), first)
+        second = np.where(is_parallel, np.inf, second)
+        entries = np.maximum(entries, np.minimum(first, second))
+        exits = np.minimum(exits, np.maximum(first, second))
+    return entries <= exits
+
+
 def generate_nonpoint_beam(width: float, height: float, presicion: float,
                            origin: Point, angle: float, color: ColorType) -> BeamsTemplateList:
     """
@@ -40,38 +136,51 @@ def generate_nonpoint_beam(width: float, height: float, presicion: float,
 
 
 class VisualLightBeam(Drawable):
-    def __init__(self, light_beam: LightBeam, visual_plane: VisualPlane, color: ColorType, diffusion_treshold: int = 5) -> None:
+    blends_with_passed_objects = True
+
+    def __init__(self, light_beam: LightBeam, visual_plane: VisualPlane, color: ColorType, diffusion_treshold: int = 5,
+                 radiance_buffer: Optional[RadianceBuffer] = None, bind_to_plane: bool = True,
+                 distance_field: Optional[DistanceField] = None) -> None:
+        """
+        If radiance buffer is given, beam deposits its intensity into it instead of keeping own draw coordinates.
+        Only last points of the path are kept in that case, so memory doesn't grow with path length.
+        Beams, that are not bound to plane, can only be traced into radiance buffer.
+        If distance field of objects on plane is given, beam is propogated by sphere tracing.
+        """
         super().__init__()
+        self.radiance_buffer = radiance_buffer
+        self.distance_field = distance_field
+        self._number_of_deposited_points = 0
+        self._number_of_drawn_points = 0
         self.beam = light_beam
         self.visual_plane = visual_plane
         self.color = color
         self.original_color = color
-        self.visual_plane.bind_object(self)
+        self.is_bound_to_plane = bind_to_plane
+        if bind_to_plane:
+            self.visual_plane.bind_object(self)
         self.diffusion_treshold = diffusion_treshold
         self.transparensy = 0.5
+        self.is_source_drawn = False
+        # States of the beam and its drawing before every propogation, from which beam can be traced again
+        self._checkpoints: list[tuple[tuple, int, ColorType]] = []
+        # Id of the beam in exporter, while the beam waits in ray scheduler to be continued
+        self._export_id: Optional[int] = None
 
     def get_transparensy(self) -> float:
         return self.transparensy
 
     def draw_source(self) -> None:
-        source_center = Point(round(self.beam.coordinates[0].x), round(self.beam.coordinates[0].y))
-        for n in range(4):
-            for i in range(-3, 4):
-                x = source_center.x
-                y = source_center.y
-                if n == 0:
-                    x += i
-                elif n == 1:
-                    y += i
-                elif n == 2:
-                    x -= i
-                    y += i
-                elif n == 3:
-                    x += i
-                    y += i
-                if (x >= 0) and (x < self.visual_plane.plane.size()[0]) and (y >= 0) and (y < self.visual_plane.plane.size()[1]):
-                    if self.draw_coordinates.get(Point(x, y), None) is None:
-                        self.draw_coordinates[Point(x, y)] = self.color
+        # Star of horizontal, vertical and two diagonal strokes of 7 pixels around the source
+        x, y = round(self.beam.coordinates[0].x), round(self.beam.coordinates[0].y)
+        offsets = np.arange(-3, 4)
+        zeros = np.zeros_like(offsets)
+        xs = x + np.concatenate([offsets, zeros, -offsets, offsets])
+        ys = y + np.concatenate([zeros, offsets, offsets, offsets])
+        width, height = self.visual_plane.plane.size()
+        in_plane = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        self.draw_coordinates.add(xs[in_plane], ys[in_plane], self.color)
+        self.is_source_drawn = True
 
     def update_intensity(self) -> None:
         new_intensity = self.beam.relative_intensity
@@ -79,34 +188,159 @@ class VisualLightBeam(Drawable):
         self.color = Color.blend_colors(self.original_color, background_color, 1-new_intensity)
 
     def compute_draw_coordinates(self) -> None:
-        for point in self.beam.coordinates:
-            x, y = point.x, point.y
-            rounded_x = round(x)
-            rounded_y = round(y)
-            if self.draw_coordinates.get(Point(rounded_x, rounded_y), None) is None:
-                self.draw_coordinates[Point(rounded_x, rounded_y)] = self.color
+        if self.radiance_buffer is not None:
+            return
+        # Points, that were already drawn, keep their color, so only path after the last drawn point is added.
+        # Path is densified, so parts of it, which points are further than a pixel apart, leave no gaps.
+        coordinates = self.beam.coordinates[max(self._number_of_drawn_points - 1, 0):]
+        xs, ys = densify_path([point.x for point in coordinates], [point.y for point in coordinates])
+        self.draw_coordinates.add(xs, ys, self.color)
+        self._number_of_drawn_points = len(self.beam.coordinates)
 
     def get_color_on_point(self, point: Point, precision: Optional[float] = None) -> ColorType:
         if not self.draw_coordinates:
             self.compute_draw_coordinates()
-        if point in self.draw_coordinates.keys():
+        if point in self.draw_coordinates:
             return self.draw_coordinates[point]
         else:
             return Color.NONE
 
-    def fully_propogate(self) -> None:
+    def fully_propogate(self, scheduler: Optional[RayTreeScheduler] = None, exporter: Optional['TraceExporter'] = None) -> None:
+        """
+        If scheduler is given, beam is split on refraction lines by Fresnel equations,
+        and both reflected beam and this beam with transmitted part are spawned into scheduler,
+        so they are traced brightest first. This beam is continued by the next call, when scheduler pops it.
+        If exporter is given, path and interactions of the beam are exported by it.
+        """
+        from optical.detectors import DetectorLine
+        if exporter is not None and self._export_id is None:
+            self._export_id = exporter.start_beam(self.beam)
+        beam_id = self._export_id
         while True:
             if not self.check_diffusion(): break
 
-            object_hit = self.beam.propogate_until(self.visual_plane.plane.borders_as_list() + self.visual_plane.plane.objects_on_plane)
-            self.compute_draw_coordinates()
-            if isinstance(object_hit, RefractionLine):
+            self.record_checkpoint()
+            object_hit = self.beam.propogate_until(self.visual_plane.plane.borders_as_list() + self.visual_plane.plane.objects_on_plane,
+                                                   self.distance_field)
+            if exporter is not None:
+                exporter.record_propogation(beam_id, self.beam, object_hit is not None)
+            if self.radiance_buffer is not None:
+                self.deposit_radiance()
+            else:
+                self.compute_draw_coordinates()
+            if isinstance(object_hit, RefractionLine) and scheduler is not None:
+                reflected_beam = self.beam.split(object_hit)
+                self.update_intensity()
+                if reflected_beam is not None:
+                    scheduler.spawn(self.spawn_beam(reflected_beam), reflected_beam.relative_intensity)
+                    if scheduler.spawn(self, self.beam.relative_intensity):
+                        return
+                    break
+            elif isinstance(object_hit, RefractionLine):
                 self.beam.refract(object_hit)
             elif isinstance(object_hit, ReflectionLine):
                 self.beam.reflect(object_hit)
                 self.update_intensity()
+            elif isinstance(object_hit, DetectorLine):
+                direction = self.beam.direction
+                object_hit.record_hit(self.beam.coordinates[-1], direction.x, direction.y, self.beam.relative_intensity)
+                if object_hit.detector.absorbing:
+                    break
+                self.beam.pass_through()
             else:
                 break
+        if exporter is not None:
+            exporter.finish_beam(beam_id, self.beam)
+            self._export_id = None
+
+    def record_checkpoint(self) -> None:
+        """Remembers state of the beam before propogation, so that it can be traced again from this point"""
+        self._checkpoints.append((self.beam.get_state(), self._number_of_drawn_points, self.color))
+
+    def get_runs(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns xs and ys of starts and ends of straight runs of the path, that beam passed from every checkpoint.
+        Runs end 0.01 after the hit, where beam was reflected or refracted.
+        """
+        coordinates = self.beam.coordinates
+        starts = [coordinates[state[0] - 1] for state, _, _ in self._checkpoints]
+        ends = starts[1:] + [coordinates[-1]] if starts else []
+        return (np.array([point.x for point in starts], np.float64), np.array([point.y for point in starts], np.float64),
+                np.array([point.x for point in ends], np.float64), np.array([point.y for point in ends], np.float64))
+
+    def get_initial_refraction_coefficient(self) -> float:
+        """Returns refraction coefficient, with which beam started its path"""
+        state, _, _ = self._checkpoints[0]
+        return state[2]
+
+    def get_initial_media(self) -> Optional[tuple]:
+        """Returns media, inside which beam started its path (None, if beam doesn't track them)"""
+        state, _, _ = self._checkpoints[0]
+        return state[5]
+
+    def get_path_rows(self, checkpoint_index: int) -> np.ndarray:
+        """Returns rows of pixels of the path, drawn after given checkpoint"""
+        _, number_of_drawn_points, _ = self._checkpoints[checkpoint_index]
+        coordinates = self.beam.coordinates[max(number_of_drawn_points - 1, 0):]
+        _, ys = densify_path([point.x for point in coordinates], [point.y for point in coordinates])
+        return np.unique(np.rint(ys).astype(np.int64))
+
+    def restart_from_checkpoint(self, checkpoint_index: int) -> None:
+        """
+        Returns beam and its drawing into state of given checkpoint, so it can be propogated again from it.
+        Pixels are merged in draw coordinates, so path before checkpoint is drawn again the same way, as it was drawn.
+        """
+        if self.radiance_buffer is not None:
+            raise ValueError('Beams, that deposit into radiance buffer, forget their path and can not be traced again')
+        self.draw_coordinates.clear()
+        self.color = self.original_color
+        if self.is_source_drawn:
+            self.draw_source()
+        for drawn_coordinates, color in self.get_drawn_paths(checkpoint_index):
+            xs, ys = densify_path([point.x for point in drawn_coordinates], [point.y for point in drawn_coordinates])
+            self.draw_coordinates.add(xs, ys, color)
+        state, self._number_of_drawn_points, self.color = self._checkpoints[checkpoint_index]
+        self.beam.restore_state(state)
+        del self._checkpoints[checkpoint_index:]
+
+    def get_drawn_paths(self, number_of_propogations: Optional[int] = None) -> list[tuple[list[Point], ColorType]]:
+        """
+        Returns parts of the path, drawn by the first propogations (all by default), with colors, they were drawn with.
+        Every propogation is drawn with color, that beam had before it, and parts continue from the last drawn point.
+        """
+        if self.radiance_buffer is not None:
+            raise ValueError('Beams, that deposit into radiance buffer, forget their path and can not be drawn again')
+        coordinates = self.beam.coordinates
+        ends = [number_of_drawn_points for _, number_of_drawn_points, _ in self._checkpoints[1:]] + [self._number_of_drawn_points]
+        drawn_paths = []
+        for (_, first_drawn_point, color), last_drawn_point in list(zip(self._checkpoints, ends))[:number_of_propogations]:
+            if last_drawn_point > first_drawn_point:
+                drawn_paths.append((coordinates[max(first_drawn_point - 1, 0):last_drawn_point], color))
+        return drawn_paths
+
+    def spawn_beam(self, light_beam: LightBeam) -> 'VisualLightBeam':
+        """Returns visual beam for beam, that was split from this one, drawn the same way as this beam"""
+        visual_beam = VisualLightBeam(light_beam, self.visual_plane, self.original_color, self.diffusion_treshold,
+                                      radiance_buffer=self.radiance_buffer, bind_to_plane=self.is_bound_to_plane,
+                                      distance_field=self.distance_field)
+        # Spawned beam starts from two last points of this beam, which are already drawn
+        visual_beam._number_of_deposited_points = 2
+        visual_beam.update_intensity()
+        return visual_beam
+
+    def deposit_radiance(self) -> None:
+        """Deposits path, passed since last deposit, and forgets all points except two last"""
+        coordinates = self.beam.coordinates
+        # Path is continued from the last deposited point, which itself is not deposited again
+        first_point = max(self._number_of_deposited_points - 1, 0)
+        xs, ys = densify_path([point.x for point in coordinates[first_point:]],
+                              [point.y for point in coordinates[first_point:]])
+        if first_point > 0:
+            xs, ys = xs[1:], ys[1:]
+        self.radiance_buffer.deposit(xs, ys, self.beam.relative_intensity, self.original_color)
+        # Two last points are needed to reflect or refract the beam
+        del coordinates[:-2]
+        self._number_of_deposited_points = len(coordinates)
 
     def check_diffusion(self) -> bool:
         background_color = self.visual_plane.background_color
@@ -135,19 +369,55 @@ class LightBeamSceneManager:
     def __init__(self, visual_plane: VisualPlane, *, beams: BeamsTemplateList,
                 points: Optional[PointTemplateList], lines: Optional[LinesTemplateList],
                 line_segments: Optional[LinesSegmentsTemplateList], polygons: Optional[PolygonsTemplateList],
-                circles: Optional[CirclesTemplateList], refraction_coefficients_management: bool = True) -> None: ...
+                circles: Optional[CirclesTemplateList], refraction_coefficients_management: bool = True,
+                arcs: Optional[ArcsTemplateList] = None, lenses: Optional[LensesTemplateList] = None,
+                conics: Optional[ConicsTemplateList] = None, scene_graphs: Optional[SceneGraphsTemplateList] = None,
+                accumulate_beams: bool = False, exposure: Optional[float] = None,
+                sources: Optional[SourcesTemplateList] = None,
+                ray_scheduler: Optional[RayTreeScheduler] = None,
+                use_distance_field: bool = False, distance_field_cell_size: float = 4,
+                render_cache: Optional['RenderCache'] = None, process_tracer: Optional['ProcessTracer'] = None,
+                trace_exporter: Optional['TraceExporter'] = None) -> None: ...
 
     @overload
     def __init__(self, visual_plane: VisualPlane, *, 
-                image_groups: dict[str, SceneGroup], refraction_coefficients_management: bool = True) -> None: ...
+                image_groups: dict[str, SceneGroup], refraction_coefficients_management: bool = True,
+                accumulate_beams: bool = False, exposure: Optional[float] = None,
+                ray_scheduler: Optional[RayTreeScheduler] = None,
+                use_distance_field: bool = False, distance_field_cell_size: float = 4,
+                render_cache: Optional['RenderCache'] = None, process_tracer: Optional['ProcessTracer'] = None,
+                trace_exporter: Optional['TraceExporter'] = None) -> None: ...
 
     def __init__(self, visual_plane, *, beams = None,
                  points = None, lines = None,
                  line_segments = None, polygons = None,
                  circles = None, refraction_coefficients_management = True,
-                 image_groups = None):
-        if (beams is None and image_groups is None): 
-            raise ValueError('LightBeamSceneManager expect to either beams or images keyword argument provided')
+                 arcs = None, lenses = None, conics = None, scene_graphs = None, image_groups = None, accumulate_beams = False, exposure = None, sources = None,
+                 ray_scheduler = None, use_distance_field = False, distance_field_cell_size = 4,
+                 render_cache = None, process_tracer = None, trace_exporter = None):
+        """
+        If accumulate_beams is True, beams add their intensity into radiance buffer of the plane
+        instead of overwriting each other, and buffer is tone mapped with given exposure
+        (or automatic one, if exposure is None) once all beams are traced.
+        Beams of light sources are emitted and traced chunk by chunk, and are always accumulated.
+        If ray scheduler is given, beams are split on refraction lines by Fresnel equations,
+        and the whole ray tree is traced brightest beam first, within limits of the scheduler:
+        both reflected and transmitted beams of every split are spawned into it.
+        If use_distance_field is True, distance field of the scene is sampled with given cell size,
+        and beams are propogated by sphere tracing through it: they pass the same path, as without it,
+        but objects are checked only near them, so images are the same.
+        If render cache is given, images, which scene and settings didn't change, are restored from it.
+        If process tracer is given, spectral beams are traced by its worker processes, when the scene can be packed
+        into shared memory, and by batch tracer in this process otherwise. Regular beams and beams of sources
+        are always traced in this process.
+        If trace exporter is given, paths and interactions of all beams, traced by render_image, are exported by it,
+        and images are not restored from render cache, because they must be traced.
+        Spectral beams are traced together by batch tracer (without Fresnel splitting and distance field),
+        and every wavelength is drawn with its own color. Given color of spectral beam only
+        tells, if it is visible (not Color.NONE).
+        """
+        if (beams is None and sources is None and image_groups is None):
+            raise ValueError('LightBeamSceneManager expect to either beams, sources or images keyword argument provided')
 
         self.visual_plane = visual_plane
         self.image_counter = 0    
@@ -155,11 +425,24 @@ class LightBeamSceneManager:
 
         self.image_groups = image_groups
         self.refraction_coefficients_management = refraction_coefficients_management
+        self.accumulate_beams = accumulate_beams
+        self.exposure = exposure
+        self.ray_scheduler = ray_scheduler
+        self.use_distance_field = use_distance_field
+        self.distance_field_cell_size = distance_field_cell_size
+        self.render_cache = render_cache
+        self.process_tracer = process_tracer
+        self.trace_exporter = trace_exporter
 
         if image_groups is None:
+            self.scene_group: SceneGroup = {'beams': beams, 'points': points, 'lines': lines,
+                                            'line_segments': line_segments, 'polygons': polygons,
+                                            'circles': circles, 'sources': sources, 'arcs': arcs, 'lenses': lenses,
+                                            'conics': conics, 'scene_graphs': scene_graphs}
             self._resolve(beams=beams, line_segments=line_segments, lines=lines,
                         refraction_coefficients_management=refraction_coefficients_management, points=points,
-                        polygons=polygons, circles=circles)
+                        polygons=polygons, circles=circles, sources=sources, arcs=arcs, lenses=lenses, conics=conics,
+                        scene_graphs=scene_graphs)
             
     def draw_image(self, image_name: str = '') -> None:
         self.image_counter += 1
@@ -170,78 +453,264 @@ class LightBeamSceneManager:
         else:
             raise ValueError('Image name must be provided, if you specified image groups')
 
+        cache_key = self.get_cache_key(image_name)
+        image_path = self.visual_plane.get_image_path(image_name)
+        if cache_key is not None and self.render_cache.restore(cache_key, image_path):
+            self.visual_plane.image_counter += 1
+            if image_name:
+                print(f'Image "{image_name}" restored from cache')
+            else:
+                print(f'Image №{self.image_counter} restored from cache')
+            return
+
+        self.render_image(image_name)
+
+        # With background encoder image is stored into cache only after it is written
+        self.visual_plane.create_image(image_name, on_written=(lambda: self.render_cache.store(cache_key, image_path))
+                                       if cache_key is not None else None)
+        state = 'queued' if self.visual_plane.encoder is not None else 'created'
+        if image_name:
+            print(f'Image "{image_name}" {state}')
+        else:
+            print(f'Image №{self.image_counter} {state}')
+
+    def get_cache_key(self, image_name: str = '') -> Optional[str]:
+        """
+        Returns key of the image in render cache, or None, if there is no cache
+        or image is not reproducible (has light sources without seed).
+        Images with detectors are not cached too, because histograms of detectors are filled only by tracing.
+        """
+        if self.render_cache is None or self.trace_exporter is not None:
+            return None
+        from optical.detectors import Detector
+        scene_group = self.image_groups[str(image_name)] if self.using_groups else self.scene_group
+        if any(source.seed is None for source, _ in scene_group.get('sources') or []):
+            return None
+        if any(isinstance(object_, Detector)
+               for object_, _ in (scene_group.get('line_segments') or []) + (scene_group.get('polygons') or [])):
+            return None
+        settings = {
+            'size': self.visual_plane.plane.size(),
+            'background_color': self.visual_plane.background_color,
+            'refraction_coefficients_management': self.refraction_coefficients_management,
+            'accumulate_beams': self.accumulate_beams,
+            'exposure': self.exposure,
+            'ray_scheduler': self.ray_scheduler,
+            'use_distance_field': self.use_distance_field,
+            'distance_field_cell_size': self.distance_field_cell_size,
+            'image_format': self.visual_plane.image_format,
+        }
+        return self.render_cache.get_key(scene_group, settings)
+
+    def render_image(self, image_name: str = '') -> None:
+        """Traces the scene (or image group with given name) and draws it into framebuffer of the plane"""
+        self.trace_only(image_name)
+        self.visual_plane.rasterize(self.get_drawables())
+        if self.accumulate_beams or self.sources:
+            self.visual_plane.compose_radiance(self.exposure)
+        self.is_rendered = True
+
+    def trace_only(self, image_name: str = '') -> list['Detector']:
+        """
+        Traces the scene (or image group with given name) without drawing it into framebuffer,
+        and returns its detectors, which histograms are filled by the trace.
+        Scene, that is traced this way, is drawn by render_image without tracing it again.
+        """
+        self.rendered_image_name = image_name
         if self.using_groups:
             scene_group: dict = self.image_groups[str(image_name)]
-            self.regroup_scene(beams=scene_group['beams'], points=scene_group.get('points', None),
+            self.regroup_scene(beams=scene_group.get('beams', None), points=scene_group.get('points', None),
                 lines=scene_group.get('lines', None), line_segments=scene_group.get('line_segments', None),
                 polygons=scene_group.get('polygons', None), circles=scene_group.get('circles', None),
+                sources=scene_group.get('sources', None), arcs=scene_group.get('arcs', None),
+                lenses=scene_group.get('lenses', None), conics=scene_group.get('conics', None),
+                scene_graphs=scene_group.get('scene_graphs', None),
                 refraction_coefficients_management=self.refraction_coefficients_management)
 
-        for visual_beam in self.visual_beams:
-            visual_beam.fully_propogate()
-
-        for visual_line in self.visual_lines:
-            self.visual_plane.draw_object_by_point(visual_line)
-
-        for visual_polygon in self.visual_polygons:
-            self.visual_plane.draw_object_by_point(visual_polygon)
-
-        for visual_circle in self.visual_circles:
-            self.visual_plane.draw_object_by_point(visual_circle)
-
-        for visual_line_segment in self.visual_line_segments:
-            self.visual_plane.draw_object_by_point(visual_line_segment)
-
-        for visual_point in self.visual_points:
-            self.visual_plane.draw_object_by_point(visual_point)
-
-        for visual_beam in self.visual_beams:
-            visual_beam.blend_with_passed_objects()
-            self.visual_plane.draw_object_by_point(visual_beam)
-
-        self.visual_plane.create_image(image_name)
-        if image_name:
-            print(f'Image "{image_name}" created')
-        else:
-            print(f'Image №{self.image_counter} created')
+        if self.ray_scheduler is not None:
+            self.ray_scheduler.reset()
+        self.visual_beams += self.trace_beams(self.visual_beams, self.trace_exporter)
+        self.trace_spectral_beams(self.spectral_visual_beams, self.trace_exporter)
+
+        for source, color in self.sources:
+            self.trace_source(source, color, self.trace_exporter)
+        return self.detectors
+
+    def render_view(self, viewport: 'Viewport', image_name: str = '') -> VisualPlane:
+        """
+        Draws the traced scene (or image group with given name) through viewport into new plane of its size
+        and returns it, so its image can be created. Scene is traced only, if it wasn't rendered yet,
+        so one trace can be drawn at any number of resolutions and crops.
+        """
+        if not getattr(self, 'is_rendered', False) or self.rendered_image_name != image_name:
+            self.render_image(image_name)
+        if self.accumulate_beams or self.sources:
+            raise ValueError('Beams, accumulated into radiance buffer, forget their paths and can not be drawn through viewport')
+        # Viewport is imported only, when views are drawn
+        from visual.viewport import get_view_drawable
+        view_plane = VisualPlane(*viewport.get_size(self.visual_plane.plane.size()),
+                                 path_to_image_folder=self.visual_plane.path_to_image_folder,
+                                 background_color=self.visual_plane.background_color,
+                                 image_format=self.visual_plane.image_format, encoder=self.visual_plane.encoder)
+        view_plane.rasterizer = self.visual_plane.rasterizer
+        view_plane.rasterize([get_view_drawable(drawable, viewport, view_plane) for drawable in self.get_drawables()])
+        return view_plane
+
+    def get_drawables(self) -> list[Drawable]:
+        """Returns visual objects of the scene in order, in which they are rasterized"""
+        # Beams are drawn last, so they are blended with every object they pass
+        return [*self.visual_lines, *self.visual_polygons, *self.visual_instances, *self.visual_lenses, *self.visual_circles,
+                *self.visual_arcs, *self.visual_conics,
+                *self.visual_line_segments, *self.visual_points, *self.visual_beams,
+                *self.spectral_visual_beams]
 
     def draw_all_images(self) -> None:
+        """Draws every image, and waits, until images, queued to background encoder, are written"""
         if self.using_groups:
             for image_name in self.image_groups:
                 self.draw_image(image_name)
         else:
             self.draw_image()
+        self.visual_plane.flush_images()
+
+    def trace_source(self, source: LightSource, color: ColorType, exporter: Optional['TraceExporter'] = None) -> None:
+        """
+        Traces beams of the source into radiance buffer, consuming them chunk by chunk,
+        so only one chunk of beams is kept in memory at once.
+        """
+        radiance_buffer = self.visual_plane.get_radiance_buffer()
+        for beams in source.emit_beams():
+            if self.refraction_coefficients_management:
+                self.resolve_refraction_coefficients(beams)
+            visual_beams = []
+            for beam in beams:
+                visual_beams.append(VisualLightBeam(beam, self.visual_plane, color, radiance_buffer=radiance_buffer,
+                                                    bind_to_plane=False, distance_field=self.distance_field))
+            self.trace_beams(visual_beams, exporter)
+
+    def trace_beams(self, visual_beams: list[VisualLightBeam], exporter: Optional['TraceExporter'] = None) -> list[VisualLightBeam]:
+        """Fully propogates given beams and returns beams, that were spawned by splitting"""
+        if self.ray_scheduler is None:
+            for visual_beam in visual_beams:
+                visual_beam.fully_propogate(exporter=exporter)
+            return []
+        for visual_beam in visual_beams:
+            self.ray_scheduler.push(visual_beam, visual_beam.beam.relative_intensity)
+        primary_beams = set(visual_beams)
+        # Beams are popped once for every part of their path between splits, but returned once
+        spawned_beams: dict[VisualLightBeam, None] = {}
+        while self.ray_scheduler:
+            visual_beam = self.ray_scheduler.pop()
+            visual_beam.fully_propogate(self.ray_scheduler, exporter)
+            if visual_beam not in primary_beams:
+                spawned_beams[visual_beam] = None
+        return list(spawned_beams)
+
+    def trace_spectral_beams(self, visual_beams: list[VisualLightBeam], exporter: Optional['TraceExporter'] = None) -> None:
+        """Fully propogates given beams together by batch tracer, drawing and exporting them the same way as fully_propogate"""
+        if not visual_beams:
+            return
+        from optical.spectral_tracer import BatchTracer
+        if exporter is not None:
+            beam_ids = [exporter.start_beam(visual_beam.beam) for visual_beam in visual_beams]
+        plane = self.visual_plane.plane
+        objects = plane.borders_as_list() + plane.objects_on_plane
+        tracer: Union['BatchTracer', 'ProcessTracer']
+        if self.process_tracer is not None and self._can_pack(objects):
+            self.process_tracer.publish(objects)
+            tracer = self.process_tracer
+        else:
+            tracer = BatchTracer(objects)
+
+        def on_hit(i: int) -> None:
+            visual_beam = visual_beams[i]
+            if exporter is not None:
+                exporter.record_propogation(beam_ids[i], visual_beam.beam, True)
+            if visual_beam.radiance_buffer is not None:
+                visual_beam.deposit_radiance()
+            else:
+                visual_beam.compute_draw_coordinates()
+
+        def should_continue(i: int) -> bool:
+            visual_beams[i].update_intensity()
+            if not visual_beams[i].check_diffusion():
+                return False
+            visual_beams[i].record_checkpoint()
+            return True
+
+        tracer.trace([visual_beam.beam for visual_beam in visual_beams], on_hit=on_hit, should_continue=should_continue)
+        if exporter is not None:
+            for beam_id, visual_beam in zip(beam_ids, visual_beams):
+                exporter.finish_beam(beam_id, visual_beam.beam)
+
+    @staticmethod
+    def _can_pack(objects: list[Any]) -> bool:
+        # Shared tracer is imported only, when process tracer is used
+        from optical.shared_tracer import can_pack
+        return can_pack(objects)
+
+    def resolve_refraction_coefficients(self, beams: list[LightBeam]) -> None:
+        """
+        Sets stacks of closed figures, inside which beams start, as their media, and refraction coefficients
+        of the beams to the coefficients of the innermost figures or, outside of all figures, of the closest refraction lines
+        """
+        xs = np.array([beam.origin.x for beam in beams], np.float64)
+        ys = np.array([beam.origin.y for beam in beams], np.float64)
+        unresolved = []
+        for i, (beam, media) in enumerate(zip(beams, self.medium_tree.get_media(xs, ys))):
+            beam.media = media
+            if media:
+                beam.refracion_coefficient = get_medium_refraction_coefficient(media, beam.wavelength)
+            else:
+                unresolved.append(i)
+        if self.refraction_lines and unresolved:
+            closest_lines = self.refraction_lines_index.get_closest_objects(xs[unresolved], ys[unresolved])
+            for i, closest_line in zip(unresolved, closest_lines):
+                direction_to_line = closest_line.get_direction_to_point(beams[i].origin)
+                beams[i].refracion_coefficient = closest_line.get_current_refraction_coefficient(direction_to_line,
+                                                                                                 beams[i].wavelength)
 
     def get_closest_refraction_line(self, point: Point) -> RefractionLine:
-        closest = None
-        min_distance = math.inf
-        for obj in self.refraction_lines:
-            distance = obj.get_distance_to_point(point)
-            if distance < min_distance:
-                closest = obj
-        return closest
-
-    def _resolve(self, *, beams: BeamsTemplateList,
+        return self.refraction_lines_index.get_closest_object(point)
+
+    def _resolve(self, *, beams: BeamsTemplateList = None,
                  points: PointTemplateList = None, lines: LinesTemplateList = None,
                  line_segments: LinesSegmentsTemplateList = None, polygons: PolygonsTemplateList = None,
-                 circles: CirclesTemplateList = None, refraction_coefficients_management: bool = True) -> None:
+                 circles: CirclesTemplateList = None, sources: SourcesTemplateList = None,
+                 arcs: ArcsTemplateList = None, lenses: LensesTemplateList = None,
+                 conics: ConicsTemplateList = None, scene_graphs: SceneGraphsTemplateList = None,
+                 refraction_coefficients_management: bool = True) -> None:
+        from optical.detectors import Detector
+        from optical.spectral_tracer import SpectralBeam
         self.points: list[Point] = []
         self.lines: list[Line] = []
         self.beams: list[LightBeam] = []
         self.line_segments: list[LineSegment] = []
         self.polygons: list[Polygon] = []
         self.circles: list[Cirlce] = []
+        self.arcs: list[Arc] = []
+        self.lenses: list[Lens] = []
+        self.conics: list[Conic] = []
+        self.scene_graphs: list['SceneGraph'] = []
+        self.sources: SourcesTemplateList = sources if sources is not None else []
 
         self.refraction_polygons: list[RefractionPolygon] = []
         self.refraction_lines: list[RefractionLine] = []
         self.refraction_circles: list[RefractionCircle] = []
+        self.refraction_lenses: list[RefractionLens] = []
 
         self.visual_points: list[VisualPoint] = []
         self.visual_lines: list[VisualLine] = []
         self.visual_beams: list[VisualLightBeam] = []
+        self.spectral_visual_beams: list[VisualLightBeam] = []
         self.visual_line_segments: list[VisualLineSegment] = []
         self.visual_polygons: list[VisualPolygon] = []
         self.visual_circles: list[VisaulCircle] = []
+        self.visual_arcs: list[VisualArc] = []
+        self.visual_lenses: list[VisualLens] = []
+        self.visual_conics: list[VisualConic] = []
+        self.visual_instances: list[VisualInstances] = []
+        self.is_rendered = False
 
         if points is not None:
             for point, color in points:
@@ -279,6 +748,8 @@ class LightBeamSceneManager:
                 for edge in polygon.edges:
                     self.visual_plane.plane.append_object(edge)
 
+        self.refraction_lines_index = SpatialIndex(self.refraction_lines)
+
         if circles is not None:
             for circle, color, draw_only_circumference in circles:
                 self.circles.append(circle)
@@ -289,38 +760,248 @@ class LightBeamSceneManager:
                     self.visual_circles.append(visual_circle)
                 self.visual_plane.plane.append_object(circle)
 
+        if arcs is not None:
+            for arc, color in arcs:
+                self.arcs.append(arc)
+                if color != Color.NONE:
+                    visual_arc = VisualArc(arc, self.visual_plane, color)
+                    self.visual_arcs.append(visual_arc)
+                self.visual_plane.plane.append_object(arc)
+
+        if conics is not None:
+            for conic, color in conics:
+                self.conics.append(conic)
+                if color != Color.NONE:
+                    visual_conic = VisualConic(conic, self.visual_plane, color)
+                    self.visual_conics.append(visual_conic)
+                self.visual_plane.plane.append_object(conic)
+
+        if scene_graphs is not None:
+            for scene_graph, color in scene_graphs:
+                scene_graph.build()
+                self.scene_graphs.append(scene_graph)
+                if color != Color.NONE:
+                    for prototype in scene_graph.prototypes:
+                        visual_instances = VisualInstances(scene_graph, prototype, self.visual_plane, color)
+                        self.visual_instances.append(visual_instances)
+                self.visual_plane.plane.append_object(scene_graph)
+
+        if lenses is not None:
+            for lens, color in lenses:
+                self.lenses.append(lens)
+                if isinstance(lens, RefractionLens):
+                    self.refraction_lenses.append(lens)
+                if color != Color.NONE:
+                    visual_lens = VisualLens(lens, self.visual_plane, color)
+                    self.visual_lenses.append(visual_lens)
+                for surface in lens.surfaces:
+                    self.visual_plane.plane.append_object(surface)
+
+        self.medium_tree = MediumTree([*self.refraction_circles, *self.refraction_lenses, *self.refraction_polygons])
+
+        # Detectors count hits of this scene only
+        self.detectors: list['Detector'] = [object_ for object_ in self.line_segments + self.polygons if isinstance(object_, Detector)]
+        for detector in self.detectors:
+            detector.reset()
+
+        self.distance_field: Optional[DistanceField] = None
+        if self.use_distance_field:
+            plane = self.visual_plane.plane
+            self.distance_field = DistanceField(plane.borders_as_list() + plane.objects_on_plane,
+                                                plane.width, plane.height, self.distance_field_cell_size)
+
+        if beams is None:
+            beams = []
+        # Every wavelength of spectral beam is resolved and drawn as separate beam, source is drawn once
+        light_beams: list[tuple[LightBeam, ColorType, bool, bool]] = []
         for beam, color, draw_source in beams:
-            if refraction_coefficients_management:
-                for circle in self.refraction_circles:
-                    if circle.is_point_inside(beam.origin):
-                        beam.refracion_coefficient = circle.inner_refraction_coefficient
-                        break
-                else:
-                    for polygon in self.refraction_polygons:
-                        if polygon.is_point_inside(beam.origin):
-                            beam.refracion_coefficient = polygon.inner_refraction_coefficient
-                            break
-                    else:
-                        if self.refraction_lines:
-                            closest_line = self.get_closest_refraction_line(beam.origin)
-                            direction_to_line = closest_line.get_direction_to_point(beam.origin)
-                            beam.refracion_coefficient = closest_line.get_current_refraction_coefficient(direction_to_line)
+            if isinstance(beam, SpectralBeam):
+                light_beams += [(wavelength_beam, color, draw_source and i == 0, True)
+                                for i, wavelength_beam in enumerate(beam.beams)]
+            else:
+                light_beams.append((beam, color, draw_source, False))
+        for beam, _, _, _ in light_beams:
+            beam.media = None
+        if refraction_coefficients_management:
+            self.resolve_refraction_coefficients([beam for beam, _, _, _ in light_beams])
+        for beam, color, draw_source, is_spectral in light_beams:
             beam.coordinates = [beam.origin]
             beam.angle = beam.initial_angle
             beam.relative_intensity = 1
             self.beams.append(beam)
-            if color != Color.NONE:
-                visual_beam = VisualLightBeam(beam, self.visual_plane, color)
+            if color != Color.NONE and is_spectral:
+                radiance_buffer = self.visual_plane.get_radiance_buffer() if self.accumulate_beams else None
+                visual_beam = VisualLightBeam(beam, self.visual_plane, Color.from_wavelength(beam.wavelength),
+                                              radiance_buffer=radiance_buffer)
+                if draw_source:
+                    visual_beam.draw_source()
+                self.spectral_visual_beams.append(visual_beam)
+            elif color != Color.NONE:
+                radiance_buffer = self.visual_plane.get_radiance_buffer() if self.accumulate_beams else None
+                visual_beam = VisualLightBeam(beam, self.visual_plane, color, radiance_buffer=radiance_buffer,
+                                              distance_field=self.distance_field)
                 if draw_source:
                     visual_beam.draw_source()
                 self.visual_beams.append(visual_beam)
 
-    def regroup_scene(self, *, beams: BeamsTemplateList,
+    def regroup_scene(self, *, beams: BeamsTemplateList = None,
                  points: PointTemplateList = None, lines: LinesTemplateList = None,
                  line_segments: LinesSegmentsTemplateList = None, polygons: PolygonsTemplateList = None,
-                 circles: CirclesTemplateList = None, refraction_coefficients_management: bool = True) -> None:
+                 circles: CirclesTemplateList = None, sources: SourcesTemplateList = None,
+                 arcs: ArcsTemplateList = None, lenses: LensesTemplateList = None,
+                 conics: ConicsTemplateList = None, scene_graphs: SceneGraphsTemplateList = None,
+                 refraction_coefficients_management: bool = True) -> None:
         self.visual_plane.reset_plane()
 
         self._resolve(beams=beams, line_segments=line_segments, lines=lines,
                       refraction_coefficients_management=refraction_coefficients_management, points=points,
-                      polygons=polygons, circles=circles)
\ No newline at end of file
+                      polygons=polygons, circles=circles, sources=sources, arcs=arcs, lenses=lenses, conics=conics,
+                      scene_graphs=scene_graphs)
+
+    def replace_object(self, old_object: Any, new_object: Any) -> None:
+        """
+        Replaces object of the scene (line, line segment, polygon, circle, arc, lens, conic or scene graph)
+        with new one, for example with moved copy of it, which is drawn with the same color.
+        If the scene is already rendered, framebuffer of the plane is updated incrementally:
+        only beams, which passed near old or new object, are traced again from the first run, that passed near them,
+        and only rows of the plane, that could change, are rasterized again.
+        Scenes with light sources, accumulated beams, ray scheduler, distance field or detectors
+        are rendered again completely.
+        """
+        from optical.detectors import Detector
+        from optical.scene_graph import SceneGraph
+        scene_groups = list(self.image_groups.values()) if self.using_groups else [self.scene_group]
+        kind = None
+        for scene_group in scene_groups:
+            for group_kind in _REPLACEABLE_KINDS:
+                templates = scene_group.get(group_kind) or []
+                for i, template in enumerate(templates):
+                    if template[0] is old_object:
+                        templates[i] = (new_object, *template[1:])
+                        kind = group_kind
+        if kind is None:
+            raise ValueError(f'{old_object} is not a line, line segment, polygon, circle, arc, lens, conic or scene graph of the scene')
+        objects = getattr(self, kind, [])
+        if not any(object_ is old_object for object_ in objects):
+            # Object belongs to other image group, than the one, that is resolved now
+            return
+        if not self.is_rendered:
+            if not self.using_groups:
+                self.regroup_scene(**self.scene_group, refraction_coefficients_management=self.refraction_coefficients_management)
+            return
+        if (self.sources or self.accumulate_beams or self.ray_scheduler is not None or self.use_distance_field
+                or self.detectors or isinstance(new_object, Detector)):
+            if not self.using_groups:
+                self.regroup_scene(**self.scene_group, refraction_coefficients_management=self.refraction_coefficients_management)
+            self.render_image(self.rendered_image_name)
+            return
+
+        scene_group = self.image_groups[str(self.rendered_image_name)] if self.using_groups else self.scene_group
+        new_template = next(template for template in scene_group[kind] if template[0] is new_object)
+        if isinstance(new_object, SceneGraph):
+            new_object.build()
+        objects[next(i for i, object_ in enumerate(objects) if object_ is old_object)] = new_object
+        plane_objects = self.visual_plane.plane.objects_on_plane
+        old_plane_objects = _get_plane_objects(old_object)
+        first_plane_object = next(i for i, object_ in enumerate(plane_objects) if object_ is old_plane_objects[0])
+        plane_objects[first_plane_object:first_plane_object + len(old_plane_objects)] = _get_plane_objects(new_object)
+        self.refraction_lines = [line for line in self.lines if isinstance(line, RefractionLine)]
+        self.refraction_polygons = [polygon for polygon in self.polygons if isinstance(polygon, RefractionPolygon)]
+        self.refraction_circles = [circle for circle in self.circles if isinstance(circle, RefractionCircle)]
+        self.refraction_lenses = [lens for lens in self.lenses if isinstance(lens, RefractionLens)]
+        self.refraction_lines_index = SpatialIndex(self.refraction_lines)
+        self.medium_tree = MediumTree([*self.refraction_circles, *self.refraction_lenses, *self.refraction_polygons])
+
+        width, height = self.visual_plane.plane.size()
+        old_bounds, new_bounds = _get_bounds(old_object, width, height), _get_bounds(new_object, width, height)
+        dirty_rows = [np.empty(0, np.int64)]
+        visuals_name, object_attribute = _REPLACEABLE_KINDS[kind]
+        visuals = getattr(self, visuals_name)
+        old_visual_indexes = [i for i, visual in enumerate(visuals) if getattr(visual, object_attribute) is old_object]
+        if old_visual_indexes:
+            for i in old_visual_indexes:
+                self.visual_plane.objects_on_plane.remove(visuals[i])
+            visuals[old_visual_indexes[0]:old_visual_indexes[-1] + 1] = self._create_visuals(kind, new_template)
+            for _, _, min_y, max_y in (old_bounds, new_bounds):
+                if min_y <= max_y:
+                    dirty_rows.append(np.arange(math.floor(min_y) - 1, math.ceil(max_y) + 2))
+
+        dirty_rows += self.retrace_beams_near_objects([(old_object, old_bounds), (new_object, new_bounds)],
+                                                      replaced_objects=[(old_object, new_object)])
+        self.visual_plane.rasterize(self.get_drawables(), rows=np.concatenate(dirty_rows))
+
+    def retrace_beams_near_objects(self, objects: list[tuple[Any, tuple[float, float, float, float]]], *,
+                                   replaced_objects: Optional[list[tuple[Any, Any]]] = None) -> list[np.ndarray]:
+        """
+        Traces again beams, which paths passed near given objects (with their bounds on plane),
+        from the first run of the path, that passed near one of them. Beams, that start in other medium, than before,
+        are traced again from the start. Old objects in media of the beams are changed to new ones by replaced objects.
+        Returns rows of pixels of old and new paths of the beams after these runs.
+        """
+        if replaced_objects is None:
+            replaced_objects = []
+        spectral_beams = set(self.spectral_visual_beams)
+        visual_beams = [visual_beam for visual_beam in self.visual_beams + self.spectral_visual_beams
+                        if visual_beam.get_runs()[0].size]
+        if not visual_beams:
+            return []
+        runs = [visual_beam.get_runs() for visual_beam in visual_beams]
+        run_beams = np.repeat(np.arange(len(visual_beams)), [run[0].size for run in runs])
+        run_indexes = np.concatenate([np.arange(run[0].size) for run in runs])
+        x0s, y0s, x1s, y1s = (np.concatenate([run[i] for run in runs]) for i in range(4))
+        is_near = np.zeros(x0s.size, bool)
+        for object_, bounds in objects:
+            is_near |= _are_runs_near_object(x0s, y0s, x1s, y1s, object_, bounds)
+        first_runs = np.full(len(visual_beams), run_indexes.size, np.int64)
+        np.minimum.at(first_runs, run_beams[is_near], run_indexes[is_near])
+
+        if self.refraction_coefficients_management:
+            # Medium, where beam starts, may change, even if its path doesn't pass near changed objects
+            start_beams = [LightBeam(visual_beam.beam.origin, 0, wavelength=visual_beam.beam.wavelength)
+                           for visual_beam in visual_beams]
+            self.resolve_refraction_coefficients(start_beams)
+            for i, (visual_beam, start_beam) in enumerate(zip(visual_beams, start_beams)):
+                initial_media = list(visual_beam.get_initial_media() or [])
+                for old_object, new_object in replaced_objects:
+                    initial_media = [new_object if medium is old_object else medium for medium in initial_media]
+                if (start_beam.refracion_coefficient != visual_beam.get_initial_refraction_coefficient()
+                        or [id(medium) for medium in start_beam.media] != [id(medium) for medium in initial_media]):
+                    first_runs[i] = 0
+
+        affected = np.flatnonzero(first_runs < run_indexes.size).tolist()
+        dirty_rows = []
+        for i in affected:
+            visual_beam = visual_beams[i]
+            dirty_rows.append(visual_beam.get_path_rows(int(first_runs[i])))
+            visual_beam.restart_from_checkpoint(int(first_runs[i]))
+            for old_object, new_object in replaced_objects:
+                visual_beam.beam.replace_medium(old_object, new_object)
+            if first_runs[i] == 0 and self.refraction_coefficients_management:
+                visual_beam.beam.refracion_coefficient = start_beams[i].refracion_coefficient
+                visual_beam.beam.media = start_beams[i].media
+        self.trace_beams([visual_beams[i] for i in affected if visual_beams[i] not in spectral_beams])
+        self.trace_spectral_beams([visual_beams[i] for i in affected if visual_beams[i] in spectral_beams])
+        for i in affected:
+            dirty_rows.append(visual_beams[i].get_path_rows(int(first_runs[i])))
+        return dirty_rows
+
+    def _create_visuals(self, kind: str, template: tuple) -> list[Drawable]:
+        """Returns visual objects for object of the scene of given kind, created like in _resolve"""
+        object_, color = template[0], template[1]
+        if color == Color.NONE:
+            return []
+        if kind == 'lines':
+            return [VisualLine(object_, self.visual_plane, color)]
+        if kind == 'line_segments':
+            return [VisualLineSegment(object_, self.visual_plane, color)]
+        if kind == 'polygons':
+            return [VisualPolygon(object_, self.visual_plane, color)]
+        if kind == 'circles':
+            return [VisaulCircle(object_, self.visual_plane, color, template[2])]
+        if kind == 'arcs':
+            return [VisualArc(object_, self.visual_plane, color)]
+        if kind == 'lenses':
+            return [VisualLens(object_, self.visual_plane, color)]
+        if kind == 'conics':
+            return [VisualConic(object_, self.visual_plane, color)]
+        return [VisualInstances(object_, prototype, self.visual_plane, color) for prototype in object_.prototypes]